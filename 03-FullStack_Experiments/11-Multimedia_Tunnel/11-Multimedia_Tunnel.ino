@@ -6,7 +6,8 @@
     - Does NOT reassemble large messages in RAM.
     - For MSGF: prints "FRAG,src,seq,idx,tot,rssi,d_m,chunk" to Serial.
     - For MSG:  prints "MSG,src,seq,rssi,d_m,text" to Serial.
-    - Still sends ACK / ACKF to keep the ARQ logic working.
+    - Still sends ACK / ACKF to keep the ARQ logic working
+      (except in ARQ_NONE, where the host runs its own selective repeat).
 
   TX side:
     - Fragmentation is done at MCU for long lines from PC.
@@ -14,6 +15,8 @@
         * Stop-and-Wait
         * Go-Back-N
         * Selective Repeat
+        * TDD Block ACK
+        * None (fire-and-forget; reliability handled by the host, see ARQ.md)
     - For small single-packet messages: classic stop-and-wait with ACK.
 
   PC side:
@@ -36,11 +39,12 @@ enum ArqMode
     ARQ_STOP_AND_WAIT = 0,
     ARQ_GO_BACK_N = 1,
     ARQ_SELECTIVE_REPEAT = 2,
-    ARQ_TDD_BLOCK_ACK = 3 // TDD-Aware Block ACK
+    ARQ_TDD_BLOCK_ACK = 3, // TDD-Aware Block ACK
+    ARQ_NONE = 4           // Fire-and-forget: no ACK/ACKF, host-side SR ARQ (--host-arq)
 };
 
 // Choose which ARQ scheme to use for *fragmented* messages:
-ArqMode gArqMode = ARQ_TDD_BLOCK_ACK; // change here: S&W / GBN / SR / TDD-Block-ACK
+ArqMode gArqMode = ARQ_TDD_BLOCK_ACK; // change here: S&W / GBN / SR / TDD-Block-ACK / NONE
 
 // Window size for Go-Back-N / Selective Repeat / TDD Block ACK
 const size_t ARQ_WINDOW_SIZE = 20; // small window (RELIABLE)
@@ -639,7 +643,7 @@ bool sendFragmentsGoBackN(const String &line, size_t L, size_t total, uint32_t s
 {
     if (total > MAX_FRAGMENTS)
     {
-        Serial.println("[ERROR] GBN: total fragments > MAX_FRAGMENTS");
+        Serial.println("[ABORT] GBN: total fragments > MAX_FRAGMENTS");
         return false;
     }
 
@@ -777,7 +781,7 @@ bool sendFragmentsSelectiveRepeat(const String &line, size_t L, size_t total, ui
 {
     if (total > MAX_FRAGMENTS)
     {
-        Serial.println("[ERROR] SR: total fragments > MAX_FRAGMENTS");
+        Serial.println("[ABORT] SR: total fragments > MAX_FRAGMENTS");
         return false;
     }
 
@@ -913,7 +917,7 @@ bool sendFragmentsTDDBlockAck(const String &line, size_t L, size_t total, uint32
 {
     if (total > MAX_FRAGMENTS)
     {
-        Serial.println("[ERROR] TDD-BACK: total fragments > MAX_FRAGMENTS");
+        Serial.println("[ABORT] TDD-BACK: total fragments > MAX_FRAGMENTS");
         return false;
     }
 
@@ -1142,6 +1146,27 @@ bool sendFragmentsTDDBlockAck(const String &line, size_t L, size_t total, uint32
     return true;
 }
 
+// Fire-and-forget: every fragment once, no ACKF wait. Loss is recovered by
+// the host (SRSEG/SRACK selective repeat in lora_transceiver.py --host-arq).
+bool sendFragmentsNoAck(const String &line, size_t L, size_t total, uint32_t seq)
+{
+    for (size_t i = 0; i < total; i++)
+    {
+        size_t off = i * FRAG_CHUNK;
+        String chunk = line.substring(off, min(L, off + FRAG_CHUNK));
+
+        String payload = "MSGF," + myId + "," + dstAny + "," + String(seq) + "," +
+                         String(i) + "," + String(total) + "," + chunk;
+        sendLoRa(payload);
+        txDataPktsTotal++;
+        txBytesTotal += chunk.length();
+        delay(FRAG_SPACING_MS);
+    }
+
+    Serial.printf("[TX DONE] #%lu mode=NONE %u fragments sent.\n", (unsigned long)seq, (unsigned)total);
+    return true;
+}
+
 // ---------- Send one message reliably ----------
 bool sendMessageReliable(const String &lineIn)
 {
@@ -1168,6 +1193,15 @@ bool sendMessageReliable(const String &lineIn)
         String text = (L <= maxText) ? line : line.substring(0, maxText);
         String payload = "MSG," + myId + "," + dstAny + "," + String(seq) + "," + text;
 
+        if (gArqMode == ARQ_NONE)
+        {
+            sendLoRa(payload);
+            txDataPktsTotal++;
+            txBytesTotal += text.length();
+            Serial.printf("[TX DONE] #%lu mode=NONE\n", (unsigned long)seq);
+            return true;
+        }
+
         bool sentOk = false;
         for (int i = 0; i < FRAG_MAX_TRIES; i++)
         {
@@ -1187,7 +1221,7 @@ bool sendMessageReliable(const String &lineIn)
 
         if (!sentOk)
         {
-            Serial.println("  -> FAILED: No ACK for single message.");
+            Serial.println("[ABORT] SINGLE: No ACK for single message.");
             oled3("TX FAILED", "No ACK", "");
             return false;
         }
@@ -1215,6 +1249,10 @@ bool sendMessageReliable(const String &lineIn)
             Serial.println("[ARQ] Mode = TDD Block ACK");
             ok = sendFragmentsTDDBlockAck(line, L, total, seq);
             break;
+        case ARQ_NONE:
+            Serial.println("[ARQ] Mode = None (host ARQ)");
+            ok = sendFragmentsNoAck(line, L, total, seq);
+            break;
         }
 
         if (!ok)
@@ -1263,6 +1301,8 @@ void setup()
         modeStr = "SR";
     else if (gArqMode == ARQ_TDD_BLOCK_ACK)
         modeStr = "TDD-BACK";
+    else if (gArqMode == ARQ_NONE)
+        modeStr = "NONE";
 
     oled3("LoRa Chat Ready", "ID: " + myId, "ARQ: " + modeStr);
     Serial.println("=== LoRa Chat (PC Reassembly Mode) ===");
@@ -1283,7 +1323,9 @@ void loop()
     {
         String line = Serial.readStringUntil('\n');
         line.trim();
-        if (line.length())
+        if (line == "PING")
+            Serial.println("[PONG] " + myId); // host readiness probe, not sent over LoRa
+        else if (line.length())
             sendMessageReliable(line);
     }
 
@@ -1378,6 +1420,9 @@ void loop()
 
             oled3("RX MSG (" + String(seq) + ")", t.substring(0, 16), "d~" + String(d_m, 1) + "m");
 
+            if (gArqMode == ARQ_NONE)
+                return;
+
             delay(RX_ACK_DELAY_MS);
             String ack = "ACK," + myId + "," + s + "," + String(seq) + "," +
                          String((unsigned long long)rxBytesTotal) + "," +
@@ -1477,6 +1522,11 @@ void loop()
 
                 return;
             }
+            else if (gArqMode == ARQ_NONE)
+            {
+                // Host-side ARQ: the receiving PC answers with SRACK lines
+                return;
+            }
             else
             {
                 // Original per-fragment ACK for other ARQ modes
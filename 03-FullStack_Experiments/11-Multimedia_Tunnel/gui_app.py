@@ -4,6 +4,7 @@ Tkinter control panel for the multi-media LoRa demo.
 - Lets the user pick ports, chunk sizes, and launch audio/image/text/file sends.
 """
 
+import sys
 import threading
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
@@ -12,6 +13,12 @@ from pathlib import Path
 from lora_transceiver import LoRaSerialSession
 from serial.tools import list_ports
 
+try:
+    from lora_host import imgbudget, textcodec, tklog
+except ImportError:  # running from a checkout without the repo root on sys.path
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+    from lora_host import imgbudget, textcodec, tklog
+
 
 class App(tk.Tk):
     def __init__(self):
@@ -25,14 +32,24 @@ class App(tk.Tk):
 
         self.jpeg_quality_var = tk.IntVar(value=85)
         self.mp3_bitrate_var = tk.StringVar(value="64k")
+        # Audio: mp3 (pydub + ffmpeg) or an 8 kHz NumPy voice codec (lora_host.voice)
+        self.voice_codec_var = tk.StringVar(value="adpcm")
         self.chunk_size_var = tk.IntVar(value=40000)
+        self.encoding_var = tk.StringVar(value=textcodec.DEFAULT)
         self.chunk_timeout_var = tk.DoubleVar(value=300.0)
 
+        # Image budget (0 = off): KB, or a deadline at the link's SF / bandwidth
+        self.image_kb_var = tk.DoubleVar(value=0)
+        self.deadline_var = tk.DoubleVar(value=0)
+        self.sf_var = tk.IntVar(value=7)
+        self.bw_khz_var = tk.DoubleVar(value=500)
+
         # Audio capture controls
         self.audio_sr_var = tk.IntVar(value=16000)
         self.audio_dur_var = tk.IntVar(value=5)
 
         self.file_path_var = tk.StringVar()
+        self.log_level_var = tk.StringVar(value="all")
 
         self.sess = None
 
@@ -81,7 +98,7 @@ class App(tk.Tk):
         ttk.Label(tx, text="MP3 Bitrate").grid(row=0, column=2, sticky="w")
         ttk.Entry(tx, textvariable=self.mp3_bitrate_var, width=8).grid(row=0, column=3, sticky="w", padx=5)
 
-        ttk.Label(tx, text="Chunk Size (b64 chars)").grid(row=0, column=4, sticky="w")
+        ttk.Label(tx, text="Chunk Size (chars)").grid(row=0, column=4, sticky="w")
         ttk.Entry(tx, textvariable=self.chunk_size_var, width=10).grid(row=0, column=5, sticky="w", padx=5)
 
         ttk.Label(tx, text="Chunk Timeout (s)").grid(row=0, column=6, sticky="w")
@@ -99,12 +116,31 @@ class App(tk.Tk):
         )
         ttk.Button(tx, text="Browse", command=self.choose_file).grid(row=1, column=7, sticky="w")
 
+        # b64 is the only encoding older receivers understand
+        ttk.Label(tx, text="Encoding").grid(row=1, column=8, sticky="w")
+        ttk.Combobox(tx, textvariable=self.encoding_var, width=6, state="readonly",
+                     values=list(textcodec.CODECS)).grid(row=1, column=9, sticky="w", padx=5)
+
+        ttk.Label(tx, text="Voice Codec").grid(row=1, column=10, sticky="w")
+        ttk.Combobox(tx, textvariable=self.voice_codec_var, width=6, state="readonly",
+                     values=["mp3", "ulaw", "adpcm", "lpc"]).grid(row=1, column=11, sticky="w", padx=5)
+
         ttk.Label(tx, text="Or type text").grid(row=2, column=0, sticky="nw")
 
         # IMPORTANT: parent must be tx (NOT self)
         self.text_input = tk.Text(tx, height=6)
         self.text_input.grid(row=2, column=1, columnspan=7, sticky="we", padx=5, pady=5)
 
+        # Images only: best JPEG within the budget (lora_host.imgbudget)
+        ttk.Label(tx, text="Image Budget (KB)").grid(row=3, column=0, sticky="w")
+        ttk.Entry(tx, textvariable=self.image_kb_var, width=8).grid(row=3, column=1, sticky="w", padx=5)
+        ttk.Label(tx, text="or Deadline (s)").grid(row=3, column=2, sticky="w")
+        ttk.Entry(tx, textvariable=self.deadline_var, width=8).grid(row=3, column=3, sticky="w", padx=5)
+        ttk.Label(tx, text="Link SF").grid(row=4, column=0, sticky="w")
+        ttk.Entry(tx, textvariable=self.sf_var, width=6).grid(row=4, column=1, sticky="w", padx=5)
+        ttk.Label(tx, text="BW (kHz)").grid(row=4, column=2, sticky="w")
+        ttk.Entry(tx, textvariable=self.bw_khz_var, width=8).grid(row=4, column=3, sticky="w", padx=5)
+
         self.send_file_btn = ttk.Button(tx, text="Send File", command=self.on_send_file)
         self.send_file_btn.grid(row=3, column=6, sticky="e")
         self.send_text_btn = ttk.Button(tx, text="Send Text", command=self.on_send_text)
@@ -134,6 +170,19 @@ class App(tk.Tk):
         scroll = ttk.Scrollbar(log_frame, orient="vertical", command=self.log.yview)
         scroll.grid(row=0, column=1, sticky="ns")
         self.log.configure(yscrollcommand=scroll.set)
+        self.log.tag_config("warning", foreground="orange")
+
+        # Lines from any thread go through one queue, rendered at ~30 Hz
+        self.log_view = tklog.LogView(self.log, max_lines=5000, keep_lines=4000)
+        self.log_view.start()
+
+        lvl = ttk.Frame(lg)
+        lvl.grid(row=1, column=0, sticky="e", padx=5)
+        ttk.Label(lvl, text="Show").pack(side="left")
+        level_combo = ttk.Combobox(lvl, textvariable=self.log_level_var, width=8, state="readonly",
+                                   values=("all", "info", "warning", "error"))
+        level_combo.pack(side="left", padx=5)
+        level_combo.bind("<<ComboboxSelected>>", lambda _e: self.log_view.set_level(self.log_level_var.get()))
 
         self._log("[INFO] Ready. Click Connect to start listening.\n")
         # Initially disable TX actions until connected
@@ -145,17 +194,8 @@ class App(tk.Tk):
         self.refresh_ports()
 
     def _log(self, s: str):
-        # Append and auto-scroll
-        self.log.insert(tk.END, s)
-        self.log.see(tk.END)
-        # Trim log to last ~5000 lines to keep UI snappy
-        try:
-            line_count = int(self.log.index('end-1c').split('.')[0])
-            if line_count > 5000:
-                # delete from start to keep roughly last 4000 lines
-                self.log.delete('1.0', f"{line_count-4000}.0")
-        except Exception:
-            pass
+        # Safe from any thread; LogView batches, auto-scrolls and trims
+        self.log_view.put(s if s.endswith("\n") else s + "\n")
 
     def choose_dir(self):
         d = filedialog.askdirectory()
@@ -201,12 +241,8 @@ class App(tk.Tk):
         out_dir = Path(self.out_dir_var.get())
 
         try:
-            # Provide a log callback so MCU and TX/RX logs appear instantly in GUI
-            def gui_log(msg: str):
-                # Ensure UI updates happen on the main thread
-                self.after(0, lambda: self._log(msg + ("\n" if not msg.endswith("\n") else "")))
-
-            self.sess = LoRaSerialSession(port, baud, out_dir=out_dir, quiet=False, log_callback=gui_log)
+            # MCU and TX/RX logs are queued from the reader thread, not scheduled per line
+            self.sess = LoRaSerialSession(port, baud, out_dir=out_dir, quiet=False, log_callback=self._log)
             self.sess.open()
             self._log(f"[INFO] Connected to {port} @ {baud}. Listening started.\n")
             # Toggle UI to connected state
@@ -230,6 +266,26 @@ class App(tk.Tk):
             for b in (self.send_file_btn, self.send_text_btn, self.capture_btn, self.record_btn):
                 b.state(["disabled"])  # disable
 
+    def _image_budget(self) -> int:
+        """Byte budget for images from the budget fields, 0 for none."""
+        max_bytes = int(float(self.image_kb_var.get()) * 1000)
+        deadline = float(self.deadline_var.get())
+        if deadline > 0:
+            link = imgbudget.link_params(int(self.sf_var.get()), float(self.bw_khz_var.get()))
+            chunk = int(self.chunk_size_var.get())
+            mode = imgbudget.delivering_mode(link, chunk_chars=chunk)
+            budget = imgbudget.budget_bytes(deadline, link, chunk_chars=chunk, mode=mode)
+            self._log(f"[TX] Deadline {deadline:g} s at SF{link.sf} / {link.bw_hz / 1000:g} kHz -> {budget} bytes\n")
+            if mode != imgbudget.ARQ_MODE:
+                self._log(f"[TX] {imgbudget.ARQ_MODE} ARQ does not deliver at this link; "
+                          f"budget assumes gArqMode = {imgbudget.SKETCH_MODES[mode]}\n")
+            max_bytes = min(max_bytes, budget) if max_bytes > 0 else budget
+        return max(0, max_bytes)
+
+    def _voice_codec(self) -> str:
+        codec = self.voice_codec_var.get()
+        return "" if codec == "mp3" else codec
+
     def on_send_file(self):
         if self.sess is None:
             messagebox.showerror("Not connected", "Connect first.")
@@ -249,6 +305,9 @@ class App(tk.Tk):
                     jpeg_quality=int(self.jpeg_quality_var.get()),
                     mp3_bitrate=str(self.mp3_bitrate_var.get()),
                     chunk_timeout_s=float(self.chunk_timeout_var.get()),
+                    encoding=self.encoding_var.get(),
+                    max_bytes=self._image_budget(),
+                    voice_codec=self._voice_codec(),
                 )
                 self._log(f"[RESULT] Send file: {'OK' if ok else 'FAILED'}\n")
             except Exception as e:
@@ -275,6 +334,7 @@ class App(tk.Tk):
                     jpeg_quality=int(self.jpeg_quality_var.get()),
                     mp3_bitrate=str(self.mp3_bitrate_var.get()),
                     chunk_timeout_s=float(self.chunk_timeout_var.get()),
+                    encoding=self.encoding_var.get(),
                 )
                 self._log(f"[RESULT] Send text: {'OK' if ok else 'FAILED'}\n")
             except Exception as e:
@@ -306,6 +366,8 @@ class App(tk.Tk):
                     jpeg_quality=int(self.jpeg_quality_var.get()),
                     mp3_bitrate=str(self.mp3_bitrate_var.get()),
                     chunk_timeout_s=float(self.chunk_timeout_var.get()),
+                    encoding=self.encoding_var.get(),
+                    max_bytes=self._image_budget(),
                 )
                 self._log(f"[RESULT] Capture photo send: {'OK' if ok else 'FAILED'}\n")
             except Exception as e:
@@ -331,14 +393,13 @@ class App(tk.Tk):
             try:
                 self._log(f"[TX] Recording voice {duration_s}s @ {sample_rate}Hz...\n")
                 import sounddevice as sd  # pip install sounddevice
-                import numpy as np
-                from scipy.io.wavfile import write  # pip install scipy
+                from lora_host import voice  # NumPy
 
                 data = sd.rec(int(duration_s * sample_rate), samplerate=sample_rate, channels=1, dtype='int16')
                 sd.wait()
 
                 tmp_wav = Path("_tmp_record.wav")
-                write(str(tmp_wav), sample_rate, data)
+                tmp_wav.write_bytes(voice.pcm_wav(data[:, 0], sample_rate))
 
                 self._log("[TX] Voice recorded. Sending...\n")
                 ok = self.sess.send_file(
@@ -347,6 +408,8 @@ class App(tk.Tk):
                     jpeg_quality=int(self.jpeg_quality_var.get()),
                     mp3_bitrate=str(self.mp3_bitrate_var.get()),
                     chunk_timeout_s=float(self.chunk_timeout_var.get()),
+                    encoding=self.encoding_var.get(),
+                    voice_codec=self._voice_codec(),
                 )
                 self._log(f"[RESULT] Voice send: {'OK' if ok else 'FAILED'}\n")
             except Exception as e:
@@ -16,6 +16,24 @@ MCU expected input lines (from PC to MCU):
   FILECHUNK:<filename>:<idx>:<tot>:<base64_chunk>\n
   or plain text lines for chat (optional)
 
+  With --encoding a85/z85/b91 the chunks carry a denser text encoding
+  instead of base64, tagged at the start of the first chunk
+  (lora_host.textcodec); receivers decode either.
+
+  With --progressive an image goes out as a ~3 KB thumbnail <stem>_thumb.jpg
+  followed by a progressive JPEG cut at its scan boundaries
+  (lora_host.progressive); the receiving side writes <name>.preview.jpg
+  after every chunk until the full image is in (--no-preview to disable).
+
+  With --max-bytes N or --deadline S an image is re-encoded as the best JPEG
+  within that budget: resolution, quality (up to --jpeg-quality) and chroma
+  subsampling are searched by lora_host.imgbudget.
+
+  With --voice ulaw|adpcm|lpc audio is sent as 8 kHz voice encoded with
+  NumPy only (lora_host.voice) instead of MP3: a µ-law or IMA ADPCM WAV
+  that plays as received, or a 2.4 kbps .lpc file for
+  `python -m lora_host.voice decode`.
+
 Usage examples:
   # Just listen + reassemble (default):
   python lora_transceiver.py COM9 --out-dir received_files
@@ -26,12 +44,25 @@ Usage examples:
   # Send a text message as a file:
   python lora_transceiver.py COM9 --send-text "hello world"
 
+  # Thumbnail first, then the first 5 progressive scans only:
+  python lora_transceiver.py COM9 --send photo.png --progressive --layers 5
+
+  # Best image that arrives within 2 minutes at SF9 / 125 kHz:
+  python lora_transceiver.py COM9 --send photo.png --deadline 120 --sf 9 --bw-khz 125
+
+  # 30 s of speech in ~9 KB (2.4 kbps vocoder):
+  python lora_transceiver.py COM9 --send human_voice.wav --voice lpc
+
+  # Host-side selective repeat (sketch flashed with gArqMode = ARQ_NONE):
+  python lora_transceiver.py COM9 --send path/to/file.png --host-arq --sr-window 256
+
 Dependencies:
   pip install pyserial
 Optional:
   pip install pillow
   pip install pydub
   and install ffmpeg for audio conversion (pydub needs it)
+  pip install numpy    (--voice only; no ffmpeg needed)
 """
 
 import argparse
@@ -39,133 +70,33 @@ import base64
 import io
 import mimetypes
 import queue
+import secrets
+import sys
 import threading
 import time
+from collections import deque
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
 import serial  # pip install pyserial
 
-# Optional conversion libs
-try:
-    from PIL import Image  # pip install pillow
-except Exception:
-    Image = None
-
 try:
-    from pydub import AudioSegment  # pip install pydub
-except Exception:
-    AudioSegment = None
-
-
-# ----------------------------
-# Reassembly helpers (same logic as your RX script)
-# ----------------------------
-
-class MessageReassembler:
-    """Reassembles FRAG messages coming from the RX MCU."""
-    def __init__(self):
-        # (src, seq) -> {"tot": int, "chunks": {idx: str}}
-        self.messages = {}
-
-    def add_frag(self, src: str, seq: int, idx: int, tot: int, chunk: str) -> Optional[str]:
-        key = (src, seq)
-        if key not in self.messages:
-            self.messages[key] = {"tot": tot, "chunks": {}}
-        msg = self.messages[key]
-        msg["tot"] = tot
-        msg["chunks"][idx] = chunk
-
-        if len(msg["chunks"]) == msg["tot"]:
-            ordered = [msg["chunks"][i] for i in range(msg["tot"])]
-            full_payload = "".join(ordered)
-            del self.messages[key]
-            return full_payload
-        return None
-
-
-class FileChunkAssembler:
-    """Assembles FILECHUNK:<fname>:<idx>:<tot>:<b64> messages into final files."""
-    def __init__(self, out_dir: Path):
-        self.files = {}  # fname -> {"tot": int, "chunks": {idx: str}}
-        self.out_dir = out_dir
-        self.out_dir.mkdir(parents=True, exist_ok=True)
-
-    def add_chunk(self, fname: str, idx: int, tot: int, b64_chunk: str) -> None:
-        if fname not in self.files:
-            self.files[fname] = {"tot": tot, "chunks": {}}
-        entry = self.files[fname]
-        entry["tot"] = tot
-        entry["chunks"][idx] = b64_chunk
-
-        print(f"[INFO] Got FILECHUNK {idx+1}/{tot} for '{fname}'")
-
-        if len(entry["chunks"]) == entry["tot"]:
-            ordered = [entry["chunks"][i] for i in range(entry["tot"])]
-            full_b64 = "".join(ordered)
-            del self.files[fname]
-
-            try:
-                raw = base64.b64decode(full_b64)
-            except Exception as e:
-                print(f"[ERROR] Base64 decode failed for '{fname}': {e}")
-                return
-
-            p = Path(fname)
-            stamped = f"{p.stem}_rx{p.suffix}"
-            out_path = self.out_dir / stamped
-            out_path.write_bytes(raw)
-            print(f"[OK] Reassembled and wrote {len(raw)} bytes to '{out_path.resolve()}'")
-
-            # If this was a typed text (temporary name), also print its content to the RX log
-            try:
-                if Path(fname).stem.startswith("_tmp_text_to_send"):
-                    txt = raw.decode("utf-8", errors="ignore")
-                    print(f"[RX TEXT] Full received text ({len(txt)} chars):\n{txt}")
-            except Exception:
-                pass
-
-
-def handle_full_payload(payload: str, file_asm: FileChunkAssembler) -> None:
-    """Called when we have a fully reassembled payload from LoRa-level FRAGs."""
-    if payload.startswith("FILECHUNK:"):
-        # FILECHUNK:<fname>:<idx>:<tot>:<base64_chunk>
-        try:
-            _, fname, s_idx, s_tot, b64_chunk = payload.split(":", 4)
-            idx = int(s_idx)
-            tot = int(s_tot)
-        except ValueError:
-            print("[WARN] FILECHUNK payload format invalid, printing raw:")
-            print(payload[:200] + "...")
-            return
-        file_asm.add_chunk(fname, idx, tot, b64_chunk)
-        return
-
-    if payload.startswith("FILE:"):
-        # Legacy: FILE:<fname>:<base64>
-        try:
-            _, fname, b64 = payload.split(":", 2)
-        except ValueError:
-            print("[WARN] FILE payload format invalid, printing raw:")
-            print(payload[:200] + "...")
-            return
+    from lora_host import imgbudget, lineparse, metrics, progressive, ready, reassembly, sr_arq, textcodec, trace
+except ImportError:  # running from a checkout: use the repo-root package
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+    from lora_host import imgbudget, lineparse, metrics, progressive, ready, reassembly, sr_arq, textcodec, trace
 
-        print(f"[INFO] Received FILE '{fname}' (base64 length {len(b64)})")
-        try:
-            raw = base64.b64decode(b64)
-        except Exception as e:
-            print(f"[ERROR] Base64 decode failed: {e}")
-            return
 
-        p = Path(fname)
-        stamped = f"{p.stem}_rx{p.suffix}"
-        out_path = file_asm.out_dir / stamped
-        out_path.write_bytes(raw)
-        print(f"[OK] Wrote {len(raw)} bytes to '{out_path.resolve()}'")
+def _print_typed_text(fname: str, path: Path) -> None:
+    """If this was a typed text (temporary name), also print its content to the RX log."""
+    if not Path(fname).stem.startswith("_tmp_text_to_send"):
         return
-
-    print("[FULL PAYLOAD]", payload[:200] + ("..." if len(payload) > 200 else ""))
+    try:
+        txt = path.read_bytes().decode("utf-8", errors="ignore")
+        print(f"[RX TEXT] Full received text ({len(txt)} chars):\n{txt}")
+    except Exception:
+        pass
 
 
 # ----------------------------
@@ -175,6 +106,7 @@ def handle_full_payload(payload: str, file_asm: FileChunkAssembler) -> None:
 TEXT_EXT = {".txt", ".csv", ".json", ".text"}
 IMAGE_EXT = {".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff", ".webp"}
 AUDIO_EXT = {".wav", ".flac", ".mp3", ".m4a", ".aac", ".ogg", ".wma", ".aif", ".aiff"}
+VOICE_CODECS = ("ulaw", "adpcm", "lpc")  # lora_host.voice.CODECS
 
 def is_image_file(path: Path) -> bool:
     if path.suffix.lower() in IMAGE_EXT:
@@ -188,32 +120,63 @@ def is_audio_file(path: Path) -> bool:
     m = mimetypes.guess_type(path.name)[0]
     return bool(m and m.startswith("audio/"))
 
-def convert_image_to_jpeg(path: Path, quality: int = 85) -> tuple[bytes, str]:
-    if Image is None:
-        raise RuntimeError("Pillow not installed. Run: pip install pillow")
+def convert_image_to_jpeg(path: Path, quality: int = 85, progressive_jpeg: bool = False,
+                          max_side: int = 0, max_bytes: int = 0) -> tuple[bytes, str]:
+    # Optional conversion libs are imported on first use, so listening
+    # (and `lora tunnel --help`) does not pay for them
+    try:
+        from PIL import Image  # pip install pillow
+    except ImportError:
+        raise RuntimeError("Pillow not installed. Run: pip install pillow") from None
     img = Image.open(path).convert("RGB")
+    if max_side:
+        img.thumbnail((max_side, max_side))
+    if max_bytes:
+        # Best JPEG within max_bytes, quality at most `quality`
+        fit = imgbudget.fit(img, max_bytes, q_max=quality, progressive=progressive_jpeg)
+        print(f"[INFO] Fitted to {max_bytes} bytes: {fit.describe()}")
+        return fit.data, path.with_suffix(".jpg").name
     buf = io.BytesIO()
-    img.save(buf, format="JPEG", quality=quality, optimize=True)
+    img.save(buf, format="JPEG", quality=quality, optimize=True, progressive=progressive_jpeg)
     return buf.getvalue(), path.with_suffix(".jpg").name
 
 def convert_audio_to_mp3(path: Path, bitrate: str = "64k") -> tuple[bytes, str]:
-    if AudioSegment is None:
+    try:
+        from pydub import AudioSegment  # pip install pydub
+    except ImportError:
         raise RuntimeError(
             "pydub not installed. Run: pip install pydub\n"
             "Also ensure ffmpeg is installed and in PATH."
-        )
+        ) from None
     audio = AudioSegment.from_file(path)
     buf = io.BytesIO()
     audio.export(buf, format="mp3", bitrate=bitrate)
     return buf.getvalue(), path.with_suffix(".mp3").name
 
-def prepare_file_for_lora(path: Path, jpeg_quality: int = 85, mp3_bitrate: str = "64k") -> tuple[bytes, str, str]:
+def convert_audio_to_voice(path: Path, codec: str) -> tuple[bytes, str]:
+    try:
+        from lora_host import voice  # NumPy
+    except ImportError:
+        raise RuntimeError("NumPy not installed. Run: pip install numpy") from None
+    return voice.encode_file(path, codec)
+
+def prepare_file_for_lora(path: Path, jpeg_quality: int = 85, mp3_bitrate: str = "64k",
+                          progressive_jpeg: bool = False, max_bytes: int = 0,
+                          voice_codec: str = "") -> tuple[bytes, str, str]:
     suffix = path.suffix.lower()
+    over_budget = bool(max_bytes) and path.stat().st_size > max_bytes
 
-    if is_image_file(path) and suffix not in (".jpg", ".jpeg"):
-        print(f"[INFO] Image '{path.name}' -> JPEG")
-        raw, out_name = convert_image_to_jpeg(path, quality=jpeg_quality)
-        return raw, out_name, f"image->jpeg ({len(raw)} bytes)"
+    if is_image_file(path) and (progressive_jpeg or over_budget or suffix not in (".jpg", ".jpeg")):
+        kind = "progressive JPEG" if progressive_jpeg else "JPEG"
+        print(f"[INFO] Image '{path.name}' -> {kind}")
+        raw, out_name = convert_image_to_jpeg(path, quality=jpeg_quality, progressive_jpeg=progressive_jpeg,
+                                              max_bytes=max_bytes)
+        return raw, out_name, f"image->{'progressive ' if progressive_jpeg else ''}jpeg ({len(raw)} bytes)"
+
+    if is_audio_file(path) and voice_codec:
+        print(f"[INFO] Audio '{path.name}' -> 8 kHz {voice_codec} voice")
+        raw, out_name = convert_audio_to_voice(path, voice_codec)
+        return raw, out_name, f"audio->{voice_codec} voice ({len(raw)} bytes)"
 
     if is_audio_file(path) and suffix != ".mp3":
         print(f"[INFO] Audio '{path.name}' -> MP3")
@@ -239,44 +202,117 @@ class LoRaSerialSession:
       - prints all MCU lines
       - extracts MSG/FRAG lines and reassembles
       - signals TX completion events ([TX DONE]/[ABORT]/TX FAILED)
+      - answers SRSEG segments with SRACK lines (host ARQ, see send_file)
     """
-    def __init__(self, port: str, baud: int, out_dir: Path, quiet: bool = False, log_callback: Optional[callable] = None):
+    def __init__(self, port: str, baud: int, out_dir: Path, quiet: bool = False, log_callback: Optional[callable] = None,
+                 tracer: Optional[trace.Tracer] = None, probe: bool = True, reset: bool = False,
+                 previews: bool = True):
         self.port = port
         self.baud = baud
         self.quiet = quiet
+        self.probe = probe   # PING readiness probe (needs the PING-aware sketch) instead of a fixed wait
+        self.reset = reset   # reboot the MCU on open (default: keep it running)
         self._log_cb = log_callback
+        self.tr = tracer or trace.NULL
 
         self.ser: Optional[serial.Serial] = None
         self._stop = threading.Event()
         self._thread: Optional[threading.Thread] = None
 
-        # RX pipeline
-        self.reasm = MessageReassembler()
-        self.file_asm = FileChunkAssembler(out_dir)
+        # RX pipeline (lora_host.reassembly, shared with rx_receive_file.py)
+        self.reasm = reassembly.MessageReassembler()
+        self.file_asm = reassembly.FileChunkAssembler(out_dir, suffix="_rx", on_file=_print_typed_text,
+                                                      previews=previews)
 
         # TX completion signalling
         self._tx_event = threading.Event()
         self._tx_lock = threading.Lock()
         self._tx_last: Optional[TxResult] = None
 
-    def open(self) -> None:
-        self.ser = serial.Serial(self.port, self.baud, timeout=1)
-        time.sleep(2.0)
+        # Host selective-repeat ARQ state. Every line written for TX is
+        # queued in _tx_owners (True = a caller waits for its result). The
+        # MCU sends one line at a time and prints [TX START] before each, so
+        # that marker moves the head of the queue to _tx_cur and the next
+        # [TX DONE]/[ABORT] belongs to it. Completions of our own SRACK
+        # lines, or of a line whose wait timed out, are dropped.
+        self.sr_rx = sr_arq.SrReceiver()
+        self.sack_delay_s = 2.0
+        self._sr_lock = threading.Lock()
+        self._sr_cond = threading.Condition()
+        self._sr_tx: dict = {}  # sid -> SrSender
+        self._sack_timers: dict = {}  # sid -> threading.Timer, under _sr_lock like sr_rx
+        self._write_lock = threading.Lock()
+        self._tx_owners: deque = deque()  # lines written, [TX START] not seen yet
+        self._tx_cur = False  # line between [TX START] and its TxStatus is waited for
+
+        self._init_metrics()
+
+    def _init_metrics(self) -> None:
+        """Per-port children of the shared lora_session_* metric families."""
+        reg = metrics.REGISTRY
+        p = (self.port,)
+        self._m_lines = reg.counter("lora_session_lines_total", "Serial lines read from the MCU", ("port",)).labels(*p)
+        self._m_bytes_in = reg.counter("lora_session_bytes_in_total", "Bytes read from the serial port", ("port",)).labels(*p)
+        self._m_bytes_out = reg.counter("lora_session_bytes_out_total", "Bytes written to the serial port", ("port",)).labels(*p)
+        self._m_parse_errors = reg.counter("lora_session_parse_errors_total", "Malformed MCU lines by kind", ("port", "kind"))
+        self._m_tx_ok = reg.counter("lora_session_tx_done_total", "Lines the MCU reported as sent", ("port",)).labels(*p)
+        self._m_tx_fail = reg.counter("lora_session_tx_failures_total", "[ABORT]/TX FAILED/timeouts waiting for [TX DONE]", ("port",)).labels(*p)
+        self._m_retries = reg.counter("lora_session_retries_total", "MCU retry attempts plus host-ARQ retransmissions", ("port",)).labels(*p)
+        self._m_payloads = reg.counter("lora_session_payloads_total", "Complete MSG/FRAG payloads received", ("port",)).labels(*p)
+        self._m_tx_wait = reg.histogram("lora_session_tx_done_wait_seconds", "Time blocked waiting for [TX DONE]", ("port",)).labels(*p)
+        self._m_chunk_latency = reg.histogram("lora_session_chunk_latency_seconds", "FILECHUNK/SRSEG line write to [TX DONE]", ("port",)).labels(*p)
+        self._m_sr_rtt = reg.histogram("lora_session_sr_rtt_seconds", "Host-ARQ segment to SRACK round trip", ("port",)).labels(*p)
+        self._m_reasm_msgs = reg.gauge("lora_session_reassembly_messages", "FRAG messages waiting for fragments", ("port",)).labels(*p)
+        self._m_reasm_frags = reg.gauge("lora_session_reassembly_fragments", "Fragments buffered for incomplete messages", ("port",)).labels(*p)
+        self._m_file_parts = reg.gauge("lora_session_file_chunks_buffered", "FILECHUNKs/SRSEGs buffered for incomplete files", ("port",)).labels(*p)
+        reg.add_collector(self._collect_metrics)
+
+    def _collect_metrics(self) -> None:
+        msgs, frags = self.reasm.pending()
+        self._m_reasm_msgs.set(msgs)
+        self._m_reasm_frags.set(frags)
+        self._m_file_parts.set(
+            self.file_asm.pending()[1]
+            + sum(len(tr.chunks) for tr in list(self.sr_rx.transfers.values()))
+        )
 
-        # Drain boot lines briefly
-        boot_deadline = time.time() + 1.5
-        while time.time() < boot_deadline:
-            line = self._readline()
-            if line:
-                self._log(f"[MCU-BOOT] {line}")
+    def open(self) -> None:
+        if self.ser is not None and self.ser.is_open:
+            return  # already open: reuse the warm connection
+
+        if self.probe:
+            # DTR/RTS stay inactive so the MCU is not rebooted; PING until it answers
+            self.ser = ready.open_port(self.port, self.baud, timeout=1, reset=self.reset)
+            r = ready.wait_ready(self.ser, ready.PING, ready.TUNNEL_READY,
+                                 on_line=lambda line: self._log(f"[MCU-BOOT] {line}"))
+            if r.ready:
+                self._log(f"[INFO] MCU {r.describe()}")
+            else:
+                self._log(f"[WARN] MCU gave {r.describe()}; continuing (old sketch? try --no-probe)")
+        else:
+            self.ser = serial.Serial(self.port, self.baud, timeout=1)
+            time.sleep(2.0)
+
+            # Drain boot lines briefly
+            boot_deadline = time.time() + 1.5
+            while time.time() < boot_deadline:
+                line = self._readline()
+                if line:
+                    self._log(f"[MCU-BOOT] {line}")
 
         self._thread = threading.Thread(target=self._reader_loop, daemon=True)
         self._thread.start()
 
     def close(self) -> None:
+        metrics.REGISTRY.remove_collector(self._collect_metrics)
         self._stop.set()
         if self._thread and self._thread.is_alive():
             self._thread.join(timeout=1.0)
+        with self._sr_lock:
+            for tm in self._sack_timers.values():
+                tm.cancel()
+            self._sack_timers.clear()
+        self.file_asm.close()  # drop incomplete files and their .part
         if self.ser:
             try:
                 self.ser.close()
@@ -287,14 +323,25 @@ class LoRaSerialSession:
     def _readline(self) -> str:
         assert self.ser is not None
         try:
-            return self.ser.readline().decode(errors="ignore").strip()
+            raw = self.ser.readline()
         except Exception:
             return ""
-
-    def _write(self, data: bytes) -> None:
+        if raw:
+            self._m_bytes_in.inc(len(raw))
+        line = raw.decode(errors="ignore").strip()
+        if line and self.tr.enabled:
+            self.tr.rx(line)
+        return line
+
+    def _write(self, data: bytes, wait: bool = True) -> None:
         assert self.ser is not None
-        self.ser.write(data)
-        self.ser.flush()
+        with self._write_lock:
+            self._tx_owners.append(wait)
+            self.ser.write(data)
+            self.ser.flush()
+        self._m_bytes_out.inc(len(data))
+        if self.tr.enabled:
+            self.tr.tx(data)
 
     def _log(self, s: str) -> None:
         if self._log_cb:
@@ -309,66 +356,171 @@ class LoRaSerialSession:
             print(s)
 
     def _signal_tx(self, ok: bool, reason: str) -> None:
+        if self.tr.enabled:
+            self.tr.emit("state", what="tx_status", ok=ok, reason=reason)
         with self._tx_lock:
             self._tx_last = TxResult(ok=ok, reason=reason)
             self._tx_event.set()
 
     def _consume_tx_result(self, timeout_s: float) -> TxResult:
-        if not self._tx_event.wait(timeout=timeout_s):
+        t0 = time.monotonic()
+        got = self._tx_event.wait(timeout=timeout_s)
+        self._m_tx_wait.observe(time.monotonic() - t0)
+        if not got:
+            self._drop_tx_wait()
+            self._m_tx_fail.inc()
             return TxResult(ok=False, reason="timeout waiting for [TX DONE]")
         with self._tx_lock:
             r = self._tx_last or TxResult(ok=False, reason="unknown")
             # reset for next chunk
             self._tx_last = None
             self._tx_event.clear()
-            return r
+        if r.ok:
+            self._m_tx_ok.inc()
+        else:
+            self._m_tx_fail.inc()
+        return r
+
+    def _drop_tx_wait(self) -> None:
+        """Nobody waits for the timed-out line any more: drop its late TxStatus."""
+        with self._write_lock:
+            if self._tx_cur:
+                self._tx_cur = False
+            elif True in self._tx_owners:
+                self._tx_owners[self._tx_owners.index(True)] = False
+        with self._tx_lock:
+            self._tx_last = None
+            self._tx_event.clear()
 
     def _handle_rx_line(self, line: str) -> None:
+        self._handle_event(lineparse.parse_line(line))
+
+    def _handle_event(self, ev) -> None:
+        t = type(ev)
+
         # MSG,src,seq,rssi,d_m,text
-        if line.startswith("MSG,"):
-            parts = line.split(",", 5)
-            if len(parts) >= 6:
-                _, src, seq, rssi, d_m, text = parts
-                self._log(f"[MSG] src={src} seq={seq} rssi={rssi} d~{d_m}m text='{text[:60]}'")
-                handle_full_payload(text, self.file_asm)
+        if t is lineparse.Msg:
+            self._m_payloads.inc()
+            if ev.line.startswith("SR", ev.start):
+                self._handle_sr(ev.line, ev.start)
+                return
+            self._log(f"[MSG] src={ev.src} seq={ev.seq} rssi={ev.rssi} d~{ev.d_m}m "
+                      f"text='{ev.line[ev.start:ev.start + 60]}'")
+            reassembly.handle_full_payload(ev.line, self.file_asm, ev.start, preview=200)
             return
 
         # FRAG,src,seq,idx,tot,rssi,d_m,chunk
-        if line.startswith("FRAG,"):
-            parts = line.split(",", 7)
-            if len(parts) >= 8:
-                _, src, seq, idx, tot, rssi, d_m, chunk = parts
-                try:
-                    seq_i = int(seq); idx_i = int(idx); tot_i = int(tot)
-                except ValueError:
-                    self._log(f"[WARN] Bad FRAG ints: {line[:120]}")
+        if t is lineparse.Frag:
+            full = self.reasm.add_frag(ev.src, ev.seq, ev.idx, ev.tot, ev.chunk)
+            if full is not None:
+                self._m_payloads.inc()
+                if self.tr.enabled:
+                    self.tr.emit("state", what="payload_complete", src=ev.src, seq=ev.seq, n=len(full))
+                if full.startswith("SR"):
+                    self._handle_sr(full, 0)
                     return
-                full = self.reasm.add_frag(src, seq_i, idx_i, tot_i, chunk)
-                if full is not None:
-                    self._log(f"[INFO] Full payload src={src} seq={seq_i} len={len(full)}")
-                    handle_full_payload(full, self.file_asm)
+                self._log(f"[INFO] Full payload src={ev.src} seq={ev.seq} len={len(full)}")
+                reassembly.handle_full_payload(full, self.file_asm, preview=200)
+            return
+
+        if t is lineparse.BadLine and ev.kind == "FRAG":
+            self._log(f"[WARN] Bad FRAG ints: {ev.line[:120]}")
+
+    # ----------------------------
+    # Host selective-repeat ARQ (RX side and SACK delivery)
+    # ----------------------------
+
+    def _handle_sr(self, payload: str, start: int) -> None:
+        ev = lineparse.parse_tunnel_payload(payload, start)
+        t = type(ev)
+
+        if t is lineparse.SrAck:
+            with self._sr_cond:
+                snd = self._sr_tx.get(ev.sid)
+                if snd is not None:
+                    n = snd.rtt.samples
+                    newly = snd.on_sack(ev.cum, sr_arq.parse_bitmap(ev.bitmap), time.monotonic())
+                    if self.tr.enabled:
+                        self.tr.emit("state", what="sack_rx", cid=ev.sid, cum=ev.cum, newly=newly, acked=snd.acked)
+                    if snd.rtt.samples != n:
+                        self._m_sr_rtt.observe(snd.rtt.last)
+                    self._sr_cond.notify_all()
+            return
+
+        if t is lineparse.SrSegment:
+            with self._sr_lock:
+                is_new, sack_now = self.sr_rx.add(ev.sid, ev.seq, ev.tot, ev.data)
+                parts = self.sr_rx.take(ev.sid) if is_new else None
+                if not sack_now and ev.sid not in self._sack_timers:
+                    # Delayed SACK so a short tail still gets acknowledged
+                    tm = threading.Timer(self.sack_delay_s, self._send_sack, args=(ev.sid,))
+                    tm.daemon = True
+                    self._sack_timers[ev.sid] = tm
+                    tm.start()
+            if sack_now:
+                self._send_sack(ev.sid)
+            if parts:
+                if self.tr.enabled:
+                    self.tr.emit("done", cid=ev.sid, what="sr_rx", ok=True, segs=ev.tot)
+                self._log(f"[INFO] SR transfer {ev.sid} complete: {ev.tot} segments")
+                self.file_asm.add_chunk(parts[0], 0, 1, "".join(parts[1:]))
+            return
+
+        if t is lineparse.BadLine:
+            self._log(f"[WARN] Bad {ev.kind} payload: {payload[start:start + 120]}")
+
+    def _send_sack(self, sid: str) -> None:
+        # Reader thread or a delayed-SACK Timer thread
+        with self._sr_lock:
+            tm = self._sack_timers.pop(sid, None)
+            if tm is not None:
+                tm.cancel()
+            line = self.sr_rx.sack(sid)
+        if line is None or self.ser is None:
             return
+        if self.tr.enabled:
+            self.tr.emit("state", what="sack_tx", cid=sid, s=line)
+        try:
+            self._write((line + "\n").encode("ascii"), wait=False)
+        except Exception as e:
+            self._log(f"[WARN] SRACK write failed: {e}")
 
     def _reader_loop(self) -> None:
         while not self._stop.is_set():
             line = self._readline()
             if not line:
                 continue
+            self._m_lines.inc()
+
+            ev = lineparse.parse_line(line)
+            t = type(ev)
+            if ev is not None and self.tr.enabled:
+                self.tr.parsed(ev)
+
+            if t is lineparse.BadLine:
+                self._m_parse_errors.labels(self.port, ev.kind).inc()
+            elif ev is None and "] Try " in line and "Try 1/" not in line:
+                # "[TX SINGLE] Try 2/3", "[S&W FRAG 4/9] Try 2/3": an MCU retry
+                self._m_retries.inc()
 
             # Always print MCU lines (unless quiet)
-            if not self.quiet and not (line.startswith("MSG,") or line.startswith("FRAG,")):
+            if not self.quiet and t is not lineparse.Msg and t is not lineparse.Frag:
                 print(f"[MCU] {line}")
 
-            # TX completion markers
-            if "[TX DONE]" in line:
-                self._signal_tx(ok=True, reason="TX DONE")
+            # TX start / completion markers
+            if ev is None and line.startswith("[TX START]"):
+                with self._write_lock:
+                    self._tx_cur = self._tx_owners.popleft() if self._tx_owners else False
                 continue
-            if "[ABORT]" in line or "TX FAILED" in line:
-                self._signal_tx(ok=False, reason=line)
+            if t is lineparse.TxStatus:
+                with self._write_lock:
+                    waited, self._tx_cur = self._tx_cur, False
+                if waited:
+                    self._signal_tx(ok=ev.ok, reason=ev.reason)
                 continue
 
             # RX parsing
-            self._handle_rx_line(line)
+            self._handle_event(ev)
 
     # ----------------------------
     # Public TX APIs (use same serial connection)
@@ -376,32 +528,171 @@ class LoRaSerialSession:
 
     def send_file(self, file_path: Path, chunk_size_chars: int = 40000,
                   jpeg_quality: int = 85, mp3_bitrate: str = "64k",
-                  chunk_timeout_s: float = 300.0) -> bool:
-        raw, tx_name, desc = prepare_file_for_lora(file_path, jpeg_quality=jpeg_quality, mp3_bitrate=mp3_bitrate)
+                  chunk_timeout_s: float = 300.0, host_arq: bool = False,
+                  sr_window: int = 256, sr_seg_chars: int = 180,
+                  encoding: str = textcodec.DEFAULT, progressive_jpeg: bool = False,
+                  layers: int = 0, thumb_side: int = progressive.THUMB_SIDE, max_bytes: int = 0,
+                  voice_codec: str = "") -> bool:
+        image = is_image_file(file_path)
+        progressive_jpeg = progressive_jpeg and image
+        if max_bytes and not image:
+            self._log("[WARN] Byte budget applies to images only; sending as is")
+            max_bytes = 0
+        thumb = b""
+        if progressive_jpeg and thumb_side:
+            # Encoded first so the image budget can cover it
+            thumb, _ = convert_image_to_jpeg(file_path, quality=progressive.THUMB_QUALITY, max_side=thumb_side)
+            if max_bytes:
+                max_bytes = max(1, max_bytes - len(thumb))
+        raw, tx_name, desc = prepare_file_for_lora(file_path, jpeg_quality=jpeg_quality, mp3_bitrate=mp3_bitrate,
+                                                   progressive_jpeg=progressive_jpeg, max_bytes=max_bytes,
+                                                   voice_codec=voice_codec)
         self._log(f"[INFO] Final transmit name: {tx_name}")
         self._log(f"[INFO] Mode: {desc}")
 
-        b64 = base64.b64encode(raw).decode("ascii")
-        self._log(f"[INFO] Base64 length: {len(b64)}")
+        if not progressive_jpeg:
+            text = textcodec.encode(raw, encoding)
+            self._log(f"[INFO] Encoded length ({encoding}): {len(text)}")
+            if host_arq:
+                return self._send_sr(tx_name, text, sr_window, sr_seg_chars, chunk_timeout_s)
+            chunks = [text[i:i + chunk_size_chars] for i in range(0, len(text), chunk_size_chars)]
+            return self._send_chunks(tx_name, chunks, len(raw), chunk_timeout_s)
+
+        # Thumbnail as a file of its own, then the progressive JPEG scan by scan
+        if thumb:
+            thumb_name = progressive.thumb_name(tx_name)
+            text = textcodec.encode(thumb, encoding)
+            self._log(f"[INFO] Thumbnail {thumb_name}: {len(thumb)} bytes")
+            if host_arq:
+                ok = self._send_sr(thumb_name, text, sr_window, sr_seg_chars, chunk_timeout_s)
+            else:
+                chunks = [text[i:i + chunk_size_chars] for i in range(0, len(text), chunk_size_chars)]
+                ok = self._send_chunks(thumb_name, chunks, len(thumb), chunk_timeout_s)
+            if not ok:
+                return False
 
-        chunks = [b64[i:i + chunk_size_chars] for i in range(0, len(b64), chunk_size_chars)]
+        total = len(progressive.scan_ends(raw))
+        data, ends = progressive.layered(raw, layers)
+        self._log(f"[INFO] Progressive JPEG: sending {len(ends)}/{total} scans, {len(data)} of {len(raw)} bytes")
+        if encoding != textcodec.DEFAULT:
+            # Receivers stream (and preview) base64 only
+            self._log(f"[WARN] Progressive layers are sent as {textcodec.DEFAULT}, not {encoding}")
+        if host_arq:
+            return self._send_sr(tx_name, base64.b64encode(data).decode("ascii"),
+                                 sr_window, sr_seg_chars, chunk_timeout_s)
+        return self._send_chunks(tx_name, progressive.chunks(data, ends, chunk_size_chars),
+                                 len(data), chunk_timeout_s)
+
+    def _send_chunks(self, tx_name: str, chunks: list, nbytes: int, chunk_timeout_s: float) -> bool:
+        """Send one file as FILECHUNK lines, waiting for [TX DONE] after each."""
         tot = len(chunks)
         self._log(f"[INFO] Will send {tot} FILECHUNK lines")
 
+        tr = self.tr
+        cid = tr.new_id("f") if tr.enabled else ""
+        if tr.enabled:
+            tr.emit("send", cid=cid, what="file", fname=tx_name, bytes=nbytes, chunks=tot)
+
         for idx, chunk in enumerate(chunks):
             self._log(f"\n=== Sending FILECHUNK {idx+1}/{tot} (len={len(chunk)}) ===")
             payload = f"FILECHUNK:{tx_name}:{idx}:{tot}:{chunk}\n"
+            if tr.enabled:
+                tr.emit("send", cid=f"{cid}.{idx}", what="chunk", n=len(payload))
+            t_chunk = time.monotonic()
             self._write(payload.encode("utf-8"))
 
             # Wait for MCU TX completion for THIS chunk
             r = self._consume_tx_result(timeout_s=chunk_timeout_s)
+            self._m_chunk_latency.observe(time.monotonic() - t_chunk)
+            if tr.enabled:
+                tr.emit("done", cid=f"{cid}.{idx}", ok=r.ok, reason=r.reason)
             if not r.ok:
                 self._log(f"[ERROR] Chunk {idx+1}/{tot} failed: {r.reason}")
+                if tr.enabled:
+                    tr.emit("done", cid=cid, ok=False)
                 return False
 
+        if tr.enabled:
+            tr.emit("done", cid=cid, ok=True)
         self._log("[OK] All FILECHUNK lines sent.")
         return True
 
+    def _send_sr(self, tx_name: str, text: str, window: int, seg_chars: int,
+                 line_timeout_s: float) -> bool:
+        """
+        Send one file as SRSEG segments with host selective repeat.
+
+        Each segment is one MCU line (one LoRa packet with the default
+        180 chars); [TX DONE] only paces the serial link, delivery is
+        confirmed by SRACKs coming back from the receiving PC.
+        """
+        sid = secrets.token_hex(3)
+        segs = [tx_name] + [text[i:i + seg_chars] for i in range(0, len(text), seg_chars)]
+        snd = sr_arq.SrSender(sid, segs, window=window)
+        self._log(f"[INFO] Host ARQ sid={sid}: {snd.tot} segments, window {snd.window}")
+
+        tr = self.tr
+        if tr.enabled:
+            tr.emit("send", cid=sid, what="sr_file", fname=tx_name, segs=snd.tot, window=snd.window)
+
+        with self._sr_cond:
+            self._sr_tx[sid] = snd
+        t0 = time.monotonic()
+        last_report = t0
+        try:
+            while True:
+                with self._sr_cond:
+                    while True:
+                        if snd.done or snd.failed:
+                            break
+                        now = time.monotonic()
+                        seq = snd.next_to_send(now)
+                        if seq is not None:
+                            break
+                        deadline = snd.next_deadline()
+                        self._sr_cond.wait(timeout=max(0.05, deadline - now) if deadline else 1.0)
+                    if snd.done or snd.failed:
+                        break
+                    line = snd.line(seq)
+
+                if snd.state[seq].tries:
+                    self._m_retries.inc()
+                if tr.enabled:
+                    tr.emit("send", cid=f"{sid}.{seq}", what="seg", tries=snd.state[seq].tries + 1,
+                            rto=round(snd.rtt.rto, 3))
+                t_line = time.monotonic()
+                self._write(line.encode("utf-8"))
+                r = self._consume_tx_result(timeout_s=line_timeout_s)
+                self._m_chunk_latency.observe(time.monotonic() - t_line)
+                if tr.enabled:
+                    tr.emit("done", cid=f"{sid}.{seq}", ok=r.ok, reason=r.reason)
+                if not r.ok:
+                    # Left to the RTO like any other lost segment
+                    self._log(f"[WARN] Segment {seq} not sent by MCU: {r.reason}")
+                with self._sr_cond:
+                    snd.on_sent(seq, time.monotonic())
+
+                now = time.monotonic()
+                if now - last_report >= 10.0:
+                    last_report = now
+                    self._log(f"[SR] {snd.acked}/{snd.tot} acked, base={snd.base}, "
+                              f"retx={snd.retransmits}, rto={snd.rtt.rto:.1f}s")
+        finally:
+            with self._sr_cond:
+                self._sr_tx.pop(sid, None)
+
+        dt = time.monotonic() - t0
+        if tr.enabled:
+            tr.emit("done", cid=sid, ok=snd.done, acked=snd.acked, retx=snd.retransmits)
+        srtt = f"{snd.rtt.srtt:.2f}s" if snd.rtt.srtt is not None else "n/a"
+        if snd.failed:
+            self._log(f"[ERROR] Host ARQ: segment {snd.failed_seq} unacknowledged after "
+                      f"{snd.max_tries} tries ({snd.acked}/{snd.tot} acked)")
+            return False
+        self._log(f"[OK] Host ARQ sid={sid}: {snd.tot} segments in {dt:.1f}s, "
+                  f"{snd.retransmits} retransmits, srtt={srtt}, rto={snd.rtt.rto:.1f}s")
+        return True
+
     def send_text_as_file(self, text: str, tmp_name: str = "_tmp_text_to_send.txt",
                           **kwargs) -> bool:
         tmp = Path(tmp_name)
@@ -420,7 +711,10 @@ class LoRaSerialSession:
         Optional: send a raw text line to MCU.
         If your MCU prints [TX DONE] for each sent line, wait_done=True works.
         """
-        self._write((line.strip() + "\n").encode("utf-8"))
+        line = line.strip()
+        if not line:
+            return False  # the MCU skips blank lines
+        self._write((line + "\n").encode("utf-8"), wait=wait_done)
         if not wait_done:
             return True
         r = self._consume_tx_result(timeout_s=timeout_s)
@@ -441,17 +735,69 @@ def main():
     # TX options
     ap.add_argument("--send", type=str, default="", help="File path to send (optional)")
     ap.add_argument("--send-text", type=str, default="", help="Send this text as a file (optional)")
-    ap.add_argument("--chunk-size", type=int, default=40000, help="Base64 characters per FILECHUNK")
+    ap.add_argument("--chunk-size", type=int, default=40000, help="Encoded characters per FILECHUNK")
+    ap.add_argument("--encoding", choices=list(textcodec.CODECS), default=textcodec.DEFAULT,
+                    help="Text encoding of the file data (b64 is understood by older receivers)")
     ap.add_argument("--chunk-timeout", type=float, default=300.0, help="Seconds to wait per FILECHUNK")
     ap.add_argument("--jpeg-quality", type=int, default=85)
     ap.add_argument("--mp3-bitrate", type=str, default="64k")
+    ap.add_argument("--voice", choices=VOICE_CODECS, default="",
+                    help="Audio: 8 kHz voice instead of MP3, NumPy only (ulaw 64 kbps, adpcm 32 kbps, lpc 2.4 kbps)")
+    ap.add_argument("--progressive", action="store_true",
+                    help="Images: thumbnail first, then a progressive JPEG scan by scan (JPEGs are re-encoded)")
+    ap.add_argument("--layers", type=int, default=0,
+                    help="With --progressive: send only the first N scans, as a complete coarser JPEG")
+    ap.add_argument("--thumb-size", type=int, default=progressive.THUMB_SIDE,
+                    help="With --progressive: thumbnail size in px, 0 for none")
+    ap.add_argument("--max-bytes", type=int, default=0,
+                    help="Images: best JPEG within this many bytes (searches size, quality, subsampling)")
+    ap.add_argument("--deadline", type=float, default=0,
+                    help="Images: byte budget from a transfer deadline in seconds at --sf/--bw-khz")
+    ap.add_argument("--sf", type=int, default=0, help="Link spreading factor for --deadline (default: the sketch's, 7)")
+    ap.add_argument("--bw-khz", type=float, default=0,
+                    help="Link bandwidth for --deadline (default: the sketch's, 500)")
+    ap.add_argument("--no-preview", action="store_true",
+                    help="Do not write <name>.preview.jpg while a progressive JPEG arrives")
+    ap.add_argument("--host-arq", action="store_true",
+                    help="Selective repeat between the PCs (sketch in ARQ_NONE mode)")
+    ap.add_argument("--sr-window", type=int, default=256, help="Host ARQ window in segments")
+    ap.add_argument("--sr-seg-chars", type=int, default=180, help="Encoded characters per SRSEG segment")
+
+    # Metrics
+    ap.add_argument("--metrics-port", type=int, default=0, help="Serve Prometheus /metrics on this local port")
+    ap.add_argument("--metrics-json", type=str, default="", help="Append periodic JSON metric snapshots here")
+    ap.add_argument("--metrics-interval", type=float, default=60.0, help="Seconds between JSON snapshots")
+    ap.add_argument("--trace", type=str, default="", help="Write a JSONL event trace (lora_host.trace) here")
+
+    # Startup
+    ap.add_argument("--no-probe", action="store_true",
+                    help="Old fixed 3.5 s boot wait instead of the PING probe (sketches without PING)")
+    ap.add_argument("--reset", action="store_true", help="Reboot the MCU on open (default: keep it running)")
 
     # Keep alive listening
     ap.add_argument("--exit-after-send", action="store_true", help="Exit after sending completes")
     args = ap.parse_args()
 
+    max_bytes = args.max_bytes
+    if args.deadline:
+        link = imgbudget.link_params(args.sf, args.bw_khz)
+        try:
+            mode = imgbudget.delivering_mode(link, chunk_chars=args.chunk_size)
+            budget = imgbudget.budget_bytes(args.deadline, link, chunk_chars=args.chunk_size, mode=mode)
+        except ValueError as e:
+            raise SystemExit(f"[ERROR] --deadline: {e}") from None
+        print(f"[INFO] Deadline {args.deadline:g} s at SF{link.sf} / {link.bw_hz / 1000:g} kHz -> {budget} bytes")
+        if mode != imgbudget.ARQ_MODE:
+            print(f"[WARN] {imgbudget.ARQ_MODE} ARQ does not deliver at this link; "
+                  f"budget assumes gArqMode = {imgbudget.SKETCH_MODES[mode]}")
+        max_bytes = min(max_bytes, budget) if max_bytes else budget
+
     out_dir = Path(args.out_dir)
-    sess = LoRaSerialSession(args.serial_port, args.baud, out_dir=out_dir, quiet=args.quiet)
+    tracer = trace.open_tracer(args.trace, "lora_session")
+    sess = LoRaSerialSession(args.serial_port, args.baud, out_dir=out_dir, quiet=args.quiet, tracer=tracer,
+                             probe=not args.no_probe, reset=args.reset, previews=not args.no_preview)
+
+    snapshots = metrics.start_exporters(args.metrics_port, args.metrics_json, args.metrics_interval)
 
     print(f"[INFO] Opening {args.serial_port} @ {args.baud} (ONE owner)...")
     sess.open()
@@ -471,7 +817,16 @@ def main():
                     chunk_size_chars=args.chunk_size,
                     jpeg_quality=args.jpeg_quality,
                     mp3_bitrate=args.mp3_bitrate,
-                    chunk_timeout_s=args.chunk_timeout
+                    chunk_timeout_s=args.chunk_timeout,
+                    host_arq=args.host_arq,
+                    sr_window=args.sr_window,
+                    sr_seg_chars=args.sr_seg_chars,
+                    encoding=args.encoding,
+                    progressive_jpeg=args.progressive,
+                    layers=args.layers,
+                    thumb_side=args.thumb_size,
+                    max_bytes=max_bytes,
+                    voice_codec=args.voice
                 )
                 print("[RESULT] SEND FILE:", "OK" if ok else "FAILED")
 
@@ -482,7 +837,11 @@ def main():
                 chunk_size_chars=args.chunk_size,
                 jpeg_quality=args.jpeg_quality,
                 mp3_bitrate=args.mp3_bitrate,
-                chunk_timeout_s=args.chunk_timeout
+                chunk_timeout_s=args.chunk_timeout,
+                host_arq=args.host_arq,
+                sr_window=args.sr_window,
+                sr_seg_chars=args.sr_seg_chars,
+                encoding=args.encoding
             )
             print("[RESULT] SEND TEXT:", "OK" if ok else "FAILED")
 
@@ -497,6 +856,9 @@ def main():
         print("\n[INFO] Exiting.")
     finally:
         sess.close()
+        tracer.close()
+        if snapshots:
+            snapshots.stop()
 
 
 if __name__ == "__main__":
@@ -5,7 +5,9 @@ Generic TX-side file sender for LoRa tunnel (with ARQ on MCU).
 Features:
 - Takes ANY file path.
 - If it's an image (png, bmp, gif, etc.) -> convert to JPEG and send.
-- If it's audio (wav, flac, m4a, etc.) -> convert to MP3 and send.
+- If it's audio (wav, flac, m4a, etc.) -> convert to MP3 and send, or with
+  --voice ulaw|adpcm|lpc encode 8 kHz voice with NumPy only (lora_host.voice:
+  64 kbps µ-law WAV, 32 kbps IMA ADPCM WAV or a 2.4 kbps .lpc vocoder file).
 - For text (.txt, .csv, .json, .text) and other files -> send raw bytes.
 - Base64-encodes the final bytes.
 - Splits into big ASCII-safe lines:
@@ -15,29 +17,41 @@ Features:
     [TX DONE]   -> success for that chunk/message
     [ABORT]     -> failure, stops
 
+- Opens the port without rebooting the MCU and PINGs it until it answers
+  (lora_host.ready); --no-probe restores the fixed 6 s boot wait.
+- --progressive (images): first a ~3 KB thumbnail <stem>_thumb.jpg, then a
+  progressive JPEG sent scan by scan (lora_host.progressive), so receivers
+  can show a preview long before the last chunk; --layers N stops after
+  N scans and sends a complete, coarser JPEG.
+- --max-bytes N or --deadline S (images): resolution, quality and chroma
+  subsampling are searched for the best JPEG within the budget
+  (lora_host.imgbudget); --jpeg-quality is then the highest quality tried.
+
 Usage:
     python tx_send_file.py COM9 path/to/myfile.png
+    python tx_send_file.py COM9 photo.png --progressive --layers 5
+    python tx_send_file.py COM9 photo.png --deadline 120 --sf 9 --bw-khz 125
+    python tx_send_file.py COM9 human_voice.wav --voice adpcm
 """
 
 import argparse
 import base64
 import io
 import mimetypes
+import sys
 import time
 from pathlib import Path
 
 import serial  # pip install pyserial
 
-# Optional libraries for conversion
 try:
-    from PIL import Image  # pip install pillow
-except ImportError:
-    Image = None
+    from lora_host import imgbudget, progressive, ready
+except ImportError:  # running from a checkout: use the repo-root package
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+    from lora_host import imgbudget, progressive, ready
 
-try:
-    from pydub import AudioSegment  # pip install pydub
-except ImportError:
-    AudioSegment = None
+# Optional libraries for conversion (Pillow, pydub, NumPy for --voice) are imported on first use
+VOICE_CODECS = ("ulaw", "adpcm", "lpc")  # lora_host.voice.CODECS
 
 # Default settings
 BAUD_RATE = 115200
@@ -70,20 +84,31 @@ def is_audio_file(path: Path) -> bool:
     return bool(m and m.startswith("audio/"))
 
 
-def convert_image_to_jpeg(path: Path, quality: int = 85) -> tuple[bytes, str]:
+def convert_image_to_jpeg(path: Path, quality: int = 85, progressive_jpeg: bool = False,
+                          max_side: int = 0, max_bytes: int = 0) -> tuple[bytes, str]:
     """
-    Convert any supported image to JPEG in-memory.
+    Convert any supported image to JPEG in-memory (progressive scans if asked,
+    scaled down to max_side px if given). With max_bytes, the best JPEG
+    within that size is searched for, quality at most `quality`.
     Returns (jpeg_bytes, new_filename).
     """
-    if Image is None:
+    try:
+        from PIL import Image  # pip install pillow (imported on first use)
+    except ImportError:
         raise RuntimeError(
             "Pillow (PIL) not installed. Run: pip install pillow"
-        )
+        ) from None
 
     img = Image.open(path)
     img = img.convert("RGB")
+    if max_side:
+        img.thumbnail((max_side, max_side))
+    if max_bytes:
+        fit = imgbudget.fit(img, max_bytes, q_max=quality, progressive=progressive_jpeg)
+        print(f"[INFO] Fitted to {max_bytes} bytes: {fit.describe()}")
+        return fit.data, path.with_suffix(".jpg").name
     buf = io.BytesIO()
-    img.save(buf, format="JPEG", quality=quality, optimize=True)
+    img.save(buf, format="JPEG", quality=quality, optimize=True, progressive=progressive_jpeg)
     return buf.getvalue(), path.with_suffix(".jpg").name
 
 
@@ -92,11 +117,13 @@ def convert_audio_to_mp3(path: Path, bitrate: str = "64k") -> tuple[bytes, str]:
     Convert any supported audio file to MP3 in-memory.
     Returns (mp3_bytes, new_filename).
     """
-    if AudioSegment is None:
+    try:
+        from pydub import AudioSegment  # pip install pydub (imported on first use)
+    except ImportError:
         raise RuntimeError(
             "pydub not installed. Run: pip install pydub\n"
             "Also ensure ffmpeg is installed and in PATH."
-        )
+        ) from None
 
     audio = AudioSegment.from_file(path)
     buf = io.BytesIO()
@@ -104,21 +131,44 @@ def convert_audio_to_mp3(path: Path, bitrate: str = "64k") -> tuple[bytes, str]:
     return buf.getvalue(), path.with_suffix(".mp3").name
 
 
-def prepare_file_for_lora(path: Path, jpeg_quality: int | None = None, mp3_bitrate: str | None = None) -> tuple[bytes, str, str]:
+def convert_audio_to_voice(path: Path, codec: str) -> tuple[bytes, str]:
+    """
+    Encode audio as 8 kHz voice (lora_host.voice, NumPy only).
+    Returns (file_bytes, new_filename).
+    """
+    try:
+        from lora_host import voice
+    except ImportError:
+        raise RuntimeError("NumPy not installed. Run: pip install numpy") from None
+    return voice.encode_file(path, codec)
+
+
+def prepare_file_for_lora(path: Path, jpeg_quality: int | None = None, mp3_bitrate: str | None = None,
+                          progressive_jpeg: bool = False, max_bytes: int = 0,
+                          voice_codec: str = "") -> tuple[bytes, str, str]:
     """
     Decide how to handle the file:
-      - Image -> JPEG
-      - Audio -> MP3
+      - Image -> JPEG (progressive, or over max_bytes: JPEGs are re-encoded too)
+      - Audio -> voice_codec if given, else MP3
       - Others (text, etc.) -> raw bytes
     Returns (bytes_to_send, transmit_filename, description).
     """
     suffix = path.suffix.lower()
+    over_budget = bool(max_bytes) and path.stat().st_size > max_bytes
 
-    if is_image_file(path) and suffix not in (".jpg", ".jpeg"):
-        print(f"[INFO] Detected image '{path.name}', converting to JPEG...")
+    if is_image_file(path) and (progressive_jpeg or over_budget or suffix not in (".jpg", ".jpeg")):
+        kind = "progressive JPEG" if progressive_jpeg else "JPEG"
+        print(f"[INFO] Detected image '{path.name}', converting to {kind}...")
         q = jpeg_quality if jpeg_quality is not None else 85
-        raw, out_name = convert_image_to_jpeg(path, quality=q)
-        desc = f"image->jpeg, {len(raw)} bytes"
+        raw, out_name = convert_image_to_jpeg(path, quality=q, progressive_jpeg=progressive_jpeg,
+                                              max_bytes=max_bytes)
+        desc = f"image->{'progressive ' if progressive_jpeg else ''}jpeg, {len(raw)} bytes"
+        return raw, out_name, desc
+
+    if is_audio_file(path) and voice_codec:
+        print(f"[INFO] Detected audio '{path.name}', encoding 8 kHz {voice_codec} voice...")
+        raw, out_name = convert_audio_to_voice(path, voice_codec)
+        desc = f"audio->{voice_codec} voice, {len(raw)} bytes"
         return raw, out_name, desc
 
     if is_audio_file(path) and suffix != ".mp3":
@@ -171,45 +221,107 @@ def wait_for_chunk_done(ser: serial.Serial, chunk_idx: int, chunk_tot: int) -> b
     return ok
 
 
-def send_file(serial_port: str, file_path: str, baud: int = BAUD_RATE, chunk_size: int = CHUNK_SIZE, jpeg_quality: int = 85, mp3_bitrate: str = "64k") -> None:
+def plan_transfers(path: Path, chunk_size: int = CHUNK_SIZE, jpeg_quality: int = 85, mp3_bitrate: str = "64k",
+                   progressive_jpeg: bool = False, layers: int = 0,
+                   thumb_side: int = progressive.THUMB_SIDE, max_bytes: int = 0,
+                   voice_codec: str = "") -> list[tuple[str, list[str]]]:
     """
-    Programmatic API to send a file over LoRa via the TX MCU.
+    The (transmit_name, FILECHUNK texts) transfers for one file: normally
+    one; with progressive_jpeg and an image, a thumbnail and then the
+    progressive JPEG split at its scan boundaries. An image byte budget
+    (max_bytes) covers the thumbnail too.
     """
-    path = Path(file_path)
-    if not path.is_file():
-        raise FileNotFoundError(f"file '{path}' not found")
-
-    raw, tx_name, desc = prepare_file_for_lora(path, jpeg_quality=jpeg_quality, mp3_bitrate=mp3_bitrate)
+    image = is_image_file(path)
+    progressive_jpeg = progressive_jpeg and image
+    if max_bytes and not image:
+        print("[WARN] Byte budget applies to images only; sending as is")
+        max_bytes = 0
+
+    transfers = []
+    if progressive_jpeg and thumb_side:
+        thumb, _ = convert_image_to_jpeg(path, quality=progressive.THUMB_QUALITY, max_side=thumb_side)
+        thumb_name = progressive.thumb_name(path.with_suffix(".jpg").name)
+        b64 = base64.b64encode(thumb).decode("ascii")
+        print(f"[INFO] Thumbnail {thumb_name}: {len(thumb)} bytes")
+        transfers.append((thumb_name, [b64[i : i + chunk_size] for i in range(0, len(b64), chunk_size)]))
+        if max_bytes:
+            max_bytes = max(1, max_bytes - len(thumb))
+
+    raw, tx_name, desc = prepare_file_for_lora(path, jpeg_quality=jpeg_quality, mp3_bitrate=mp3_bitrate,
+                                               progressive_jpeg=progressive_jpeg, max_bytes=max_bytes,
+                                               voice_codec=voice_codec)
     print(f"[INFO] Final transmit name: {tx_name}")
     print(f"[INFO] Mode: {desc}")
 
-    b64 = base64.b64encode(raw).decode("ascii")
-    print(f"[INFO] Base64 length: {len(b64)} characters")
+    if not progressive_jpeg:
+        b64 = base64.b64encode(raw).decode("ascii")
+        print(f"[INFO] Base64 length: {len(b64)} characters")
+        return [(tx_name, [b64[i : i + chunk_size] for i in range(0, len(b64), chunk_size)])]
+
+    total = len(progressive.scan_ends(raw))
+    data, ends = progressive.layered(raw, layers)
+    print(f"[INFO] Progressive JPEG: sending {len(ends)}/{total} scans, {len(data)} of {len(raw)} bytes; "
+          f"layer ends at {', '.join(str(e) for e in ends)}")
+    transfers.append((tx_name, progressive.chunks(data, ends, chunk_size)))
+    return transfers
+
 
-    chunks = [b64[i : i + chunk_size] for i in range(0, len(b64), chunk_size)]
+def send_chunks(ser: serial.Serial, tx_name: str, chunks: list[str]) -> bool:
+    """Send one file's FILECHUNK lines, waiting for the MCU after each."""
     tot = len(chunks)
     print(f"[INFO] Will send {tot} FILECHUNK lines to MCU")
+    for idx, chunk in enumerate(chunks):
+        print(f"\n=== Sending FILECHUNK {idx+1}/{tot} (len={len(chunk)}) ===")
+        payload = f"FILECHUNK:{tx_name}:{idx}:{tot}:{chunk}\n"
+        ser.write(payload.encode("utf-8"))
+        ser.flush()
+
+        print(f"[INFO] Waiting for MCU to finish chunk {idx+1}/{tot}...")
+        ok = wait_for_chunk_done(ser, idx, tot)
+        if not ok:
+            print("[ERROR] Stopping due to TX failure.")
+            return False
+    return True
+
+
+def send_file(serial_port: str, file_path: str, baud: int = BAUD_RATE, chunk_size: int = CHUNK_SIZE, jpeg_quality: int = 85, mp3_bitrate: str = "64k",
+              probe: bool = True, reset: bool = False, progressive_jpeg: bool = False, layers: int = 0,
+              thumb_side: int = progressive.THUMB_SIDE, max_bytes: int = 0, voice_codec: str = "") -> None:
+    """
+    Programmatic API to send a file over LoRa via the TX MCU.
+    """
+    path = Path(file_path)
+    if not path.is_file():
+        raise FileNotFoundError(f"file '{path}' not found")
+
+    transfers = plan_transfers(path, chunk_size, jpeg_quality, mp3_bitrate,
+                               progressive_jpeg, layers, thumb_side, max_bytes, voice_codec)
 
     print(f"[INFO] Opening serial port {serial_port} @ {baud}...")
-    with serial.Serial(serial_port, baud, timeout=1) as ser:
-        time.sleep(3.0)
-
-        boot_deadline = time.time() + 3.0
-        while time.time() < boot_deadline:
-            line = ser.readline().decode(errors="ignore").strip()
-            if line:
-                print(f"[MCU-BOOT] {line}")
-
-        for idx, chunk in enumerate(chunks):
-            print(f"\n=== Sending FILECHUNK {idx+1}/{tot} (len={len(chunk)}) ===")
-            payload = f"FILECHUNK:{tx_name}:{idx}:{tot}:{chunk}\n"
-            ser.write(payload.encode("utf-8"))
-            ser.flush()
-
-            print(f"[INFO] Waiting for MCU to finish chunk {idx+1}/{tot}...")
-            ok = wait_for_chunk_done(ser, idx, tot)
-            if not ok:
-                print("[ERROR] Stopping due to TX failure.")
+    if probe:
+        ser = ready.open_port(serial_port, baud, timeout=1, reset=reset)
+        r = ready.wait_ready(ser, ready.PING, ready.TUNNEL_READY,
+                             on_line=lambda line: print(f"[MCU-BOOT] {line}"))
+        if r.ready:
+            print(f"[INFO] MCU {r.describe()}")
+        else:
+            print(f"[WARN] MCU gave {r.describe()}; continuing (old sketch? try --no-probe)")
+    else:
+        ser = serial.Serial(serial_port, baud, timeout=1)
+    with ser:
+        if not probe:
+            time.sleep(3.0)
+
+            boot_deadline = time.time() + 3.0
+            while time.time() < boot_deadline:
+                line = ser.readline().decode(errors="ignore").strip()
+                if line:
+                    print(f"[MCU-BOOT] {line}")
+
+        for tx_name, chunks in transfers:
+            if len(transfers) > 1:
+                print(f"\n[INFO] Sending '{tx_name}'")
+            if not send_chunks(ser, tx_name, chunks):
                 break
 
         print("\n[INFO] All FILECHUNK lines sent (TX side finished).")
@@ -236,8 +348,56 @@ def main():
         "--mp3-bitrate", type=str, default="64k",
         help="MP3 bitrate (e.g. '64k', '96k', '128k')",
     )
+    parser.add_argument(
+        "--voice", choices=VOICE_CODECS, default="",
+        help="Audio: 8 kHz voice instead of MP3, NumPy only (ulaw 64 kbps, adpcm 32 kbps, lpc 2.4 kbps)",
+    )
+    parser.add_argument(
+        "--progressive", action="store_true",
+        help="Images: thumbnail first, then a progressive JPEG scan by scan (JPEG inputs are re-encoded)",
+    )
+    parser.add_argument(
+        "--layers", type=int, default=0,
+        help="With --progressive: send only the first N scans, as a complete coarser JPEG (default all)",
+    )
+    parser.add_argument(
+        "--thumb-size", type=int, default=progressive.THUMB_SIDE,
+        help=f"With --progressive: thumbnail size in px, 0 for none (default {progressive.THUMB_SIDE})",
+    )
+    parser.add_argument(
+        "--max-bytes", type=int, default=0,
+        help="Images: best JPEG within this many bytes (searches size, quality, subsampling)",
+    )
+    parser.add_argument(
+        "--deadline", type=float, default=0,
+        help="Images: byte budget from a transfer deadline in seconds at --sf/--bw-khz",
+    )
+    parser.add_argument("--sf", type=int, default=0, help="Link spreading factor for --deadline (default: the sketch's, 7)")
+    parser.add_argument("--bw-khz", type=float, default=0, help="Link bandwidth for --deadline (default: the sketch's, 500)")
+    parser.add_argument(
+        "--no-probe", action="store_true",
+        help="Fixed 6 s boot wait instead of the PING probe (sketches without PING)",
+    )
+    parser.add_argument(
+        "--reset", action="store_true",
+        help="Reboot the MCU on open (default: keep it running)",
+    )
     args = parser.parse_args()
 
+    max_bytes = args.max_bytes
+    if args.deadline:
+        link = imgbudget.link_params(args.sf, args.bw_khz)
+        try:
+            mode = imgbudget.delivering_mode(link, chunk_chars=args.chunk_size)
+            budget = imgbudget.budget_bytes(args.deadline, link, chunk_chars=args.chunk_size, mode=mode)
+        except ValueError as e:
+            raise SystemExit(f"[ERROR] --deadline: {e}") from None
+        print(f"[INFO] Deadline {args.deadline:g} s at SF{link.sf} / {link.bw_hz / 1000:g} kHz -> {budget} bytes")
+        if mode != imgbudget.ARQ_MODE:
+            print(f"[WARN] {imgbudget.ARQ_MODE} ARQ does not deliver at this link; "
+                  f"budget assumes gArqMode = {imgbudget.SKETCH_MODES[mode]}")
+        max_bytes = min(max_bytes, budget) if max_bytes else budget
+
     try:
         send_file(
             serial_port=args.serial_port,
@@ -246,8 +406,15 @@ def main():
             chunk_size=args.chunk_size,
             jpeg_quality=args.jpeg_quality,
             mp3_bitrate=args.mp3_bitrate,
+            probe=not args.no_probe,
+            reset=args.reset,
+            progressive_jpeg=args.progressive,
+            layers=args.layers,
+            thumb_side=args.thumb_size,
+            max_bytes=max_bytes,
+            voice_codec=args.voice,
         )
-    except FileNotFoundError as e:
+    except (FileNotFoundError, ValueError) as e:
         print(f"Error: {e}")
 
 
@@ -1,38 +1,75 @@
 #!/usr/bin/env python3
 """Plot pathloss vs spreading factor from RX-side CSV logs."""
+import argparse
+import sys
+from pathlib import Path
+
 import pandas as pd
 import matplotlib.pyplot as plt
 
+try:
+    from lora_host import live, store
+except ImportError:  # running from a checkout: use the repo-root package
+    sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+    from lora_host import live, store
+
 CSV_PATH = "rx_results.csv"          # change if needed
 OUT_PNG  = "rx_pathloss_vs_sf.png"
 
+# Optional: read pre-aggregated results from a lora_host.store database
+# (python -m lora_host.store ingest runs.sqlite ...) instead of the CSV.
+DB_PATH = None                       # e.g. "runs.sqlite"
+
 BW_ORDER = [125000, 250000, 500000]
 
 def to_num(s):
     return pd.to_numeric(s, errors="coerce")
 
+def load_from_store(db_path: str) -> pd.DataFrame:
+    con = store.connect(db_path)
+    rows = store.aggregate_by_sf_bw(con, "pathloss_db", side="RX")
+    g = pd.DataFrame(rows, columns=["sf", "bw", "mean"])  # keeps the columns when the store is empty
+    return g.rename(columns={"mean": "pathloss_db"})
+
 def main():
-    df = pd.read_csv(CSV_PATH)
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--live", action="store_true",
+                    help="Follow CSV_PATH while the logger writes it and redraw running stats")
+    ap.add_argument("--fps", type=float, default=2.0, help="Redraw rate in live mode")
+    args = ap.parse_args()
+
+    if args.live:
+        tail = live.CsvTail(CSV_PATH)
+        live.run_plot(tail, live.PathlossAggregator("RX"), args.fps, "RX: Path Loss vs SF (live)")
+        return
+
+    if DB_PATH:
+        g = load_from_store(DB_PATH)
+    else:
+        df = pd.read_csv(CSV_PATH)
+
+        # Keep only RX rows
+        df = df[df["type"] == "RX"].copy()
 
-    # Keep only RX rows
-    df = df[df["type"] == "RX"].copy()
+        # Numeric cleanup
+        df["sf"] = to_num(df["sf"])
+        df["bw"] = to_num(df["bw"])
+        df["txp_dbm"] = to_num(df.get("txp_dbm"))
+        df["rssi_dbm"] = to_num(df.get("rssi_dbm"))
+        df["pathloss_db"] = to_num(df.get("pathloss_db"))
 
-    # Numeric cleanup
-    df["sf"] = to_num(df["sf"])
-    df["bw"] = to_num(df["bw"])
-    df["txp_dbm"] = to_num(df.get("txp_dbm"))
-    df["rssi_dbm"] = to_num(df.get("rssi_dbm"))
-    df["pathloss_db"] = to_num(df.get("pathloss_db"))
+        # If pathloss_db missing, compute from txp_dbm - rssi_dbm
+        if df["pathloss_db"].isna().all():
+            df["pathloss_db"] = df["txp_dbm"] - df["rssi_dbm"]
 
-    # If pathloss_db missing, compute from txp_dbm - rssi_dbm
-    if df["pathloss_db"].isna().all():
-        df["pathloss_db"] = df["txp_dbm"] - df["rssi_dbm"]
+        # Drop incomplete rows
+        df = df.dropna(subset=["sf", "bw", "pathloss_db"])
 
-    # Drop incomplete rows
-    df = df.dropna(subset=["sf", "bw", "pathloss_db"])
+        # Aggregate: mean loss per (sf,bw)
+        g = df.groupby(["sf", "bw"], as_index=False)["pathloss_db"].mean()
 
-    # Aggregate: mean loss per (sf,bw)
-    g = df.groupby(["sf", "bw"], as_index=False)["pathloss_db"].mean()
+    if g.empty:
+        sys.exit(f"[ERROR] No RX rows in {DB_PATH or CSV_PATH}")
 
     plt.figure()
     for bw in BW_ORDER:
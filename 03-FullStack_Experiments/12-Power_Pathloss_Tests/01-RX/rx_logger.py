@@ -1,10 +1,17 @@
 #!/usr/bin/env python3
 """Capture RX-side power test logs from serial into a CSV."""
-import csv
-import os
+import sys
 import time
+from pathlib import Path
+
 import serial
 
+try:
+    from lora_host.telemetry import TelemetrySink
+except ImportError:  # running from a checkout: use the repo-root package
+    sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+    from lora_host.telemetry import TelemetrySink
+
 SERIAL_PORT = "COM9"
 BAUD = 115200
 OUT_CSV = "rx_results.csv"
@@ -18,38 +25,19 @@ FIELDNAMES = [
     "role", "state", "cmd"
 ]
 
-def ensure_csv(path: str, fieldnames: list[str]) -> None:
-    if (not os.path.exists(path)) or os.path.getsize(path) == 0:
-        with open(path, "w", newline="", encoding="utf-8") as f:
-            csv.DictWriter(f, fieldnames=fieldnames).writeheader()
-
-def parse_log_line(line: str) -> dict:
-    parts = [p.strip() for p in line.split(",")]
-    out = {"type": "", "event": "", "raw_line": line}
-
-    if len(parts) < 2 or parts[0] != "LOG":
-        return out
-
-    out["type"] = parts[1]
-
-    # If this is an EVENT line: LOG,EVENT,<EVENTNAME>,k1,v1,k2,v2...
-    i = 2
-    if out["type"] == "EVENT" and len(parts) >= 3:
-        out["event"] = parts[2]
-        i = 3  # start parsing pairs after event name
-
-    # Parse remaining tokens as key,value pairs
-    while i + 1 < len(parts):
-        k = parts[i]
-        v = parts[i + 1]
-        out[k] = v
-        i += 2
+NUMERIC_FIELDS = [
+    "testId", "slot", "sf", "bw", "seq", "len", "toa_ms",
+    "txp_dbm", "rssi_dbm", "snr_db", "pathloss_db",
+]
 
-    return out
+# Rows are batched and written every FLUSH_ROWS rows or FLUSH_SECS seconds;
+# a journal next to OUT_CSV keeps unflushed rows safe across a crash.
+FLUSH_ROWS = 256
+FLUSH_SECS = 2.0
+OUT_SQLITE = None   # e.g. "rx_results.sqlite"
+OUT_NPZ_DIR = None  # e.g. "rx_npz"
 
 def main():
-    ensure_csv(OUT_CSV, FIELDNAMES)
-
     ser = serial.Serial(SERIAL_PORT, BAUD, timeout=0.2)
     time.sleep(1.0)
     ser.reset_input_buffer()
@@ -61,28 +49,23 @@ def main():
     ser.write(b"STATUS\n")
 
     print(f"[RX] Logging from {SERIAL_PORT} -> {OUT_CSV}")
+    sink = TelemetrySink(OUT_CSV, FIELDNAMES, numeric=NUMERIC_FIELDS,
+                         flush_rows=FLUSH_ROWS, flush_secs=FLUSH_SECS,
+                         sqlite_path=OUT_SQLITE, npz_dir=OUT_NPZ_DIR)
     try:
-        with open(OUT_CSV, "a", newline="", encoding="utf-8") as f:
-            w = csv.DictWriter(f, fieldnames=FIELDNAMES, extrasaction="ignore")
-            while True:
-                line = ser.readline().decode("utf-8", errors="replace").strip()
-                if not line or not line.startswith("LOG,"):
-                    continue
-
-                ts = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime())
-                row = {"pc_time_iso": ts}
-                row.update(parse_log_line(line))
-
-                for k in FIELDNAMES:
-                    row.setdefault(k, "")
+        while True:
+            line = ser.readline().decode("utf-8", errors="replace").strip()
+            if not line or not line.startswith("LOG,"):
+                sink.poll()
+                continue
 
-                w.writerow(row)
-                f.flush()
-                print(line)
+            sink.add_line(line)
+            print(line)
 
     except KeyboardInterrupt:
         print("\n[RX] Stopped.")
     finally:
+        sink.close()
         ser.close()
 
 if __name__ == "__main__":
@@ -3,130 +3,320 @@
 LoRa CSV Data Capture Script
 Captures TX_CSV and RX_CSV data from ESP32 serial output and saves to local files.
 
+The serial port is drained by a reader thread that only parses lines and
+puts them on a bounded queue; a writer thread takes them off in batches
+(one write + flush per batch per file). If the disk stalls long enough for
+the queue to fill, new lines are dropped and counted instead of blocking
+the UART. Output files can rotate by size and/or age, closed segments can
+be gzipped in the background, and console echo is rate-limited, so the
+tool can run for days.
+
 Usage:
-    python csv_capture.py [COM_PORT] [BAUD_RATE]
-    
+    python csv_capture.py [COM_PORT] [BAUD_RATE] [--rotate-mb N] [--rotate-min N]
+                          [--gzip] [--echo-rate N] [--queue N]
+
 Example:
     python csv_capture.py COM11 115200
+    python csv_capture.py COM11 115200 --rotate-mb 50 --rotate-min 60 --gzip
 """
 
+import argparse
 import serial
 import datetime
+import gzip
 import os
+import queue
+import shutil
 import sys
 import signal
 import threading
 import time
+from pathlib import Path
+
+try:
+    from lora_host import lineparse
+except ImportError:  # running from a checkout: use the repo-root package
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+    from lora_host import lineparse
+
+QUEUE_LINES = 100000   # lines buffered between reader and writer
+BATCH_LINES = 1000     # max lines per write() batch
+STATUS_SECS = 30.0     # period of the counters line
+
+
+class RotatingCSV:
+    """
+    One output stream (Tx or Rx) split into segments: Tx_<ts>.csv,
+    Tx_<ts>_001.csv, ... A new segment starts when the size or age limit is
+    reached; the last header line seen is repeated at its top so every
+    segment can be read on its own.
+    """
+
+    def __init__(self, prefix, timestamp, max_bytes=0, max_secs=0, compress=False):
+        self.prefix = prefix
+        self.timestamp = timestamp
+        self.max_bytes = max_bytes
+        self.max_secs = max_secs
+        self.compress = compress
+        self.header = None
+        self.segment = 0
+        self.file = None
+        self.filename = None
+        self.size = 0
+        self.rows = 0
+        self.opened_at = 0.0
+        self.closed = []          # finished segment paths
+        self._gzip_threads = []
+        self._open()
+
+    def _open(self):
+        suffix = "" if self.segment == 0 else f"_{self.segment:03d}"
+        self.filename = f"{self.prefix}_{self.timestamp}{suffix}.csv"
+        self.file = open(self.filename, 'w', newline='', encoding='utf-8')
+        self.size = 0
+        self.rows = 0
+        self.opened_at = time.monotonic()
+        if self.header is not None:
+            self.size += self.file.write(self.header + '\n')
+
+    def _rotate(self):
+        self._finish()
+        self.segment += 1
+        self._open()
+
+    def _finish(self):
+        self.file.close()
+        self.file = None
+        self.closed.append(self.filename)
+        if self.compress:
+            # Off the writer thread: a large segment takes a while
+            t = threading.Thread(target=_gzip_file, args=(self.filename,))
+            t.start()
+            self._gzip_threads.append(t)
+
+    def due(self):
+        if self.rows == 0:
+            return False
+        if self.max_bytes and self.size >= self.max_bytes:
+            return True
+        return bool(self.max_secs) and time.monotonic() - self.opened_at >= self.max_secs
+
+    def write_batch(self, lines):
+        """lines: list of (text, is_header)"""
+        if self.due():
+            self._rotate()
+        buf = []
+        for text, is_header in lines:
+            if is_header:
+                self.header = text
+            buf.append(text)
+        data = '\n'.join(buf) + '\n'
+        self.size += self.file.write(data)
+        self.rows += len(buf)
+        self.file.flush()
+
+    def close(self):
+        if self.file:
+            self._finish()
+        for t in self._gzip_threads:
+            t.join()
+
+
+def _gzip_file(path):
+    try:
+        with open(path, 'rb') as src, gzip.open(path + '.gz', 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+        os.remove(path)
+    except OSError as e:
+        print(f"⚠️ gzip failed for {path}: {e}")
+
 
 class CSVCapture:
-    def __init__(self, port='COM11', baud=115200):
+    def __init__(self, port='COM11', baud=115200, rotate_mb=0.0, rotate_min=0.0,
+                 compress=False, echo_rate=5.0, queue_lines=QUEUE_LINES):
         self.port = port
         self.baud = baud
         self.serial_conn = None
         self.running = False
         self.tx_file = None
         self.rx_file = None
-        
+        self.rotate_bytes = int(rotate_mb * 1024 * 1024)
+        self.rotate_secs = rotate_min * 60.0
+        self.compress = compress
+        self.echo_interval = 1.0 / echo_rate if echo_rate > 0 else None
+
+        self.queue = queue.Queue(maxsize=queue_lines)
+        self.reader_thread = None
+        self.writer_thread = None
+
+        # Counters (each only written by one thread)
+        self.lines_read = 0
+        self.dropped = 0          # queue full (reader thread)
+        self.write_errors = 0     # lost to failed writes (writer thread)
+        self.written = {"TX": 0, "RX": 0}
+        self.echo_skipped = 0
+
         # Create timestamp for unique filenames
         self.timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         self.tx_filename = f"Tx_{self.timestamp}.csv"
         self.rx_filename = f"Rx_{self.timestamp}.csv"
-        
+
     def setup_files(self):
         """Create and setup CSV files with headers"""
         try:
-            self.tx_file = open(self.tx_filename, 'w', newline='')
-            self.rx_file = open(self.rx_filename, 'w', newline='')
+            self.tx_file = RotatingCSV("Tx", self.timestamp, self.rotate_bytes, self.rotate_secs, self.compress)
+            self.rx_file = RotatingCSV("Rx", self.timestamp, self.rotate_bytes, self.rotate_secs, self.compress)
             print(f"✅ Created {self.tx_filename}")
             print(f"✅ Created {self.rx_filename}")
         except Exception as e:
             print(f"❌ Error creating files: {e}")
             return False
         return True
-            
+
     def connect_serial(self):
         """Connect to ESP32 serial port"""
         try:
-            self.serial_conn = serial.Serial(self.port, self.baud, timeout=1)
+            self.serial_conn = serial.Serial(self.port, self.baud, timeout=0.2)
             print(f"✅ Connected to {self.port} at {self.baud} baud")
             return True
         except Exception as e:
             print(f"❌ Error connecting to serial: {e}")
             return False
-            
+
     def process_line(self, line):
-        """Process incoming serial line and extract CSV data"""
+        """Parse one serial line; CSV rows are queued for the writer thread"""
         line = line.strip()
-        
-        if line.startswith("TX_CSV_HEADER:"):
-            header = line.replace("TX_CSV_HEADER:", "")
-            self.tx_file.write(header + '\n')
-            self.tx_file.flush()
-            print(f"📝 TX Header: {header}")
-            
-        elif line.startswith("RX_CSV_HEADER:"):
-            header = line.replace("RX_CSV_HEADER:", "")
-            self.rx_file.write(header + '\n')
-            self.rx_file.flush()
-            print(f"📝 RX Header: {header}")
-            
-        elif line.startswith("TX_CSV:"):
-            data = line.replace("TX_CSV:", "")
-            self.tx_file.write(data + '\n')
-            self.tx_file.flush()
-            print(f"📤 TX: {data}")
-            
-        elif line.startswith("RX_CSV:"):
-            data = line.replace("RX_CSV:", "")
-            self.rx_file.write(data + '\n')
-            self.rx_file.flush()
-            print(f"📥 RX: {data}")
-            
+
+        ev = lineparse.parse_line(line)
+
+        if type(ev) is lineparse.CsvLine:
+            try:
+                self.queue.put_nowait((ev.stream, ev.data, ev.header))
+            except queue.Full:
+                self.dropped += 1
+
         # Also log other important messages
         elif "Node ID:" in line:
             print(f"🆔 {line}")
         elif "LoRa Chat" in line:
             print(f"🚀 {line}")
-            
-    def capture_loop(self):
-        """Main capture loop"""
-        print("🎯 Starting CSV capture... Press Ctrl+C to stop")
-        self.running = True
-        
+
+    # ----------------------------
+    # Threads
+    # ----------------------------
+
+    def reader_loop(self):
+        """Drain the UART in bulk and hand complete lines to process_line()"""
+        buf = bytearray()
         while self.running:
             try:
-                if self.serial_conn.in_waiting > 0:
-                    line = self.serial_conn.readline().decode('utf-8', errors='ignore')
-                    if line:
-                        self.process_line(line)
-                else:
-                    time.sleep(0.01)  # Small delay to prevent CPU spinning
-                    
-            except KeyboardInterrupt:
-                print("\n🛑 Ctrl+C detected, stopping capture...")
-                break
+                chunk = self.serial_conn.read(self.serial_conn.in_waiting or 1)
             except Exception as e:
                 print(f"⚠️ Error reading serial: {e}")
                 time.sleep(0.1)
-                
+                continue
+            if not chunk:
+                continue
+            buf += chunk
+            start = 0
+            while True:
+                nl = buf.find(b'\n', start)
+                if nl < 0:
+                    break
+                self.lines_read += 1
+                self.process_line(buf[start:nl].decode('utf-8', errors='ignore'))
+                start = nl + 1
+            del buf[:start]
+
+    def writer_loop(self):
+        """Take queued rows in batches, write them, echo a sample and report counters"""
+        last_echo = 0.0
+        last_status = time.monotonic()
+        while self.running or not self.queue.empty():
+            try:
+                first = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                first = None
+            batch = [] if first is None else [first]
+            while len(batch) < BATCH_LINES:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if batch:
+                tx = [(d, h) for stream, d, h in batch if stream == "TX"]
+                rx = [(d, h) for stream, d, h in batch if stream != "TX"]
+                try:
+                    if tx:
+                        self.tx_file.write_batch(tx)
+                    if rx:
+                        self.rx_file.write_batch(rx)
+                except OSError as e:
+                    print(f"❌ Write failed, {len(batch)} lines lost: {e}")
+                    self.write_errors += len(batch)
+                else:
+                    self.written["TX"] += len(tx)
+                    self.written["RX"] += len(rx)
+
+                now = time.monotonic()
+                for stream, data, header in batch:
+                    if header:
+                        print(f"📝 {stream} Header: {data}")
+                    elif self.echo_interval is not None and now - last_echo >= self.echo_interval:
+                        print(f"📤 TX: {data}" if stream == "TX" else f"📥 RX: {data}")
+                        last_echo = now
+                    else:
+                        self.echo_skipped += 1
+
+            if time.monotonic() - last_status >= STATUS_SECS:
+                last_status = time.monotonic()
+                self.print_status()
+
+    def print_status(self):
+        print(f"📊 written TX={self.written['TX']} RX={self.written['RX']} "
+              f"dropped={self.dropped} write_errors={self.write_errors} queued={self.queue.qsize()} "
+              f"segments TX={self.tx_file.segment + 1} RX={self.rx_file.segment + 1}")
+
+    def capture_loop(self):
+        """Start reader/writer threads and wait for Ctrl+C"""
+        print("🎯 Starting CSV capture... Press Ctrl+C to stop")
+        self.running = True
+        self.writer_thread = threading.Thread(target=self.writer_loop, name="csv-writer")
+        self.reader_thread = threading.Thread(target=self.reader_loop, name="serial-reader", daemon=True)
+        self.writer_thread.start()
+        self.reader_thread.start()
+
+        try:
+            while self.running and self.writer_thread.is_alive():
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            print("\n🛑 Ctrl+C detected, stopping capture...")
+
     def cleanup(self):
         """Clean up resources"""
         self.running = False
-        
-        if self.tx_file:
-            self.tx_file.close()
-            size = os.path.getsize(self.tx_filename)
-            print(f"💾 Saved {self.tx_filename} ({size} bytes)")
-            
-        if self.rx_file:
-            self.rx_file.close()
-            size = os.path.getsize(self.rx_filename)
-            print(f"💾 Saved {self.rx_filename} ({size} bytes)")
-            
+        if self.reader_thread:
+            self.reader_thread.join(timeout=2.0)
+        if self.writer_thread:
+            self.writer_thread.join()  # drains the queue
+
+        for f in (self.tx_file, self.rx_file):
+            if f:
+                f.close()
+                for name in f.closed:
+                    path = name + ".gz" if os.path.exists(name + ".gz") else name
+                    if os.path.exists(path):
+                        print(f"💾 Saved {path} ({os.path.getsize(path)} bytes)")
+
+        if self.tx_file and self.rx_file:
+            self.print_status()
+            print(f"📊 lines read={self.lines_read}, echo suppressed={self.echo_skipped}")
+
         if self.serial_conn:
             self.serial_conn.close()
             print("🔌 Serial connection closed")
-            
+
     def run(self):
         """Main run method"""
         print(f"📡 LoRa CSV Capture Tool")
@@ -155,17 +345,25 @@ def signal_handler(sig, frame):
 if __name__ == "__main__":
     # Setup signal handler for graceful exit
     signal.signal(signal.SIGINT, signal_handler)
-    
+
     # Parse command line arguments
-    port = sys.argv[1] if len(sys.argv) > 1 else 'COM11'
-    baud = int(sys.argv[2]) if len(sys.argv) > 2 else 115200
-    
+    ap = argparse.ArgumentParser(description="Capture TX_CSV/RX_CSV lines from the ESP32 into Tx_*/Rx_* files.")
+    ap.add_argument("port", nargs="?", default="COM11")
+    ap.add_argument("baud", nargs="?", type=int, default=115200)
+    ap.add_argument("--rotate-mb", type=float, default=0.0, help="Start a new segment after N MB (0 = never)")
+    ap.add_argument("--rotate-min", type=float, default=0.0, help="Start a new segment after N minutes (0 = never)")
+    ap.add_argument("--gzip", action="store_true", help="Compress closed segments")
+    ap.add_argument("--echo-rate", type=float, default=5.0, help="Max data lines echoed per second (0 = none)")
+    ap.add_argument("--queue", type=int, default=QUEUE_LINES, help="Lines buffered before dropping")
+    args = ap.parse_args()
+
     # Create and run CSV capture
-    capture = CSVCapture(port, baud)
+    capture = CSVCapture(args.port, args.baud, rotate_mb=args.rotate_mb, rotate_min=args.rotate_min,
+                         compress=args.gzip, echo_rate=args.echo_rate, queue_lines=args.queue)
     success = capture.run()
-    
+
     if success:
         print("✅ CSV capture completed successfully!")
     else:
         print("❌ CSV capture failed!")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
@@ -3,6 +3,13 @@
 ESP32 CSV File Downloader
 Downloads CSV files from ESP32 LittleFS via serial commands.
 
+'download all' streams tx, rx and timing back to back in one session. Each
+file is written to disk as it arrives and ends on its END marker, whose
+LEN/CRC32 trailer is checked before the file is renamed into place (needs
+the firmware in src/main.cpp). Older firmware does not know 'download all'
+and sends nothing back; if no BEGIN marker arrives within the timeout the
+files are fetched one by one with 'download <type>' instead.
+
 Usage:
     python csv_download.py [COM_PORT] [BAUD_RATE]
     
@@ -14,116 +21,203 @@ import serial
 import time
 import sys
 import os
+import re
+import zlib
 from datetime import datetime
 
+BEGIN_RE = re.compile(rb"^=== BEGIN (\w+) CSV FILE ===")
+END_RE = re.compile(rb"^=== END (\w+) CSV FILE ===(?: LEN=(\d+) CRC32=([0-9A-Fa-f]{8}))?")
+DONE_LINE = b"=== DOWNLOAD DONE ==="
+ERROR_PREFIX = b"[ERROR]"
+CSV_TYPES = ('tx', 'rx', 'timing')
+
+
 class ESP32CSVDownloader:
-    def __init__(self, port='COM9', baud=115200, timeout=5):
+    def __init__(self, port='COM9', baud=115200, timeout=5, idle_timeout=2.0):
         self.port = port
         self.baud = baud
-        self.timeout = timeout
+        self.timeout = timeout            # max wait for the first byte of a reply
+        self.idle_timeout = idle_timeout  # max silence once a transfer is running
         self.serial_conn = None
-        
+        self._buf = bytearray()
+        self.saw_done = False             # last _receive_file stopped on DOWNLOAD DONE
+
     def connect(self):
         """Connect to ESP32"""
         try:
-            self.serial_conn = serial.Serial(self.port, self.baud, timeout=1)
+            self.serial_conn = serial.Serial(self.port, self.baud, timeout=0.05)
             time.sleep(2)  # Wait for ESP32 to be ready
+            self.serial_conn.reset_input_buffer()
             print(f"✅ Connected to {self.port} at {self.baud} baud")
             return True
         except Exception as e:
             print(f"❌ Error connecting: {e}")
             return False
-    
+
+    def _read_line(self, wait):
+        """
+        Next raw line (bytes, newline kept) or None after `wait` seconds of
+        silence. Reads whatever the UART has buffered in one call, so the
+        transfer runs at line speed instead of one readline() per row.
+        """
+        deadline = time.monotonic() + wait
+        while True:
+            nl = self._buf.find(b"\n")
+            if nl >= 0:
+                line = bytes(self._buf[:nl + 1])
+                del self._buf[:nl + 1]
+                return line
+            chunk = self.serial_conn.read(self.serial_conn.in_waiting or 1)
+            if chunk:
+                self._buf += chunk
+                deadline = time.monotonic() + wait
+            elif time.monotonic() >= deadline:
+                return None
+
     def send_command(self, command):
-        """Send command to ESP32 and return response"""
+        """Send command to ESP32 and return the reply lines (ends when the link goes quiet)"""
         if not self.serial_conn:
             return None
-            
+
         print(f"📤 Sending: {command}")
         self.serial_conn.write((command + '\n').encode())
-        time.sleep(0.5)  # Wait for response
-        
+
         response_lines = []
-        start_time = time.time()
-        
-        while time.time() - start_time < self.timeout:
-            if self.serial_conn.in_waiting > 0:
-                line = self.serial_conn.readline().decode('utf-8', errors='ignore').strip()
-                if line:
-                    response_lines.append(line)
-                    print(f"📥 {line}")
-            else:
-                time.sleep(0.1)
-                
+        wait = self.timeout
+        while True:
+            raw = self._read_line(wait)
+            if raw is None:
+                break
+            line = raw.decode('utf-8', errors='ignore').strip()
+            if line:
+                response_lines.append(line)
+                print(f"📥 {line}")
+            wait = 0.5  # reply lines come back to back
+
         return response_lines
-    
-    def download_csv_data(self, csv_type):
-        """Download specific CSV data type (tx, rx, timing)"""
-        command = f"download {csv_type}"
-        response = self.send_command(command)
-        
-        if not response:
-            print(f"⚠️ No response for {csv_type} download")
-            return None
-            
-        # Look for CSV data between BEGIN and END markers
-        csv_data = []
-        recording = False
-        
-        for line in response:
-            if f"BEGIN {csv_type.upper()} CSV FILE" in line:
-                recording = True
-                continue
-            elif f"END {csv_type.upper()} CSV FILE" in line:
-                recording = False
+
+    def _receive_file(self, filenames, until_done=False):
+        """
+        Stream one BEGIN..END block to disk. Returns (csv_type, path, ok), or
+        None when the device reports DONE, goes silent or (for a single
+        download) reports an error. With until_done, [ERROR] lines (missing
+        file) are skipped and the next block is awaited.
+
+        Bytes between the BEGIN line and the END line are written as they
+        arrive, except that the newline the firmware puts in front of the END
+        marker is dropped, so the copy is byte-identical to the LittleFS file
+        and can be checked against the LEN/CRC32 trailer.
+        """
+        self.saw_done = False
+        while True:
+            raw = self._read_line(self.timeout)
+            if raw is None:
+                print("⚠️ Timed out waiting for a file")
+                return None
+            m = BEGIN_RE.match(raw)
+            if m:
                 break
-            elif recording:
-                csv_data.append(line)
-        
-        return csv_data
-    
-    def save_csv_file(self, csv_data, filename):
-        """Save CSV data to file"""
-        if not csv_data:
-            print(f"⚠️ No data to save for {filename}")
-            return False
-            
-        try:
-            with open(filename, 'w', newline='', encoding='utf-8') as f:
-                for line in csv_data:
-                    f.write(line + '\n')
-            
-            size = os.path.getsize(filename)
-            print(f"💾 Saved {filename} ({size} bytes, {len(csv_data)} lines)")
-            return True
-            
-        except Exception as e:
-            print(f"❌ Error saving {filename}: {e}")
-            return False
-    
+            if raw.startswith(ERROR_PREFIX):
+                print(f"⚠️ {raw.decode('utf-8', errors='ignore').strip()}")
+                if not until_done:
+                    return None
+            if raw.strip() == DONE_LINE:
+                self.saw_done = True
+                return None
+
+        csv_type = m.group(1).decode().lower()
+        filename = filenames(csv_type)
+        part = filename + ".part"
+        crc = 0
+        size = 0
+        lines = 0
+        pending = None
+        t0 = time.monotonic()
+        with open(part, 'wb') as f:
+            while True:
+                raw = self._read_line(self.idle_timeout)
+                if raw is None:
+                    print(f"❌ {csv_type.upper()}: link went silent after {size} bytes")
+                    return csv_type, part, False
+                end = END_RE.match(raw)
+                if end:
+                    break
+                if pending is not None:
+                    f.write(pending)
+                    crc = zlib.crc32(pending, crc)
+                    size += len(pending)
+                    lines += 1
+                pending = raw
+            if pending is not None:
+                tail = pending[:-1]  # newline added before the END marker
+                f.write(tail)
+                crc = zlib.crc32(tail, crc)
+                size += len(tail)
+                lines += 1 if tail else 0
+
+        secs = max(time.monotonic() - t0, 1e-6)
+        rate = f"{size / secs / 1024:.1f} KiB/s"
+        if end.group(2) is None:
+            print(f"⚠️ {csv_type.upper()}: no LEN/CRC32 trailer (old firmware), copy not verified")
+            ok = True
+        else:
+            want_len, want_crc = int(end.group(2)), int(end.group(3), 16)
+            ok = (size == want_len and crc == want_crc)
+            if not ok:
+                print(f"❌ {csv_type.upper()}: got {size} bytes CRC32={crc:08X}, "
+                      f"device sent {want_len} bytes CRC32={want_crc:08X}; kept as {part}")
+                return csv_type, part, False
+        os.replace(part, filename)
+        print(f"💾 Saved {filename} ({size} bytes, {lines} lines, {rate})"
+              + (" ✔ CRC32 OK" if end.group(2) is not None else ""))
+        return csv_type, filename, ok
+
+    def download_csv_data(self, csv_type, filename):
+        """Download one CSV data type (tx, rx, timing) straight to `filename`"""
+        print(f"📤 Sending: download {csv_type}")
+        self.serial_conn.write(f"download {csv_type}\n".encode())
+        res = self._receive_file(lambda _t: filename)
+        if res is None:
+            print(f"⚠️ No data for {csv_type} download")
+            return None
+        return res[1] if res[2] else None
+
     def download_all_csv_files(self):
-        """Download all CSV files from ESP32"""
+        """Download tx, rx and timing CSVs in one session ('download all'), one by one on old firmware"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        csv_types = ['tx', 'rx', 'timing']
         downloaded_files = []
-        
+
         # First get info
         print("📊 Getting file info...")
         self.send_command("info")
         print("-" * 50)
-        
-        # Download each CSV type
-        for csv_type in csv_types:
-            filename = f"{csv_type}_data_{timestamp}.csv"
+
+        print("\n📥 Downloading TX, RX and TIMING data...")
+        print("📤 Sending: download all")
+        self.serial_conn.write(b"download all\n")
+        got_block = False
+        while True:
+            res = self._receive_file(lambda t: f"{t}_data_{timestamp}.csv", until_done=True)
+            if res is None:
+                break
+            got_block = True
+            _csv_type, filename, ok = res
+            if ok:
+                downloaded_files.append(filename)
+        if got_block or self.saw_done:
+            return downloaded_files
+
+        print("⚠️ No reply to 'download all' (firmware without it?), downloading one file at a time")
+        self.serial_conn.reset_input_buffer()
+        self._buf.clear()
+        for csv_type in CSV_TYPES:
             print(f"\n📥 Downloading {csv_type.upper()} data...")
-            
-            csv_data = self.download_csv_data(csv_type)
-            if self.save_csv_file(csv_data, filename):
+            filename = self.download_csv_data(csv_type, f"{csv_type}_data_{timestamp}.csv")
+            if filename:
                 downloaded_files.append(filename)
-        
+
         return downloaded_files
-    
+
     def disconnect(self):
         """Close serial connection"""
         if self.serial_conn:
@@ -242,10 +242,27 @@ static void showCsvInfo()
     f.close();
   }
 
-  Serial.println("[CMD] Use 'download tx', 'download rx', 'download timing' to get files");
+  Serial.println("[CMD] Use 'download tx', 'download rx', 'download timing' (or 'download all') to get files");
   Serial.println("[CMD] Use 'clear' to delete all CSV files");
 }
 
+// CRC-32 (IEEE 802.3, same as zlib.crc32) for the download trailer
+static uint32_t crc32Update(uint32_t crc, const uint8_t *data, size_t len)
+{
+  crc = ~crc;
+  while (len--)
+  {
+    crc ^= *data++;
+    for (int k = 0; k < 8; k++)
+      crc = (crc >> 1) ^ (0xEDB88320UL & (0UL - (crc & 1)));
+  }
+  return ~crc;
+}
+
+// Streams the file between BEGIN/END markers. The END line carries a
+// trailer with the byte count and CRC-32 of the file contents so the host
+// can stop on the marker and verify the copy:
+//   === END TX CSV FILE === LEN=<bytes> CRC32=<8 hex digits>
 static void downloadCsvFile(const String &filename, const String &filepath)
 {
   if (!LittleFS.exists(filepath))
@@ -264,11 +281,21 @@ static void downloadCsvFile(const String &filename, const String &filepath)
   String upperFilename = filename;
   upperFilename.toUpperCase();
   Serial.println("=== BEGIN " + upperFilename + " CSV FILE ===");
+  uint8_t buf[256];
+  uint32_t crc = 0;
+  size_t total = 0;
   while (file.available())
   {
-    Serial.write(file.read());
+    size_t n = file.read(buf, sizeof(buf));
+    if (n == 0)
+      break;
+    Serial.write(buf, n);
+    crc = crc32Update(crc, buf, n);
+    total += n;
   }
-  Serial.println("\n=== END " + upperFilename + " CSV FILE ===");
+  char hex[9];
+  snprintf(hex, sizeof(hex), "%08lX", (unsigned long)crc);
+  Serial.println("\n=== END " + upperFilename + " CSV FILE === LEN=" + String((unsigned long)total) + " CRC32=" + String(hex));
 
   file.close();
 }
@@ -999,6 +1026,15 @@ void loop()
         downloadCsvFile("timing", timingCsvPath);
         return;
       }
+      else if (line.equals("download all"))
+      {
+        // tx, rx and timing back to back, then a terminator line
+        downloadCsvFile("tx", txCsvPath);
+        downloadCsvFile("rx", rxCsvPath);
+        downloadCsvFile("timing", timingCsvPath);
+        Serial.println("=== DOWNLOAD DONE ===");
+        return;
+      }
       else if (line.equals("clear"))
       {
         clearCsvFiles();
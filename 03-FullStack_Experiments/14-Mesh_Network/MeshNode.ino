@@ -1050,6 +1050,11 @@ void processSerialCommand()
         serialPrintLn("Session Time: " + String((millis() - sessionStartMs) / 1000) + "s");
         serialPrintLn("================================\n");
     }
+    // Command: PING - host readiness probe (lora_host.ready), no radio traffic
+    else if (line == "PING")
+    {
+        serialPrintLn("[CMD] PONG " + myNodeName);
+    }
     // Command: DISCOVER:<dest> - force route discovery
     else if (line.startsWith("DISCOVER:"))
     {
@@ -1060,7 +1065,7 @@ void processSerialCommand()
     // Plain text message (default destination)
     else
     {
-        serialPrintLn("[CMD] Unknown command. Available: SEND, ROUTES, STATS, DISCOVER");
+        serialPrintLn("[CMD] Unknown command. Available: SEND, ROUTES, STATS, DISCOVER, PING");
     }
 }
 
@@ -1114,6 +1119,7 @@ void setup()
     Serial.println("  ROUTES - Show routing table");
     Serial.println("  STATS - Show statistics");
     Serial.println("  DISCOVER:<dest> - Find route");
+    Serial.println("  PING - Readiness check");
     Serial.println("========================================\n");
 
     // Send initial HELLO
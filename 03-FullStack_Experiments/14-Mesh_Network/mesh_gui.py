@@ -19,6 +19,7 @@ Dependencies:
     pip install pyserial
 """
 
+import math
 import os
 import sys
 import threading
@@ -28,16 +29,160 @@ from pathlib import Path
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 from typing import Optional
 
-import serial
 from serial.tools import list_ports
 
 # Import our mesh network interface
 try:
-    from mesh_network_interface import MeshNetworkInterface, REL_NONE, REL_LOW, REL_MEDIUM, REL_HIGH, REL_CRITICAL
+    from mesh_network_interface import (MeshNetworkInterface, NodeLine,
+                                        REL_NONE, REL_LOW, REL_MEDIUM, REL_HIGH, REL_CRITICAL)
 except ImportError:
     messagebox.showerror("Import Error", "Could not import mesh_network_interface.py\nMake sure it's in the same directory!")
     sys.exit(1)
 
+try:
+    from lora_host import tklog, topology
+except ImportError:  # running from a checkout without the repo root on sys.path
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+    from lora_host import tklog, topology
+
+
+# Log colour tag per node line category (lineparse.classify_mesh)
+MONITOR_TAGS = {
+    "tx": "tx",
+    "rx": "rx",
+    "error": "error",
+    "route": "info",
+    "ack": "success",
+}
+
+
+class TopologyView:
+    """
+    Canvas drawing of a topology.Topology, updated incrementally.
+
+    Nodes get a fixed spot when first seen (golden-angle spacing on an inner
+    ring for neighbours, outer ring for the rest), so nothing moves when the
+    mesh changes. ``refresh()`` redraws only the edges of names the model
+    reports as changed. ``tick()`` rewrites the age labels and fades
+    stale links once a second.
+    """
+    
+    GOLDEN = math.pi * (3 - math.sqrt(5))
+    NODE_R = 16
+    
+    def __init__(self, canvas: tk.Canvas, model: topology.Topology):
+        self.canvas = canvas
+        self.model = model
+        self.slots = {}       # name -> (ring, angle)
+        self.ring_count = [0, 0]
+        self.nodes = {}       # name -> (oval id, text id)
+        self.edges = {}       # (name, kind) -> [line id, label id, a, rssi, updated, hops]
+        self.canvas.bind("<Configure>", lambda _e: self.redraw_all())
+    
+    # ---------- geometry ----------
+    
+    def _pos(self, name: str):
+        w = max(self.canvas.winfo_width(), 100)
+        h = max(self.canvas.winfo_height(), 100)
+        cx, cy = w / 2, h / 2
+        if name == topology.LOCAL:
+            return cx, cy
+        ring, angle = self.slots[name]
+        r = min(w, h) * (0.25 if ring == 0 else 0.42)
+        return cx + r * math.cos(angle), cy + r * math.sin(angle)
+    
+    def _slot(self, name: str, neighbour: bool):
+        if name not in self.slots and name != topology.LOCAL:
+            ring = 0 if neighbour else 1
+            self.slots[name] = (ring, self.ring_count[ring] * self.GOLDEN - math.pi / 2)
+            self.ring_count[ring] += 1
+    
+    # ---------- items ----------
+    
+    def _node(self, name: str):
+        if name in self.nodes:
+            return
+        x, y = self._pos(name)
+        r = self.NODE_R
+        local = name == topology.LOCAL
+        oval = self.canvas.create_oval(x - r, y - r, x + r, y + r, width=2,
+                                       fill="#ffe08a" if local else "#cfe3ff", tags=("node",))
+        label = (self.model.local or "local") if local else name
+        text = self.canvas.create_text(x, y + r + 8, text=label, font=("TkDefaultFont", 8), tags=("node",))
+        self.nodes[name] = (oval, text)
+    
+    def _label(self, kind: str, rssi, updated: float, hops: int, now: float) -> str:
+        age = int(now - updated)
+        if kind == "link":
+            return f"{rssi} dBm · {age}s"
+        rssi_s = f" · {rssi} dBm" if rssi is not None else ""
+        return f"{hops} hop{'s' if hops != 1 else ''}{rssi_s} · {age}s"
+    
+    def _colour(self, kind: str, updated: float, now: float) -> str:
+        age = now - updated
+        if kind == "link":
+            return "#2e8b57" if age < 2 * topology.HELLO_INTERVAL_S else "#a0a0a0"
+        return "#6a5acd" if age < self.model.route_timeout_s / 2 else "#b0a8d8"
+    
+    def _place_edge(self, item, a: str, b: str):
+        (x1, y1), (x2, y2) = self._pos(a), self._pos(b)
+        self.canvas.coords(item[0], x1, y1, x2, y2)
+        self.canvas.coords(item[1], (x1 + x2) / 2, (y1 + y2) / 2 - 7)
+    
+    def refresh(self, names, now: float):
+        """Redraw the edges of ``names`` (the model's change set)."""
+        c = self.canvas
+        self._node(topology.LOCAL)
+        if topology.LOCAL in names:
+            c.itemconfig(self.nodes[topology.LOCAL][1], text=self.model.local or "local")
+        names = [n for n in names if n != topology.LOCAL]
+        current = {(b, kind): (a, rssi, upd) for a, b, kind, rssi, upd in self.model.edges(names)}
+        for name in names:
+            r = self.model.routes.get(name)
+            hops = r.hops if r else 1
+            for kind in ("link", "route"):
+                key = (name, kind)
+                new = current.get(key)
+                old = self.edges.get(key)
+                if new is None:
+                    if old is not None:
+                        c.delete(old[0], old[1])
+                        del self.edges[key]
+                    continue
+                a, rssi, upd = new
+                self._slot(name, kind == "link" or hops <= 1)
+                if a:
+                    self._slot(a, True)
+                    self._node(a)
+                self._node(name)
+                if old is None:
+                    line = c.create_line(0, 0, 0, 0, width=2, dash=() if kind == "link" else (4, 3))
+                    text = c.create_text(0, 0, font=("TkDefaultFont", 7))
+                    c.tag_lower(line)
+                    old = self.edges[key] = [line, text, a, rssi, upd, hops]
+                else:
+                    old[2:] = [a, rssi, upd, hops]
+                self._place_edge(old, a, name)
+                c.itemconfig(old[0], fill=self._colour(kind, upd, now))
+                c.itemconfig(old[1], text=self._label(kind, rssi, upd, hops, now))
+    
+    def tick(self, now: float):
+        """Once a second: ages and colours only, no geometry"""
+        c = self.canvas
+        for (name, kind), (line, text, a, rssi, upd, hops) in self.edges.items():
+            c.itemconfig(text, text=self._label(kind, rssi, upd, hops, now))
+            c.itemconfig(line, fill=self._colour(kind, upd, now))
+    
+    def redraw_all(self):
+        """Canvas resized: move every item (positions scale with the canvas)"""
+        for name, (oval, text) in self.nodes.items():
+            x, y = self._pos(name)
+            r = self.NODE_R
+            self.canvas.coords(oval, x - r, y - r, x + r, y + r)
+            self.canvas.coords(text, x, y + r + 8)
+        for (name, _kind), item in self.edges.items():
+            self._place_edge(item, item[2], name)
+
 
 class MeshNetworkGUI(tk.Tk):
     """Main GUI application for mesh network"""
@@ -56,12 +201,15 @@ class MeshNetworkGUI(tk.Tk):
         self.reliability_var = tk.IntVar(value=REL_MEDIUM)
         self.out_dir_var = tk.StringVar(value="received_files")
         self.file_path_var = tk.StringVar()
+        self.log_level_var = tk.StringVar(value="all")
         
         # Connection state
         self.interface: Optional[MeshNetworkInterface] = None
         self.connected = False
         self.monitoring = False
-        self.monitor_thread = None
+        
+        # Mesh model; the interface feeds it every node line (lora_host.topology)
+        self.topology = topology.Topology()
         
         # Build UI
         self._build_ui()
@@ -187,8 +335,8 @@ class MeshNetworkGUI(tk.Tk):
                                        command=self.discover_route, width=15, state="disabled")
         self.discover_btn.pack(side="left", padx=5)
         
-        self.show_routes_btn = ttk.Button(quick_frame, text="🗺️ Show Routes", 
-                                          command=self.show_routes, width=15, state="disabled")
+        self.show_routes_btn = ttk.Button(quick_frame, text="🗺️ Refresh Routes", 
+                                          command=self.show_routes, width=16, state="disabled")
         self.show_routes_btn.pack(side="left", padx=5)
         
         self.show_stats_btn = ttk.Button(quick_frame, text="📊 Statistics", 
@@ -199,9 +347,12 @@ class MeshNetworkGUI(tk.Tk):
                                       command=self.toggle_monitoring, width=18, state="disabled")
         self.monitor_btn.pack(side="left", padx=5)
         
-        # ============ Log Section ============
-        log_frame = ttk.LabelFrame(main_frame, text="📋 Activity Log", padding="10")
-        log_frame.grid(row=3, column=0, sticky="nsew", pady=(0, 10))
+        # ============ Log + Topology ============
+        panes = ttk.PanedWindow(main_frame, orient="horizontal")
+        panes.grid(row=3, column=0, sticky="nsew", pady=(0, 10))
+        
+        log_frame = ttk.LabelFrame(panes, text="📋 Activity Log", padding="10")
+        panes.add(log_frame, weight=3)
         log_frame.grid_rowconfigure(0, weight=1)
         log_frame.grid_columnconfigure(0, weight=1)
         
@@ -217,6 +368,33 @@ class MeshNetworkGUI(tk.Tk):
         self.log.tag_config("tx", foreground="purple")
         self.log.tag_config("rx", foreground="teal")
         
+        # Threads only enqueue; the queue is rendered in batches at ~30 Hz
+        self.log_view = tklog.LogView(self.log, max_lines=5000, keep_lines=4000)
+        self.log_view.start()
+        
+        level_frame = ttk.Frame(log_frame)
+        level_frame.grid(row=1, column=0, sticky="e", pady=(5, 0))
+        ttk.Label(level_frame, text="Show:").pack(side="left", padx=(0, 5))
+        level_combo = ttk.Combobox(level_frame, textvariable=self.log_level_var, width=10, state="readonly",
+                                   values=("all", "info", "warning", "error"))
+        level_combo.pack(side="left")
+        level_combo.bind("<<ComboboxSelected>>",
+                         lambda _e: self.log_view.set_level(self.log_level_var.get()))
+        ttk.Button(level_frame, text="Clear", command=self.log_view.clear, width=8).pack(side="left", padx=(5, 0))
+        
+        topo_frame = ttk.LabelFrame(panes, text="🕸️ Mesh Topology", padding="10")
+        panes.add(topo_frame, weight=2)
+        topo_frame.grid_rowconfigure(0, weight=1)
+        topo_frame.grid_columnconfigure(0, weight=1)
+        
+        topo_canvas = tk.Canvas(topo_frame, width=320, height=260, background="white", highlightthickness=0)
+        topo_canvas.grid(row=0, column=0, sticky="nsew")
+        self.topo_view = TopologyView(topo_canvas, self.topology)
+        self.topo_stats = ttk.Label(topo_frame, text="No node statistics yet", foreground="gray")
+        self.topo_stats.grid(row=1, column=0, sticky="w", pady=(5, 0))
+        self.after(250, self._topology_refresh)
+        self.after(1000, self._topology_tick)
+        
         # ============ Status Bar ============
         status_frame = ttk.Frame(main_frame)
         status_frame.grid(row=4, column=0, sticky="ew")
@@ -232,13 +410,13 @@ class MeshNetworkGUI(tk.Tk):
         self._log("Please connect to your mesh node to begin.\n", "info")
     
     def _log(self, message: str, tag: str = ""):
-        """Add message to log with optional color tag"""
+        """Queue message for the log with optional color tag (safe from any thread)"""
         timestamp = time.strftime("%H:%M:%S")
-        full_msg = f"[{timestamp}] {message}"
-        
-        self.log.insert("end", full_msg, tag)
-        self.log.see("end")
-        self.log.update()
+        self.log_view.put(f"[{timestamp}] {message}", tag)
+    
+    def _ui(self, fn, *args):
+        """Run fn(*args) on the Tk thread (worker threads must not touch widgets)"""
+        self.after(0, fn, *args)
     
     def refresh_ports(self):
         """Refresh available COM ports"""
@@ -270,8 +448,9 @@ class MeshNetworkGUI(tk.Tk):
             self._log(f"Connecting to {port} @ {baud} baud...\n", "info")
             self.progress_bar.start()
             
-            # Create interface
-            self.interface = MeshNetworkInterface(port, baud)
+            # Create interface; its reader thread is the only one reading the port
+            # and it keeps the topology panel's model (also its route cache) current
+            self.interface = MeshNetworkInterface(port, baud, reader=True, topo=self.topology)
             
             if self.interface.connect():
                 self.connected = True
@@ -288,6 +467,10 @@ class MeshNetworkGUI(tk.Tk):
                 
                 self._log(f"Successfully connected to {port}\n", "success")
                 self._log("Ready to send messages and files!\n", "success")
+                
+                # Seed the topology panel once; node lines keep it current
+                self._request("STATS", show=False)
+                self._request("ROUTES", show=False)
             else:
                 self._log("Connection failed\n", "error")
                 messagebox.showerror("Connection Error", "Failed to connect to mesh node")
@@ -375,18 +558,18 @@ class MeshNetworkGUI(tk.Tk):
                 
                 if success:
                     self._log(f"\n✅ File sent successfully!\n", "success")
-                    messagebox.showinfo("Success", f"File sent to {dest}")
+                    self._ui(messagebox.showinfo, "Success", f"File sent to {dest}")
                 else:
                     self._log(f"\n❌ File send failed\n", "error")
-                    messagebox.showerror("Failed", f"Failed to send file to {dest}")
+                    self._ui(messagebox.showerror, "Failed", f"Failed to send file to {dest}")
             
             except Exception as e:
                 self._log(f"\n❌ Error: {e}\n", "error")
-                messagebox.showerror("Error", f"Send failed:\n{e}")
+                self._ui(messagebox.showerror, "Error", f"Send failed:\n{e}")
             
             finally:
-                self.progress_bar.stop()
-                self._set_tx_state("normal")
+                self._ui(self.progress_bar.stop)
+                self._ui(self._set_tx_state, "normal")
         
         threading.Thread(target=send_thread, daemon=True).start()
     
@@ -426,18 +609,18 @@ class MeshNetworkGUI(tk.Tk):
                 
                 if success:
                     self._log(f"\n✅ Text sent successfully!\n", "success")
-                    self.text_input.delete("1.0", "end")
+                    self._ui(self.text_input.delete, "1.0", "end")
                 else:
                     self._log(f"\n❌ Text send failed\n", "error")
-                    messagebox.showerror("Failed", f"Failed to send text to {dest}")
+                    self._ui(messagebox.showerror, "Failed", f"Failed to send text to {dest}")
             
             except Exception as e:
                 self._log(f"\n❌ Error: {e}\n", "error")
-                messagebox.showerror("Error", f"Send failed:\n{e}")
+                self._ui(messagebox.showerror, "Error", f"Send failed:\n{e}")
             
             finally:
-                self.progress_bar.stop()
-                self._set_tx_state("normal")
+                self._ui(self.progress_bar.stop)
+                self._ui(self._set_tx_state, "normal")
         
         threading.Thread(target=send_thread, daemon=True).start()
     
@@ -465,18 +648,19 @@ class MeshNetworkGUI(tk.Tk):
                     self._log(f"❌ Route discovery failed\n", "error")
             
             finally:
-                self.progress_bar.stop()
+                self._ui(self.progress_bar.stop)
         
         threading.Thread(target=discover_thread, daemon=True).start()
     
     def show_routes(self):
-        """Show routing table"""
+        """Refresh the topology panel from the node's routing table"""
         if not self.connected:
             messagebox.showerror("Error", "Not connected to mesh node")
             return
         
-        self._log(f"\n🗺️ Requesting routing table...\n", "info")
-        self.interface.show_routes()
+        # The reply updates the panel as it arrives; HELLO/[ROUTE] lines keep it current
+        self._log(f"\n🗺️ Refreshing routing table...\n", "info")
+        self._request("ROUTES", show=False)
     
     def show_stats(self):
         """Show node statistics"""
@@ -485,7 +669,40 @@ class MeshNetworkGUI(tk.Tk):
             return
         
         self._log(f"\n📊 Requesting node statistics...\n", "info")
-        self.interface.show_stats()
+        self._request("STATS")
+    
+    def _request(self, command: str, show: bool = True):
+        """Send a command in the background; optionally log its reply lines"""
+        interface = self.interface
+        
+        def request_thread():
+            # Waits behind any SEND in progress; the node runs one command at a time
+            lines = interface.request(command, 1.0 if show else 0.0)
+            if lines is None:
+                self._log(f"❌ {command} could not be sent\n", "error")
+            elif show and not self.monitoring:  # the monitor view already shows them
+                for line in lines:
+                    self._log(f"{line}\n")
+        
+        threading.Thread(target=request_thread, daemon=True).start()
+    
+    def _topology_refresh(self):
+        changed = self.topology.take_changes()
+        if changed:
+            self.topo_view.refresh(changed, time.monotonic())
+            if topology.LOCAL in changed:
+                st = self.topology.stats
+                self.topo_stats.config(
+                    text=f"TX {st.get('TX Packets', '?')} · RX {st.get('RX Packets', '?')} · "
+                         f"relayed {st.get('Relayed', '?')} · queue {st.get('Queue Size', '?')}",
+                    foreground="black")
+        self.after(250, self._topology_refresh)
+    
+    def _topology_tick(self):
+        now = time.monotonic()
+        self.topology.expire(now)
+        self.topo_view.tick(now)
+        self.after(1000, self._topology_tick)
     
     def toggle_monitoring(self):
         """Start or stop network monitoring"""
@@ -503,36 +720,18 @@ class MeshNetworkGUI(tk.Tk):
         self.monitor_btn.config(text="⏹️ Stop Monitor")
         self._log(f"\n👁️ Starting network monitoring...\n", "info")
         
-        def monitor_thread():
-            while self.monitoring and self.connected:
-                if self.interface.ser.in_waiting:
-                    try:
-                        line = self.interface.ser.readline().decode(errors='ignore').strip()
-                        if line:
-                            # Determine tag based on content
-                            if "[TX]" in line or "Sent" in line:
-                                tag = "tx"
-                            elif "[RX]" in line or "Received" in line:
-                                tag = "rx"
-                            elif "[ERR]" in line or "failed" in line.lower():
-                                tag = "error"
-                            elif "[ROUTE]" in line:
-                                tag = "info"
-                            else:
-                                tag = ""
-                            
-                            self._log(f"{line}\n", tag)
-                    except Exception:
-                        pass
-                
-                time.sleep(0.01)
-        
-        self.monitor_thread = threading.Thread(target=monitor_thread, daemon=True)
-        self.monitor_thread.start()
+        # Lines come from the interface's reader thread, parsed once
+        self.interface.subscribe(self._on_node_line)
+    
+    def _on_node_line(self, msg: NodeLine):
+        """Reader-thread callback: queue one node line for the monitor view"""
+        self._log(f"{msg.line}\n", MONITOR_TAGS.get(msg.kind, ""))
     
     def stop_monitoring(self):
         """Stop monitoring network activity"""
         self.monitoring = False
+        if self.interface:
+            self.interface.unsubscribe(self._on_node_line)
         self.monitor_btn.config(text="👁️ Monitor Network")
         self._log(f"\n⏹️ Stopped network monitoring\n", "warning")
     
@@ -25,23 +25,36 @@ Usage:
     # Monitor network activity
     python mesh_network_interface.py COM9 --monitor
 
+    # Several short messages, packed into as few packets as possible
+    python mesh_network_interface.py COM9 --dest Node_2 --coalesce-ms 200 \
+        --send-text "t=21.4" --send-text "h=40" --send-text "p=1013"
+
 Dependencies:
     pip install pyserial
 """
 
 import argparse
-import base64
 import hashlib
 import mimetypes
 import os
+import queue
 import sys
+import threading
 import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import Callable, Deque, Optional, Dict, List
 
 import serial
 
+try:
+    from lora_host import coalesce, lineparse, metrics, ready, textcodec, topology, trace
+except ImportError:  # running from a checkout: use the repo-root package
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+    from lora_host import coalesce, lineparse, metrics, ready, textcodec, topology, trace
+
 # ==================== CONFIGURATION ====================
 
 # Reliability levels (must match Arduino enum)
@@ -74,6 +87,9 @@ FILE_RELIABILITY_MAP = {
     '.gz': REL_HIGH,
 }
 
+# Longest text send_text puts in one SEND: (also the BATCH: payload limit)
+SINGLE_PACKET_CHARS = coalesce.MAX_CHARS
+
 # Chunk size for fragmentation (characters)
 # Small chunks for better reliability over mesh
 CHUNK_SIZE = 150  # ~150 chars = ~200 bytes with headers
@@ -82,6 +98,17 @@ CHUNK_SIZE = 150  # ~150 chars = ~200 bytes with headers
 CHUNK_SEND_TIMEOUT = 60.0  # seconds per chunk
 ROUTE_DISCOVERY_TIMEOUT = 10.0  # seconds for route discovery
 
+# Monitor display prefix per line category (see lineparse.classify_mesh)
+MONITOR_PREFIX = {
+    "tx": "→",
+    "rx": "←",
+    "relay": "↔",
+    "route": "☆",
+    "error": "✗",
+    "ack": "✓",
+    "other": " ",
+}
+
 # ==================== DATA STRUCTURES ====================
 
 @dataclass
@@ -113,58 +140,359 @@ class TransmissionStats:
         return (self.total_bytes * 8) / self.duration
 
 
+@dataclass
+class NodeLine:
+    """One line from the node, parsed once by the reader thread"""
+    line: str
+    ev: object    # lineparse event, BadLine or None
+    kind: str     # lineparse.classify_mesh category
+    t: float      # time.monotonic() when read
+
+
+class _PendingSend:
+    """A SEND: command waiting for its [CMD] Send completed/failed line"""
+    __slots__ = ("fut", "started")
+
+    def __init__(self):
+        self.fut: Future = Future()
+        self.started = False  # node printed "[CMD] Sending to ..." for it
+
+
 class MeshNetworkInterface:
-    """High-level interface for LoRa mesh network communication"""
+    """
+    High-level interface for LoRa mesh network communication.
+
+    By default every method reads the port itself, which is fine for the
+    one-shot CLI. With ``reader=True`` (the GUI) ``connect()`` starts a
+    single reader thread instead: each line is read and parsed once, then
+    settles the pending SEND / DISCOVER futures and is published to
+    ``subscribe()``d callbacks, so concurrent operations never steal each
+    other's completion lines.
+
+    The node handles one serial command at a time and answers a SEND with
+    "[CMD] Sending to ..." and then exactly one "[CMD] Send completed" /
+    "[CMD] Send failed", so pending sends are matched in FIFO order.
+
+    Every line read also updates ``topo`` (lora_host.topology), which doubles
+    as a host-side route cache: ``discover_route`` answers from it while the
+    node's route is younger than ROUTE_TIMEOUT_MS, and only floods a
+    DISCOVER on a miss or after a send to that destination failed.
+
+    With ``coalesce_ms > 0``, short ``send_text`` messages are held for up
+    to that long and packed with others for the same destination into one
+    ``BATCH:`` payload (lora_host.coalesce), one header and one ACK for
+    all of them. ``send_text_async`` returns a per-message Future.
+    """
     
-    def __init__(self, port: str, baudrate: int = 115200):
+    def __init__(self, port: str, baudrate: int = 115200, tracer: Optional[trace.Tracer] = None,
+                 reader: bool = False, topo: Optional[topology.Topology] = None,
+                 coalesce_ms: float = 0.0, probe: bool = True, reset: bool = False):
         self.port = port
         self.baudrate = baudrate
         self.ser: Optional[serial.Serial] = None
         self.stats = TransmissionStats()
+        self.tr = tracer or trace.NULL
+        self.probe = probe   # PING readiness probe instead of the fixed boot wait
+        self.reset = reset   # reboot the node on connect (default: keep it running)
+        self.topo = topo or topology.Topology()
+        self._routes_synced = False  # ROUTES read once since connect
+
+        # Single-reader mode (see class docstring)
+        self.use_reader = reader
+        self._reader: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._subs: List[Callable[[NodeLine], None]] = []
+        self._pend_lock = threading.Lock()
+        self._sends: Deque[_PendingSend] = deque()
+        self._routes: Dict[str, List[Future]] = {}
+        # One command in flight: a SEND blocks the node's serial loop until it completes
+        self._cmd_lock = threading.Lock()
+
+        # Opt-in small-message batching (see class docstring)
+        self.coalesce_ms = coalesce_ms
+        self._coalescer: Optional[coalesce.Coalescer] = None
+
+        # Running totals across transfers (see lora_host.metrics)
+        reg = metrics.REGISTRY
+        p = (port,)
+        self._m_lines = reg.counter('mesh_iface_lines_total', 'Serial lines read from the node', ('port',)).labels(*p)
+        self._m_bytes_in = reg.counter('mesh_iface_bytes_in_total', 'Bytes read from the serial port', ('port',)).labels(*p)
+        self._m_bytes_out = reg.counter('mesh_iface_bytes_out_total', 'Bytes written to the serial port', ('port',)).labels(*p)
+        self._m_node_errors = reg.counter('mesh_iface_node_errors_total', 'Node lines classified as errors', ('port',)).labels(*p)
+        self._m_chunks = reg.counter('mesh_iface_chunks_total', 'SEND commands by outcome', ('port', 'result'))
+        self._m_chunk_latency = reg.histogram('mesh_iface_chunk_latency_seconds', 'SEND command to [CMD] Send completed/failed', ('port',)).labels(*p)
+        self._m_route_discovery = reg.histogram('mesh_iface_route_discovery_seconds', 'DISCOVER to RREP', ('port',)).labels(*p)
+        self._m_transfer_bps = reg.gauge('mesh_iface_last_transfer_bps', 'Throughput of the last fragmented transfer', ('port',)).labels(*p)
+        self._m_route_cache = reg.counter('mesh_iface_route_cache_total', 'discover_route answered from the route cache (hit) or by DISCOVER (miss)', ('port', 'result'))
+        self._m_batched = reg.counter('mesh_iface_batched_messages_total', 'Text messages sent inside a multi-message BATCH: payload', ('port',)).labels(*p)
         
     def connect(self):
-        """Open serial connection to mesh node"""
+        """Open serial connection to mesh node (a no-op if already connected)"""
+        if self.ser is not None and self.ser.is_open:
+            return True
         try:
-            self.ser = serial.Serial(self.port, self.baudrate, timeout=1)
-            time.sleep(2.0)  # Wait for ESP32 to initialize
-            print(f"[INFO] Connected to {self.port} @ {self.baudrate} baud")
-            
-            # Clear boot messages
-            boot_deadline = time.time() + 2.0
-            while time.time() < boot_deadline:
-                if self.ser.in_waiting:
-                    line = self.ser.readline().decode(errors='ignore').strip()
-                    if line:
-                        print(f"[NODE] {line}")
+            if not self.probe:
+                self.ser = serial.Serial(self.port, self.baudrate, timeout=1)
+                time.sleep(2.0)  # Wait for ESP32 to initialize
+                print(f"[INFO] Connected to {self.port} @ {self.baudrate} baud")
+                
+                # Clear boot messages
+                boot_deadline = time.time() + 2.0
+                while time.time() < boot_deadline:
+                    if self.ser.in_waiting:
+                        line = self._readline()
+                        if line:
+                            print(f"[NODE] {line}")
+            else:
+                # Keep DTR/RTS inactive so opening does not reboot the node,
+                # then PING until it answers
+                self.ser = ready.open_port(self.port, self.baudrate, timeout=1, reset=self.reset)
+                print(f"[INFO] Connected to {self.port} @ {self.baudrate} baud")
+                r = ready.wait_ready(self.ser, ready.PING, ready.MESH_READY, on_line=self._boot_line)
+                if r.ready:
+                    print(f"[INFO] Node {r.describe()}")
+                else:
+                    print(f"[WARN] Node gave {r.describe()}; continuing anyway")
             
+            if self.use_reader:
+                self.start_reader()
             return True
         except Exception as e:
             print(f"[ERROR] Failed to connect: {e}")
             return False
     
+    def _boot_line(self, line: str):
+        # Lines seen while probing get the same bookkeeping as _readline
+        self._m_lines.inc()
+        self._m_bytes_in.inc(len(line) + 2)
+        if self.tr.enabled:
+            self.tr.rx(line)
+        self.topo.feed(line)
+        print(f"[NODE] {line}")
+
     def disconnect(self):
         """Close serial connection"""
+        if self._coalescer is not None:
+            self._coalescer.close(CHUNK_SEND_TIMEOUT)
+            self._coalescer = None
+        self.stop_reader()
+        self._routes_synced = False
         if self.ser and self.ser.is_open:
             self.ser.close()
             print("[INFO] Disconnected")
+
+    # ---------- single reader ----------
+
+    def start_reader(self):
+        """Start the reader thread; from now on only it reads the port."""
+        if self._reader is not None:
+            return
+        self._stop.clear()
+        self._reader = threading.Thread(target=self._reader_loop, name="mesh-reader", daemon=True)
+        self._reader.start()
+
+    def stop_reader(self):
+        if self._reader is None:
+            return
+        self._stop.set()
+        self._reader.join(timeout=2.0)
+        self._reader = None
+        self._abandon_pending("reader stopped")
+
+    def subscribe(self, fn: Callable[[NodeLine], None]) -> Callable[[NodeLine], None]:
+        """Call ``fn(NodeLine)`` from the reader thread for every line; keep it short."""
+        self._subs = self._subs + [fn]
+        return fn
+
+    def unsubscribe(self, fn: Callable[[NodeLine], None]):
+        self._subs = [f for f in self._subs if f != fn]
+
+    def _reader_loop(self):
+        while not self._stop.is_set():
+            try:
+                line = self._readline()
+            except Exception as e:
+                if not self._stop.is_set():
+                    print(f"[ERROR] Serial read failed: {e}")
+                    self._abandon_pending("read error")
+                break
+            if line:
+                self._publish(line)
+
+    def _publish(self, line: str):
+        ev = lineparse.parse_line(line)
+        kind = lineparse.classify_mesh(line)
+        if kind == "error":
+            self._m_node_errors.inc()
+        if self.tr.enabled and ev is not None:
+            self.tr.parsed(ev)
+        self.topo.feed(line, ev)
+        self._settle(line, ev)
+        msg = NodeLine(line, ev, kind, time.monotonic())
+        for fn in self._subs:
+            try:
+                fn(msg)
+            except Exception as e:
+                print(f"[WARN] Line subscriber failed: {e}")
+
+    def _settle(self, line: str, ev):
+        """Resolve pending SEND / DISCOVER futures from one node line."""
+        with self._pend_lock:
+            sends = self._sends
+            if line.startswith("[CMD] Sending to "):
+                # A newer SEND started, so any older one lost its result line
+                while sends and sends[0].started:
+                    sends.popleft().fut.set_result("lost")
+                if sends:
+                    sends[0].started = True
+            elif isinstance(ev, lineparse.SendResult) and line.startswith("[CMD]"):
+                if sends:
+                    sends.popleft().fut.set_result("ok" if ev.ok else "failed")
+            elif line.startswith("[ERR] Invalid SEND"):
+                if sends:
+                    sends.popleft().fut.set_result("failed")
+            elif isinstance(ev, lineparse.RouteReply):
+                for fut in self._routes.pop(ev.src, ()):
+                    fut.set_result("ok")
+            elif line.startswith("[TX] Route discovery failed for "):
+                for fut in self._routes.pop(line[32:].strip(), ()):
+                    fut.set_result("failed")
+
+    def _abandon_pending(self, reason: str):
+        with self._pend_lock:
+            while self._sends:
+                self._sends.popleft().fut.set_result(reason)
+            for futs in self._routes.values():
+                for fut in futs:
+                    fut.set_result(reason)
+            self._routes.clear()
+
+    def request(self, command: str, seconds: float = 1.0) -> Optional[List[str]]:
+        """
+        Send a command with a printed reply (ROUTES, STATS) and return the
+        lines the node printed during the next ``seconds``; None if the
+        write failed.
+        """
+        if self._reader is None:
+            with self._cmd_lock:
+                if not self.send_command(command):
+                    return None
+            time.sleep(seconds)
+            out = []
+            while self.ser.in_waiting:
+                line = self._readline()
+                if line:
+                    out.append(line)
+            return out
+
+        q: "queue.SimpleQueue[NodeLine]" = queue.SimpleQueue()
+        fn = self.subscribe(q.put)
+        try:
+            with self._cmd_lock:
+                if not self.send_command(command):
+                    return None
+            time.sleep(seconds)
+        finally:
+            self.unsubscribe(fn)
+        out = []
+        while not q.empty():
+            out.append(q.get_nowait().line)
+        return out
     
+    def _readline(self) -> str:
+        raw = self.ser.readline()
+        if raw:
+            self._m_bytes_in.inc(len(raw))
+            self._m_lines.inc()
+        line = raw.decode(errors='ignore').strip()
+        if line:
+            if self.tr.enabled:
+                self.tr.rx(line)
+            if self._reader is None:  # the reader thread feeds it from _publish
+                self.topo.feed(line)
+        return line
+
     def send_command(self, command: str) -> bool:
         """Send a command to the mesh node"""
         try:
-            self.ser.write((command + '\n').encode())
+            data = (command + '\n').encode()
+            self.ser.write(data)
             self.ser.flush()
+            self._m_bytes_out.inc(len(data))
+            if self.tr.enabled:
+                self.tr.tx(data)
             return True
         except Exception as e:
             print(f"[ERROR] Failed to send command: {e}")
             return False
     
+    def send_and_wait(self, command: str, timeout: float = CHUNK_SEND_TIMEOUT) -> str:
+        """
+        Send a SEND: command and wait for the node's verdict.
+        Returns 'ok', 'failed', 'timeout', 'error' (write failed) or, in
+        reader mode, 'lost' when the result line never arrived.
+        """
+        with self._cmd_lock:
+            if self._reader is None:
+                if not self.send_command(command):
+                    return 'error'
+                return self._read_send_result(timeout)
+
+            pending = _PendingSend()
+            with self._pend_lock:
+                self._sends.append(pending)
+            if not self.send_command(command):
+                with self._pend_lock:
+                    if pending in self._sends:
+                        self._sends.remove(pending)
+                return 'error'
+            try:
+                return pending.fut.result(timeout)
+            except FutureTimeout:
+                # Left queued: a late result still pairs with this SEND
+                return 'timeout'
+
+    def _read_send_result(self, timeout: float) -> str:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.ser.in_waiting:
+                line = self._readline()
+                if line:
+                    print(f"[NODE] {line}")
+                    if "[CMD] Send completed" in line:
+                        return 'ok'
+                    # "[TX] Failed ..." precedes "[CMD] Send failed"; wait for the
+                    # verdict so it is not left behind for the next SEND
+                    if "[CMD] Send failed" in line or line.startswith("[ERR] Invalid SEND"):
+                        return 'failed'
+        return 'timeout'
+
     def wait_for_response(self, expected: str, timeout: float) -> bool:
         """Wait for expected response from node"""
         deadline = time.time() + timeout
         
+        if self._reader is not None:
+            q: "queue.SimpleQueue[NodeLine]" = queue.SimpleQueue()
+            fn = self.subscribe(q.put)
+            try:
+                while True:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return False
+                    try:
+                        line = q.get(timeout=remaining).line
+                    except queue.Empty:
+                        return False
+                    if expected in line:
+                        return True
+                    if "[ERR]" in line or "failed" in line.lower():
+                        return False
+            finally:
+                self.unsubscribe(fn)
+        
         while time.time() < deadline:
             if self.ser.in_waiting:
-                line = self.ser.readline().decode(errors='ignore').strip()
+                line = self._readline()
                 if line:
                     print(f"[NODE] {line}")
                     
@@ -177,60 +505,199 @@ class MeshNetworkInterface:
         
         return False
     
-    def discover_route(self, dest: str) -> bool:
-        """Initiate route discovery to destination"""
+    # ---------- route cache ----------
+
+    def refresh_routes(self) -> bool:
+        """Read the node's ROUTES table into the cache (serial only, no radio)."""
+        lines = self.request("ROUTES", 1.0)
+        if lines is None:
+            return False
+        self._routes_synced = True
+        return True
+
+    def cached_route(self, dest: str) -> Optional[topology.Route]:
+        """The node's route to dest if still fresh; syncs from ROUTES once on the first miss."""
+        r = self.topo.route(dest)
+        if r is None and not self._routes_synced:
+            self.refresh_routes()
+            r = self.topo.route(dest)
+        return r
+
+    def discover_route(self, dest: str, force: bool = False) -> bool:
+        """Make sure the node has a route to dest; DISCOVER only on a cache miss (or force)"""
+        if not force:
+            r = self.cached_route(dest)
+            if r is not None:
+                self._m_route_cache.labels(self.port, 'hit').inc()
+                age = time.monotonic() - r.updated
+                via = f"via {r.next_hop}, " if r.next_hop else ""
+                print(f"[INFO] Route to {dest} cached ({via}{r.hops} hops, {age:.0f}s old)")
+                return True
+            self._m_route_cache.labels(self.port, 'miss').inc()
+        
         print(f"[INFO] Discovering route to {dest}...")
         
+        if self._reader is not None:
+            return self._discover_via_reader(dest)
+        
         if not self.send_command(f"DISCOVER:{dest}"):
             return False
         
         # Wait for route to be established
+        cid = self.tr.new_id("r") if self.tr.enabled else ""
+        if cid:
+            self.tr.emit("send", cid=cid, what="discover", dest=dest)
+        t0 = time.monotonic()
         deadline = time.time() + ROUTE_DISCOVERY_TIMEOUT
         
         while time.time() < deadline:
             if self.ser.in_waiting:
-                line = self.ser.readline().decode(errors='ignore').strip()
+                line = self._readline()
                 if line:
                     print(f"[NODE] {line}")
                     
                     if "[RREP]" in line and dest in line:
+                        self._m_route_discovery.observe(time.monotonic() - t0)
+                        if cid:
+                            self.tr.emit("done", cid=cid, ok=True)
                         print(f"[INFO] Route to {dest} established")
                         return True
                     
                     if "Route discovery failed" in line:
+                        if cid:
+                            self.tr.emit("done", cid=cid, ok=False, reason="failed")
                         print(f"[ERROR] Route discovery failed")
                         return False
         
+        if cid:
+            self.tr.emit("done", cid=cid, ok=False, reason="timeout")
         print(f"[WARN] Route discovery timeout")
         return False
+
+    def _discover_via_reader(self, dest: str) -> bool:
+        fut: Future = Future()
+        with self._pend_lock:
+            self._routes.setdefault(dest, []).append(fut)
+        with self._cmd_lock:
+            sent = self.send_command(f"DISCOVER:{dest}")
+        if not sent:
+            with self._pend_lock:
+                if fut in self._routes.get(dest, ()):
+                    self._routes[dest].remove(fut)
+            return False
+        cid = self.tr.new_id("r") if self.tr.enabled else ""
+        if cid:
+            self.tr.emit("send", cid=cid, what="discover", dest=dest)
+        t0 = time.monotonic()
+        try:
+            result = fut.result(ROUTE_DISCOVERY_TIMEOUT)
+        except FutureTimeout:
+            result = "timeout"
+            with self._pend_lock:
+                waiters = self._routes.get(dest, [])
+                if fut in waiters:
+                    waiters.remove(fut)
+                if not waiters:
+                    self._routes.pop(dest, None)
+        if cid:
+            self.tr.emit("done", cid=cid, ok=result == "ok", reason=result)
+        if result == "ok":
+            self._m_route_discovery.observe(time.monotonic() - t0)
+            print(f"[INFO] Route to {dest} established")
+            return True
+        if result == "timeout":
+            print("[WARN] Route discovery timeout")
+        else:
+            print(f"[ERROR] Route discovery failed ({result})")
+        return False
     
     def send_text(self, dest: str, text: str, reliability: int = REL_LOW) -> bool:
         """Send a text message"""
+        if self._batchable(text):
+            return self.send_text_async(dest, text, reliability).result() == 'ok'
+
         print(f"\n[TX] Sending text to {dest} (rel={reliability})")
         print(f"[TX] Message: {text[:100]}{'...' if len(text) > 100 else ''}")
         
         # Check if message fits in single packet
         # Format: SEND:<dest>:<rel>:<data>
         # Rough estimate: 200 bytes available for data
-        if len(text) <= 150:
+        if len(text) <= SINGLE_PACKET_CHARS:
             # Single packet
-            command = f"SEND:{dest}:{reliability}:{text}"
-            if not self.send_command(command):
-                return False
-            
-            # Wait for completion
-            if self.wait_for_response("[CMD] Send completed", CHUNK_SEND_TIMEOUT):
+            ok = self._send_packet(dest, reliability, text, 1) == 'ok'
+            if ok:
                 print(f"[TX] Message sent successfully")
-                return True
             else:
                 print(f"[TX] Message send failed")
-                return False
+            return ok
         else:
             # Need fragmentation
             return self.send_fragmented_data(dest, text, reliability, is_binary=False)
+
+    def send_text_async(self, dest: str, text: str, reliability: int = REL_LOW,
+                        on_done: Optional[Callable[[str], None]] = None) -> Future:
+        """
+        Queue a short text for the next batch to ``dest``. The Future (and
+        ``on_done``, called on the batching thread) gets the result of the
+        packet that carried it: 'ok', 'failed', 'timeout', 'error' or 'lost'.
+        Without coalescing, or for a text too long to batch, the message is
+        sent right away and the returned Future is already done.
+        """
+        if not self._batchable(text):
+            fut: Future = Future()
+            if on_done is not None:
+                fut.add_done_callback(lambda f: on_done(f.result()))
+            fut.set_result('ok' if self.send_text(dest, text, reliability) else 'failed')
+            return fut
+        if self._coalescer is None:
+            self._coalescer = coalesce.Coalescer(self._send_batch, self.coalesce_ms / 1000.0,
+                                                 SINGLE_PACKET_CHARS)
+        print(f"[TX] Queued text for {dest} (rel={reliability}): {text[:60]}{'...' if len(text) > 60 else ''}")
+        return self._coalescer.submit(dest, reliability, text, on_done)
+
+    def _batchable(self, text: str) -> bool:
+        return self.coalesce_ms > 0 and len(text) <= SINGLE_PACKET_CHARS and "\n" not in text
+
+    def flush_texts(self):
+        """Send any batched texts now instead of after the linger time."""
+        if self._coalescer is not None:
+            self._coalescer.flush()
+
+    def _send_batch(self, dest: str, reliability: int, payload: str, count: int) -> str:
+        print(f"\n[TX] Sending {count} message(s) to {dest} in one packet "
+              f"({len(payload)} chars, rel={reliability})")
+        result = self._send_packet(dest, reliability, payload, count)
+        if count > 1:
+            self._m_batched.inc(count)
+        print(f"[TX] Batch {'sent successfully' if result == 'ok' else 'failed (' + result + ')'}")
+        return result
+
+    def _send_packet(self, dest: str, reliability: int, payload: str, count: int) -> str:
+        """One SEND: of a text payload carrying ``count`` messages."""
+        command = f"SEND:{dest}:{reliability}:{payload}"
+
+        cid = self.tr.new_id("m") if self.tr.enabled else ""
+        if cid:
+            self.tr.emit("send", cid=cid, what="text", dest=dest, rel=reliability, n=len(payload), msgs=count)
+        t0 = time.monotonic()
+        result = self.send_and_wait(command, CHUNK_SEND_TIMEOUT)
+        if result == 'error':
+            if cid:
+                self.tr.emit("done", cid=cid, ok=False, reason=result)
+            return result
+        ok = result == 'ok'
+        self._m_chunk_latency.observe(time.monotonic() - t0)
+        if cid:
+            self.tr.emit("done", cid=cid, ok=ok, reason=result)
+        self._m_chunks.labels(self.port, 'ok' if ok else 'failed').inc()
+        if not ok:
+            # The next discover_route() must not trust the cached route
+            self.topo.invalidate(dest)
+        return result
     
-    def send_file(self, dest: str, filepath: str, reliability: Optional[int] = None) -> bool:
-        """Send a file through the mesh network"""
+    def send_file(self, dest: str, filepath: str, reliability: Optional[int] = None,
+                  encoding: str = textcodec.DEFAULT) -> bool:
+        """Send a file through the mesh network (data encoded with lora_host.textcodec)"""
         path = Path(filepath)
         
         if not path.is_file():
@@ -254,14 +721,18 @@ class MeshNetworkInterface:
             print(f"[ERROR] Failed to read file: {e}")
             return False
         
-        # Encode as base64
-        b64_data = base64.b64encode(raw_data).decode('ascii')
+        # Encode as text (base64 unless another encoding was asked for)
+        try:
+            enc_data = textcodec.encode(raw_data, encoding)
+        except ValueError as e:
+            print(f"[ERROR] {e}")
+            return False
         
         # Prepare metadata
         metadata = f"FILE:{path.name}:{len(raw_data)}:"
-        full_data = metadata + b64_data
+        full_data = metadata + enc_data
         
-        print(f"[TX] Base64 length: {len(b64_data)} chars")
+        print(f"[TX] Encoded length ({encoding}): {len(enc_data)} chars")
         print(f"[TX] Total length: {len(full_data)} chars")
         
         # Send fragmented
@@ -286,6 +757,12 @@ class MeshNetworkInterface:
         self.stats.total_bytes = len(data)
         self.stats.start_time = time.time()
         
+        tr = self.tr
+        cid = tr.new_id("t") if tr.enabled else ""
+        if cid:
+            tr.emit("send", cid=cid, what="transfer", dest=dest, rel=reliability, chunks=total_chunks,
+                    n=len(data))
+
         # Send chunks
         for idx, chunk in enumerate(chunks):
             print(f"\n[TX] Chunk {idx+1}/{total_chunks} ({len(chunk)} chars)")
@@ -296,33 +773,32 @@ class MeshNetworkInterface:
             
             # Send via SEND command
             command = f"SEND:{dest}:{reliability}:{chunk_msg}"
+            if cid:
+                tr.emit("send", cid=f"{cid}.{idx}", what="chunk")
             
-            if not self.send_command(command):
+            # Send and wait for this chunk to complete
+            t0 = time.monotonic()
+            result = self.send_and_wait(command, CHUNK_SEND_TIMEOUT)
+            if result == 'error':
                 print(f"[TX] Failed to send command for chunk {idx+1}")
                 self.stats.failed_chunks += 1
                 continue
             
-            # Wait for this chunk to complete
-            deadline = time.time() + CHUNK_SEND_TIMEOUT
-            success = False
-            
-            while time.time() < deadline:
-                if self.ser.in_waiting:
-                    line = self.ser.readline().decode(errors='ignore').strip()
-                    if line:
-                        print(f"[NODE] {line}")
-                        
-                        if "[CMD] Send completed" in line:
-                            print(f"[TX] Chunk {idx+1}/{total_chunks} sent successfully")
-                            self.stats.sent_chunks += 1
-                            success = True
-                            break
-                        
-                        if "[CMD] Send failed" in line or "[TX] Failed" in line:
-                            print(f"[TX] Chunk {idx+1}/{total_chunks} failed")
-                            self.stats.failed_chunks += 1
-                            break
+            success = result == 'ok'
+            if success:
+                print(f"[TX] Chunk {idx+1}/{total_chunks} sent successfully")
+                self.stats.sent_chunks += 1
+            else:
+                self.topo.invalidate(dest)
+                if result != 'timeout':
+                    print(f"[TX] Chunk {idx+1}/{total_chunks} failed ({result})")
+                    self.stats.failed_chunks += 1
             
+            self._m_chunk_latency.observe(time.monotonic() - t0)
+            self._m_chunks.labels(self.port, result).inc()
+            if cid:
+                tr.emit("done", cid=f"{cid}.{idx}", ok=success, reason=result)
+
             if not success and self.stats.failed_chunks == 0:
                 print(f"[TX] Timeout for chunk {idx+1}")
                 self.stats.failed_chunks += 1
@@ -335,10 +811,16 @@ class MeshNetworkInterface:
             if self.stats.failed_chunks > total_chunks * 0.3:  # More than 30% failed
                 print(f"\n[ERROR] Too many failures ({self.stats.failed_chunks}), aborting")
                 self.stats.end_time = time.time()
+                if cid:
+                    tr.emit("done", cid=cid, ok=False, sent=self.stats.sent_chunks, failed=self.stats.failed_chunks)
                 return False
         
         # Transmission complete
         self.stats.end_time = time.time()
+        self._m_transfer_bps.set(self.stats.throughput_bps)
+        if cid:
+            tr.emit("done", cid=cid, ok=self.stats.failed_chunks == 0, sent=self.stats.sent_chunks,
+                    failed=self.stats.failed_chunks)
         
         print(f"\n{'='*50}")
         print(f"TRANSMISSION SUMMARY")
@@ -358,26 +840,29 @@ class MeshNetworkInterface:
         """Monitor network activity and display statistics"""
         print("[INFO] Monitoring network activity (Ctrl+C to stop)...\n")
         
+        if self._reader is not None:
+            def show(msg: NodeLine):
+                print(f"{MONITOR_PREFIX[msg.kind]} {msg.line}")
+            self.subscribe(show)
+            try:
+                while True:
+                    time.sleep(0.5)
+            except KeyboardInterrupt:
+                print("\n[INFO] Monitoring stopped")
+            finally:
+                self.unsubscribe(show)
+            return
+        
         try:
             while True:
                 if self.ser.in_waiting:
-                    line = self.ser.readline().decode(errors='ignore').strip()
+                    line = self._readline()
                     if line:
                         # Colorize output based on message type
-                        if "[TX]" in line or "[RREQ]" in line or "[RREP]" in line:
-                            prefix = "→"
-                        elif "[RX]" in line or "[HELLO]" in line:
-                            prefix = "←"
-                        elif "[FWD]" in line or "[RELAY]" in line:
-                            prefix = "↔"
-                        elif "[ROUTE]" in line:
-                            prefix = "☆"
-                        elif "[ERR]" in line or "failed" in line.lower():
-                            prefix = "✗"
-                        elif "[ACK]" in line:
-                            prefix = "✓"
-                        else:
-                            prefix = " "
+                        kind = lineparse.classify_mesh(line)
+                        if kind == "error":
+                            self._m_node_errors.inc()
+                        prefix = MONITOR_PREFIX[kind]
                         
                         print(f"{prefix} {line}")
                 
@@ -390,16 +875,13 @@ class MeshNetworkInterface:
         """Request and display routing table"""
         print("[INFO] Requesting routing table...\n")
         
-        if not self.send_command("ROUTES"):
-            return False
-        
         # Wait for routing table output
-        time.sleep(1.0)
+        lines = self.request("ROUTES", 1.0)
+        if lines is None:
+            return False
         
-        while self.ser.in_waiting:
-            line = self.ser.readline().decode(errors='ignore').strip()
-            if line:
-                print(line)
+        for line in lines:
+            print(line)
         
         return True
     
@@ -407,16 +889,13 @@ class MeshNetworkInterface:
         """Request and display node statistics"""
         print("[INFO] Requesting node statistics...\n")
         
-        if not self.send_command("STATS"):
-            return False
-        
         # Wait for statistics output
-        time.sleep(1.0)
+        lines = self.request("STATS", 1.0)
+        if lines is None:
+            return False
         
-        while self.ser.in_waiting:
-            line = self.ser.readline().decode(errors='ignore').strip()
-            if line:
-                print(line)
+        for line in lines:
+            print(line)
         
         return True
 
@@ -450,11 +929,16 @@ Examples:
     parser.add_argument('--baud', type=int, default=115200, help='Baud rate (default: 115200)')
     
     # Transmission options
-    parser.add_argument('--send-text', metavar='TEXT', help='Send text message')
+    parser.add_argument('--send-text', metavar='TEXT', action='append',
+                        help='Send text message (repeat for several)')
     parser.add_argument('--send-file', metavar='FILE', help='Send file')
     parser.add_argument('--dest', help='Destination node name (required for sending)')
     parser.add_argument('--rel', type=int, choices=[0,1,2,3,4], 
                         help='Reliability level (0=none, 1=low, 2=med, 3=high, 4=critical)')
+    parser.add_argument('--encoding', choices=list(textcodec.CODECS), default=textcodec.DEFAULT,
+                        help='Text encoding for --send-file data (b64 is understood by older receivers)')
+    parser.add_argument('--coalesce-ms', type=float, default=0.0,
+                        help='Batch short texts to the same node, holding each at most this long (0 = off)')
     
     # Monitoring options
     parser.add_argument('--monitor', action='store_true', help='Monitor network activity')
@@ -462,12 +946,28 @@ Examples:
     parser.add_argument('--stats', action='store_true', help='Show node statistics')
     
     # Route discovery
-    parser.add_argument('--discover', metavar='NODE', help='Discover route to node')
+    parser.add_argument('--discover', metavar='NODE', help='Discover route to node (answered from ROUTES if fresh)')
+    parser.add_argument('--force-discover', action='store_true', help='Send DISCOVER even if the node has a fresh route')
+
+    # Metrics
+    parser.add_argument('--metrics-port', type=int, default=0, help='Serve Prometheus /metrics on this local port')
+    parser.add_argument('--metrics-json', default='', help='Append periodic JSON metric snapshots here')
+    parser.add_argument('--metrics-interval', type=float, default=60.0, help='Seconds between JSON snapshots')
+    parser.add_argument('--trace', default='', help='Write a JSONL event trace (lora_host.trace) here')
+
+    # Startup
+    parser.add_argument('--no-probe', action='store_true',
+                        help='Use the old fixed 4 s boot wait instead of the PING readiness probe')
+    parser.add_argument('--reset', action='store_true', help='Reboot the node on connect (default: keep it running)')
     
     args = parser.parse_args()
+
+    snapshots = metrics.start_exporters(args.metrics_port, args.metrics_json, args.metrics_interval)
     
     # Create interface
-    interface = MeshNetworkInterface(args.port, args.baud)
+    tracer = trace.open_tracer(args.trace, 'mesh_iface')
+    interface = MeshNetworkInterface(args.port, args.baud, tracer=tracer, coalesce_ms=args.coalesce_ms,
+                                     probe=not args.no_probe, reset=args.reset)
     
     # Connect
     if not interface.connect():
@@ -485,7 +985,7 @@ Examples:
             interface.show_stats()
         
         elif args.discover:
-            interface.discover_route(args.discover)
+            return 0 if interface.discover_route(args.discover, force=args.force_discover) else 1
         
         elif args.send_text:
             if not args.dest:
@@ -493,16 +993,20 @@ Examples:
                 return 1
             
             rel = args.rel if args.rel is not None else REL_LOW
-            success = interface.send_text(args.dest, args.send_text, rel)
+            futures = [interface.send_text_async(args.dest, text, rel) for text in args.send_text]
+            interface.flush_texts()
+            results = [f.result() for f in futures]
+            if len(results) > 1:
+                print(f"[INFO] {results.count('ok')}/{len(results)} messages delivered")
             
-            return 0 if success else 1
+            return 0 if all(r == 'ok' for r in results) else 1
         
         elif args.send_file:
             if not args.dest:
                 print("[ERROR] --dest required for sending")
                 return 1
             
-            success = interface.send_file(args.dest, args.send_file, args.rel)
+            success = interface.send_file(args.dest, args.send_file, args.rel, encoding=args.encoding)
             
             return 0 if success else 1
         
@@ -512,6 +1016,9 @@ Examples:
     
     finally:
         interface.disconnect()
+        tracer.close()
+        if snapshots:
+            snapshots.stop()
     
     return 0
 
@@ -10,6 +10,7 @@ Usage:
 
 Features:
     - Automatic fragment reassembly
+    - Unpacking of batched short messages (send_text with coalescing)
     - File type detection and saving
     - Real-time statistics
     - Message logging
@@ -19,7 +20,6 @@ Dependencies:
 """
 
 import argparse
-import base64
 import os
 import sys
 import time
@@ -30,6 +30,15 @@ from typing import Dict, List, Optional
 
 import serial
 
+try:
+    from lora_host import coalesce, lineparse, ready, textcodec, trace
+except ImportError:  # running from a checkout: use the repo-root package
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+    from lora_host import coalesce, lineparse, ready, textcodec, trace
+
+# Lines with these tags are echoed by the listener (for debugging)
+ECHO_TAGS = {"[RX]", "[TX]", "[ROUTE]", "[HELLO]", "[ACK]"}
+
 
 @dataclass
 class FragmentedMessage:
@@ -87,8 +96,12 @@ class ReceptionStats:
 class MeshReceiver:
     """Receiver for mesh network messages"""
     
-    def __init__(self, port: str, output_dir: Path, baudrate: int = 115200):
+    def __init__(self, port: str, output_dir: Path, baudrate: int = 115200,
+                 tracer: Optional[trace.Tracer] = None, probe: bool = True, reset: bool = False):
         self.port = port
+        self.probe = probe   # PING readiness probe instead of the fixed boot wait
+        self.reset = reset
+        self.tr = tracer or trace.NULL
         self.baudrate = baudrate
         self.output_dir = output_dir
         self.output_dir.mkdir(parents=True, exist_ok=True)
@@ -105,18 +118,29 @@ class MeshReceiver:
     def connect(self) -> bool:
         """Connect to mesh node"""
         try:
-            self.ser = serial.Serial(self.port, self.baudrate, timeout=1)
-            time.sleep(2.0)  # Wait for ESP32 boot
+            if self.probe:
+                # No DTR/RTS toggle (node keeps running), then PING until it answers
+                self.ser = ready.open_port(self.port, self.baudrate, timeout=1, reset=self.reset)
+                r = ready.wait_ready(self.ser, ready.PING, ready.MESH_READY,
+                                     on_line=self.tr.rx if self.tr.enabled else None)
+                if not r.ready:
+                    print(f"[WARN] Node gave {r.describe()}; continuing anyway")
+            else:
+                self.ser = serial.Serial(self.port, self.baudrate, timeout=1)
+                time.sleep(2.0)  # Wait for ESP32 boot
             
             print(f"[INFO] Connected to {self.port} @ {self.baudrate} baud")
+            if self.probe and r.ready:
+                print(f"[INFO] Node {r.describe()}")
             print(f"[INFO] Output directory: {self.output_dir}")
             print(f"[INFO] Listening for messages...\n")
             
-            # Clear boot messages
-            boot_deadline = time.time() + 2.0
-            while time.time() < boot_deadline:
-                if self.ser.in_waiting:
-                    self.ser.readline()
+            if not self.probe:
+                # Clear boot messages
+                boot_deadline = time.time() + 2.0
+                while time.time() < boot_deadline:
+                    if self.ser.in_waiting:
+                        self.ser.readline()
             
             return True
         
@@ -134,35 +158,26 @@ class MeshReceiver:
         """Parse DATA message from node output"""
         # Example: [RX] DATA from Node_1 (seq=123, hops=2)
         # Next line: [RX] Payload: <data>
-        
-        if "[RX] DATA from" in line:
-            parts = line.split()
-            if len(parts) >= 4:
-                source = parts[3]  # Node_X
-                
-                # Extract sequence number
-                seq_part = [p for p in parts if "seq=" in p]
-                seq = 0
-                if seq_part:
-                    seq = int(seq_part[0].split("=")[1].rstrip(",)"))
-                
-                return {
-                    "type": "DATA",
-                    "source": source,
-                    "seq": seq
-                }
-        
+        ev = lineparse.parse_line(line)
+        if type(ev) is lineparse.MeshData:
+            return {
+                "type": "DATA",
+                "source": ev.src,
+                "seq": ev.seq
+            }
         return None
     
     def parse_payload_line(self, line: str) -> Optional[str]:
         """Extract payload from [RX] Payload: line"""
-        if "[RX] Payload:" in line:
-            idx = line.index("[RX] Payload:") + len("[RX] Payload:")
-            return line[idx:].strip()
+        ev = lineparse.parse_line(line)
+        if type(ev) is lineparse.MeshPayload:
+            return ev.payload
         return None
     
     def process_payload(self, source: str, payload: str):
         """Process received payload"""
+        if self.tr.enabled:
+            self.tr.emit("state", what="payload", src=source, n=len(payload))
         # Check if this is a fragment
         if payload.startswith("FRAG:"):
             self.handle_fragment(source, payload)
@@ -171,6 +186,14 @@ class MeshReceiver:
         elif payload.startswith("FILE:"):
             self.handle_file(source, payload)
         
+        # Several short texts in one packet (lora_host.coalesce)
+        elif payload.startswith(coalesce.PREFIX):
+            texts = coalesce.unpack(payload)
+            if self.tr.enabled:
+                self.tr.emit("state", what="batch", src=source, msgs=len(texts))
+            for text in texts:
+                self.handle_text_message(source, text)
+        
         # Regular text message
         else:
             self.handle_text_message(source, payload)
@@ -212,6 +235,8 @@ class MeshReceiver:
             # Check if complete
             if msg.is_complete:
                 print(f"[FRAG] All chunks received from {source}, reassembling...")
+                if self.tr.enabled:
+                    self.tr.emit("state", what="reassembled", src=source, tot=total)
                 
                 full_data = msg.get_reassembled()
                 if full_data:
@@ -231,7 +256,7 @@ class MeshReceiver:
     
     def handle_file(self, source: str, payload: str):
         """Handle file transmission"""
-        # Format: FILE:<filename>:<size>:<base64_data>
+        # Format: FILE:<filename>:<size>:<data>, data from lora_host.textcodec (base64 by default)
         try:
             parts = payload.split(":", 3)
             if len(parts) != 4:
@@ -240,17 +265,17 @@ class MeshReceiver:
             
             filename = parts[1]
             size = int(parts[2])
-            b64_data = parts[3]
+            enc_data = parts[3]
             
             print(f"\n[FILE] Receiving file from {source}")
             print(f"[FILE] Name: {filename}")
             print(f"[FILE] Size: {size} bytes")
             
-            # Decode base64
+            # Decode (the encoding is tagged in the data; untagged is base64)
             try:
-                file_data = base64.b64decode(b64_data)
-            except Exception as e:
-                print(f"[ERROR] Base64 decode failed: {e}")
+                file_data = textcodec.decode(enc_data)
+            except ValueError as e:
+                print(f"[ERROR] {textcodec.encoding_of(enc_data)} decode failed: {e}")
                 return
             
             # Generate unique filename if exists
@@ -268,6 +293,9 @@ class MeshReceiver:
             
             self.stats.files_received += 1
             self.stats.total_bytes += len(file_data)
+            if self.tr.enabled:
+                self.tr.emit("done", what="file", src=source, fname=filename, n=len(file_data),
+                             ok=len(file_data) == size)
             
             print(f"[FILE] Saved to: {output_path}")
             print(f"[FILE] Verification: {len(file_data)} bytes written")
@@ -329,7 +357,7 @@ class MeshReceiver:
         last_cleanup = time.time()
         last_stats = time.time()
         
-        pending_data = None  # Stores parsed DATA message waiting for payload
+        pending_data = None  # MeshData header waiting for its payload line
         
         try:
             while True:
@@ -339,23 +367,27 @@ class MeshReceiver:
                     if not line:
                         continue
                     
+                    ev = lineparse.parse_line(line)
+                    t = type(ev)
+                    if self.tr.enabled:
+                        self.tr.rx(line)
+                        if ev is not None:
+                            self.tr.parsed(ev)
+                    
                     # Check if this is a DATA message header
-                    data_msg = self.parse_data_message(line)
-                    if data_msg:
-                        pending_data = data_msg
+                    if t is lineparse.MeshData:
+                        pending_data = ev
                         continue
                     
                     # Check if this is a payload line
-                    if pending_data:
-                        payload = self.parse_payload_line(line)
-                        if payload:
-                            # Process the complete message
-                            self.process_payload(pending_data["source"], payload)
-                            pending_data = None
-                            continue
+                    if pending_data and t is lineparse.MeshPayload:
+                        # Process the complete message
+                        self.process_payload(pending_data.src, ev.payload)
+                        pending_data = None
+                        continue
                     
                     # Echo all other lines (for debugging)
-                    if any(marker in line for marker in ["[RX]", "[TX]", "[ROUTE]", "[HELLO]", "[ACK]"]):
+                    if lineparse.mesh_tag(line) in ECHO_TAGS:
                         print(f"  {line}")
                 
                 # Periodic cleanup
@@ -391,14 +423,24 @@ Example:
                         help='Output directory for received files (default: received_files)')
     parser.add_argument('--baud', type=int, default=115200, 
                         help='Baud rate (default: 115200)')
+    parser.add_argument('--trace', default='',
+                        help='Write a JSONL event trace (lora_host.trace) here')
+    parser.add_argument('--no-probe', action='store_true',
+                        help='Use the old fixed 4 s boot wait instead of the PING readiness probe')
+    parser.add_argument('--reset', action='store_true',
+                        help='Reboot the node on connect (default: keep it running)')
     
     args = parser.parse_args()
     
     # Create receiver
+    tracer = trace.open_tracer(args.trace, 'mesh_rx')
     receiver = MeshReceiver(
         port=args.port,
         output_dir=Path(args.out_dir),
-        baudrate=args.baud
+        baudrate=args.baud,
+        tracer=tracer,
+        probe=not args.no_probe,
+        reset=args.reset
     )
     
     # Connect and listen
@@ -409,6 +451,7 @@ Example:
         receiver.listen()
     finally:
         receiver.disconnect()
+        tracer.close()
     
     return 0
 
@@ -30,9 +30,10 @@ from mesh_network_interface import MeshNetworkInterface, REL_LOW, REL_MEDIUM, RE
 class NetworkTester:
     """Automated test suite for mesh network"""
     
-    def __init__(self, port: str, dest: str):
+    def __init__(self, port: str, dest: str, force_discover: bool = False):
         self.port = port
         self.dest = dest
+        self.force_discover = force_discover
         self.interface = MeshNetworkInterface(port)
         self.results = {}
     
@@ -89,7 +90,8 @@ class NetworkTester:
         """Test 2: Route discovery mechanism"""
         print("\nInitiating route discovery...")
         
-        success = self.interface.discover_route(self.dest)
+        # A fresh route in the node's table counts; --force-discover floods anyway
+        success = self.interface.discover_route(self.dest, force=self.force_discover)
         
         if success:
             print("✓ Route discovered successfully")
@@ -371,11 +373,13 @@ Examples:
                        choices=['connectivity', 'route', 'small', 'large', 
                                'reliability', 'throughput', 'file', 'stress', 'all'],
                        help='Test to run (default: all)')
+    parser.add_argument('--force-discover', action='store_true',
+                       help='Route test sends DISCOVER even if the node has a fresh route')
     
     args = parser.parse_args()
     
     # Create tester
-    tester = NetworkTester(args.port, args.dest)
+    tester = NetworkTester(args.port, args.dest, force_discover=args.force_discover)
     
     # Run selected test(s)
     if args.test == 'all':
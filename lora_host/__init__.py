@@ -0,0 +1,11 @@
+"""
+Shared host-side helpers for the LoRa-FullStack experiments.
+
+The numbered experiment folders keep their runnable scripts; anything that
+more than one of them needs (line parsing, reassembly, logging sinks, ...)
+lives here so a fix only has to be made once.
+
+Scripts that are run straight from a checkout add the repository root to
+``sys.path`` before importing this package, so no install step is required.
+``pip install -e .`` adds the ``lora`` command (lora_host.cli) on top.
+"""
@@ -0,0 +1,592 @@
+#!/usr/bin/env python3
+"""
+Reference models of the four ARQ modes of 11-Multimedia_Tunnel.ino over a
+lossy, half-duplex LoRa link, plus a sweep that tabulates goodput/latency.
+
+The sender procedures mirror sendFragmentsStopAndWait / GoBackN /
+SelectiveRepeat / TDDBlockAck step by step (same constants, same timers,
+same abort rules), and the receiver mirrors loop(): ACKF after
+RX_ACK_DELAY_MS per MSGF, or, in TDD mode, one BACK bitmap per burst sent on
+gap detection. See ARQ.md and TDD_BLOCK_ACK.md for the protocol description.
+
+Channel model:
+  - Airtime from the Semtech formula for the configured SF/BW/CR.
+  - Half-duplex: a packet is lost for a node that transmits at any time
+    during the packet's airtime (both nodes share one channel).
+  - Loss: Gilbert-Elliott two-state chain advanced once per packet on the
+    air, parameterised by the average loss rate and the mean burst length
+    (1 = no memory beyond one packet).
+  - The radio keeps receiving while the firmware is in delay(); packets are
+    handed to the protocol the next time it polls. The SX127x one-packet
+    FIFO is not modelled.
+
+Usage:
+    python -m lora_host.arq_sim                         # default sweep
+    python -m lora_host.arq_sim --loss 0 0.1 0.3 --burst 1 4 --sf 7 9 \\
+        --window 10 20 40 --tdd-burst 32 64 --frags 64 --trials 20 --out arq.csv
+"""
+
+import argparse
+import csv
+import heapq
+import math
+import random
+import statistics
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+from typing import Callable, Deque, Dict, Generator, List, Optional, Tuple
+
+MODES = ("SW", "GBN", "SR", "TDD")
+
+
+@dataclass
+class Params:
+    """Firmware knobs (defaults = 11-Multimedia_Tunnel.ino)."""
+    sf: int = 7
+    bw_hz: int = 500000
+    cr_den: int = 5
+    crc: bool = True
+    frag_chunk: int = 220
+    frag_header: int = 32           # "MSGF,<id12>,FF,seq,idx,tot," ~ bytes
+    ackf_bytes: int = 36            # "ACKF,<id12>,<id12>,seq,idx"
+    back_header: int = 36           # "BACK,<id12>,<id12>,seq,start," + bitmap
+    frag_max_tries: int = 3
+    frag_ack_timeout_ms: float = 5000
+    frag_spacing_ms: float = 150
+    listen_after_tx_ms: float = 500
+    rx_ack_delay_ms: float = 250
+    ack_slot_ms: float = 1000
+    arq_window_size: int = 20
+    tdd_burst_size: int = 64
+    tdd_block_ack_timeout_ms: float = 6000
+    tdd_uplink_guard_ms: float = 100
+    tdd_burst_gap_detect_ms: float = 350
+    tdd_radio_settle_ms: float = 20
+    tdd_min_frags_for_back: int = 5  # loop() only sends BACK after 5 fragments
+    tdd_back_resend_ms: float = 300
+
+
+def toa_ms(payload_len: int, p: Params) -> float:
+    """Semtech time-on-air, explicit header (same as loraToaMs() in the sketches)."""
+    ts = (1 << p.sf) / p.bw_hz
+    de = 1 if ts * 1000.0 > 16.0 else 0  # low data rate optimisation
+    sym = math.ceil((8.0 * payload_len - 4.0 * p.sf + 28.0 + 16.0 * int(p.crc)) / (4.0 * (p.sf - 2.0 * de)))
+    n_payload = 8.0 + max(sym * p.cr_den, 0)
+    return ((8.0 + 4.25) + n_payload) * ts * 1000.0
+
+
+# ----------------------------
+# Channel and event kernel
+# ----------------------------
+
+class GilbertElliott:
+    """Bursty packet loss: average rate `loss`, mean run of losses `burst`."""
+
+    def __init__(self, loss: float, burst: float, rng: random.Random):
+        self.rng = rng
+        self.bad = False
+        if loss <= 0:
+            self.p_gb, self.p_bg = 0.0, 1.0
+        elif loss >= 1:
+            self.p_gb, self.p_bg = 1.0, 0.0
+        else:
+            self.p_bg = 1.0 / max(burst, 1.0)
+            self.p_gb = min(1.0, loss * self.p_bg / (1.0 - loss))
+
+    def lost(self) -> bool:
+        r = self.rng.random()
+        self.bad = (r >= self.p_bg) if self.bad else (r < self.p_gb)
+        return self.bad
+
+
+@dataclass
+class Packet:
+    kind: str                 # MSGF | ACKF | BACK
+    nbytes: int
+    seq: int = 0
+    idx: int = 0
+    tot: int = 0
+    start: int = 0            # BACK start index
+    bitmap: str = ""
+
+
+class Node:
+    def __init__(self, sim: "Sim", name: str):
+        self.sim = sim
+        self.name = name
+        self.peer: Optional["Node"] = None
+        self.inbox: Deque[Packet] = deque()
+        self.tx_spans: Deque[Tuple[float, float]] = deque()
+        self._gen: Optional[Generator] = None
+        self._waiting = False
+        self._token = 0
+        self.tx_count: Dict[str, int] = {}
+        self.airtime_ms = 0.0
+
+    def start(self, gen: Generator) -> None:
+        self._gen = gen
+        self.sim.at(self.sim.now, lambda: self._step(None))
+
+    def deaf_during(self, t0: float, t1: float) -> bool:
+        while self.tx_spans and self.tx_spans[0][1] < t0 - 60000:
+            self.tx_spans.popleft()
+        return any(s < t1 and e > t0 for s, e in self.tx_spans)
+
+    def deliver(self, pkt: Packet) -> None:
+        self.inbox.append(pkt)
+        if self._waiting:
+            self._waiting = False
+            self._token += 1
+            self.sim.at(self.sim.now, lambda: self._step(self.inbox.popleft()))
+
+    def _step(self, value) -> None:
+        try:
+            cmd = self._gen.send(value)
+        except StopIteration as stop:
+            self.sim.finished(self, stop.value)
+            return
+        op = cmd[0]
+        sim = self.sim
+        if op == "tx":
+            pkt: Packet = cmd[1]
+            dur = toa_ms(pkt.nbytes, sim.p)
+            t0, t1 = sim.now, sim.now + dur
+            self.tx_spans.append((t0, t1))
+            self.tx_count[pkt.kind] = self.tx_count.get(pkt.kind, 0) + 1
+            self.airtime_ms += dur
+            sim.at(t1, lambda: sim.propagate(self, pkt, t0, t1))
+            sim.at(t1, lambda: self._step(None))
+        elif op == "sleep":
+            sim.at(sim.now + cmd[1], lambda: self._step(None))
+        elif op == "recv":
+            # Next queued packet, or None at the absolute deadline
+            if self.inbox:
+                sim.at(sim.now, lambda: self._step(self.inbox.popleft()))
+                return
+            deadline = cmd[1]
+            self._waiting = True
+            self._token += 1
+            if deadline is not None:
+                token = self._token
+
+                def timeout():
+                    if self._waiting and self._token == token:
+                        self._waiting = False
+                        self._step(None)
+                sim.at(max(deadline, sim.now), timeout)
+        else:
+            raise ValueError(op)
+
+
+class Sim:
+    def __init__(self, p: Params, loss: float, burst: float, seed: int):
+        self.p = p
+        self.rng = random.Random(seed)
+        self.channel = GilbertElliott(loss, burst, self.rng)
+        self.now = 0.0
+        self._q: List[Tuple[float, int, Callable[[], None]]] = []
+        self._n = 0
+        self.result: Dict[str, object] = {}
+        self._done = False
+
+    def at(self, t: float, fn: Callable[[], None]) -> None:
+        self._n += 1
+        heapq.heappush(self._q, (t, self._n, fn))
+
+    def propagate(self, src: Node, pkt: Packet, t0: float, t1: float) -> None:
+        dst = src.peer
+        lost = self.channel.lost()
+        if lost or dst.deaf_during(t0, t1):
+            return
+        dst.deliver(pkt)
+
+    def finished(self, node: Node, value) -> None:
+        if node.name == "tx":
+            self.result["ok"] = bool(value)
+            self.result["done_ms"] = self.now
+            self._done = True
+
+    def run(self, limit_ms: float = 3.6e6) -> None:
+        while self._q and not self._done:
+            t, _, fn = heapq.heappop(self._q)
+            if t > limit_ms:
+                self.result.setdefault("ok", False)
+                self.result.setdefault("done_ms", limit_ms)
+                break
+            self.now = t
+            fn()
+
+
+# ----------------------------
+# Sender procedures (one per ARQ mode)
+# ----------------------------
+
+def _msgf(p: Params, seq: int, i: int, total: int) -> Packet:
+    return Packet("MSGF", p.frag_header + p.frag_chunk, seq, i, total)
+
+
+def _take_acks(node: Node, seq: int, acked: List[bool]) -> None:
+    # processIncomingWhileTx(): ACKF and BACK both mark fragments
+    while node.inbox:
+        pkt = node.inbox.popleft()
+        _mark(pkt, seq, acked)
+
+
+def _mark(pkt: Optional[Packet], seq: int, acked: List[bool]) -> None:
+    if pkt is None or pkt.seq != seq:
+        return
+    if pkt.kind == "ACKF" and 0 <= pkt.idx < len(acked):
+        acked[pkt.idx] = True
+    elif pkt.kind == "BACK":
+        for k, c in enumerate(pkt.bitmap):
+            j = pkt.start + k
+            if c == "1" and j < len(acked):
+                acked[j] = True
+
+
+def _listen(node: Node, seq: int, acked: List[bool], until: float):
+    """listenForAckWindow(): keep taking ACKs until the absolute time `until`."""
+    while True:
+        pkt = yield ("recv", until)
+        if pkt is None:
+            return
+        _mark(pkt, seq, acked)
+
+
+def sender_sw(node: Node, p: Params, seq: int, total: int):
+    for i in range(total):
+        ok = False
+        for _ in range(p.frag_max_tries):
+            yield ("tx", _msgf(p, seq, i, total))
+            deadline = node.sim.now + p.frag_ack_timeout_ms
+            while True:
+                pkt = yield ("recv", deadline)
+                if pkt is None:
+                    break
+                if pkt.kind == "ACKF" and pkt.seq == seq and pkt.idx == i:
+                    ok = True
+                    break
+            if ok:
+                break
+            yield ("sleep", p.frag_spacing_ms)
+        if not ok:
+            return False
+    return True
+
+
+def sender_gbn(node: Node, p: Params, seq: int, total: int):
+    return (yield from _windowed(node, p, seq, total, selective=False))
+
+
+def sender_sr(node: Node, p: Params, seq: int, total: int):
+    return (yield from _windowed(node, p, seq, total, selective=True))
+
+
+def _windowed(node: Node, p: Params, seq: int, total: int, selective: bool):
+    sim = node.sim
+    acked = [False] * total
+    last_tx = [0.0] * total
+    retries = [0] * total
+    base = nxt = 0
+    W = p.arq_window_size
+
+    while base < total:
+        now = sim.now
+        start_idx = nxt
+        while nxt < total and nxt < base + W:
+            yield ("tx", _msgf(p, seq, nxt, total))
+            last_tx[nxt] = now  # firmware stamps the time taken before the burst
+            retries[nxt] += 1
+            yield ("sleep", p.frag_spacing_ms)
+            nxt += 1
+        if start_idx < nxt:
+            yield from _listen(node, seq, acked, sim.now + p.ack_slot_ms)
+
+        loop_start = sim.now
+        while True:
+            _take_acks(node, seq, acked)
+            while base < total and acked[base]:
+                base += 1
+            if base >= total:
+                return True
+            if nxt < total and nxt < base + W:
+                break
+
+            now2 = sim.now
+            if not selective:
+                if not acked[base] and now2 - last_tx[base] > p.frag_ack_timeout_ms:
+                    if retries[base] >= p.frag_max_tries:
+                        return False
+                    for j in range(base, nxt):
+                        yield ("tx", _msgf(p, seq, j, total))
+                        last_tx[j] = sim.now
+                        retries[j] += 1
+                        yield from _listen(node, seq, acked, sim.now + p.listen_after_tx_ms)
+                        if retries[j] > p.frag_max_tries:
+                            return False
+                wake = last_tx[base] + p.frag_ack_timeout_ms + 1
+            else:
+                for j in range(base, nxt):
+                    if acked[j]:
+                        continue
+                    if now2 - last_tx[j] > p.frag_ack_timeout_ms:
+                        if retries[j] >= p.frag_max_tries:
+                            return False
+                        yield ("tx", _msgf(p, seq, j, total))
+                        last_tx[j] = now2
+                        retries[j] += 1
+                        yield from _listen(node, seq, acked, sim.now + p.listen_after_tx_ms)
+                if sim.now - loop_start > p.frag_ack_timeout_ms / 2:
+                    break
+                pending = [last_tx[j] for j in range(base, nxt) if not acked[j]]
+                wake = min(pending, default=sim.now) + p.frag_ack_timeout_ms + 1
+                wake = min(wake, loop_start + p.frag_ack_timeout_ms / 2 + 1)
+
+            # The firmware polls every 2 ms; sleeping until the next ACK or
+            # timer expiry gives the same result with far fewer events.
+            pkt = yield ("recv", max(wake, sim.now + 2))
+            _mark(pkt, seq, acked)
+    return True
+
+
+def sender_tdd(node: Node, p: Params, seq: int, total: int):
+    sim = node.sim
+    acked = [False] * total
+    retries = [0] * total
+    base = 0
+
+    def burst_done(lo, hi):
+        return all(acked[lo:hi])
+
+    def uplink(lo, hi):
+        # LoRa.idle() + settle, guard poll, then wait for the BACK
+        yield ("sleep", p.tdd_radio_settle_ms)
+        yield from _listen(node, seq, acked, sim.now + p.tdd_uplink_guard_ms)
+        deadline = sim.now + p.tdd_block_ack_timeout_ms
+        while not burst_done(lo, hi):
+            pkt = yield ("recv", deadline)
+            if pkt is None:
+                return False
+            _mark(pkt, seq, acked)
+        return True
+
+    while base < total:
+        end = min(base + p.tdd_burst_size, total)
+        for i in range(base, end):
+            yield ("tx", _msgf(p, seq, i, total))
+            retries[i] += 1
+            yield ("sleep", p.frag_spacing_ms)
+        if (yield from uplink(base, end)) or burst_done(base, end):
+            base = end
+            continue
+
+        lost = [i for i in range(base, end) if not acked[i]]
+        if any(retries[i] >= p.frag_max_tries for i in lost):
+            return False
+        for i in lost:
+            yield ("tx", _msgf(p, seq, i, total))
+            retries[i] += 1
+            yield ("sleep", p.frag_spacing_ms)
+        if not (yield from uplink(base, end)) and not burst_done(base, end):
+            return False
+        base = end
+    return True
+
+
+SENDERS = {"SW": sender_sw, "GBN": sender_gbn, "SR": sender_sr, "TDD": sender_tdd}
+
+
+# ----------------------------
+# Receiver (loop() of the sketch)
+# ----------------------------
+
+def receiver(node: Node, p: Params, mode: str, stats: Dict[str, float]):
+    sim = node.sim
+    received: Dict[int, bool] = {}
+    total = 0
+    seq = None
+    last_update = 0.0
+    last_seen = 0
+    last_burst_sent = None
+    dirty = False
+    last_back_at = -1e18
+
+    while True:
+        deadline = None
+        if mode == "TDD" and seq is not None:
+            gap = max(p.tdd_burst_gap_detect_ms, p.frag_spacing_ms + 80)
+            deadline = last_update + gap + 1
+        pkt = yield ("recv", deadline)
+
+        if pkt is not None and pkt.kind == "MSGF":
+            if pkt.idx not in received:
+                stats.setdefault("first_rx_ms", sim.now)
+                stats["frags_rx"] = stats.get("frags_rx", 0) + 1
+                if stats["frags_rx"] == pkt.tot:
+                    stats["all_rx_ms"] = sim.now
+            if mode != "TDD":
+                received[pkt.idx] = True
+                yield ("sleep", p.rx_ack_delay_ms)
+                yield ("tx", Packet("ACKF", p.ackf_bytes, pkt.seq, pkt.idx))
+                continue
+            if seq != pkt.seq:
+                seq, total = pkt.seq, pkt.tot
+                received = {}
+                last_seen = 0
+                last_burst_sent = None
+                dirty = False
+            received[pkt.idx] = True
+            last_update = sim.now
+            last_seen = max(last_seen, pkt.idx)
+            burst_start = (pkt.idx // p.tdd_burst_size) * p.tdd_burst_size
+            if last_burst_sent == burst_start:
+                dirty = True
+            continue
+
+        if pkt is not None or mode != "TDD" or seq is None:
+            continue
+
+        # Gap detection: BACK for the burst of the highest fragment seen
+        if sim.now - last_update <= max(p.tdd_burst_gap_detect_ms, p.frag_spacing_ms + 80):
+            continue
+        if len(received) < p.tdd_min_frags_for_back:
+            last_update = sim.now  # re-arm; firmware keeps polling
+            continue
+        cur = (last_seen // p.tdd_burst_size) * p.tdd_burst_size
+        send = last_burst_sent != cur or (dirty and sim.now - last_back_at > p.tdd_back_resend_ms)
+        if send:
+            end = min(cur + p.tdd_burst_size, total)
+            bitmap = "".join("1" if received.get(i) else "0" for i in range(cur, end))
+            yield ("sleep", p.rx_ack_delay_ms)
+            yield ("tx", Packet("BACK", p.back_header + len(bitmap), seq, start=cur, bitmap=bitmap))
+            last_burst_sent = cur
+            dirty = False
+            last_back_at = sim.now
+        last_update = sim.now
+
+
+# ----------------------------
+# Runs and sweeps
+# ----------------------------
+
+def simulate(mode: str, p: Params, frags: int, loss: float, burst: float, seed: int) -> Dict[str, object]:
+    """One message of `frags` fragments; returns outcome, time and packet counts."""
+    sim = Sim(p, loss, burst, seed)
+    tx, rx = Node(sim, "tx"), Node(sim, "rx")
+    tx.peer, rx.peer = rx, tx
+    rx_stats: Dict[str, float] = {}
+    tx.start(SENDERS[mode](tx, p, 1, frags))
+    rx.start(receiver(rx, p, mode, rx_stats))
+    sim.run()
+    done = float(sim.result.get("done_ms", 0.0))
+    ok = bool(sim.result.get("ok", False))
+    data_tx = tx.tx_count.get("MSGF", 0)
+    payload = frags * p.frag_chunk
+    return {
+        "ok": ok,
+        "done_ms": done,
+        "goodput_bps": payload * 8 / (done / 1000.0) if ok and done > 0 else 0.0,
+        "data_tx": data_tx,
+        "ack_tx": sum(rx.tx_count.values()),
+        "tx_per_frag": data_tx / frags,
+        "airtime_ms": tx.airtime_ms + rx.airtime_ms,
+        "delivered": rx_stats.get("frags_rx", 0) == frags,
+    }
+
+
+def sweep(modes, losses, bursts, sfs, windows, tdd_bursts, frags, trials, base: Params,
+          progress: bool = True) -> List[Dict[str, object]]:
+    rows = []
+    for sf in sfs:
+        for mode in modes:
+            if mode in ("GBN", "SR"):
+                variants = [("window", w) for w in windows]
+            elif mode == "TDD":
+                variants = [("burst", b) for b in tdd_bursts]
+            else:
+                variants = [("-", 0)]
+            for knob, val in variants:
+                p = replace(base, sf=sf)
+                if knob == "window":
+                    p = replace(p, arq_window_size=val)
+                elif knob == "burst":
+                    p = replace(p, tdd_burst_size=val)
+                for loss in losses:
+                    for burst in bursts:
+                        runs = [simulate(mode, p, frags, loss, burst, seed) for seed in range(trials)]
+                        ok = [r for r in runs if r["ok"]]
+                        rows.append({
+                            "mode": mode, "sf": sf, "knob": knob, "value": val,
+                            "loss": loss, "burst": burst, "frags": frags, "trials": trials,
+                            "success": len(ok) / trials,
+                            "goodput_bps": statistics.mean(r["goodput_bps"] for r in runs),
+                            "goodput_ok_bps": statistics.mean(r["goodput_bps"] for r in ok) if ok else 0.0,
+                            "latency_s": statistics.median(r["done_ms"] for r in ok) / 1000.0 if ok else float("nan"),
+                            "tx_per_frag": statistics.mean(r["tx_per_frag"] for r in runs),
+                            "ack_tx": statistics.mean(r["ack_tx"] for r in runs),
+                            "airtime_s": statistics.mean(r["airtime_ms"] for r in runs) / 1000.0,
+                        })
+                        if progress:
+                            r = rows[-1]
+                            setting = f"{knob}={val:<3} " if knob != "-" else ""
+                            print(f"{mode:<4} sf={sf:<2} {setting}loss={loss:<4} burst={burst:<3} "
+                                  f"ok={r['success']:>4.0%} goodput={r['goodput_bps']:>7.0f} bps "
+                                  f"latency={r['latency_s']:>7.1f} s  tx/frag={r['tx_per_frag']:.2f}")
+    return rows
+
+
+def print_table(rows: List[Dict[str, object]]) -> None:
+    """Best configuration per (sf, loss, burst) and mode, by mean goodput."""
+    best: Dict[Tuple, Dict[str, object]] = {}
+    for r in rows:
+        key = (r["sf"], r["loss"], r["burst"], r["mode"])
+        if key not in best or r["goodput_bps"] > best[key]["goodput_bps"]:
+            best[key] = r
+    print(f"\n{'sf':>3} {'loss':>5} {'burst':>5}  " + "  ".join(f"{m:>18}" for m in MODES))
+    for sf, loss, burst in sorted({k[:3] for k in best}):
+        cells = []
+        for m in MODES:
+            r = best.get((sf, loss, burst, m))
+            if r is None:
+                cells.append(f"{'-':>18}")
+                continue
+            tag = f"{r['knob'][0]}{r['value']}" if r["knob"] != "-" else ""
+            cells.append(f"{r['goodput_bps']:>7.0f}bps {r['success']:>4.0%} {tag:>4}")
+        print(f"{sf:>3} {loss:>5} {burst:>5}  " + "  ".join(cells))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare S&W / GBN / SR / TDD Block ACK on a simulated lossy half-duplex link.")
+    ap.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    ap.add_argument("--loss", nargs="+", type=float, default=[0.0, 0.05, 0.1, 0.2, 0.3])
+    ap.add_argument("--burst", nargs="+", type=float, default=[1.0, 4.0], help="Mean loss burst length (packets)")
+    ap.add_argument("--sf", nargs="+", type=int, default=[7, 9])
+    ap.add_argument("--bw", type=int, default=500000, help="Bandwidth in Hz (sketch uses 500 kHz)")
+    ap.add_argument("--window", nargs="+", type=int, default=[20], help="ARQ_WINDOW_SIZE values for GBN/SR")
+    ap.add_argument("--tdd-burst", nargs="+", type=int, default=[64], help="TDD_BURST_SIZE values")
+    ap.add_argument("--gap", type=float, default=Params.tdd_burst_gap_detect_ms, help="TDD_BURST_GAP_DETECT_MS")
+    ap.add_argument("--max-tries", type=int, default=Params.frag_max_tries, help="FRAG_MAX_TRIES")
+    ap.add_argument("--frags", type=int, default=64, help="Fragments per message (220 chars each)")
+    ap.add_argument("--trials", type=int, default=10, help="Seeds per configuration")
+    ap.add_argument("--out", help="Write all rows to this CSV")
+    ap.add_argument("--quiet", action="store_true", help="Only print the summary table")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    rows = sweep(args.modes, args.loss, args.burst, args.sf, args.window, args.tdd_burst,
+                 args.frags, args.trials, Params(bw_hz=args.bw, frag_max_tries=args.max_tries,
+                                     tdd_burst_gap_detect_ms=args.gap), progress=not args.quiet)
+    print_table(rows)
+    print(f"[INFO] {len(rows)} configurations x {args.trials} trials in {time.perf_counter() - t0:.1f} s")
+
+    if args.out and rows:
+        with open(args.out, "w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            w.writeheader()
+            w.writerows(rows)
+        print(f"[OK] Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
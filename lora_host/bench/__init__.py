@@ -0,0 +1,6 @@
+"""
+Offline benchmarks for the host-side hot paths.
+
+Each module runs without a serial port or radio and can be started with
+``python -m lora_host.bench.<name>`` from the repository root.
+"""
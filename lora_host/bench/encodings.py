@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Size, airtime and CPU of the text encodings in lora_host.textcodec.
+
+For each input file and encoding it reports the encoded length, the
+overhead over the raw bytes, and what that costs on the two text paths:
+
+  mesh    FRAG:<idx>:<tot>:<150 chars> per SEND (mesh_network_interface
+          CHUNK_SIZE), one LoRa packet each with a ~40 byte T|S|D|Q|H|L|R
+          header, SF7 / 125 kHz (MeshNode.ino)
+  tunnel  FILECHUNK lines split by the sketch into frag_chunk-byte LoRa
+          fragments with frag_header bytes each, SF7 / 500 kHz
+          (arq_sim.Params defaults = 11-Multimedia_Tunnel.ino)
+
+Airtime is the sum of Semtech time-on-air of the data packets
+(arq_sim.toa_ms), without ACKs or retries, so it scales with the packet
+count. Encode/decode speed is the best pass within ``--seconds``.
+
+Usage:
+    python -m lora_host.bench.encodings [FILE ...] [--seconds 0.5] [--json out.json]
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from lora_host import arq_sim, textcodec
+
+REPO = Path(__file__).resolve().parents[2]
+EXP = REPO / "03-FullStack_Experiments"
+SAMPLES = [
+    EXP / "11-Multimedia_Tunnel" / "earthquake.webp",
+    EXP / "11-Multimedia_Tunnel" / "human_voice.wav",
+]
+
+MESH_CHUNK = 150      # mesh_network_interface.CHUNK_SIZE
+MESH_HEADER = 40      # T1|SNode_1|DNode_2|Q12345|H0|L10|R3|:
+MESH_PARAMS = arq_sim.Params(sf=7, bw_hz=125000)
+TUNNEL_PARAMS = arq_sim.Params()
+
+
+def best_time(fn: Callable[[], object], seconds: float) -> float:
+    best = float("inf")
+    deadline = time.perf_counter() + seconds
+    while True:
+        t0 = time.perf_counter()
+        fn()
+        t1 = time.perf_counter()
+        best = min(best, t1 - t0)
+        if t1 >= deadline:
+            return best
+
+
+def mesh_airtime(chars: int, fname: str, nbytes: int) -> Dict[str, float]:
+    data = len(f"FILE:{fname}:{nbytes}:") + chars
+    tot = math.ceil(data / MESH_CHUNK)
+    air = 0.0
+    for idx in range(tot):
+        n = min(MESH_CHUNK, data - idx * MESH_CHUNK)
+        air += arq_sim.toa_ms(MESH_HEADER + len(f"FRAG:{idx}:{tot}:") + n, MESH_PARAMS)
+    return {"packets": tot, "airtime_s": air / 1000.0}
+
+
+def tunnel_airtime(chars: int, fname: str) -> Dict[str, float]:
+    p = TUNNEL_PARAMS
+    line = len(f"FILECHUNK:{fname}:0:1:") + chars
+    full, rest = divmod(line, p.frag_chunk)
+    air = full * arq_sim.toa_ms(p.frag_chunk + p.frag_header, p)
+    if rest:
+        air += arq_sim.toa_ms(rest + p.frag_header, p)
+    return {"packets": full + (1 if rest else 0), "airtime_s": air / 1000.0}
+
+
+def run(files: List[Path], seconds: float = 0.5) -> List[Dict[str, object]]:
+    results = []
+    for path in files:
+        raw = path.read_bytes() if path.name != "random" else os.urandom(64 * 1024)
+        for name, codec in textcodec.CODECS.items():
+            text = textcodec.encode(raw, name)
+            assert textcodec.decode(text) == raw, name
+            t_enc = best_time(lambda: codec.encode(raw), seconds)
+            body = codec.encode(raw)
+            t_dec = best_time(lambda: codec.decode(body), seconds)
+            mesh = mesh_airtime(len(text), path.name, len(raw))
+            tun = tunnel_airtime(len(text), path.name)
+            results.append({
+                "file": path.name,
+                "bytes": len(raw),
+                "encoding": name,
+                "chars": len(text),
+                "overhead_pct": 100.0 * (len(text) / max(1, len(raw)) - 1.0),
+                "mesh_packets": mesh["packets"],
+                "mesh_airtime_s": mesh["airtime_s"],
+                "tunnel_packets": tun["packets"],
+                "tunnel_airtime_s": tun["airtime_s"],
+                "encode_mb_s": len(raw) / t_enc / 1e6,
+                "decode_mb_s": len(raw) / t_dec / 1e6,
+            })
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare text encodings for the MCU line protocols.")
+    ap.add_argument("files", nargs="*", help="Input files (default: the tunnel samples and 64 KB of random bytes)")
+    ap.add_argument("--seconds", type=float, default=0.5, help="Time budget per encode/decode measurement")
+    ap.add_argument("--json", default="", help="Also write the results here")
+    args = ap.parse_args()
+
+    files = [Path(f) for f in args.files] or [p for p in SAMPLES if p.is_file()] + [Path("random")]
+    results = run(files, args.seconds)
+
+    print(f"{'file':<18} {'enc':<4} {'chars':>8} {'ovh %':>6} {'mesh pk':>8} {'mesh air s':>10} "
+          f"{'tun pk':>7} {'tun air s':>9} {'enc MB/s':>9} {'dec MB/s':>9}")
+    for r in results:
+        print(f"{r['file'][:18]:<18} {r['encoding']:<4} {r['chars']:>8} {r['overhead_pct']:>6.1f} "
+              f"{r['mesh_packets']:>8} {r['mesh_airtime_s']:>10.1f} {r['tunnel_packets']:>7} "
+              f"{r['tunnel_airtime_s']:>9.2f} {r['encode_mb_s']:>9.1f} {r['decode_mb_s']:>9.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[OK] Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for the host-side hot paths.
+
+Covers the code that runs per line / per fragment / per file while a link
+is busy, using synthetic inputs plus the sample files checked into the repo
+(human_voice.wav, the received JPEGs, the MiniSEED records, rx_results.csv):
+
+  - send_file: base64 encode + FILECHUNK splitting (lora_transceiver)
+  - MessageReassembler.add_frag / FileChunkAssembler.add_chunk (lora_host.reassembly)
+  - FragmentedMessage.get_reassembled (mesh_receiver)
+  - LoRaSerialSession._handle_rx_line on FRAG/MSG traffic (lora_transceiver)
+  - lineparse.parse_log(...).as_row() (what TelemetrySink does per LOG line of
+    rx_logger / tx_trigger) on synthetic and recorded LOG lines
+  - pathloss aggregation: running (live.PathlossAggregator) and batch (pandas
+    groupby as in plot_rx_pathloss.py)
+
+The scripts are imported from their folders, so the numbers follow whatever
+is in the tree. Each case is run repeatedly for about --seconds and the
+fastest pass is kept. Results are written as JSON; with --baseline they are
+compared case by case and the exit status is 1 if any case got slower than
+--tolerance allows.
+
+Usage:
+    python -m lora_host.bench.hotpath [--seconds 0.5] [--out results.json]
+    python -m lora_host.bench.hotpath --save-baseline bench_baseline.json
+    python -m lora_host.bench.hotpath --baseline bench_baseline.json [--tolerance 0.15]
+"""
+
+import argparse
+import base64
+import contextlib
+import csv
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from lora_host import lineparse, live, reassembly
+from lora_host.bench import parse as parse_bench
+
+REPO = Path(__file__).resolve().parents[2]
+EXP = REPO / "03-FullStack_Experiments"
+
+SAMPLE_FILES = [
+    EXP / "11-Multimedia_Tunnel" / "human_voice.wav",
+    EXP / "11-Multimedia_Tunnel" / "received_files" / "earthquake_rx.jpg",
+    EXP / "07-Seismic_Stream_v7" / "01-RX_MiniSEED" / "synthetic_36s.mseed",
+]
+SAMPLE_LOG_CSV = EXP / "12-Power_Pathloss_Tests" / "01-RX" / "rx_results.csv"
+
+# A case returns a callable doing one pass, plus (ops, bytes) per pass
+Case = Tuple[Callable[[], object], int, int]
+
+
+def _load(rel: str, name: str):
+    """Import an experiment script by path (its own lora_host fallback runs too)."""
+    spec = importlib.util.spec_from_file_location(name, EXP / rel)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def _quiet(fn: Callable[[], object]) -> Callable[[], object]:
+    """The assemblers print per chunk; keep the terminal out of the timing."""
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fn()
+    return run
+
+
+def _b64(n: int) -> str:
+    return base64.b64encode(os.urandom(n * 3 // 4 + 3)).decode("ascii")[:n]
+
+
+# ----------------------------
+# Cases
+# ----------------------------
+
+def case_send_file(raw: bytes, chunk_size_chars: int = 40000) -> Case:
+    # Same two steps send_file() does before writing to the port
+    def run():
+        b64 = base64.b64encode(raw).decode("ascii")
+        chunks = [b64[i:i + chunk_size_chars] for i in range(0, len(b64), chunk_size_chars)]
+        tot = len(chunks)
+        return [f"FILECHUNK:f.bin:{idx}:{tot}:{chunk}\n".encode("utf-8") for idx, chunk in enumerate(chunks)]
+    return run, 1, len(raw)
+
+
+def case_add_frag(frags: int, frag_chars: int = 200) -> Case:
+    chunks = [_b64(frag_chars) for _ in range(frags)]
+    order = list(range(frags))
+    random.Random(frags).shuffle(order)
+
+    def run():
+        reasm = reassembly.MessageReassembler()
+        for i in order:
+            reasm.add_frag("0x1A2B", 7, i, frags, chunks[i])
+    return run, frags, frags * frag_chars
+
+
+def case_add_chunk(out_dir: Path, file_bytes: int, chunk_chars: int = 40000) -> Case:
+    b64 = base64.b64encode(os.urandom(file_bytes)).decode("ascii")
+    chunks = [b64[i:i + chunk_chars] for i in range(0, len(b64), chunk_chars)]
+    tot = len(chunks)
+
+    def run():
+        asm = reassembly.FileChunkAssembler(out_dir, suffix="_rx")
+        for i, c in enumerate(chunks):
+            asm.add_chunk("bench.bin", i, tot, c)
+    return _quiet(run), tot, len(b64)
+
+
+def case_get_reassembled(mesh, frags: int, frag_chars: int = 150) -> Case:
+    msg = mesh.FragmentedMessage(total_chunks=frags)
+    for i in range(frags):
+        msg.received_chunks[i] = _b64(frag_chars)
+    return msg.get_reassembled, 1, frags * frag_chars
+
+
+def case_handle_rx_line(tx, out_dir: Path, lines: List[str]) -> Case:
+    sess = tx.LoRaSerialSession("bench", 115200, out_dir=out_dir, quiet=True)
+    handle = sess._handle_rx_line
+
+    def run():
+        for line in lines:
+            handle(line)
+    return _quiet(run), len(lines), sum(len(l) for l in lines)
+
+
+def case_parse_log(lines: List[str]) -> Case:
+    parse = lineparse.parse_log
+
+    def run():
+        for line in lines:
+            parse(line).as_row()
+    return run, len(lines), sum(len(l) for l in lines)
+
+
+def case_aggregator(rows: List[Dict[str, str]]) -> Case:
+    def run():
+        agg = live.PathlossAggregator("RX")
+        for row in rows:
+            agg.add_row(row)
+        return agg
+    return run, len(rows), 0
+
+
+def case_groupby(rows: int) -> Case:
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "type": "RX",
+        "sf": rng.integers(7, 13, rows),
+        "bw": rng.choice([125, 250, 500], rows),
+        "pathloss_db": rng.normal(110, 6, rows),
+    })
+
+    def run():
+        return df.groupby(["sf", "bw"], as_index=False)["pathloss_db"].mean()
+    return run, rows, 0
+
+
+def _sample_log_rows() -> Tuple[List[str], List[Dict[str, str]]]:
+    if not SAMPLE_LOG_CSV.exists():
+        return [], []
+    with open(SAMPLE_LOG_CSV, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    return [r["raw_line"] for r in rows if r.get("raw_line")], rows
+
+
+# ----------------------------
+# Runner
+# ----------------------------
+
+def measure(run: Callable[[], object], seconds: float) -> float:
+    """Fastest pass over ~`seconds` of repeats (at least 3 passes)."""
+    best = float("inf")
+    deadline = time.perf_counter() + seconds
+    passes = 0
+    while True:
+        t0 = time.perf_counter()
+        run()
+        t1 = time.perf_counter()
+        best = min(best, t1 - t0)
+        passes += 1
+        if passes >= 3 and t1 >= deadline:
+            return best
+
+
+def build_cases(tmp: Path) -> Dict[str, Callable[[], Case]]:
+    """Name -> factory; factories are lazy so one missing import only skips its cases."""
+    tx = _load("11-Multimedia_Tunnel/lora_transceiver.py", "bench_lora_transceiver")
+    mesh = _load("14-Mesh_Network/mesh_receiver.py", "bench_mesh_receiver")
+
+    cases: Dict[str, Callable[[], Case]] = {}
+    rnd = os.urandom(1 << 20)
+    cases["send_file/random_1MiB"] = lambda: case_send_file(rnd)
+    for p in SAMPLE_FILES:
+        if p.exists():
+            cases[f"send_file/{p.name}"] = lambda p=p: case_send_file(p.read_bytes())
+
+    for n in (10, 100, 1000):
+        cases[f"add_frag/{n}_frags"] = lambda n=n: case_add_frag(n)
+    for kb in (64, 1024):
+        cases[f"add_chunk/{kb}KiB"] = lambda kb=kb: case_add_chunk(tmp, kb * 1024)
+    for n in (10, 100, 1000):
+        cases[f"get_reassembled/{n}_frags"] = lambda n=n: case_get_reassembled(mesh, n)
+
+    cases["handle_rx_line/frag_traffic"] = lambda: case_handle_rx_line(tx, tmp, parse_bench.tunnel_corpus())
+    cases["handle_rx_line/filechunk_40k"] = lambda: case_handle_rx_line(tx, tmp, parse_bench.filechunk_corpus(40))
+
+    raw_lines, rows = _sample_log_rows()
+    cases["parse_log/synthetic"] = lambda: case_parse_log(parse_bench.log_corpus())
+    if raw_lines:
+        cases["parse_log/rx_results.csv"] = lambda: case_parse_log(raw_lines * 20)
+        cases["pathloss/aggregator_rx_results.csv"] = lambda: case_aggregator(rows * 20)
+    cases["pathloss/groupby_100k"] = lambda: case_groupby(100_000)
+    return cases
+
+
+def run(seconds: float = 0.5, only: Optional[str] = None) -> List[Dict[str, object]]:
+    results = []
+    with tempfile.TemporaryDirectory(prefix="lora_bench_") as tmp:
+        for name, factory in build_cases(Path(tmp)).items():
+            if only and only not in name:
+                continue
+            try:
+                fn, ops, nbytes = factory()
+            except ImportError as e:
+                results.append({"case": name, "skipped": str(e)})
+                continue
+            best = measure(fn, seconds)
+            results.append({
+                "case": name,
+                "best_s": best,
+                "ops_per_s": ops / best,
+                "mb_per_s": nbytes / best / 1e6 if nbytes else None,
+            })
+    return results
+
+
+def compare(results: List[Dict[str, object]], baseline: Dict[str, object],
+            tolerance: float) -> List[str]:
+    """Annotate results with the ratio to the baseline; return the regressed cases."""
+    base = {r["case"]: r for r in baseline.get("results", []) if "best_s" in r}
+    regressed = []
+    for r in results:
+        b = base.get(r["case"])
+        if b is None or "best_s" not in r:
+            continue
+        r["baseline_best_s"] = b["best_s"]
+        r["speedup"] = b["best_s"] / r["best_s"]
+        if r["speedup"] < 1.0 - tolerance:
+            regressed.append(r["case"])
+    return regressed
+
+
+def _meta() -> Dict[str, str]:
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the host-side hot paths offline.")
+    ap.add_argument("--seconds", type=float, default=0.5, help="Time budget per case")
+    ap.add_argument("--only", help="Run only cases whose name contains this string")
+    ap.add_argument("--out", help="Write results JSON here")
+    ap.add_argument("--baseline", help="Compare with a results JSON saved earlier")
+    ap.add_argument("--save-baseline", help="Write results JSON as the new baseline")
+    ap.add_argument("--tolerance", type=float, default=0.15,
+                    help="Allowed slowdown vs baseline before a case counts as regressed")
+    args = ap.parse_args()
+
+    results = run(args.seconds, args.only)
+    regressed = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressed = compare(results, json.load(f), args.tolerance)
+
+    print(f"{'case':<40} {'ops/s':>12} {'MB/s':>8} {'vs base':>8}")
+    for r in results:
+        if "skipped" in r:
+            print(f"{r['case']:<40} skipped: {r['skipped']}")
+            continue
+        mb = f"{r['mb_per_s']:>8.1f}" if r["mb_per_s"] is not None else f"{'-':>8}"
+        vs = f"{r['speedup']:>7.2f}x" if "speedup" in r else f"{'-':>8}"
+        flag = "  REGRESSED" if r["case"] in regressed else ""
+        print(f"{r['case']:<40} {r['ops_per_s']:>12,.1f} {mb} {vs}{flag}")
+
+    doc = {"meta": _meta(), "seconds": args.seconds, "results": results}
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(doc, f, indent=2)
+            print(f"[OK] Results written to {path}")
+
+    if regressed:
+        print(f"[WARN] {len(regressed)} case(s) slower than baseline by more than {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark: lineparse vs. the per-script parsers it replaced.
+
+The "old" functions below are faithful copies of the string handling the
+experiment scripts did before lineparse existed (startswith/`in` chains and
+full split() calls), stripped of their printing and side effects so only the
+parsing cost is measured.
+
+Usage:
+    python -m lora_host.bench.parse [--seconds 1.0] [--filechunk-kb 40]
+"""
+
+import argparse
+import base64
+import os
+import time
+from typing import Callable, Dict, List
+
+from lora_host import lineparse
+
+
+# ----------------------------
+# Old parsers (baseline)
+# ----------------------------
+
+def _old_full_payload(payload: str):
+    # handle_full_payload() from 11-Multimedia_Tunnel before lineparse
+    if payload.startswith("FILECHUNK:"):
+        try:
+            _, fname, s_idx, s_tot, b64_chunk = payload.split(":", 4)
+            return fname, int(s_idx), int(s_tot), b64_chunk
+        except ValueError:
+            return None
+    if payload.startswith("FILE:"):
+        try:
+            _, fname, b64 = payload.split(":", 2)
+            return fname, b64
+        except ValueError:
+            return None
+    return None
+
+
+def old_tunnel(line: str):
+    # LoRaSerialSession._reader_loop + _handle_rx_line
+    if "[TX DONE]" in line:
+        return True
+    if "[ABORT]" in line or "TX FAILED" in line:
+        return False
+    if line.startswith("MSG,"):
+        parts = line.split(",", 5)
+        if len(parts) >= 6:
+            _, src, seq, rssi, d_m, text = parts
+            return _old_full_payload(text)
+        return None
+    if line.startswith("FRAG,"):
+        parts = line.split(",", 7)
+        if len(parts) >= 8:
+            _, src, seq, idx, tot, rssi, d_m, chunk = parts
+            try:
+                return src, int(seq), int(idx), int(tot), chunk
+            except ValueError:
+                return None
+    return None
+
+
+def old_mesh(line: str):
+    # MeshReceiver.parse_data_message / parse_payload_line / echo filter
+    if "[RX] DATA from" in line:
+        parts = line.split()
+        if len(parts) >= 4:
+            seq_part = [p for p in parts if "seq=" in p]
+            seq = 0
+            if seq_part:
+                seq = int(seq_part[0].split("=")[1].rstrip(",)"))
+            return {"type": "DATA", "source": parts[3], "seq": seq}
+    if "[RX] Payload:" in line:
+        idx = line.index("[RX] Payload:") + len("[RX] Payload:")
+        return line[idx:].strip()
+    return any(marker in line for marker in ["[RX]", "[TX]", "[ROUTE]", "[HELLO]", "[ACK]"])
+
+
+def old_log(line: str) -> dict:
+    # parse_log_line() as 12-Power_Pathloss_Tests had it before lineparse
+    parts = [p.strip() for p in line.split(",")]
+    out = {"type": "", "event": "", "raw_line": line}
+    if len(parts) < 2 or parts[0] != "LOG":
+        return out
+    out["type"] = parts[1]
+    i = 2
+    if out["type"] == "EVENT" and len(parts) >= 3:
+        out["event"] = parts[2]
+        i = 3
+    while i + 1 < len(parts):
+        out[parts[i]] = parts[i + 1]
+        i += 2
+    return out
+
+
+# ----------------------------
+# New parsers (same work through lineparse)
+# ----------------------------
+
+def new_tunnel(line: str):
+    ev = lineparse.parse_line(line)
+    if type(ev) is lineparse.Msg:
+        ev = lineparse.parse_tunnel_payload(ev.line, ev.start)
+        if type(ev) is lineparse.FileChunk:
+            return ev.fname, ev.idx, ev.tot, ev.b64
+    elif type(ev) is lineparse.Frag:
+        return ev.src, ev.seq, ev.idx, ev.tot, ev.chunk
+    return ev
+
+
+def new_mesh(line: str):
+    ev = lineparse.parse_line(line)
+    if type(ev) is lineparse.MeshPayload:
+        return ev.payload
+    if ev is None:
+        return lineparse.mesh_tag(line)
+    return ev
+
+
+def new_log(line: str) -> dict:
+    return lineparse.parse_log(line).as_row()
+
+
+# ----------------------------
+# Corpora
+# ----------------------------
+
+def _b64(n: int) -> str:
+    return base64.b64encode(os.urandom(n * 3 // 4)).decode("ascii")[:n]
+
+
+def tunnel_corpus() -> List[str]:
+    lines = []
+    for seq in range(20):
+        for idx in range(20):
+            lines.append(f"FRAG,0x1A2B,{seq},{idx},20,-87,412,{_b64(220)}")
+        lines.append(f"[TX DONE] #{seq} mode=FRAG")
+    return lines
+
+
+def filechunk_corpus(filechunk_kb: int) -> List[str]:
+    lines = []
+    for i in range(8):
+        blob = _b64(filechunk_kb * 1024)
+        lines.append(f"MSG,0x1A2B,{100 + i},-90,430,FILECHUNK:photo.jpg:{i}:8:{blob}")
+    return lines
+
+
+def mesh_corpus() -> List[str]:
+    lines = []
+    for seq in range(100):
+        lines.append(f"[RX] DATA from Node_3 (seq={seq}, hops=2)")
+        lines.append(f"[RX] Payload: CHUNK:{seq}:100:{_b64(150)}")
+        lines.append("[HELLO] Neighbor Node_2 (RSSI=-71, SNR=9.25)")
+        lines.append("[ROUTE] Node_3 via Node_2 (2 hops)")
+        lines.append("[TX] Sending HELLO beacon")
+    return lines
+
+
+def log_corpus() -> List[str]:
+    lines = []
+    for seq in range(200):
+        lines.append(f"LOG,RX,testId,7,slot,{seq % 12},sf,{7 + seq % 6},bw,125,seq,{seq},"
+                     f"len,32,toa_ms,61.7,txp_dbm,14,rssi_dbm,-98,snr_db,6.5,pathloss_db,112")
+        lines.append(f"LOG,EVENT,SLOT_START,testId,7,slot,{seq % 12},sf,{7 + seq % 6},bw,125")
+    return lines
+
+
+# ----------------------------
+# Runner
+# ----------------------------
+
+def measure(fn: Callable[[str], object], lines: List[str], seconds: float) -> Dict[str, float]:
+    """
+    Run fn over lines repeatedly for about `seconds` and keep the fastest
+    pass (like timeit), so scheduler noise does not decide the comparison.
+    """
+    nbytes = sum(len(l) for l in lines)
+    best = float("inf")
+    deadline = time.perf_counter() + seconds
+    while True:
+        t0 = time.perf_counter()
+        for line in lines:
+            fn(line)
+        t1 = time.perf_counter()
+        best = min(best, t1 - t0)
+        if t1 >= deadline:
+            break
+    return {
+        "lines_per_s": len(lines) / best,
+        "mb_per_s": nbytes / best / 1e6,
+    }
+
+
+def run(seconds: float = 1.0, filechunk_kb: int = 40) -> List[Dict[str, object]]:
+    cases = [
+        ("tunnel", tunnel_corpus(), old_tunnel, new_tunnel),
+        ("filechunk", filechunk_corpus(filechunk_kb), old_tunnel, new_tunnel),
+        ("mesh", mesh_corpus(), old_mesh, new_mesh),
+        ("log", log_corpus(), old_log, new_log),
+    ]
+    results = []
+    for name, lines, old_fn, new_fn in cases:
+        old = measure(old_fn, lines, seconds)
+        new = measure(new_fn, lines, seconds)
+        results.append({
+            "case": name,
+            "lines": len(lines),
+            "old_lines_per_s": old["lines_per_s"],
+            "new_lines_per_s": new["lines_per_s"],
+            "old_mb_per_s": old["mb_per_s"],
+            "new_mb_per_s": new["mb_per_s"],
+            "speedup": new["lines_per_s"] / old["lines_per_s"],
+        })
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark lineparse against the old script parsers.")
+    ap.add_argument("--seconds", type=float, default=1.0, help="Time budget per case and parser")
+    ap.add_argument("--filechunk-kb", type=int, default=40, help="Size of FILECHUNK payloads in the tunnel corpus")
+    args = ap.parse_args()
+
+    print(f"{'case':<10} {'old lines/s':>12} {'new lines/s':>12} {'old MB/s':>9} {'new MB/s':>9} {'speedup':>8}")
+    for r in run(args.seconds, args.filechunk_kb):
+        print(f"{r['case']:<10} {r['old_lines_per_s']:>12,.0f} {r['new_lines_per_s']:>12,.0f} "
+              f"{r['old_mb_per_s']:>9.1f} {r['new_mb_per_s']:>9.1f} {r['speedup']:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
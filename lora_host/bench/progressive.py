@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Time to first picture for progressive image transfers (lora_host.progressive).
+
+Encodes an image the way the tunnel senders do, once as the baseline JPEG
+and once with ``--progressive`` (thumbnail, then the scans as layers), and
+walks the progressive transfer chunk by chunk. For every point where the
+receiver has a new picture to show, it prints:
+
+  airtime s   tunnel airtime spent so far (bench.encodings.tunnel_airtime:
+              data packets only, SF7 / 500 kHz, no ACKs or retries)
+  bytes       file bytes delivered so far
+  psnr dB     the picture shown (thumbnail scaled up, then each preview)
+              against the source image
+
+A baseline JPEG shows nothing until its last chunk, so its only row is the
+complete file. The layer rows are also what ``--layers N`` would cost.
+
+Usage:
+    python -m lora_host.bench.progressive [IMAGE] [--quality 85] [--thumb-size 128] [--json out.json]
+"""
+
+import argparse
+import base64
+import io
+import json
+import math
+from pathlib import Path
+from typing import Dict, List
+
+from lora_host import progressive
+from lora_host.bench.encodings import EXP, tunnel_airtime
+
+SAMPLE = EXP / "11-Multimedia_Tunnel" / "earthquake.webp"
+CHUNK_SIZE = 40000
+
+
+def _jpeg(img, quality: int, progressive_scans: bool = False) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=quality, optimize=True, progressive=progressive_scans)
+    return buf.getvalue()
+
+
+def psnr(shown: bytes, ref) -> float:
+    from PIL import Image, ImageChops, ImageStat
+    img = Image.open(io.BytesIO(shown)).convert("RGB")
+    if img.size != ref.size:
+        img = img.resize(ref.size, Image.BICUBIC)
+    rms = ImageStat.Stat(ImageChops.difference(img, ref)).rms
+    mse = sum(r * r for r in rms) / len(rms)
+    return float("inf") if mse == 0 else 10.0 * math.log10(255.0 ** 2 / mse)
+
+
+def run(path: Path, quality: int = 85, thumb_side: int = progressive.THUMB_SIDE,
+        chunk_size: int = CHUNK_SIZE) -> List[Dict[str, object]]:
+    try:
+        from PIL import Image
+    except ImportError:
+        raise SystemExit("[ERROR] Pillow not installed. Run: pip install pillow") from None
+
+    ref = Image.open(path).convert("RGB")
+    name = path.with_suffix(".jpg").name
+    rows = []
+
+    base = _jpeg(ref, quality)
+    b64 = base64.b64encode(base).decode("ascii")
+    air = sum(tunnel_airtime(len(b64[i:i + chunk_size]), name)["airtime_s"]
+              for i in range(0, len(b64), chunk_size))
+    rows.append({"mode": "baseline", "step": "complete", "airtime_s": air,
+                 "bytes": len(base), "psnr_db": psnr(base, ref)})
+
+    air = 0.0
+    sent = 0
+    if thumb_side:
+        small = ref.copy()
+        small.thumbnail((thumb_side, thumb_side))
+        thumb = _jpeg(small, progressive.THUMB_QUALITY)
+        b64 = base64.b64encode(thumb).decode("ascii")
+        air += sum(tunnel_airtime(len(b64[i:i + chunk_size]), progressive.thumb_name(name))["airtime_s"]
+                   for i in range(0, len(b64), chunk_size))
+        sent += len(thumb)
+        rows.append({"mode": "progressive", "step": f"thumb {small.size[0]}x{small.size[1]}",
+                     "airtime_s": air, "bytes": sent, "psnr_db": psnr(thumb, ref)})
+
+    data, ends = progressive.layered(_jpeg(ref, quality, progressive_scans=True))
+    chars = 0
+    layer = 0
+    chunks = progressive.chunks(data, ends, chunk_size)
+    for i, chunk in enumerate(chunks):
+        air += tunnel_airtime(len(chunk), name)["airtime_s"]
+        chars += len(chunk)
+        got = chars // 4 * 3 if i < len(chunks) - 1 else len(data)
+        while layer < len(ends) and ends[layer] <= got:
+            layer += 1
+        step = f"{layer}/{len(ends)} scans" + ("" if got in ends or i == len(chunks) - 1 else " +part")
+        rows.append({"mode": "progressive", "step": f"chunk {i + 1}/{len(chunks)} {step}",
+                     "airtime_s": air, "bytes": sent + got,
+                     "psnr_db": psnr(progressive.preview(data[:got]), ref)})
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Time to first picture: baseline vs progressive JPEG transfers.")
+    ap.add_argument("image", nargs="?", default=str(SAMPLE), help="Image to encode (default: the tunnel sample)")
+    ap.add_argument("--quality", type=int, default=85, help="JPEG quality (tunnel senders' default 85)")
+    ap.add_argument("--thumb-size", type=int, default=progressive.THUMB_SIDE, help="Thumbnail px, 0 for none")
+    ap.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Base64 characters per FILECHUNK")
+    ap.add_argument("--json", default="", help="Also write the results here")
+    args = ap.parse_args()
+
+    rows = run(Path(args.image), args.quality, args.thumb_size, args.chunk_size)
+    print(f"{'mode':<12} {'step':<30} {'airtime s':>9} {'bytes':>9} {'psnr dB':>8}")
+    for r in rows:
+        print(f"{r['mode']:<12} {r['step']:<30} {r['airtime_s']:>9.1f} {r['bytes']:>9} {r['psnr_db']:>8.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"[OK] Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
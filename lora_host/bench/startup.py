@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Startup-time budget for the ``lora`` CLI (lora_host.cli).
+
+Every command is started the way a user would start it, ``lora <command>
+--help`` in a fresh interpreter, which imports everything the command needs
+before it can parse arguments and nothing it only needs for actual work.
+For each command this reports:
+
+  wall ms     best of ``--repeat`` runs of the whole process
+  import ms   sum of the top-level imports from ``python -X importtime``
+  modules     number of modules imported
+  heavy       heavy third-party modules that were imported
+
+A command fails if its wall time exceeds ``--budget-ms`` or it imports a
+heavy module that is not in its ``Command.heavy`` (e.g. Pillow for
+``lora recv``). Commands that declare heavy modules (``lora analyze``
+needs pandas) are held to ``--heavy-budget-ms`` instead. The bare
+interpreter start (``python -c pass``) is measured too, for reference: it
+is part of the wall time but not ours to cut.
+
+Exit status is 1 if any command fails, so this can gate a change.
+
+Usage:
+    python -m lora_host.bench.startup [--budget-ms 300] [--repeat 5] [--only recv,mesh] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from lora_host import cli
+
+REPO = Path(__file__).resolve().parents[2]
+
+BUDGET_MS = 300.0          # ~2x the slowest light command on a laptop
+HEAVY_BUDGET_MS = 1500.0   # commands that import numpy/pandas to start
+HEAVY = ("PIL", "pydub", "numpy", "pandas", "matplotlib", "scipy", "obspy", "tkinter")
+
+
+def cases(only: List[str]) -> List[Tuple[str, List[str], Tuple[str, ...]]]:
+    """(label, lora args, allowed heavy modules) for every command."""
+    out = [("--help", ["--help"], ())]
+    for name, cmd in cli.COMMANDS.items():
+        if only and name not in only:
+            continue
+        if cmd.choices:
+            out += [(f"{name} {c}", [name, c, "--help"], cmd.heavy) for c in cmd.choices]
+        else:
+            out.append((name, [name, "--help"], cmd.heavy))
+    return out
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (str(REPO), env.get("PYTHONPATH", "")) if p)
+    return env
+
+
+def wall_ms(argv: List[str], repeat: int) -> float:
+    best = float("inf")
+    env = _env()
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run(argv, cwd=REPO, env=env, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, check=False)
+        best = min(best, (time.perf_counter() - t0) * 1000.0)
+    return best
+
+
+def import_profile(args: List[str]) -> Tuple[float, List[str]]:
+    """(top-level import ms, module names) from one ``-X importtime`` run."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-m", "lora_host"] + args,
+                          cwd=REPO, env=_env(), stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE, text=True, check=False)
+    total_us = 0
+    names = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # header
+        name = parts[2][1:].rstrip()  # nested imports are indented by two more spaces
+        if not name.startswith(" "):  # top level: cumulative covers its children
+            total_us += int(parts[1])
+        names.append(name.strip())
+    return total_us / 1000.0, names
+
+
+def run(budget_ms: float = BUDGET_MS, heavy_budget_ms: float = HEAVY_BUDGET_MS,
+        repeat: int = 5, only: List[str] = ()) -> List[Dict[str, object]]:
+    results = []
+    for label, args, allowed in cases(list(only)):
+        imp_ms, names = import_profile(args)
+        roots = {n.split(".")[0] for n in names}
+        heavy = sorted(m for m in HEAVY if m in roots)
+        unexpected = [m for m in heavy if m not in allowed]
+        wall = wall_ms([sys.executable, "-m", "lora_host"] + args, repeat)
+        budget = heavy_budget_ms if allowed else budget_ms
+        results.append({
+            "command": label,
+            "wall_ms": wall,
+            "budget_ms": budget,
+            "import_ms": imp_ms,
+            "modules": len(names),
+            "heavy": heavy,
+            "unexpected": unexpected,
+            "ok": wall <= budget and not unexpected,
+        })
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Check the lora CLI startup time against a budget.")
+    ap.add_argument("--budget-ms", type=float, default=BUDGET_MS, help="Max wall time per command")
+    ap.add_argument("--heavy-budget-ms", type=float, default=HEAVY_BUDGET_MS,
+                    help="Max wall time for commands that declare heavy imports")
+    ap.add_argument("--repeat", type=int, default=5, help="Runs per command (best is kept)")
+    ap.add_argument("--only", default="", help="Comma-separated commands to check (default: all)")
+    ap.add_argument("--json", default="", help="Also write the results here")
+    args = ap.parse_args()
+
+    only = [c for c in args.only.split(",") if c]
+    bare = wall_ms([sys.executable, "-c", "pass"], args.repeat)
+    print(f"[INFO] Bare interpreter start: {bare:.0f} ms")
+    results = run(args.budget_ms, args.heavy_budget_ms, args.repeat, only)
+
+    print(f"{'command':<18} {'wall ms':>8} {'budget':>7} {'import ms':>9} {'modules':>8}  heavy")
+    for r in results:
+        flag = "" if r["ok"] else "  <-- FAIL"
+        heavy = ",".join(r["heavy"]) or "-"
+        print(f"{r['command']:<18} {r['wall_ms']:>8.0f} {r['budget_ms']:>7.0f} {r['import_ms']:>9.0f} "
+              f"{r['modules']:>8}  {heavy}{flag}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"bare_ms": bare, "results": results}, f, indent=2)
+        print(f"[OK] Wrote {args.json}")
+
+    failed = [r for r in results if not r["ok"]]
+    for r in failed:
+        why = (f"imports {', '.join(r['unexpected'])}" if r["unexpected"]
+               else f"{r['wall_ms']:.0f} ms > {r['budget_ms']:.0f} ms budget")
+        print(f"[ERROR] lora {r['command']}: {why}")
+    if failed:
+        sys.exit(1)
+    print(f"[OK] {len(results)} commands within budget")
+
+
+if __name__ == "__main__":
+    main()
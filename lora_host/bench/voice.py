@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Size, airtime, speed and quality of the NumPy voice codecs (lora_host.voice).
+
+Encodes a recording with every codec and reports per codec:
+
+  bytes / kbps  the file that would be sent
+  airtime s     its base64 FILECHUNK transfer through the tunnel
+                (bench.encodings.tunnel_airtime: data packets only,
+                SF7 / 500 kHz, no ACKs or retries)
+  enc / dec ms  best pass within ``--seconds``; "x rt" is the encode
+                speed as a multiple of real time
+  snr dB        waveform SNR against the 8 kHz reference (meaningless
+                for the vocoder, which only keeps the spectral envelope)
+  lsd dB        log-spectral distance on the louder half of the 22.5 ms
+                frames, which does compare the vocoder with the others
+
+The "source" row is the file as it is (dec ms: reading it), "pcm16" the
+8 kHz reference the codecs start from. "mp3" is what the senders do without ``--voice`` and is
+only measured when pydub and ffmpeg are installed.
+
+Usage:
+    python -m lora_host.bench.voice [AUDIO] [--mp3-bitrate 64k] [--seconds 0.5] [--json out.json]
+"""
+
+import argparse
+import base64
+import io
+import json
+import math
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from lora_host.bench.encodings import EXP, best_time, tunnel_airtime
+
+SAMPLE = EXP / "11-Multimedia_Tunnel" / "human_voice.wav"
+CHUNK_SIZE = 40000
+
+
+def _airtime(nbytes: int, name: str) -> float:
+    chars = len(base64.b64encode(b"\0" * nbytes))
+    return sum(tunnel_airtime(min(CHUNK_SIZE, chars - i), name)["airtime_s"]
+               for i in range(0, chars, CHUNK_SIZE))
+
+
+def _quality(ref, out) -> Dict[str, float]:
+    import numpy as np
+    from lora_host import voice
+    n = min(len(ref), len(out)) // voice.FRAME * voice.FRAME
+    r = ref[:n].astype(np.float64)
+    y = out[:n].astype(np.float64)
+    err = ((r - y) ** 2).sum()
+    snr = 10 * math.log10((r * r).sum() / err) if err else float("inf")
+    frames_r = r.reshape(-1, voice.FRAME)
+    frames_y = y.reshape(-1, voice.FRAME)
+    rms = np.sqrt((frames_r ** 2).mean(axis=1))
+    loud = rms >= np.median(rms)
+    win = np.hamming(voice.FRAME)
+
+    def spec(m):
+        return 20 * np.log10(np.abs(np.fft.rfft(m * win, 256)) + 1e-3)
+
+    lsd = np.sqrt(((spec(frames_r[loud]) - spec(frames_y[loud])) ** 2).mean(axis=1)).mean()
+    return {"snr_db": snr, "lsd_db": float(lsd)}
+
+
+def _mp3(path: Path, bitrate: str) -> Optional[bytes]:
+    try:
+        from pydub import AudioSegment  # pip install pydub
+        buf = io.BytesIO()
+        AudioSegment.from_file(path).export(buf, format="mp3", bitrate=bitrate)
+        return buf.getvalue()
+    except Exception as e:  # pydub or ffmpeg missing
+        print(f"[INFO] mp3 skipped: {e}")
+        return None
+
+
+def run(path: Path, mp3_bitrate: str = "64k", seconds: float = 0.5) -> List[Dict[str, object]]:
+    from lora_host import voice
+
+    raw = path.read_bytes()
+    t_read = best_time(lambda: voice.read_audio(raw), seconds)
+    x, rate = voice.read_audio(raw)
+    secs = len(x) / rate
+    ref = voice._pcm16(voice.resample(x, rate))
+    rows = []
+
+    def row(codec: str, data: bytes, name: str, enc_s: Optional[float], dec_s: Optional[float],
+            snr_db: Optional[float] = None, lsd_db: Optional[float] = None):
+        rows.append({"codec": codec, "bytes": len(data), "kbps": len(data) * 8 / secs / 1000,
+                     "airtime_s": _airtime(len(data), name),
+                     "enc_ms": None if enc_s is None else enc_s * 1000,
+                     "dec_ms": None if dec_s is None else dec_s * 1000,
+                     "x_realtime": secs / enc_s if enc_s else None, "snr_db": snr_db, "lsd_db": lsd_db})
+
+    row("source", raw, path.name, None, t_read)
+    pcm = voice.pcm_wav(ref, voice.RATE)
+    row("pcm16", pcm, path.name, None, None)
+
+    for codec in voice.CODECS:
+        data = voice.encode(x, rate, codec)
+        t_enc = best_time(lambda: voice.encode(x, rate, codec), seconds)
+        t_dec = best_time(lambda: voice.decode(data), seconds)
+        out, _ = voice.decode(data)
+        q = _quality(ref, out)
+        row(codec, data, path.with_suffix(voice.suffix(codec)).name, t_enc, t_dec,
+            None if codec == "lpc" else q["snr_db"], q["lsd_db"])
+
+    mp3 = _mp3(path, mp3_bitrate)
+    if mp3 is not None:
+        row(f"mp3 {mp3_bitrate}", mp3, path.with_suffix(".mp3").name, None, None)
+    return rows
+
+
+def _fmt(v: Optional[float], width: int) -> str:
+    return f"{'-':>{width}}" if v is None else f"{v:>{width}.1f}"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Size/airtime/speed/quality of the NumPy voice codecs.")
+    ap.add_argument("audio", nargs="?", default=str(SAMPLE), help="WAV or FLAC (default: the tunnel sample)")
+    ap.add_argument("--mp3-bitrate", default="64k", help="MP3 row bitrate (needs pydub + ffmpeg)")
+    ap.add_argument("--seconds", type=float, default=0.5, help="Time budget per timing")
+    ap.add_argument("--json", default="", help="Also write the results here")
+    args = ap.parse_args()
+
+    rows = run(Path(args.audio), args.mp3_bitrate, args.seconds)
+    print(f"{'codec':<10} {'bytes':>8} {'kbps':>6} {'airtime s':>9} {'enc ms':>7} {'dec ms':>7} "
+          f"{'x rt':>7} {'snr dB':>7} {'lsd dB':>7}")
+    for r in rows:
+        print(f"{r['codec']:<10} {r['bytes']:>8} {r['kbps']:>6.1f} {r['airtime_s']:>9.1f} "
+              f"{_fmt(r['enc_ms'], 7)} {_fmt(r['dec_ms'], 7)} {_fmt(r['x_realtime'], 7)} "
+              f"{_fmt(r['snr_db'], 7)} {_fmt(r['lsd_db'], 7)}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"[OK] Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+``lora``: one entry point for the host-side tools.
+
+    lora <command> [args ...]      same arguments as the script it runs
+    lora <command> --help
+    lora bench <name> [args ...]
+
+Each command is a row in ``COMMANDS`` naming either an experiment script
+(run as ``__main__``, so its own argparse, paths and fallbacks apply) or a
+``lora_host`` module with a ``main()``. Nothing is imported until a command
+is chosen: ``lora --help`` loads only this file, and ``lora recv`` never
+loads Pillow, pydub or pandas. ``heavy`` lists the third-party modules a
+command is expected to import just to start; ``lora bench startup``
+(lora_host.bench.startup) fails if any other heavy module shows up or a
+command misses the startup budget.
+
+The experiment scripts live in the numbered folders of the checkout, so
+install with ``pip install -e .`` from the repository root (``python -m
+lora_host`` works from a checkout without installing).
+"""
+
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+REPO = Path(__file__).resolve().parents[1]
+EXP = REPO / "03-FullStack_Experiments"
+
+
+@dataclass(frozen=True)
+class Command:
+    target: str                  # "path/to/script.py" under EXP, or a module name
+    help: str
+    heavy: Tuple[str, ...] = ()  # third-party modules it may import at startup
+    choices: Tuple[str, ...] = ()  # "{}" in a module target is filled with the first arg
+
+    @property
+    def is_script(self) -> bool:
+        return self.target.endswith(".py")
+
+
+COMMANDS: Dict[str, Command] = {
+    "send": Command("11-Multimedia_Tunnel/tx_send_file.py",
+                    "Send one file through the tunnel (image->JPEG, audio->MP3)"),
+    "recv": Command("11-Multimedia_Tunnel/rx_receive_file.py",
+                    "Listen on the tunnel RX node and write received files"),
+    "tunnel": Command("11-Multimedia_Tunnel/lora_transceiver.py",
+                      "Send and receive on one tunnel port (host ARQ, metrics, trace)"),
+    "mesh": Command("14-Mesh_Network/mesh_network_interface.py",
+                    "Mesh node host interface: send text/files, routes, stats"),
+    "mesh-recv": Command("14-Mesh_Network/mesh_receiver.py",
+                         "Listen on a mesh node and reassemble files"),
+    "capture": Command("13-Timing_Analysis/csv_capture.py",
+                       "Capture TX_CSV/RX_CSV timing lines into CSV files"),
+    "analyze": Command("lora_host.timing_analysis",
+                       "Join 13-Timing CSVs: RTT, retransmissions, airtime, goodput",
+                       heavy=("numpy", "pandas")),
+    "store": Command("lora_host.store", "Import pathloss/timing CSVs into SQLite and summarize"),
+    "replay": Command("lora_host.replay", "Replay traces or captures into the host parsers"),
+    "sim": Command("lora_host.arq_sim", "Simulate the tunnel ARQ modes on a lossy link"),
+    "fit": Command("lora_host.imgbudget", "Fit an image into a byte, deadline or airtime budget"),
+    "voice": Command("lora_host.voice", "Encode/decode 8 kHz voice: µ-law, IMA ADPCM or 2.4 kbps LPC",
+                     heavy=("numpy",)),
+    "check": Command("lora_host.conformance",
+                     "Replay captures through every receiver and compare with the original reassembly"),
+    "selfcheck": Command("lora_host.selfcheck", "Unit checks kept next to the modules they test"),
+    "bench": Command("lora_host.bench.{}", "Offline benchmarks",
+                     choices=("parse", "hotpath", "encodings", "progressive", "voice", "startup")),
+}
+
+
+def usage() -> str:
+    width = max(len(n) for n in COMMANDS)
+    lines = ["usage: lora <command> [args ...]", "", "commands:"]
+    for name, cmd in COMMANDS.items():
+        extra = f" ({'|'.join(cmd.choices)})" if cmd.choices else ""
+        lines.append(f"  {name:<{width}}  {cmd.help}{extra}")
+    lines += ["", "Run 'lora <command> --help' for the options of a command."]
+    return "\n".join(lines)
+
+
+def run(name: str, args: List[str]) -> int:
+    cmd = COMMANDS.get(name)
+    if cmd is None:
+        print(f"[ERROR] Unknown command {name!r}\n\n{usage()}", file=sys.stderr)
+        return 2
+    prog = f"lora {name}"
+    target = cmd.target
+
+    if cmd.choices:
+        if not args or args[0] in ("-h", "--help"):
+            print(f"usage: {prog} {{{','.join(cmd.choices)}}} [args ...]")
+            return 0 if args else 2
+        if args[0] not in cmd.choices:
+            print(f"[ERROR] {prog}: choose from {', '.join(cmd.choices)}", file=sys.stderr)
+            return 2
+        prog = f"{prog} {args[0]}"
+        target = target.format(args[0])
+        args = args[1:]
+
+    # argparse takes prog from argv[0]
+    sys.argv = [prog] + args
+    try:
+        if cmd.is_script:
+            path = EXP / target
+            if not path.is_file():
+                print(f"[ERROR] {path} not found; '{prog}' needs the repository checkout "
+                      f"(pip install -e .)", file=sys.stderr)
+                return 2
+            import runpy
+            # As with `python script.py`: sibling modules are importable
+            sys.path.insert(0, str(path.parent))
+            runpy.run_path(str(path), run_name="__main__")
+        else:
+            import importlib
+            importlib.import_module(target).main()
+    except SystemExit as e:
+        code = e.code
+        if code is None or isinstance(code, int):
+            return code or 0
+        print(code, file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return 0 if argv else 2
+    return run(argv[0], argv[1:])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
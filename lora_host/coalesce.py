@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Nagle-style coalescing of short mesh text messages.
+
+Every ``SEND:`` pays the same fixed cost on air: preamble, the
+``T|S|D|Q|H|L|R|:`` packet header and, for reliability > 0, a whole ACK
+round trip. For 10-byte messages that is most of the airtime. A
+``Coalescer`` holds short messages for the same (destination, reliability)
+for at most ``linger_s`` and sends them as one payload:
+
+    BATCH:<len>,<len>,...:<text><text>...
+
+Lengths are in characters, so the texts need no escaping. A batch is sent
+as soon as the next message would not fit in ``max_chars`` (the
+single-packet text limit of ``send_text``), when its oldest message has
+waited ``linger_s``, or on ``flush()``. While one batch is on air (the
+node blocks on a SEND until its ACK), new messages keep accumulating, as
+in Nagle's algorithm. A batch of one is sent as the plain text, so
+receivers without ``unpack`` still get single messages unchanged.
+
+Each message gets its own ``Future`` that resolves to the send result of
+the packet that carried it ('ok', 'failed', 'timeout', ...), and optional
+per-message callbacks run (on the worker thread) when it does.
+
+``unpack(payload)`` is the receiver side (``MeshReceiver``); a payload that
+is not a well-formed batch comes back as ``[payload]``.
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+PREFIX = "BATCH:"
+MAX_CHARS = 150     # send_text's single-packet limit (keeps T|S|D|... + data < 255 bytes)
+LINGER_S = 0.2      # longest a message waits for company
+
+
+def pack(texts: List[str]) -> str:
+    """One payload carrying ``texts``; a single text is returned as is."""
+    if len(texts) == 1 and not texts[0].startswith(PREFIX):
+        return texts[0]
+    return PREFIX + ",".join(str(len(t)) for t in texts) + ":" + "".join(texts)
+
+
+def packed_len(texts_len: int, count: int, lens_len: int) -> int:
+    """Length of ``pack`` output given total text length, count and summed digit count."""
+    if count == 1:
+        return texts_len
+    return len(PREFIX) + lens_len + (count - 1) + 1 + texts_len
+
+
+def unpack(payload: str) -> List[str]:
+    """The messages in a ``pack`` payload, or ``[payload]`` if it is not one."""
+    if not payload.startswith(PREFIX):
+        return [payload]
+    head, sep, body = payload[len(PREFIX):].partition(":")
+    if not sep:
+        return [payload]
+    try:
+        lens = [int(x) for x in head.split(",")]
+    except ValueError:
+        return [payload]
+    out = []
+    off = 0
+    for n in lens:
+        if n < 0 or off > len(body):
+            return [payload]
+        out.append(body[off:off + n])
+        off += n
+    # Short only if the node's trim() ate trailing blanks of the last text
+    if off < len(body):
+        return [payload]
+    return out
+
+
+class _Batch:
+    __slots__ = ("texts", "futs", "chars", "digits", "first")
+
+    def __init__(self, now: float):
+        self.texts: List[str] = []
+        self.futs: List[Future] = []
+        self.chars = 0
+        self.digits = 0
+        self.first = now
+
+    def size_with(self, text: str) -> int:
+        return packed_len(self.chars + len(text), len(self.texts) + 1,
+                          self.digits + len(str(len(text))))
+
+
+class Coalescer:
+    """
+    Collects short texts per (dest, reliability) and hands each batch to
+    ``send(dest, reliability, payload, count) -> str`` on a worker thread.
+    """
+
+    def __init__(self, send: Callable[[str, int, str, int], str],
+                 linger_s: float = LINGER_S, max_chars: int = MAX_CHARS):
+        self.send = send
+        self.linger_s = linger_s
+        self.max_chars = max_chars
+        self._batches: Dict[Tuple[str, int], _Batch] = {}
+        self._ready: List[Tuple[Tuple[str, int], _Batch]] = []
+        self._cv = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.sent_packets = 0
+        self.sent_messages = 0
+
+    def fits(self, text: str) -> bool:
+        return len(text) <= self.max_chars and "\n" not in text
+
+    def submit(self, dest: str, reliability: int, text: str,
+               callback: Optional[Callable[[str], None]] = None) -> Future:
+        """Queue ``text``; the Future resolves to the result of its packet."""
+        fut: Future = Future()
+        if callback is not None:
+            fut.add_done_callback(lambda f: callback(f.result()))
+        with self._cv:
+            if self._closed:
+                fut.set_result('error')
+                return fut
+            key = (dest, reliability)
+            now = time.monotonic()
+            b = self._batches.get(key)
+            if b is not None and b.size_with(text) > self.max_chars:
+                self._ready.append((key, self._batches.pop(key)))
+                b = None
+            if b is None:
+                b = self._batches[key] = _Batch(now)
+            b.texts.append(text)
+            b.futs.append(fut)
+            b.chars += len(text)
+            b.digits += len(str(len(text)))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="mesh-coalesce", daemon=True)
+                self._thread.start()
+            self._cv.notify()
+        return fut
+
+    def flush(self) -> None:
+        """Send everything queued now, without waiting for the linger time."""
+        with self._cv:
+            self._ready.extend(self._batches.items())
+            self._batches.clear()
+            self._cv.notify()
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Flush, then stop the worker once the queue is empty."""
+        with self._cv:
+            self._closed = True
+        self.flush()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _next(self) -> Optional[Tuple[Tuple[str, int], _Batch]]:
+        with self._cv:
+            while True:
+                if self._ready:
+                    return self._ready.pop(0)
+                if not self._batches:
+                    if self._closed:
+                        return None
+                    self._cv.wait()
+                    continue
+                now = time.monotonic()
+                key, b = min(self._batches.items(), key=lambda kv: kv[1].first)
+                wait = b.first + self.linger_s - now
+                if wait <= 0:
+                    return key, self._batches.pop(key)
+                self._cv.wait(wait)
+
+    def _run(self) -> None:
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            (dest, rel), b = item
+            try:
+                result = self.send(dest, rel, pack(b.texts), len(b.texts))
+            except Exception:
+                result = 'error'
+            self.sent_packets += 1
+            self.sent_messages += len(b.texts)
+            for fut in b.futs:
+                fut.set_result(result)
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Conformance check for lora_host.reassembly: every tunnel-style receiver
+must write the same files the per-script code it replaced did.
+
+Each scenario is a capture of RX MCU lines carrying FILE, FILECHUNK and
+plain-text payloads as FRAG/MSG lines. Scenarios cover in-order, shuffled,
+duplicated and interleaved delivery, plus MCU noise. Every scenario is fed
+through each receiver's real read loop on a replay.ReplaySerial:
+
+  mseed6/7/8  rx_receive_mseed.main           files in the working directory
+  rx_file     rx_receive_file.main            <out-dir>/<stem>_rx<ext>
+  session     LoRaSerialSession._reader_loop  <out-dir>/<stem>_rx<ext>
+
+The files each receiver leaves behind are compared with ``legacy_files``,
+by name and byte for byte. ``legacy_files`` is the dict-based
+MessageReassembler / FileChunkAssembler that used to be copy-pasted into
+those scripts, kept here unchanged as the reference. A scenario runs only
+against receivers that understood its payload format before: v6 had no
+FILECHUNK, and only the tunnel receivers decoded the non-base64 textcodec
+encodings. Leftover ``.part`` files count as a failure.
+
+Unit checks of the library's own guarantees follow: expiry, bounds,
+out-of-range indices, streaming memory and cleanup after errors.
+
+Prints one PASS/FAIL line per check; exit status 1 on any failure.
+
+Usage:
+    python -m lora_host.conformance [--only session,mseed8] [-v]
+"""
+
+import argparse
+import base64
+import contextlib
+import importlib.util
+import io
+import os
+import random
+import sys
+import tempfile
+import types
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from lora_host import lineparse, progressive, reassembly, replay, textcodec
+
+FRAG_CHARS = 220    # 11-Multimedia_Tunnel.ino FRAG_CHUNK
+SRC_A = "A1B2C3D4E5F6"
+SRC_B = "0F0E0D0C0B0A"
+
+# receiver -> payload formats it handled before the shared library
+RECEIVERS: Dict[str, Tuple[str, ...]] = {
+    "mseed6": ("file",),
+    "mseed7": ("file", "chunk"),
+    "mseed8": ("file", "chunk"),
+    "rx_file": ("file", "chunk", "codec"),
+    "session": ("file", "chunk", "codec"),
+}
+SUFFIX = {"rx_file": "_rx", "session": "_rx"}
+
+
+# ----------------------------
+# Reference: the pre-library per-script algorithm
+# ----------------------------
+
+class LegacyMessageReassembler:
+    """The MessageReassembler every receiver carried a copy of."""
+
+    def __init__(self):
+        # (src, seq) -> {"tot": int, "chunks": {idx: str}}
+        self.messages = {}
+
+    def add_frag(self, src, seq, idx, tot, chunk):
+        key = (src, seq)
+        if key not in self.messages:
+            self.messages[key] = {"tot": tot, "chunks": {}}
+        msg = self.messages[key]
+        msg["tot"] = tot
+        msg["chunks"][idx] = chunk
+
+        if len(msg["chunks"]) == msg["tot"]:
+            ordered = [msg["chunks"][i] for i in range(msg["tot"])]
+            full_payload = "".join(ordered)
+            del self.messages[key]
+            return full_payload
+        return None
+
+
+def legacy_files(lines: List[str], suffix: str = "") -> Dict[str, bytes]:
+    """Files the old receivers wrote for ``lines`` (name -> contents)."""
+    out: Dict[str, bytes] = {}
+    files: Dict[str, dict] = {}
+    reasm = LegacyMessageReassembler()
+
+    def name(fname: str) -> str:
+        p = Path(fname)
+        return f"{p.stem}{suffix}{p.suffix}" if suffix else fname
+
+    def payload(text: str) -> None:
+        ev = lineparse.parse_tunnel_payload(text)
+        if type(ev) is lineparse.FileChunk:
+            entry = files.setdefault(ev.fname, {"tot": ev.tot, "chunks": {}})
+            entry["tot"] = ev.tot
+            entry["chunks"][ev.idx] = ev.b64
+            if len(entry["chunks"]) == entry["tot"]:
+                full = "".join(entry["chunks"][i] for i in range(entry["tot"]))
+                del files[ev.fname]
+                try:
+                    out[name(ev.fname)] = textcodec.decode(full)
+                except ValueError:
+                    pass
+        elif type(ev) is lineparse.FileBlob:
+            try:
+                out[name(ev.fname)] = textcodec.decode(ev.b64)
+            except ValueError:
+                pass
+
+    for line in lines:
+        ev = lineparse.parse_line(line)
+        if type(ev) is lineparse.Msg:
+            payload(ev.text)
+        elif type(ev) is lineparse.Frag:
+            full = reasm.add_frag(ev.src, ev.seq, ev.idx, ev.tot, ev.chunk)
+            if full is not None:
+                payload(full)
+    return out
+
+
+# ----------------------------
+# Scenarios
+# ----------------------------
+
+class Capture:
+    """Builds the FRAG/MSG lines an RX MCU prints for a series of payloads."""
+
+    def __init__(self):
+        self.seq: Dict[str, int] = {}
+
+    def frags(self, payload: str, src: str = SRC_A) -> List[str]:
+        seq = self.seq.get(src, 0)
+        self.seq[src] = seq + 1
+        parts = [payload[i:i + FRAG_CHARS] for i in range(0, len(payload), FRAG_CHARS)] or [""]
+        if len(parts) == 1:
+            return [f"MSG,{src},{seq},-61,3.20,{parts[0]}"]
+        return [f"FRAG,{src},{seq},{i},{len(parts)},-61,3.20,{p}" for i, p in enumerate(parts)]
+
+
+def _bytes(n: int, seed: int) -> bytes:
+    return random.Random(seed).randbytes(n)
+
+
+def _chunks(fname: str, data: bytes, chunk_chars: int, encoding: str = textcodec.DEFAULT) -> List[str]:
+    text = textcodec.encode(data, encoding)
+    parts = [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)] or [""]
+    return [f"FILECHUNK:{fname}:{i}:{len(parts)}:{p}" for i, p in enumerate(parts)]
+
+
+def scenarios() -> List[Tuple[str, str, List[str]]]:
+    """(name, payload format, capture lines)"""
+    out = []
+    rng = random.Random(47)
+
+    cap = Capture()
+    out.append(("file_in_msg", "file", cap.frags("FILE:small.txt:" + base64.b64encode(b"hello seismic\n").decode())))
+
+    cap = Capture()
+    out.append(("file_fragmented", "file", cap.frags("FILE:blob.bin:" + base64.b64encode(_bytes(3000, 1)).decode())))
+
+    cap = Capture()
+    lines = ["=== LoRa Chat (PC Reassembly Mode) ===", "[RX] boot", "FRAG,bad,line"]
+    lines += cap.frags("just some chat text")
+    lines += cap.frags("FILE:note.txt:" + base64.b64encode(b"between the noise").decode())
+    lines += ["MSG,short", "[TX DONE]"]
+    lines += cap.frags("FILE:broken.bin:@@@")  # undecodable: no file
+    out.append(("text_and_noise", "file", lines))
+
+    cap = Capture()
+    lines = []
+    for c in _chunks("quake.mseed", _bytes(30000, 2), 4000):
+        lines += cap.frags(c)
+    out.append(("chunks_in_order", "chunk", lines))
+
+    cap = Capture()
+    msgs = [cap.frags(c) for c in _chunks("shuffled.bin", _bytes(20000, 3), 3000)]
+    rng.shuffle(msgs)
+    lines = []
+    for m in msgs:
+        rng.shuffle(m)
+        lines += m
+    out.append(("chunks_shuffled", "chunk", lines))
+
+    cap = Capture()
+    lines = []
+    for c in _chunks("dup.bin", _bytes(12000, 4), 4000):
+        m = cap.frags(c)
+        lines += m + m[:2]                # retransmitted fragments
+        lines += cap.frags(c)             # the whole chunk again, new seq
+    out.append(("chunks_duplicated", "chunk", lines))
+
+    cap = Capture()
+    a = [cap.frags(c, SRC_A) for c in _chunks("from_a.bin", _bytes(9000, 5), 3000)]
+    b = [cap.frags(c, SRC_B) for c in _chunks("from_b.bin", _bytes(7000, 6), 3000)]
+    fa = [l for m in a for l in m]
+    fb = [l for m in b for l in m]
+    lines = [l for pair in zip(fa, fb) for l in pair] + fa[len(fb):] + fb[len(fa):]
+    out.append(("two_sources_interleaved", "chunk", lines))
+
+    cap = Capture()
+    lines = []
+    for c in _chunks("odd.bin", _bytes(10001, 7), 4001):  # chunks not on 4-char groups
+        lines += cap.frags(c)
+    out.append(("chunks_unaligned", "chunk", lines))
+
+    cap = Capture()
+    out.append(("empty_file", "chunk", cap.frags("FILECHUNK:empty.bin:0:1:")))
+
+    for enc in ("a85", "z85", "b91"):
+        cap = Capture()
+        msgs = [cap.frags(c) for c in _chunks(f"coded_{enc}.bin", _bytes(15000, 8), 4000, enc)]
+        msgs[0], msgs[1] = msgs[1], msgs[0]   # first (tagged) chunk arrives second
+        out.append((f"chunks_{enc}", "codec", [l for m in msgs for l in m]))
+
+    try:
+        from PIL import Image
+    except ImportError:
+        Image = None  # the progressive JPEG scenario needs Pillow to make one
+    if Image is not None:
+        buf = io.BytesIO()
+        Image.effect_noise((320, 200), 40).convert("RGB").save(buf, format="JPEG", quality=85, progressive=True)
+        data, ends = progressive.layered(buf.getvalue())
+        texts = progressive.chunks(data, ends, 3000)
+        cap = Capture()
+        lines = []
+        for i, c in enumerate(texts):   # receivers with previews must leave only the final file
+            lines += cap.frags(f"FILECHUNK:photo.jpg:{i}:{len(texts)}:{c}")
+        out.append(("progressive_jpeg", "chunk", lines))
+    return out
+
+
+# ----------------------------
+# Receivers
+# ----------------------------
+
+def _load(rel: str, name: str):
+    spec = importlib.util.spec_from_file_location(name, replay.EXP / rel)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def _run_mseed(key: str) -> Callable[[List[str], Path], None]:
+    def run(lines: List[str], out_dir: Path) -> None:
+        mod = _load(replay.MSEED_RX[key], f"_conformance_{key}")
+        ser = replay.ReplaySerial([(0.0, l) for l in lines])
+        mod.serial = types.SimpleNamespace(Serial=lambda *a, **k: ser)
+        mod.time = types.SimpleNamespace(sleep=lambda s: None)  # no 2 s boot wait
+        prev = os.getcwd()
+        os.chdir(out_dir)
+        try:
+            mod.main()
+        finally:
+            os.chdir(prev)
+    return run
+
+
+def _run_rx_file(lines: List[str], out_dir: Path) -> None:
+    mod = _load("11-Multimedia_Tunnel/rx_receive_file.py", "_conformance_rx_file")
+    ser = replay.ReplaySerial([(0.0, l) for l in lines])
+    mod.ready = types.SimpleNamespace(open_port=lambda *a, **k: ser)
+    argv = sys.argv
+    sys.argv = ["rx_receive_file.py", "replay", "--out-dir", str(out_dir)]
+    try:
+        mod.main()
+    finally:
+        sys.argv = argv
+
+
+def _run_session(lines: List[str], out_dir: Path) -> None:
+    replay.run_session(replay.ReplaySerial([(0.0, l) for l in lines]), out_dir)
+
+
+RUNNERS: Dict[str, Callable[[List[str], Path], None]] = {
+    **{k: _run_mseed(k) for k in ("mseed6", "mseed7", "mseed8")},
+    "rx_file": _run_rx_file,
+    "session": _run_session,
+}
+
+
+def written(out_dir: Path) -> Dict[str, bytes]:
+    return {p.name: p.read_bytes() for p in out_dir.iterdir() if p.is_file()}
+
+
+def diff(got: Dict[str, bytes], want: Dict[str, bytes]) -> str:
+    problems = []
+    for n in sorted(set(want) - set(got)):
+        problems.append(f"missing {n}")
+    for n in sorted(set(got) - set(want)):
+        problems.append(f"unexpected {n}")
+    for n in sorted(set(got) & set(want)):
+        if got[n] != want[n]:
+            problems.append(f"{n} differs ({len(got[n])} vs {len(want[n])} bytes)")
+    return ", ".join(problems)
+
+
+# ----------------------------
+# Library checks
+# ----------------------------
+
+class _Clock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def check_msg_expiry() -> Optional[str]:
+    clk = _Clock()
+    r = reassembly.MessageReassembler(ttl_s=10, clock=clk)
+    r.add_frag("a", 1, 0, 2, "AA")          # stale half of an old message
+    clk.t += 11
+    if r.add_frag("a", 1, 1, 2, "BB") is not None:
+        return "stale fragment completed a new message"
+    if r.expired != 1:
+        return f"expired={r.expired}, want 1"
+    if r.add_frag("a", 1, 0, 2, "CC") != "CCBB":
+        return "message after expiry did not reassemble"
+    return None
+
+
+def check_msg_bounds() -> Optional[str]:
+    r = reassembly.MessageReassembler(max_pending=4, max_chars=1000)
+    for seq in range(10):
+        r.add_frag("a", seq, 0, 3, "x" * 100)
+    if r.pending()[0] > 4 or r.evicted != 6:
+        return f"pending={r.pending()}, evicted={r.evicted}"
+    for seq in range(10, 30):
+        r.add_frag("b", seq, 0, 3, "y" * 300)
+    if r._chars > 1000 + 300:
+        return f"{r._chars} chars buffered, limit 1000"
+    return None
+
+
+def check_msg_out_of_range() -> Optional[str]:
+    r = reassembly.MessageReassembler()
+    if r.add_frag("a", 1, 5, 3, "zz") is not None or r.add_frag("a", 1, -1, 3, "zz") is not None:
+        return "out-of-range fragment accepted"
+    parts = [r.add_frag("a", 1, i, 3, c) for i, c in enumerate("xyz")]
+    if parts[-1] != "xyz" or r.dropped != 2:
+        return f"got {parts[-1]!r}, dropped={r.dropped}"
+    return None
+
+
+def check_file_streaming_memory() -> Optional[str]:
+    with tempfile.TemporaryDirectory() as tmp:
+        asm = reassembly.FileChunkAssembler(Path(tmp))
+        data = _bytes(2_000_000, 9)
+        chunks = _chunks("big.bin", data, 40000)
+        peak = 0
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            for c in chunks:
+                ev = lineparse.parse_tunnel_payload(c)
+                asm.add_chunk(ev.fname, ev.idx, ev.tot, ev.b64)
+                peak = max(peak, asm._chars)
+        if (Path(tmp) / "big.bin").read_bytes() != data:
+            return "output differs"
+        if peak > 40000:
+            return f"{peak} chars buffered in order, want <= one chunk"
+    return None
+
+
+def check_file_cleanup() -> Optional[str]:
+    with tempfile.TemporaryDirectory() as tmp:
+        clk = _Clock()
+        asm = reassembly.FileChunkAssembler(Path(tmp), ttl_s=60, clock=clk)
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            asm.add_chunk("stale.bin", 0, 3, "QUJD" * 10)
+            if not any(Path(tmp).glob("*.part")):
+                return "no .part while streaming"
+            clk.t += 61
+            asm.expire()
+            asm.add_chunk("bad.bin", 0, 1, "QUJ")   # incomplete base64 group
+            asm.add_chunk("open.bin", 0, 2, "QUJD")
+            asm.close()
+        left = sorted(p.name for p in Path(tmp).iterdir())
+        if left:
+            return f"left behind: {', '.join(left)}"
+    return None
+
+
+LIB_CHECKS: Dict[str, Callable[[], Optional[str]]] = {
+    "lib/msg_expiry": check_msg_expiry,
+    "lib/msg_bounds": check_msg_bounds,
+    "lib/msg_out_of_range": check_msg_out_of_range,
+    "lib/file_streaming_memory": check_file_streaming_memory,
+    "lib/file_cleanup": check_file_cleanup,
+}
+
+
+# ----------------------------
+# CLI
+# ----------------------------
+
+def run(only: List[str], verbose: bool = False) -> List[Tuple[str, Optional[str]]]:
+    results: List[Tuple[str, Optional[str]]] = []
+    receivers = [r for r in RECEIVERS if not only or r in only]
+    for name, fmt, lines in scenarios():
+        for rx in receivers:
+            if fmt not in RECEIVERS[rx]:
+                continue
+            want = legacy_files(lines, SUFFIX.get(rx, ""))
+            with tempfile.TemporaryDirectory(prefix="conformance_") as tmp:
+                out_dir = Path(tmp)
+                with open(os.devnull, "w") as devnull:
+                    sink = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(devnull)
+                    try:
+                        with sink:
+                            RUNNERS[rx](lines, out_dir)
+                    except replay.ReplayDone:
+                        pass
+                got = written(out_dir)
+            if not want and name != "text_and_noise":
+                results.append((f"{name}/{rx}", "reference wrote nothing"))
+                continue
+            results.append((f"{name}/{rx}", diff(got, want) or None))
+    for name, fn in LIB_CHECKS.items():
+        results.append((name, fn()))
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Check the shared reassembly against the original receivers.")
+    ap.add_argument("--only", default="", help=f"Comma-separated receivers ({', '.join(RECEIVERS)})")
+    ap.add_argument("-v", "--verbose", action="store_true", help="Show the receivers' console output")
+    args = ap.parse_args()
+
+    only = [r for r in args.only.split(",") if r]
+    results = run(only, args.verbose)
+    for name, problem in results:
+        print(f"[{'FAIL' if problem else 'PASS'}] {name}" + (f": {problem}" if problem else ""))
+    failed = sum(1 for _, p in results if p)
+    if failed:
+        print(f"[ERROR] {failed} of {len(results)} checks failed")
+        sys.exit(1)
+    print(f"[OK] {len(results)} checks passed")
+
+
+if __name__ == "__main__":
+    main()
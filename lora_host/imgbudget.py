@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Fit an image into a byte or airtime budget.
+
+A fixed JPEG quality gives wildly different sizes from photo to photo,
+and so wildly different airtime. ``fit`` instead searches resolution,
+quality and chroma subsampling for the best-looking JPEG that stays
+within ``max_bytes``:
+
+  1. long side   bisection for the largest long side (>= min_side) that
+                 fits at ``q_min`` with 4:2:0, first probing where bytes
+                 ~ pixels puts it. Resolution only drops when quality
+                 alone cannot make the budget.
+  2. quality     at that size and at 80 % of it, bisection for the highest
+                 quality <= ``q_max`` that fits, per subsampling (4:2:0,
+                 4:2:2, 4:4:4). The denser subsampling's quality bounds
+                 the next search from above.
+  3. score       every candidate is decoded, scaled to the largest
+                 candidate's size and scored by PSNR against the source
+                 resized to that size. Lost resolution counts against a
+                 candidate just like lost quality. The best one wins.
+
+Every resize and every encode is cached. Each search point is encoded
+once, and the scoring reference is the resize already made for step 1.
+A 1920x1280 photo takes 30-40 encodes, under a second on a laptop.
+
+``budget_bytes`` turns a deadline (wall-clock seconds, the firmware ARQ
+simulated by lora_host.arq_sim at the given SF/BW) or a pure airtime
+allowance into ``max_bytes`` for a base64 FILECHUNK transfer. Where the
+sketch's TDD mode cannot deliver, the deadline assumes the fastest mode
+that can (``delivering_mode``). Denser textcodec encodings only make that
+conservative.
+
+Used by ``--max-bytes`` / ``--deadline`` in tx_send_file.py and
+lora_transceiver.py, and by the budget fields of gui_app.py.
+
+Usage:
+    python -m lora_host.imgbudget IMAGE (--max-bytes N | --deadline S | --airtime S) [--sf 9 --bw-khz 125] [--out small.jpg]
+"""
+
+import argparse
+import io
+import math
+import time
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Optional, Tuple
+
+from lora_host import arq_sim
+
+Q_MIN = 40            # below this, drop resolution first
+Q_FLOOR = 5           # last resort at MIN_SIDE
+MIN_SIDE = 96         # px, long side
+SIDE_TOL = 16         # px, bisection resolution for the long side
+SUBSAMPLING = {2: "4:2:0", 1: "4:2:2", 0: "4:4:4"}
+CHUNK_CHARS = 40000   # tunnel senders' FILECHUNK size
+ARQ_MODE = "TDD"      # 11-Multimedia_Tunnel.ino gArqMode default
+SKETCH_MODES = {"SW": "ARQ_STOP_AND_WAIT", "GBN": "ARQ_GO_BACK_N",
+                "SR": "ARQ_SELECTIVE_REPEAT", "TDD": "ARQ_TDD_BLOCK_ACK"}
+
+
+@dataclass
+class Fit:
+    data: bytes
+    size: Tuple[int, int]
+    quality: int
+    subsampling: int      # Pillow code, see SUBSAMPLING
+    psnr_db: float
+    encodes: int
+    seconds: float
+
+    def describe(self) -> str:
+        return (f"{self.size[0]}x{self.size[1]} q{self.quality} {SUBSAMPLING[self.subsampling]}, "
+                f"{len(self.data)} bytes, {self.psnr_db:.1f} dB PSNR "
+                f"({self.encodes} encodes, {self.seconds * 1000:.0f} ms)")
+
+
+def _bisect_max(lo: int, hi: int, fits: Callable[[int], bool], tol: int = 1,
+                guess: Optional[int] = None) -> Optional[int]:
+    """
+    Largest x in [lo, hi] (to within ``tol``) with fits(x); fits must flip
+    once, True to False. A ``guess`` is probed first, with a step of 10 %
+    around it, to narrow the bracket.
+    """
+    if not fits(lo):
+        return None
+    if fits(hi):
+        return hi
+    if guess is not None and lo < guess < hi:
+        step = max(tol, (hi - lo) // 10)
+        if fits(guess):
+            lo = guess
+            nxt = min(hi, guess + step)
+            if nxt < hi and fits(nxt):
+                lo = nxt
+            else:
+                hi = nxt
+        else:
+            hi = guess
+            nxt = max(lo, guess - step)
+            if nxt > lo and not fits(nxt):
+                hi = nxt
+            else:
+                lo = nxt
+    while hi - lo > tol:
+        mid = (lo + hi) // 2
+        if fits(mid):
+            lo = mid
+        else:
+            hi = mid
+    return lo
+
+
+class _Search:
+    """Caches resized sources, encodes and the PSNR reference for one image."""
+
+    def __init__(self, img, progressive: bool):
+        from PIL import Image
+        self.Image = Image
+        self.src = img.convert("RGB")
+        self.full = max(self.src.size)
+        self.progressive = progressive
+        self.resized: Dict[int, object] = {self.full: self.src}
+        self.sizes: Dict[Tuple[int, int, int], int] = {}
+        self.encoded: Dict[Tuple[int, int, int], bytes] = {}
+        self.encodes = 0
+
+    def image(self, side: int):
+        im = self.resized.get(side)
+        if im is None:
+            w, h = self.src.size
+            s = side / self.full
+            im = self.resized[side] = self.src.resize(
+                (max(1, round(w * s)), max(1, round(h * s))), self.Image.LANCZOS)
+        return im
+
+    def size(self, side: int, sub: int, q: int) -> int:
+        key = (side, sub, q)
+        n = self.sizes.get(key)
+        if n is None:
+            buf = io.BytesIO()
+            self.image(side).save(buf, format="JPEG", quality=q, subsampling=sub,
+                                  optimize=True, progressive=self.progressive)
+            self.encodes += 1
+            data = buf.getvalue()
+            n = self.sizes[key] = len(data)
+            self.encoded[key] = data
+        return n
+
+    def psnr(self, data: bytes, ref_side: int) -> float:
+        """PSNR of ``data`` scaled to the source resized to ``ref_side``."""
+        from PIL import ImageChops, ImageStat
+        ref = self.image(ref_side)
+        im = self.Image.open(io.BytesIO(data)).convert("RGB")
+        if im.size != ref.size:
+            im = im.resize(ref.size, self.Image.BICUBIC)
+        rms = ImageStat.Stat(ImageChops.difference(im, ref)).rms
+        mse = sum(r * r for r in rms) / len(rms)
+        return float("inf") if mse == 0 else 10.0 * math.log10(255.0 ** 2 / mse)
+
+
+def fit(img, max_bytes: int, q_max: int = 90, q_min: int = Q_MIN, min_side: int = MIN_SIDE,
+        progressive: bool = False) -> Fit:
+    """
+    Best JPEG of ``img`` (a PIL image) within ``max_bytes``; see the module
+    docstring. Raises ValueError if even MIN_SIDE px at Q_FLOOR is too big.
+    """
+    t0 = time.perf_counter()
+    s = _Search(img, progressive)
+    q_max = max(q_max, q_min)
+    min_side = min(min_side, s.full)
+
+    def fits(side: int, sub: int, q: int) -> bool:
+        return s.size(side, sub, q) <= max_bytes
+
+    guess = int(s.full * math.sqrt(max_bytes / s.size(s.full, 2, q_min)))
+    side = _bisect_max(min_side, s.full, lambda x: fits(x, 2, q_min), SIDE_TOL, guess)
+    if side is None:
+        q = _bisect_max(Q_FLOOR, q_min, lambda x: fits(min_side, 2, x))
+        if q is None:
+            raise ValueError(f"budget of {max_bytes} bytes is below the smallest JPEG "
+                             f"({s.size(min_side, 2, Q_FLOOR)} bytes at {min_side} px, q{Q_FLOOR})")
+        cands = [(min_side, 2, q)]
+    else:
+        sides = [side] if side == s.full and fits(side, 2, q_max) else [side, max(min_side, side * 4 // 5)]
+        cands = []
+        for sd in sides:
+            hi = q_max
+            for sub in SUBSAMPLING:
+                q = _bisect_max(q_min, hi, lambda x: fits(sd, sub, x))
+                if q is None:
+                    break
+                cands.append((sd, sub, q))
+                hi = q
+
+    ref_side = max(c[0] for c in cands)
+    scored = [(s.psnr(s.encoded[c], ref_side), c) for c in cands]
+    best_db, (sd, sub, q) = max(scored, key=lambda t: t[0])
+    data = s.encoded[(sd, sub, q)]
+    return Fit(data=data, size=s.image(sd).size, quality=q, subsampling=sub, psnr_db=best_db,
+               encodes=s.encodes, seconds=time.perf_counter() - t0)
+
+
+# ----------------------------
+# Budgets
+# ----------------------------
+
+def _frags(nbytes: int, fname: str, chunk_chars: int, p: arq_sim.Params) -> int:
+    """LoRa fragments of a base64 FILECHUNK transfer of ``nbytes``."""
+    chars = 4 * math.ceil(nbytes / 3)
+    tot = max(1, math.ceil(chars / chunk_chars))
+    frags = 0
+    for idx in range(tot):
+        n = min(chunk_chars, chars - idx * chunk_chars)
+        frags += math.ceil((len(f"FILECHUNK:{fname}:{idx}:{tot}:") + n) / p.frag_chunk)
+    return frags
+
+
+def _arq_cost_s(p: arq_sim.Params, mode: str, loss: float, trials: int,
+                chunk_chars: int) -> Optional[float]:
+    """Mean seconds per fragment of one FILECHUNK under ``mode``, None if no run delivers."""
+    frags = math.ceil((chunk_chars + 32) / p.frag_chunk)
+    runs = [arq_sim.simulate(mode, p, frags, loss, 1.0, seed) for seed in range(trials if loss else 1)]
+    done = [r["done_ms"] for r in runs if r["ok"]]
+    return sum(done) / len(done) / frags / 1000.0 if done else None
+
+
+def delivering_mode(p: arq_sim.Params, mode: str = ARQ_MODE, loss: float = 0.0, trials: int = 5,
+                    chunk_chars: int = CHUNK_CHARS) -> str:
+    """
+    ``mode`` if the simulated firmware ARQ delivers a FILECHUNK with it at
+    this link, else the fastest mode that does (the one to flash there).
+    Losslessly, TDD only delivers at SF7 / 250 kHz and SF7-8 / 500 kHz, and
+    GBN / SR stop at SF9 / 125 kHz; S&W delivers everywhere.
+    Raises ValueError if no mode delivers.
+    """
+    if _arq_cost_s(p, mode, loss, trials, chunk_chars) is not None:
+        return mode
+    costs = [(c, m) for m in arq_sim.MODES if m != mode
+             for c in [_arq_cost_s(p, m, loss, trials, chunk_chars)] if c is not None]
+    if not costs:
+        raise ValueError(f"no firmware ARQ mode delivers a {chunk_chars}-char FILECHUNK "
+                         f"at SF{p.sf} / {p.bw_hz / 1000:g} kHz; use a faster link or --max-bytes")
+    return min(costs)[1]
+
+
+def frag_cost_s(p: arq_sim.Params, deadline: bool = True, mode: str = ARQ_MODE,
+                loss: float = 0.0, trials: int = 5, chunk_chars: int = CHUNK_CHARS) -> float:
+    """
+    Seconds per LoRa fragment: wall clock of one full FILECHUNK through the
+    simulated firmware ARQ (``deadline``), or data airtime only. Runs that
+    abort do not count; raises ValueError if none delivers.
+    """
+    if not deadline:
+        return arq_sim.toa_ms(p.frag_chunk + p.frag_header, p) / 1000.0
+    cost = _arq_cost_s(p, mode, loss, trials, chunk_chars)
+    if cost is None:
+        raise ValueError(f"the firmware ARQ ({mode}) cannot deliver a {chunk_chars}-char FILECHUNK "
+                         f"at SF{p.sf} / {p.bw_hz / 1000:g} kHz; use a faster link or --max-bytes")
+    return cost
+
+
+def budget_bytes(seconds: float, p: Optional[arq_sim.Params] = None, deadline: bool = True,
+                 fname: str = "image.jpg", chunk_chars: int = CHUNK_CHARS,
+                 mode: Optional[str] = None, **kw) -> int:
+    """
+    Largest file (bytes) whose FILECHUNK transfer fits in ``seconds``.
+    ``mode`` defaults to delivering_mode() for the link. Raises ValueError
+    if the simulated link never delivers.
+    """
+    p = p or arq_sim.Params()
+    if deadline and mode is None:
+        mode = delivering_mode(p, chunk_chars=chunk_chars, **kw)
+    per = frag_cost_s(p, deadline, mode or ARQ_MODE, chunk_chars=chunk_chars, **kw)
+    lo, hi = 0, 1
+    while _frags(hi, fname, chunk_chars, p) * per <= seconds:
+        lo, hi = hi, hi * 2
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if _frags(mid, fname, chunk_chars, p) * per <= seconds:
+            lo = mid
+        else:
+            hi = mid
+    return lo
+
+
+def link_params(sf: int = 0, bw_khz: float = 0) -> arq_sim.Params:
+    """arq_sim.Params (the sketch's defaults) with SF / bandwidth overridden when given."""
+    p = arq_sim.Params()
+    if sf:
+        p = replace(p, sf=sf)
+    if bw_khz:
+        p = replace(p, bw_hz=int(bw_khz * 1000))
+    return p
+
+
+
+# ----------------------------
+# Self-check (python -m lora_host.selfcheck)
+# ----------------------------
+
+def _check_deadline() -> Optional[str]:
+    if budget_bytes(60, link_params(7)) <= 0:
+        return "SF7 deadline budget is empty"
+    try:
+        frag_cost_s(link_params(9, 125))
+    except ValueError:
+        pass
+    else:
+        return "SF9 / 125 kHz: TDD cost from runs that never deliver, want ValueError"
+    p = link_params(9, 125)
+    mode = delivering_mode(p)
+    if mode == ARQ_MODE:
+        return f"SF9 / 125 kHz: delivering_mode kept {ARQ_MODE}"
+    n, air = budget_bytes(120, p), budget_bytes(120, p, deadline=False)
+    if not 0 < n < air:
+        return f"SF9 / 125 kHz: 120 s deadline gives {n} bytes, want 0 < n < airtime's {air}"
+    return None
+
+
+SELF_CHECKS: Dict[str, Callable[[], Optional[str]]] = {
+    "deadline": _check_deadline,
+}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Fit an image into a byte, deadline or airtime budget.")
+    ap.add_argument("image")
+    g = ap.add_mutually_exclusive_group(required=True)
+    g.add_argument("--max-bytes", type=int, help="Byte budget")
+    g.add_argument("--deadline", type=float, help="Seconds for the whole transfer (firmware ARQ simulated)")
+    g.add_argument("--airtime", type=float, help="Seconds of data airtime")
+    ap.add_argument("--sf", type=int, default=0, help="Spreading factor (default: the sketch's)")
+    ap.add_argument("--bw-khz", type=float, default=0, help="Bandwidth in kHz (default: the sketch's)")
+    ap.add_argument("--q-max", type=int, default=90, help="Highest JPEG quality to consider")
+    ap.add_argument("--progressive", action="store_true", help="Size progressive JPEGs (see lora_host.progressive)")
+    ap.add_argument("--out", default="", help="Write the chosen JPEG here")
+    args = ap.parse_args()
+
+    try:
+        from PIL import Image
+    except ImportError:
+        raise SystemExit("[ERROR] Pillow not installed. Run: pip install pillow") from None
+
+    max_bytes = args.max_bytes
+    if max_bytes is None:
+        p = link_params(args.sf, args.bw_khz)
+        secs = args.deadline if args.deadline is not None else args.airtime
+        try:
+            mode = delivering_mode(p) if args.deadline is not None else None
+            max_bytes = budget_bytes(secs, p, deadline=args.deadline is not None, mode=mode)
+        except ValueError as e:
+            raise SystemExit(f"[ERROR] {e}") from None
+        kind = "deadline" if args.deadline is not None else "airtime"
+        print(f"[INFO] {kind} {secs:g} s at SF{p.sf} / {p.bw_hz / 1000:g} kHz -> {max_bytes} bytes")
+        if mode and mode != ARQ_MODE:
+            print(f"[WARN] {ARQ_MODE} ARQ does not deliver at this link; budget assumes gArqMode = {SKETCH_MODES[mode]}")
+
+    img = Image.open(args.image)
+    try:
+        f = fit(img, max_bytes, q_max=args.q_max, progressive=args.progressive)
+    except ValueError as e:
+        raise SystemExit(f"[ERROR] {e}") from None
+    print(f"[OK] {f.describe()}")
+    if args.out:
+        with open(args.out, "wb") as fh:
+            fh.write(f.data)
+        print(f"[OK] Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,652 @@
+"""
+Table-driven parser for every line format the MCUs print on the serial port.
+
+One call, ``parse_line(line)``, replaces the ``startswith``/``split``/``in``
+chains that used to be repeated in each receiver. Lines are dispatched on
+their first ``_KEY_LEN`` (4) characters to a bucket of one or two
+(prefix, handler) pairs, so a line costs one short slice, one dict lookup
+and one or two ``startswith`` checks before the matching handler runs.
+
+Recognised formats (firmware that prints them in brackets):
+  MSG,src,seq,rssi,d_m,text                        (tunnel / seismic RX)
+  FRAG,src,seq,idx,tot,rssi,d_m,chunk              (tunnel / seismic RX)
+  BACK,src,dst,seq,startIdx,bitmap                 (tunnel TDD block ACK)
+  [TX DONE] / [ABORT] / TX FAILED                  (tunnel TX completion)
+  [TX BACK] seq=.. start=.. count=.. OK=.. LOST=.. (tunnel TDD block ACK)
+  [RX] DATA from <src> ... (seq=N, hops=H)         (mesh)
+  [RX] Payload: <data>                             (mesh)
+  [HELLO] Neighbor <id> (RSSI=.., SNR=..)          (mesh)
+  [ROUTE] <dest> via <hop> (N hops) / Expired...   (mesh)
+  [RREP] Received from <src> (N hops total)        (mesh)
+  [CMD] Send completed / [CMD] Send failed         (mesh)
+  LOG,<type>[,<event>],k1,v1,k2,v2...              (power / pathloss)
+  TX_CSV:..., RX_CSV:..., *_CSV_HEADER:...         (timing analysis)
+  TIM,nodeId,role,event,seq,idx,tot,bytes,...      (timing analysis)
+
+Payload-carrying events keep a reference to the original line plus the
+offset where the payload starts. Nothing is sliced until ``.text``,
+``.chunk`` or ``.b64`` is read, and the header is split on a short window so
+a 40 KB FILECHUNK line is never copied just to find its first few fields.
+
+Unrecognised lines return ``None``; recognised but malformed lines return a
+``BadLine`` so callers can still warn about them.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+# Header fields are split inside this window; longer headers take a slow path.
+_HEAD_WINDOW = 512
+
+# Fast paths for the fixed-format mesh lines; anything unusual falls back to
+# the tolerant hand-written parsing in the handlers.
+_MESH_DATA_RE = re.compile(r" (\S+)(?: to (\S+))? \(seq=(\d+), hops?=(\d+)")
+_HELLO_RE = re.compile(r" Neighbor (\S+) \(RSSI=(-?\d+), SNR=(-?\d+(?:\.\d*)?)\)")
+
+
+# ----------------------------
+# Event types
+# ----------------------------
+
+@dataclass(slots=True)
+class BadLine:
+    """A line with a known prefix that failed to parse."""
+    kind: str
+    line: str
+
+
+@dataclass(slots=True)
+class Msg:
+    """MSG,src,seq,rssi,d_m,text"""
+    src: str
+    seq: int
+    rssi: str
+    d_m: str
+    line: str
+    start: int
+
+    @property
+    def text(self) -> str:
+        return self.line[self.start:]
+
+
+@dataclass(slots=True)
+class Frag:
+    """FRAG,src,seq,idx,tot,rssi,d_m,chunk"""
+    src: str
+    seq: int
+    idx: int
+    tot: int
+    rssi: str
+    d_m: str
+    line: str
+    start: int
+
+    @property
+    def chunk(self) -> str:
+        return self.line[self.start:]
+
+
+@dataclass(slots=True)
+class FileChunk:
+    """FILECHUNK:<fname>:<idx>:<tot>:<b64> inside a reassembled payload."""
+    fname: str
+    idx: int
+    tot: int
+    line: str
+    start: int
+
+    @property
+    def b64(self) -> str:
+        return self.line[self.start:]
+
+
+@dataclass(slots=True)
+class FileBlob:
+    """Legacy one-shot FILE:<fname>:<b64> payload."""
+    fname: str
+    line: str
+    start: int
+
+    @property
+    def b64(self) -> str:
+        return self.line[self.start:]
+
+
+@dataclass(slots=True)
+class SrSegment:
+    """SRSEG:<sid>:<seq>:<tot>:<data> host-ARQ segment inside a payload."""
+    sid: str
+    seq: int
+    tot: int
+    line: str
+    start: int
+
+    @property
+    def data(self) -> str:
+        return self.line[self.start:]
+
+
+@dataclass(slots=True)
+class SrAck:
+    """SRACK:<sid>:<cum>:<hex bitmap> selective ACK for host-ARQ segments."""
+    sid: str
+    cum: int
+    bitmap: str
+
+
+@dataclass(slots=True)
+class TxStatus:
+    """Completion marker for the chunk the MCU is currently sending."""
+    ok: bool
+    reason: str
+
+
+@dataclass(slots=True)
+class BlockAck:
+    """Raw BACK,src,dst,seq,startIdx,bitmap packet."""
+    src: str
+    dst: str
+    seq: int
+    start_idx: int
+    bitmap: str
+
+
+@dataclass(slots=True)
+class BlockAckSent:
+    """[TX BACK] seq=.. start=.. count=.. OK=.. LOST=.. summary line."""
+    seq: int
+    start_idx: int
+    count: int
+    ok: int
+    lost: int
+
+
+@dataclass(slots=True)
+class MeshData:
+    """[RX] DATA from <src> ... (seq=N, hops=H) header; payload follows."""
+    src: str
+    seq: int
+    hops: int
+    dst: str = ""
+
+
+@dataclass(slots=True)
+class MeshPayload:
+    """[RX] Payload: <data>"""
+    line: str
+    start: int
+
+    @property
+    def payload(self) -> str:
+        return self.line[self.start:].strip()
+
+
+@dataclass(slots=True)
+class Neighbor:
+    """[HELLO] Neighbor <id> (RSSI=<int>, SNR=<float>)"""
+    node: str
+    rssi: int
+    snr: float
+
+
+@dataclass(slots=True)
+class RouteUpdate:
+    """[ROUTE] <dest> via <next_hop> (<hops> hops)"""
+    dest: str
+    next_hop: str
+    hops: int
+
+
+@dataclass(slots=True)
+class RouteLost:
+    """[ROUTE] Expired route to <dest> / Invalidated route to <dest>"""
+    dest: str
+    reason: str
+
+
+@dataclass(slots=True)
+class RouteReply:
+    """[RREP] Received from <src> (<hops> hops total)"""
+    src: str
+    hops: int
+
+
+@dataclass(slots=True)
+class SendResult:
+    """Outcome of a mesh SEND: command."""
+    ok: bool
+    line: str
+
+
+@dataclass(slots=True)
+class LogRecord:
+    """LOG,<type>[,<event>],k1,v1,k2,v2..."""
+    type: str
+    event: str
+    fields: Dict[str, str] = field(default_factory=dict)
+    line: str = ""
+
+    def as_row(self) -> dict:
+        """Flat dict in the layout the pathloss CSV loggers write."""
+        row = {"type": self.type, "event": self.event, "raw_line": self.line}
+        row.update(self.fields)
+        return row
+
+
+@dataclass(slots=True)
+class CsvLine:
+    """TX_CSV:/RX_CSV: data rows and their *_CSV_HEADER: counterparts."""
+    stream: str  # "TX" or "RX"
+    header: bool
+    line: str
+    start: int
+
+    @property
+    def data(self) -> str:
+        return self.line[self.start:]
+
+
+@dataclass(slots=True)
+class Timing:
+    """TIM,nodeId,role,event,seq,idx,tot,bytes,rssi,snr,toa_ms,t_ms,dt_ms"""
+    node_id: str
+    role: str
+    event: str
+    seq: int
+    idx: int
+    tot: int
+    nbytes: int
+    rssi: Optional[float]
+    snr: Optional[float]
+    toa_ms: int
+    t_ms: int
+    dt_ms: int
+
+
+Event = Union[
+    BadLine, Msg, Frag, FileChunk, FileBlob, SrSegment, SrAck, TxStatus, BlockAck, BlockAckSent,
+    MeshData, MeshPayload, Neighbor, RouteUpdate, RouteLost, RouteReply,
+    SendResult, LogRecord, CsvLine, Timing,
+]
+
+
+# ----------------------------
+# Helpers
+# ----------------------------
+
+def _split_head(line: str, start: int, sep: str, n: int) -> Optional[Tuple[List[str], int]]:
+    """
+    Split the first ``n`` fields after ``start`` without touching the rest.
+    Returns (fields, offset_of_remainder) or None if there are fewer fields.
+    """
+    if len(line) - start <= _HEAD_WINDOW:
+        # Short line: copying the remainder is cheaper than avoiding it.
+        parts = line[start:].split(sep, n)
+        if len(parts) <= n:
+            return None
+        return parts[:n], len(line) - len(parts[n])
+    parts = line[start:start + _HEAD_WINDOW].split(sep, n)
+    if len(parts) <= n:
+        # Header longer than the window (e.g. a very long file name).
+        parts = line[start:].split(sep, n)
+        if len(parts) <= n:
+            return None
+    fields = parts[:n]
+    return fields, start + sum(map(len, fields)) + n
+
+
+def _between(s: str, key: str, stops: str = ",)") -> str:
+    """Value following ``key`` up to the first character in ``stops``."""
+    i = s.find(key)
+    if i < 0:
+        return ""
+    i += len(key)
+    j = len(s)
+    for c in stops:
+        k = s.find(c, i, j)
+        if k >= 0:
+            j = k
+    return s[i:j]
+
+
+def _opt_float(s: str) -> Optional[float]:
+    try:
+        return float(s)
+    except ValueError:
+        return None
+
+
+# ----------------------------
+# Handlers: (line, offset_after_prefix) -> Event
+# ----------------------------
+
+# MSG/FRAG lines are the per-packet hot path. Their prefix holds exactly one
+# comma, so a short line is split whole in one call instead of going
+# through _split_head.
+
+def _msg(line: str, pos: int) -> Event:
+    if len(line) <= _HEAD_WINDOW:
+        parts = line.split(",", 5)
+        if len(parts) < 6:
+            return BadLine("MSG", line)
+        _, src, seq, rssi, d_m, text = parts
+        start = len(line) - len(text)
+    else:
+        head = _split_head(line, pos, ",", 4)
+        if head is None:
+            return BadLine("MSG", line)
+        (src, seq, rssi, d_m), start = head
+    try:
+        seq_i = int(seq)
+    except ValueError:
+        seq_i = -1
+    return Msg(src, seq_i, rssi, d_m, line, start)
+
+
+def _frag(line: str, pos: int) -> Event:
+    if len(line) <= _HEAD_WINDOW:
+        parts = line.split(",", 7)
+        if len(parts) < 8:
+            return BadLine("FRAG", line)
+        _, src, seq, idx, tot, rssi, d_m, chunk = parts
+        start = len(line) - len(chunk)
+    else:
+        head = _split_head(line, pos, ",", 6)
+        if head is None:
+            return BadLine("FRAG", line)
+        (src, seq, idx, tot, rssi, d_m), start = head
+    try:
+        return Frag(src, int(seq), int(idx), int(tot), rssi, d_m, line, start)
+    except ValueError:
+        return BadLine("FRAG", line)
+
+
+def _back(line: str, pos: int) -> Event:
+    parts = line[pos:].split(",")
+    if len(parts) != 5:
+        return BadLine("BACK", line)
+    src, dst, seq, start_idx, bitmap = parts
+    try:
+        return BlockAck(src, dst, int(seq), int(start_idx), bitmap)
+    except ValueError:
+        return BadLine("BACK", line)
+
+
+def _tx_done(line: str, pos: int) -> Event:
+    return TxStatus(True, "TX DONE")
+
+
+def _tx_failed(line: str, pos: int) -> Event:
+    return TxStatus(False, line)
+
+
+def _tx_back(line: str, pos: int) -> Event:
+    try:
+        return BlockAckSent(
+            int(_between(line, "seq=", " ")),
+            int(_between(line, "start=", " ")),
+            int(_between(line, "count=", " ")),
+            int(_between(line, "OK=", " ")),
+            int(_between(line, "LOST=", " ")),
+        )
+    except ValueError:
+        return BadLine("TX BACK", line)
+
+
+def _mesh_data(line: str, pos: int) -> Event:
+    # "[RX] DATA from Node_1 (seq=12, hops=2)" or the generic
+    # "[RX] DATA from Node_1 to Node_2 (seq=12, hop=1, RSSI=-40)"
+    m = _MESH_DATA_RE.match(line, pos)
+    if m is not None:
+        src, dst, seq, hops = m.groups()
+        return MeshData(src, int(seq), int(hops), dst or "")
+    rest = line[pos:].lstrip()
+    sp = rest.find(" ")
+    src = rest if sp < 0 else rest[:sp]
+    if not src:
+        return BadLine("DATA", line)
+    dst = ""
+    if sp > 0 and rest.startswith(" to ", sp):
+        dst = rest[sp + 4:].split(" ", 1)[0]
+    hops = _between(rest, "hops=") or _between(rest, "hop=")
+    try:
+        seq_i = int(_between(rest, "seq=") or 0)
+        hops_i = int(hops or 0)
+    except ValueError:
+        return BadLine("DATA", line)
+    return MeshData(src, seq_i, hops_i, dst)
+
+
+def _mesh_payload(line: str, pos: int) -> Event:
+    return MeshPayload(line, pos)
+
+
+def _hello(line: str, pos: int) -> Optional[Event]:
+    m = _HELLO_RE.match(line, pos)
+    if m is not None:
+        node, rssi, snr = m.groups()
+        return Neighbor(node, int(rssi), float(snr))
+    rest = line[pos:]
+    if not rest.startswith(" Neighbor "):
+        return None
+    node = rest[10:].split(" ", 1)[0]
+    try:
+        return Neighbor(node, int(_between(rest, "RSSI=")), float(_between(rest, "SNR=")))
+    except ValueError:
+        return BadLine("HELLO", line)
+
+
+def _route(line: str, pos: int) -> Optional[Event]:
+    rest = line[pos:].lstrip()
+    if rest.startswith("Expired route to "):
+        return RouteLost(rest[17:].strip(), "expired")
+    if rest.startswith("Invalidated route to "):
+        return RouteLost(rest[21:].strip(), "invalidated")
+    # "<dest> via <next_hop> (<hops> hops)"
+    parts = rest.split(" ", 4)
+    if len(parts) >= 4 and parts[1] == "via":
+        try:
+            return RouteUpdate(parts[0], parts[2], int(parts[3].lstrip("(")))
+        except ValueError:
+            return BadLine("ROUTE", line)
+    return None
+
+
+def _rrep(line: str, pos: int) -> Optional[Event]:
+    rest = line[pos:].lstrip()
+    if not rest.startswith("Received from "):
+        return None
+    parts = rest[14:].split(" ", 2)
+    try:
+        return RouteReply(parts[0], int(parts[1].lstrip("(")))
+    except (IndexError, ValueError):
+        return BadLine("RREP", line)
+
+
+def _send_ok(line: str, pos: int) -> Event:
+    return SendResult(True, line)
+
+
+def _send_failed(line: str, pos: int) -> Event:
+    return SendResult(False, line)
+
+
+def _log(line: str, pos: int) -> Event:
+    return parse_log(line)
+
+
+def _csv(stream: str, header: bool) -> Callable[[str, int], Event]:
+    def handler(line: str, pos: int) -> Event:
+        return CsvLine(stream, header, line, pos)
+    return handler
+
+
+def _timing(line: str, pos: int) -> Event:
+    parts = line[pos:].split(",")
+    if len(parts) != 12:
+        return BadLine("TIM", line)
+    node_id, role, event, seq, idx, tot, nbytes, rssi, snr, toa, t_ms, dt = parts
+    try:
+        return Timing(node_id, role, event, int(seq), int(idx), int(tot), int(nbytes),
+                      _opt_float(rssi), _opt_float(snr), int(toa), int(t_ms), int(dt))
+    except ValueError:
+        return BadLine("TIM", line)
+
+
+def _ignore(line: str, pos: int) -> None:
+    return None
+
+
+# ----------------------------
+# Dispatch table
+# ----------------------------
+
+_Handler = Callable[[str, int], Optional[Event]]
+
+# Every prefix is at least _KEY_LEN characters long, so the first _KEY_LEN
+# characters of a line select a bucket of one or two candidates. Order only
+# matters within a bucket: longer prefixes first.
+_KEY_LEN = 4
+
+_PREFIXES: List[Tuple[str, _Handler]] = [
+    ("MSG,", _msg),
+    ("FRAG,", _frag),
+    ("BACK,", _back),
+    ("LOG,", _log),
+    ("TX_CSV_HEADER:", _csv("TX", True)),
+    ("RX_CSV_HEADER:", _csv("RX", True)),
+    ("TX_CSV:", _csv("TX", False)),
+    ("RX_CSV:", _csv("RX", False)),
+    ("TX FAILED", _tx_failed),
+    ("TIM_HDR,", _ignore),
+    ("TIM,", _timing),
+    ("[TX DONE]", _tx_done),
+    ("[TX BACK]", _tx_back),
+    ("[ABORT]", _tx_failed),
+    ("[RX] DATA from", _mesh_data),
+    ("[RX] Payload:", _mesh_payload),
+    ("[HELLO]", _hello),
+    ("[ROUTE]", _route),
+    ("[RREP]", _rrep),
+    ("[CMD] Send completed", _send_ok),
+    ("[CMD] Send failed", _send_failed),
+    ("[TX] Failed", _send_failed),
+]
+
+_TABLE: Dict[str, Tuple[Tuple[str, _Handler], ...]] = {}
+for _p, _h in _PREFIXES:
+    _TABLE[_p[:_KEY_LEN]] = _TABLE.get(_p[:_KEY_LEN], ()) + ((_p, _h),)
+del _p, _h
+
+
+def parse_line(line: str) -> Optional[Event]:
+    """Parse one stripped MCU line. Returns an event, a BadLine, or None."""
+    bucket = _TABLE.get(line[:_KEY_LEN])
+    if bucket is not None:
+        for prefix, handler in bucket:
+            if line.startswith(prefix):
+                return handler(line, len(prefix))
+    return None
+
+
+# ----------------------------
+# Secondary parsers
+# ----------------------------
+
+def parse_tunnel_payload(payload: str, start: int = 0) -> Optional[Event]:
+    """
+    Parse a reassembled tunnel payload (or MSG text) beginning at ``start``:
+      FILECHUNK:<fname>:<idx>:<tot>:<b64>  -> FileChunk
+      FILE:<fname>:<b64>                   -> FileBlob
+      SRSEG:<sid>:<seq>:<tot>:<data>       -> SrSegment
+      SRACK:<sid>:<cum>:<bitmap>           -> SrAck
+    Anything else returns None.
+    """
+    if payload.startswith("FILECHUNK:", start):
+        head = _split_head(payload, start + 10, ":", 3)
+        if head is None:
+            return BadLine("FILECHUNK", payload)
+        (fname, idx, tot), b64_start = head
+        try:
+            return FileChunk(fname, int(idx), int(tot), payload, b64_start)
+        except ValueError:
+            return BadLine("FILECHUNK", payload)
+    if payload.startswith("FILE:", start):
+        head = _split_head(payload, start + 5, ":", 1)
+        if head is None:
+            return BadLine("FILE", payload)
+        (fname,), b64_start = head
+        return FileBlob(fname, payload, b64_start)
+    if payload.startswith("SRSEG:", start):
+        head = _split_head(payload, start + 6, ":", 3)
+        if head is None:
+            return BadLine("SRSEG", payload)
+        (sid, seq, tot), data_start = head
+        try:
+            return SrSegment(sid, int(seq), int(tot), payload, data_start)
+        except ValueError:
+            return BadLine("SRSEG", payload)
+    if payload.startswith("SRACK:", start):
+        parts = payload[start + 6:].strip().split(":")
+        if len(parts) != 3:
+            return BadLine("SRACK", payload)
+        try:
+            return SrAck(parts[0], int(parts[1]), parts[2])
+        except ValueError:
+            return BadLine("SRACK", payload)
+    return None
+
+
+def parse_log(line: str) -> LogRecord:
+    """
+    Parse LOG,<type>[,<event>],k1,v1,... into a LogRecord.
+    Non-LOG lines give an empty record carrying only the raw line.
+    """
+    parts = line.split(",")
+    if " " in line or "\t" in line:
+        parts = list(map(str.strip, parts))
+    if len(parts) < 2 or parts[0] != "LOG":
+        return LogRecord("", "", {}, line)
+    kind = parts[1]
+    i = 2
+    event = ""
+    if kind == "EVENT" and len(parts) >= 3:
+        event = parts[2]
+        i = 3
+    # zip() drops a trailing key without a value, like the old while loop did.
+    return LogRecord(kind, event, dict(zip(parts[i::2], parts[i + 1::2])), line)
+
+
+# Mesh firmware tags -> display category, used by monitors to colour lines.
+_MESH_CATEGORIES = {
+    "[TX]": "tx", "[RREQ]": "tx", "[RREP]": "tx",
+    "[RX]": "rx", "[HELLO]": "rx",
+    "[FWD]": "relay", "[RELAY]": "relay",
+    "[ROUTE]": "route",
+    "[ERR]": "error",
+    "[ACK]": "ack",
+}
+
+
+def mesh_tag(line: str) -> str:
+    """Leading [TAG] of a mesh firmware line, or '' if there is none."""
+    if line.startswith("["):
+        j = line.find("]")
+        if j > 0:
+            return line[:j + 1]
+    return ""
+
+
+def classify_mesh(line: str) -> str:
+    """
+    Category of a mesh node line: tx, rx, relay, route, error, ack or other.
+    Untagged lines that mention a failure count as errors.
+    """
+    cat = _MESH_CATEGORIES.get(mesh_tag(line))
+    if cat is not None:
+        return cat
+    if "failed" in line.lower():
+        return "error"
+    return "other"
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Live pathloss dashboard: tail a logger CSV and plot running aggregates.
+
+rx_logger.py / tx_trigger.py keep appending to their CSV during a sweep.
+This module follows the file (only newly written bytes are read) and keeps,
+per (sf, bw, txp_dbm), a running mean/variance (Welford) and P-square
+quantile sketches for the 10th/50th/90th percentile. Every update is O(1)
+and memory is fixed per group, so the cost does not grow with the log.
+
+The plot is redrawn at a fixed frame rate: mean pathloss vs SF, one line per
+(bw, txp), with a p10-p90 bar at each point.
+
+Usage:
+    python -m lora_host.live rx_results.csv --side RX
+    python -m lora_host.live tx_results.csv --side TX --fps 2
+    python -m lora_host.live rx_results.csv --text      # no plot, print table
+"""
+
+import argparse
+import csv
+import io
+import math
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+Key = Tuple[int, int, float]  # (sf, bw, txp_dbm)
+
+
+# ----------------------------
+# Streaming statistics
+# ----------------------------
+
+class P2Quantile:
+    """P-square quantile estimator (Jain & Chlamtac): five markers, O(1) update."""
+
+    __slots__ = ("p", "q", "n", "np", "dn")
+
+    def __init__(self, p: float):
+        self.p = p
+        self.q: List[float] = []
+        self.n: List[int] = []
+        self.np: List[float] = []
+        self.dn = (0.0, p / 2, p, (1 + p) / 2, 1.0)
+
+    def add(self, x: float) -> None:
+        q = self.q
+        if len(self.n) == 0:
+            # Warm-up: keep the first five samples sorted
+            q.append(x)
+            q.sort()
+            if len(q) == 5:
+                p = self.p
+                self.n = [1, 2, 3, 4, 5]
+                self.np = [1.0, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5.0]
+            return
+
+        n, np_, dn = self.n, self.np, self.dn
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while k < 3 and x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            np_[i] += dn[i]
+
+        for i in (1, 2, 3):
+            d = np_[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                s = 1 if d > 0 else -1
+                # Piecewise-parabolic prediction, linear if it leaves the bracket
+                qp = q[i] + s / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + s) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - s) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + s * (q[i + s] - q[i]) / (n[i + s] - n[i])
+                q[i] = qp
+                n[i] += s
+
+    def value(self) -> float:
+        q = self.q
+        if not q:
+            return math.nan
+        if not self.n:
+            # Fewer than five samples: interpolate the sorted warm-up buffer
+            pos = self.p * (len(q) - 1)
+            lo = int(pos)
+            hi = min(lo + 1, len(q) - 1)
+            return q[lo] + (q[hi] - q[lo]) * (pos - lo)
+        return q[2]
+
+
+class RunningStats:
+    """Count, mean, variance (Welford), min/max and p10/p50/p90 sketches."""
+
+    __slots__ = ("n", "mean", "m2", "lo", "hi", "p10", "p50", "p90")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.lo = math.inf
+        self.hi = -math.inf
+        self.p10 = P2Quantile(0.10)
+        self.p50 = P2Quantile(0.50)
+        self.p90 = P2Quantile(0.90)
+
+    def add(self, x: float) -> None:
+        self.n += 1
+        d = x - self.mean
+        self.mean += d / self.n
+        self.m2 += d * (x - self.mean)
+        if x < self.lo:
+            self.lo = x
+        if x > self.hi:
+            self.hi = x
+        self.p10.add(x)
+        self.p50.add(x)
+        self.p90.add(x)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+
+# ----------------------------
+# Pathloss aggregation
+# ----------------------------
+
+def _f(v: Optional[str]) -> Optional[float]:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+class PathlossAggregator:
+    """Running pathloss statistics per (sf, bw, txp) from logger CSV rows."""
+
+    def __init__(self, side: str = "RX"):
+        self.side = side
+        self.groups: Dict[Key, RunningStats] = {}
+        self.rows_seen = 0
+
+    def add_row(self, row: Dict[str, str]) -> bool:
+        """Fold one CSV row in; returns True if it contributed a sample."""
+        self.rows_seen += 1
+        if row.get("type") != self.side:
+            return False
+        if self.side == "TX":
+            if _f(row.get("ack")) != 1:
+                return False
+            pl, rssi = _f(row.get("ack_pathloss_db")), _f(row.get("ack_rssi_dbm"))
+        else:
+            pl, rssi = _f(row.get("pathloss_db")), _f(row.get("rssi_dbm"))
+        sf, bw, txp = _f(row.get("sf")), _f(row.get("bw")), _f(row.get("txp_dbm"))
+        if pl is None and txp is not None and rssi is not None:
+            pl = txp - rssi
+        if pl is None or sf is None or bw is None:
+            return False
+        key = (int(sf), int(bw), txp if txp is not None else math.nan)
+        stats = self.groups.get(key)
+        if stats is None:
+            stats = self.groups[key] = RunningStats()
+        stats.add(pl)
+        return True
+
+    def series(self) -> Dict[Tuple[int, float], List[Tuple[int, RunningStats]]]:
+        """Group stats by (bw, txp) with points sorted by SF, for plotting."""
+        out: Dict[Tuple[int, float], List[Tuple[int, RunningStats]]] = {}
+        for (sf, bw, txp), st in self.groups.items():
+            out.setdefault((bw, txp), []).append((sf, st))
+        for pts in out.values():
+            pts.sort(key=lambda t: t[0])
+        return out
+
+
+# ----------------------------
+# File tailing
+# ----------------------------
+
+class CsvTail:
+    """Follow a growing CSV: each poll() returns only rows added since the last."""
+
+    def __init__(self, path: str, from_start: bool = True):
+        self.path = Path(path)
+        self.offset = 0
+        self.fieldnames: Optional[List[str]] = None
+        self._skip_existing = not from_start
+
+    def poll(self) -> List[Dict[str, str]]:
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return []
+        if size < self.offset:
+            # Log was truncated/rotated: start over
+            self.offset = 0
+            self.fieldnames = None
+        if size == self.offset:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return []
+        self.offset += end
+        text = data[:end].decode("utf-8", errors="replace")
+        if self.fieldnames is None:
+            header, _, text = text.partition("\n")
+            self.fieldnames = next(csv.reader([header]))
+            if self._skip_existing:
+                self._skip_existing = False
+                return []
+        return list(csv.DictReader(io.StringIO(text), fieldnames=self.fieldnames))
+
+
+# ----------------------------
+# Front ends
+# ----------------------------
+
+def print_table(agg: PathlossAggregator) -> None:
+    print(f"{'sf':>3} {'bw':>7} {'txp':>5} {'n':>6} {'mean':>7} {'std':>6} "
+          f"{'p10':>7} {'p50':>7} {'p90':>7}")
+    for (sf, bw, txp), st in sorted(agg.groups.items(), key=lambda kv: (kv[0][1], kv[0][2], kv[0][0])):
+        print(f"{sf:>3} {bw:>7} {txp:>5g} {st.n:>6} {st.mean:>7.2f} {st.std:>6.2f} "
+              f"{st.p10.value():>7.2f} {st.p50.value():>7.2f} {st.p90.value():>7.2f}")
+
+
+def run_text(tail: CsvTail, agg: PathlossAggregator, period: float) -> None:
+    while True:
+        for row in tail.poll():
+            agg.add_row(row)
+        print(f"\n[LIVE] {agg.rows_seen} rows, {len(agg.groups)} groups")
+        print_table(agg)
+        time.sleep(period)
+
+
+def run_plot(tail: CsvTail, agg: PathlossAggregator, fps: float, title: str) -> None:
+    import matplotlib.pyplot as plt
+    from matplotlib.animation import FuncAnimation
+    from matplotlib.collections import LineCollection
+
+    fig, ax = plt.subplots()
+    ax.set_xlabel("Spreading Factor (SF)")
+    ax.set_ylabel("Estimated Path Loss (dB)")
+    ax.set_title(title)
+    ax.grid(True)
+    artists: Dict[Tuple[int, float], tuple] = {}
+    status = ax.text(0.01, 0.99, "", transform=ax.transAxes, va="top", fontsize=8)
+
+    def update(_frame):
+        for row in tail.poll():
+            agg.add_row(row)
+        for key, pts in agg.series().items():
+            if key not in artists:
+                bw, txp = key
+                label = f"BW {int(bw / 1000)} kHz" + ("" if math.isnan(txp) else f", {txp:g} dBm")
+                (line,) = ax.plot([], [], marker="o", label=label)
+                bars = LineCollection([], colors=line.get_color(), alpha=0.5)
+                ax.add_collection(bars)
+                artists[key] = (line, bars)
+                ax.legend(loc="lower right", fontsize=8)
+            line, bars = artists[key]
+            line.set_data([sf for sf, _ in pts], [st.mean for _, st in pts])
+            bars.set_segments([[(sf, st.p10.value()), (sf, st.p90.value())] for sf, st in pts])
+        status.set_text(f"{agg.rows_seen} rows, {len(agg.groups)} groups")
+        ax.relim()
+        ax.autoscale_view()
+        return []
+
+    # Keep a reference so the animation is not garbage collected
+    anim = FuncAnimation(fig, update, interval=1000.0 / fps, cache_frame_data=False)
+    plt.show()
+    return anim
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Live pathloss curves from a growing logger CSV.")
+    ap.add_argument("csv", help="rx_results.csv or tx_results.csv being written by the logger")
+    ap.add_argument("--side", choices=["RX", "TX"], default="RX")
+    ap.add_argument("--fps", type=float, default=2.0, help="Redraw rate")
+    ap.add_argument("--new-only", action="store_true", help="Ignore rows already in the file")
+    ap.add_argument("--text", action="store_true", help="Print a table instead of plotting")
+    args = ap.parse_args()
+
+    tail = CsvTail(args.csv, from_start=not args.new_only)
+    agg = PathlossAggregator(args.side)
+    try:
+        if args.text:
+            run_text(tail, agg, 1.0 / args.fps)
+        else:
+            title = "RX: Path Loss vs SF (live)" if args.side == "RX" else "TX: ACK Path Loss vs SF (live)"
+            run_plot(tail, agg, args.fps, title)
+    except KeyboardInterrupt:
+        print("\n[LIVE] Stopped.")
+
+
+if __name__ == "__main__":
+    main()
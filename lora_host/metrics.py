@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+In-process counters, gauges and histograms for the serial host tools.
+
+TransmissionStats / ReceptionStats only print at the end of a transfer or
+every few minutes. The classes here keep running totals that can be
+scraped at any time:
+
+  - ``serve(port)`` starts a local HTTP endpoint with
+      /metrics       Prometheus text exposition format (version 0.0.4)
+      /metrics.json  the same values as JSON
+  - ``SnapshotWriter(path, period_s)`` appends one JSON snapshot per period
+    to a JSONL file, for long runs without a Prometheus server.
+
+Metrics are get-or-create by name on a ``Registry`` (``REGISTRY`` by
+default), with optional labels:
+
+    lines = REGISTRY.counter("lora_session_lines_total", "Serial lines read", ("port",))
+    lines.labels(port="COM9").inc()
+
+Updates are plain attribute arithmetic without a lock: under the GIL an
+occasional lost increment between threads is acceptable for monitoring,
+and it keeps the per-line cost to a dict lookup and an add.
+
+No third-party dependencies (prometheus_client is not required).
+"""
+
+import bisect
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Seconds; covers a single LoRa packet up to a multi-minute FILECHUNK
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _fmt(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    if isinstance(v, int) or float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, n: float = 1) -> None:
+        self.value += n
+
+
+class _GaugeValue:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, v: float) -> None:
+        self.value = v
+
+    def inc(self, n: float = 1) -> None:
+        self.value += n
+
+    def dec(self, n: float = 1) -> None:
+        self.value -= n
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, v)] += 1
+        self.sum += v
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        out, acc = [], 0
+        for c in self.counts:
+            acc += c
+            out.append(acc)
+        return out
+
+
+class Metric:
+    """One named metric family; ``labels(...)`` returns the child to update."""
+
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **kw):
+        if kw:
+            values = tuple(str(kw[n]) for n in self.labelnames)
+        else:
+            values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new())
+        return child
+
+    # Unlabelled shortcuts
+    def inc(self, n: float = 1) -> None:
+        self.labels().inc(n)
+
+    def set(self, v: float) -> None:
+        self.labels().set(v)
+
+    def observe(self, v: float) -> None:
+        self.labels().observe(v)
+
+    def _label_str(self, values: Tuple[str, ...], extra: str = "") -> str:
+        parts = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, values)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self._children.items()):
+            lines.append(f"{self.name}{self._label_str(values)} {_fmt(child.value)}")
+        return lines
+
+    def snapshot(self) -> list:
+        return [{"labels": dict(zip(self.labelnames, values)), "value": child.value}
+                for values, child in list(self._children.items())]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new(self):
+        return _CounterValue()
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new(self):
+        return _GaugeValue()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new(self):
+        return _HistogramValue(self.buckets)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, h in list(self._children.items()):
+            cum = h.cumulative()
+            for b, c in zip(self.buckets + (math.inf,), cum):
+                le = 'le="' + _fmt(b) + '"'
+                lines.append(f"{self.name}_bucket{self._label_str(values, le)} {c}")
+            lab = self._label_str(values)
+            lines.append(f"{self.name}_sum{lab} {_fmt(h.sum)}")
+            lines.append(f"{self.name}_count{lab} {h.count}")
+        return lines
+
+    def snapshot(self) -> list:
+        out = []
+        for values, h in list(self._children.items()):
+            out.append({
+                "labels": dict(zip(self.labelnames, values)),
+                "count": h.count,
+                "sum": h.sum,
+                "buckets": dict(zip([_fmt(b) for b in self.buckets + (math.inf,)], h.cumulative())),
+            })
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+        self._collectors: List = []
+
+    def _get(self, cls, name: str, help: str, labelnames: Sequence[str], **kw) -> Metric:
+        with self._lock:
+            m = self._metrics.get(name)
+            if m is None:
+                m = self._metrics[name] = cls(name, help, labelnames, **kw)
+            elif type(m) is not cls:
+                raise ValueError(f"metric {name} already registered as {m.kind}")
+            return m
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labelnames, buckets=buckets)
+
+    def add_collector(self, fn) -> None:
+        """Register a callable run before every scrape (e.g. to refresh gauges)."""
+        self._collectors.append(fn)
+
+    def remove_collector(self, fn) -> None:
+        try:
+            self._collectors.remove(fn)
+        except ValueError:
+            pass
+
+    def _collect(self) -> None:
+        for fn in list(self._collectors):
+            try:
+                fn()
+            except Exception:
+                pass
+
+    def render_prometheus(self) -> str:
+        self._collect()
+        lines: List[str] = []
+        for m in list(self._metrics.values()):
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        self._collect()
+        return {
+            "ts": time.time(),
+            "metrics": {name: {"type": m.kind, "values": m.snapshot()}
+                        for name, m in list(self._metrics.items())},
+        }
+
+
+REGISTRY = Registry()
+
+
+# ----------------------------
+# Exporters
+# ----------------------------
+
+def serve(port: int, host: str = "127.0.0.1", registry: Registry = REGISTRY) -> ThreadingHTTPServer:
+    """Serve /metrics and /metrics.json from a daemon thread; returns the server."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path in ("/", "/metrics"):
+                body = registry.render_prometheus().encode("utf-8")
+                ctype = "text/plain; version=0.0.4; charset=utf-8"
+            elif path == "/metrics.json":
+                body = json.dumps(registry.snapshot()).encode("utf-8")
+                ctype = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+class SnapshotWriter:
+    """Append ``registry.snapshot()`` as one JSON line every ``period_s``."""
+
+    def __init__(self, path: str, period_s: float = 60.0, registry: Registry = REGISTRY):
+        self.path = Path(path)
+        self.period_s = period_s
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SnapshotWriter":
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def write_once(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.registry.snapshot(), separators=(",", ":")) + "\n")
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.period_s):
+            try:
+                self.write_once()
+            except OSError as e:
+                print(f"[WARN] metrics snapshot failed: {e}")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        try:
+            self.write_once()
+        except OSError:
+            pass
+
+
+def start_exporters(port: int = 0, json_path: str = "", period_s: float = 60.0,
+                    registry: Registry = REGISTRY) -> Optional[SnapshotWriter]:
+    """CLI helper: start whichever exporters were requested (0 / "" = off)."""
+    if port:
+        serve(port, registry=registry)
+        print(f"[INFO] Metrics on http://127.0.0.1:{port}/metrics (JSON: /metrics.json)")
+    if json_path:
+        print(f"[INFO] Metrics snapshot every {period_s:g}s -> {json_path}")
+        return SnapshotWriter(json_path, period_s, registry).start()
+    return None
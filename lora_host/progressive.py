@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Progressive JPEG transfers: a usable picture after the first chunk.
+
+A baseline JPEG decodes top to bottom, so the receiver has nothing to show
+until the last FILECHUNK is in. A progressive JPEG carries the whole frame
+in its first scan (the DC coefficients: in effect a 1/8-resolution
+thumbnail) and sharpens it with every scan after that. The sender
+(``--progressive`` in tx_send_file.py / lora_transceiver.py) cuts the file
+at scan boundaries ("layers") and sends each layer as its own FILECHUNK
+line(s), so the picture sharpens with every chunk instead of appearing
+only after the last one.
+
+Nothing changes on the wire: the chunks join into one ordinary JPEG and
+every receiver writes it as before. A FileChunkAssembler with
+``previews=True`` (rx_receive_file.py, lora_transceiver.py) also writes
+``<name>.preview.jpg`` each time a chunk extends the decoded prefix. The
+preview is the bytes so far plus an EOI marker, which JPEG viewers render
+as the current refinement. It is removed when the file completes and kept
+if the transfer stops, so a sender stopped early still leaves the best
+picture received.
+
+Cut points are exact for base64: 0xFF fill bytes, which are legal before
+any JPEG marker, pad every layer to a multiple of 3 bytes. Each layer then
+ends on a base64 group, and the receiver's streamed prefix is exactly whole
+scans. ``layered(data, layers=N)`` keeps only the first N layers plus EOI.
+The result is a complete, coarser JPEG that costs proportionally less
+airtime.
+
+The first scan still covers every 8x8 block of the full image (~38 KB for
+a 1920x1280 photo at quality 85). So the senders first send a real
+thumbnail, ``<stem>_thumb.jpg`` (THUMB_SIDE px, ~3 KB), as an ordinary
+transfer of its own, and then the layers.
+"""
+
+import base64
+from pathlib import Path
+from typing import List, Tuple
+
+SOI = b"\xff\xd8"
+EOI = b"\xff\xd9"
+PREVIEW_INFIX = ".preview"
+THUMB_SIDE = 128        # px, longest side; ~3 KB at THUMB_QUALITY
+THUMB_QUALITY = 50
+_SOS = 0xDA
+_PROGRESSIVE_SOF = {0xC2, 0xC6, 0xCA, 0xCE}
+_NO_LENGTH = {0x01} | set(range(0xD0, 0xD8))  # TEM, RSTn
+
+
+def is_progressive(head: bytes) -> bool:
+    """True if ``head`` (the first bytes of a file) is a progressive JPEG header."""
+    if not head.startswith(SOI):
+        return False
+    i = 2
+    while i + 4 <= len(head):
+        if head[i] != 0xFF:
+            return False
+        m = head[i + 1]
+        if m == 0xFF:
+            i += 1
+            continue
+        if m in _PROGRESSIVE_SOF:
+            return True
+        if m == _SOS:
+            return False  # frame header is before the first scan
+        i += 2 + (head[i + 2] << 8 | head[i + 3])
+    return False
+
+
+def scan_ends(data: bytes) -> List[int]:
+    """Offset just past each scan's entropy-coded data (where the next marker starts)."""
+    if not data.startswith(SOI):
+        raise ValueError("not a JPEG (no SOI)")
+    n = len(data)
+    ends = []
+    i = 2
+    while i + 1 < n:
+        if data[i] != 0xFF:
+            raise ValueError(f"expected a marker at offset {i}")
+        m = data[i + 1]
+        if m == 0xFF:
+            i += 1
+            continue
+        if m == EOI[1]:
+            break
+        if m in _NO_LENGTH:
+            i += 2
+            continue
+        if i + 4 > n:
+            raise ValueError("truncated marker segment")
+        i += 2 + (data[i + 2] << 8 | data[i + 3])
+        if m != _SOS:
+            continue
+        # Entropy-coded data runs to the next marker other than FF00 / RSTn
+        j = i
+        while True:
+            j = data.find(b"\xff", j)
+            if j < 0 or j + 1 >= n:
+                raise ValueError("scan runs past the end of the file")
+            k = j
+            while k + 1 < n and data[k + 1] == 0xFF:
+                k += 1  # fill bytes
+            if k + 1 < n and (data[k + 1] == 0 or 0xD0 <= data[k + 1] <= 0xD7):
+                j = k + 2
+                continue
+            break
+        ends.append(j)
+        i = j
+    return ends
+
+
+def layered(data: bytes, layers: int = 0, group: int = 3) -> Tuple[bytes, List[int]]:
+    """
+    (jpeg, layer end offsets) for sending ``data`` layer by layer.
+
+    Layer k ends where scan k does; every layer but the last is padded with
+    0xFF fill bytes to a multiple of ``group`` bytes (3: base64). ``layers``
+    > 0 keeps only that many and closes the file with EOI.
+    """
+    ends = scan_ends(data)
+    if not ends:
+        raise ValueError("JPEG has no scans")
+    keep = len(ends) if layers <= 0 else min(layers, len(ends))
+    out = bytearray()
+    layer_ends = []
+    prev = 0
+    for e in ends[:keep - 1]:
+        out += data[prev:e]
+        prev = e
+        out += b"\xff" * (-len(out) % group)
+        layer_ends.append(len(out))
+    last = ends[keep - 1]
+    out += data[prev:last]
+    out += data[last:] if keep == len(ends) else EOI
+    layer_ends.append(len(out))
+    return bytes(out), layer_ends
+
+
+def chunks(data: bytes, layer_ends: List[int], chunk_chars: int) -> List[str]:
+    """
+    Base64 FILECHUNK texts for ``layered`` output: every layer starts a new
+    chunk and layers longer than ``chunk_chars`` are split. Joined, the
+    chunks are exactly ``base64.b64encode(data)``.
+    """
+    text = base64.b64encode(data).decode("ascii")
+    out = []
+    prev = 0
+    for e in layer_ends:
+        end = len(text) if e == len(data) else e // 3 * 4
+        out += [text[i:min(i + chunk_chars, end)] for i in range(prev, end, chunk_chars)]
+        prev = end
+    return out
+
+
+def thumb_name(tx_name: str) -> str:
+    """Transmit name of the thumbnail sent ahead of ``tx_name``."""
+    return f"{Path(tx_name).stem}_thumb.jpg"
+
+
+def preview(prefix: bytes) -> bytes:
+    """A displayable JPEG from the first bytes of a progressive JPEG."""
+    return prefix if prefix.endswith(EOI) else prefix + EOI
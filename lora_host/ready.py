@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Open an MCU serial port and wait until the firmware answers, instead of
+sleeping for a fixed boot time.
+
+Two things used to cost 3-6 s per run:
+
+  reset   Opening the port toggles DTR/RTS, which on ESP32 boards drives
+          EN/IO0 through the auto-reset circuit and reboots the node.
+          ``open_port`` sets both lines inactive before opening, so a
+          node that is already running stays warm (and keeps its routes).
+          ``reset=True`` pulses EN explicitly for a clean boot.
+  sleep   ``wait_ready`` sends a probe line (``PING``) and returns as soon
+          as a reply with a known prefix arrives. Retries back off
+          exponentially (50 ms, 100 ms, ... up to 800 ms) so a node that is
+          still booting is caught on the first probe after its loop starts.
+          A warm node answers in one round trip.
+
+Replies the probe accepts:
+
+  MESH_READY    "[CMD] PONG <node>" (MeshNode.ino), or "[CMD] Unknown
+                command" from firmware that predates PING
+  TUNNEL_READY  "[PONG] <id>" (11-Multimedia_Tunnel.ino). Older tunnel
+                sketches transmit unknown lines over LoRa, so they need the
+                updated sketch (or the caller's --no-probe fixed wait).
+
+pyserial is imported only by ``open_port`` so the rest of lora_host keeps
+working without it.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+PING = "PING"
+MESH_READY: Tuple[str, ...] = ("[CMD] PONG", "[CMD] Unknown command")
+TUNNEL_READY: Tuple[str, ...] = ("[PONG]",)
+
+FIRST_WAIT_S = 0.05
+MAX_WAIT_S = 0.8
+READY_TIMEOUT_S = 6.0   # a cold ESP32 boot plus banner is ~2-3 s
+
+
+@dataclass
+class Readiness:
+    ready: bool
+    warm: bool          # answered the first probe (no boot in between)
+    attempts: int
+    seconds: float
+    line: str = ""
+
+    def describe(self) -> str:
+        if not self.ready:
+            return f"no reply after {self.attempts} probes ({self.seconds:.1f}s)"
+        state = "warm" if self.warm else f"after boot, {self.attempts} probes"
+        return f"ready in {self.seconds * 1000:.0f} ms ({state})"
+
+
+def open_port(port: str, baud: int, timeout: float = 1.0, reset: bool = False):
+    """A ``serial.Serial`` opened without toggling DTR/RTS (optionally pulsing reset)."""
+    import serial  # pip install pyserial
+
+    ser = serial.Serial()
+    ser.port = port
+    ser.baudrate = baud
+    ser.timeout = timeout
+    # Applied by open(): EN and IO0 stay high, the node keeps running
+    ser.dtr = False
+    ser.rts = False
+    ser.open()
+    if reset:
+        pulse_reset(ser)
+    return ser
+
+
+def pulse_reset(ser, hold_s: float = 0.1) -> None:
+    """Reboot an ESP32 through the auto-reset circuit (RTS -> EN), normal boot mode."""
+    ser.dtr = False
+    ser.rts = True
+    time.sleep(hold_s)
+    ser.rts = False
+
+
+def wait_ready(ser, probe: Optional[str] = PING, ready: Tuple[str, ...] = MESH_READY,
+               timeout: float = READY_TIMEOUT_S, on_line: Optional[Callable[[str], None]] = None,
+               first_wait_s: float = FIRST_WAIT_S, max_wait_s: float = MAX_WAIT_S) -> Readiness:
+    """
+    Send ``probe`` until a line starting with one of ``ready`` arrives or
+    ``timeout`` passes. Every other line read meanwhile (boot banner, HELLOs)
+    goes to ``on_line``. With ``probe=None`` it only listens.
+    """
+    t0 = time.monotonic()
+    deadline = t0 + timeout
+    wait = first_wait_s
+    attempts = 0
+    buf = b""
+    old_timeout = ser.timeout
+    ser.timeout = 0.01
+    try:
+        ser.reset_input_buffer()
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                return Readiness(False, False, attempts, now - t0)
+            if probe:
+                ser.write((probe + "\n").encode())
+                ser.flush()
+                attempts += 1
+            attempt_end = min(deadline, now + wait)
+            while time.monotonic() < attempt_end:
+                chunk = ser.read(ser.in_waiting or 1)
+                if not chunk:
+                    continue
+                buf += chunk
+                while b"\n" in buf:
+                    raw, buf = buf.split(b"\n", 1)
+                    line = raw.decode(errors="ignore").strip()
+                    if not line:
+                        continue
+                    if line.startswith(ready):
+                        return Readiness(True, attempts <= 1, attempts, time.monotonic() - t0, line)
+                    if on_line is not None:
+                        on_line(line)
+            wait = min(wait * 2, max_wait_s)
+    finally:
+        ser.timeout = old_timeout
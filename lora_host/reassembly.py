@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Reassembly of tunnel / seismic payloads, shared by every tunnel-style
+receiver (06/07/08 rx_receive_mseed.py, rx_receive_file.py and
+lora_transceiver.py).
+
+Two stages, as before:
+
+  MessageReassembler   FRAG,src,seq,idx,tot,... -> one payload per (src, seq)
+  FileChunkAssembler   FILECHUNK:<fname>:<idx>:<tot>:<data> -> <fname> on disk
+                       (and legacy FILE:<fname>:<data>)
+
+``handle_full_payload`` routes a complete payload (or MSG text) to the
+second stage, printing what it does.
+
+Compared with the per-script copies this replaces:
+
+  slots     each message / file keeps a list indexed by fragment number plus
+            a count, instead of a dict that was re-sorted into a list on
+            completion. Out-of-range indices are dropped instead of raising
+            KeyError at completion.
+  stream    base64 FILECHUNK data is decoded as soon as the chunks before it
+            are in, into ``<name>.part`` next to the output, and renamed
+            when the last chunk lands. A file in flight costs one chunk of
+            memory, not text + joined copy + decoded bytes. Other textcodec
+            encodings are buffered and decoded on completion.
+  bounded   at most ``max_pending`` entries and ``max_chars`` buffered
+            characters per stage; the oldest entry is dropped beyond that.
+  expiry    entries that get nothing for ``ttl_s`` are dropped (a stale
+            (src, seq) is no longer merged into a new message when the MCU
+            sequence number wraps).
+
+Per-receiver differences are constructor arguments: ``out_dir`` (the
+seismic receivers write to the current directory), ``suffix`` ("_rx"
+for the tunnel receivers) and ``previews`` (progressive JPEGs also get a
+``<name>.preview.jpg`` after every chunk, see lora_host.progressive).
+Output names never keep directories from the sender's file name.
+
+``python -m lora_host.conformance`` replays the same captures through all
+five receivers and checks their files against the original algorithm.
+"""
+
+import base64
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from lora_host import lineparse, progressive, textcodec
+
+MSG_TTL_S = 300.0              # no FRAG for this long -> drop the message
+MSG_MAX_PENDING = 256
+MSG_MAX_CHARS = 8_000_000
+FILE_TTL_S = 900.0             # FILECHUNKs are ~40 KB each, minutes apart at high SF
+FILE_MAX_PENDING = 32
+FILE_MAX_CHARS = 32_000_000    # out-of-order chunk text waiting to be decoded
+PREVIEW_CHARS = 120            # of non-file payloads in the log
+PART_SUFFIX = ".part"
+
+
+class _Slots:
+    """Fragments of one message or file, indexed by position."""
+    __slots__ = ("parts", "have", "t_last")
+
+    def __init__(self, tot: int, now: float):
+        self.parts: List[Optional[str]] = [None] * tot
+        self.have = 0
+        self.t_last = now
+
+
+class MessageReassembler:
+    """Reassembles FRAG messages coming from the RX MCU (LoRa level)."""
+
+    def __init__(self, ttl_s: float = MSG_TTL_S, max_pending: int = MSG_MAX_PENDING,
+                 max_chars: int = MSG_MAX_CHARS, clock: Callable[[], float] = time.monotonic):
+        self.ttl_s = ttl_s
+        self.max_pending = max_pending
+        self.max_chars = max_chars
+        self.clock = clock
+        self.messages: Dict[Tuple[str, int], _Slots] = {}  # (src, seq), oldest first
+        self._frags = 0
+        self._chars = 0
+        self._next_sweep = 0.0
+        self.completed = 0
+        self.duplicates = 0
+        self.dropped = 0       # out-of-range fragment indices
+        self.expired = 0
+        self.evicted = 0
+
+    def pending(self) -> Tuple[int, int]:
+        """(incomplete messages, fragments they hold)"""
+        return len(self.messages), self._frags
+
+    def add_frag(self, src: str, seq: int, idx: int, tot: int, chunk: str) -> Optional[str]:
+        """Store one fragment; returns the whole payload when it completes a message."""
+        now = self.clock()
+        if now >= self._next_sweep:
+            self.expire(now)
+        if not 0 <= idx < tot:
+            self.dropped += 1
+            return None
+        key = (src, seq)
+        messages = self.messages
+        m = messages.get(key)
+        if m is None or len(m.parts) != tot:
+            if m is not None:  # same (src, seq), different tot: a new message
+                self._drop(key)
+            m = messages[key] = _Slots(tot, now)
+        parts = m.parts
+        old = parts[idx]
+        if old is None:
+            m.have += 1
+            self._frags += 1
+            self._chars += len(chunk)
+        else:
+            self.duplicates += 1
+            self._chars += len(chunk) - len(old)
+        parts[idx] = chunk
+        m.t_last = now
+
+        if m.have == tot:
+            del messages[key]
+            payload = "".join(parts)
+            self._frags -= tot
+            self._chars -= len(payload)
+            self.completed += 1
+            return payload
+        if len(messages) > self.max_pending or self._chars > self.max_chars:
+            self._evict(key)
+        return None
+
+    def _evict(self, keep: Tuple[str, int]) -> None:
+        """Drop the oldest messages until back within bounds (never ``keep``)."""
+        while len(self.messages) > self.max_pending or self._chars > self.max_chars:
+            oldest = next(iter(self.messages))
+            if oldest == keep:
+                break
+            self._drop(oldest)
+            self.evicted += 1
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Drop messages idle for ``ttl_s``; returns how many."""
+        now = self.clock() if now is None else now
+        self._next_sweep = now + self.ttl_s / 4
+        stale = [k for k, m in self.messages.items() if now - m.t_last >= self.ttl_s]
+        for k in stale:
+            self._drop(k)
+        self.expired += len(stale)
+        return len(stale)
+
+    def _drop(self, key: Tuple[str, int]) -> None:
+        m = self.messages.pop(key)
+        self._frags -= m.have
+        self._chars -= sum(len(c) for c in m.parts if c is not None)
+
+
+class _IncomingFile(_Slots):
+    """FILECHUNK slots plus the streaming decoder state."""
+    __slots__ = ("chars", "next", "tail", "buffered", "part", "out", "written", "preview", "previewed")
+
+    def __init__(self, tot: int, now: float, out: Path):
+        super().__init__(tot, now)
+        self.chars = 0                 # chunk text held in parts / buffered
+        self.next = 0                  # chunks [0, next) are consumed
+        self.tail = ""                 # base64 text short of a 4-char group
+        self.buffered: Optional[List[str]] = None  # non-base64: text kept until the end
+        self.part = None               # open <out>.part
+        self.out = out
+        self.written = 0
+        self.preview: Optional[Path] = None  # progressive JPEG: <out stem>.preview<ext>
+        self.previewed = 0             # bytes in the last preview written
+
+
+class FileChunkAssembler:
+    """
+    Assembles FILECHUNK:<fname>:<idx>:<tot>:<data> messages into files in
+    ``out_dir``, named ``<stem><suffix><ext>``. ``on_file(fname, path)`` runs
+    after each file is written (FILECHUNK or FILE). With ``previews``, a
+    progressive JPEG also gets ``<stem><suffix>.preview<ext>`` rewritten
+    each time a chunk extends it; the preview is removed once the file is
+    complete and kept if the transfer is dropped.
+    """
+
+    def __init__(self, out_dir: Path = Path("."), suffix: str = "",
+                 ttl_s: float = FILE_TTL_S, max_pending: int = FILE_MAX_PENDING,
+                 max_chars: int = FILE_MAX_CHARS,
+                 on_file: Optional[Callable[[str, Path], None]] = None,
+                 previews: bool = False, clock: Callable[[], float] = time.monotonic):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.suffix = suffix
+        self.ttl_s = ttl_s
+        self.max_pending = max_pending
+        self.max_chars = max_chars
+        self.on_file = on_file
+        self.previews = previews
+        self.clock = clock
+        self.files: Dict[str, _IncomingFile] = {}  # fname, oldest first
+        self._chunks = 0
+        self._chars = 0
+        self._next_sweep = 0.0
+        self.completed = 0
+        self.failed = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def out_path(self, fname: str) -> Path:
+        p = Path(Path(fname).name)
+        return self.out_dir / (f"{p.stem}{self.suffix}{p.suffix}" if self.suffix else p.name)
+
+    def pending(self) -> Tuple[int, int]:
+        """(incomplete files, chunks received for them)"""
+        return len(self.files), self._chunks
+
+    # ---- FILECHUNK ----
+
+    def add_chunk(self, fname: str, idx: int, tot: int, text: str) -> Optional[Path]:
+        """Store one chunk; returns the output path when it completes the file."""
+        now = self.clock()
+        if now >= self._next_sweep:
+            self.expire(now)
+        if not 0 <= idx < tot or not Path(fname).name:
+            print(f"[WARN] FILECHUNK {idx}/{tot} for '{fname}' out of range, dropped")
+            return None
+        f = self.files.get(fname)
+        if f is None or len(f.parts) != tot:
+            if f is not None:  # re-sent with a different chunk count: start over
+                self._drop(fname)
+            f = self.files[fname] = _IncomingFile(tot, now, self.out_path(fname))
+
+        print(f"[INFO] Got FILECHUNK {idx+1}/{tot} for '{fname}'")
+        f.t_last = now
+        if idx < f.next or f.parts[idx] is not None:
+            return None  # retransmission of a chunk we already have
+        f.parts[idx] = text
+        f.have += 1
+        f.chars += len(text)
+        self._chunks += 1
+        self._chars += len(text)
+
+        try:
+            self._advance(f)
+        except (ValueError, OSError) as e:
+            print(f"[ERROR] {self._encoding(f)} decode failed for '{fname}': {e}")
+            self._drop(fname)
+            self.failed += 1
+            return None
+
+        if f.next == tot:
+            return self._finish(fname, f)
+        if f.preview is not None and f.written > f.previewed:
+            self._write_preview(f)
+        while len(self.files) > self.max_pending or self._chars > self.max_chars:
+            oldest = next(iter(self.files))
+            if oldest == fname:
+                break
+            print(f"[WARN] Dropping incomplete '{oldest}' ({self.files[oldest].have}/"
+                  f"{len(self.files[oldest].parts)} chunks): reassembly buffer full")
+            self._drop(oldest)
+            self.evicted += 1
+        return None
+
+    def _advance(self, f: _IncomingFile) -> None:
+        """Consume the chunks that are now contiguous from the front."""
+        parts = f.parts
+        while f.next < len(parts) and parts[f.next] is not None:
+            text = parts[f.next]
+            parts[f.next] = ""  # consumed; keeps the slot marked as received
+            f.next += 1
+            if f.buffered is None and f.next == 1 and textcodec.encoding_of(text) != textcodec.DEFAULT:
+                f.buffered = []
+            if f.buffered is not None:
+                f.buffered.append(text)  # still counted in chars until the file is done
+                continue
+            f.chars -= len(text)
+            self._chars -= len(text)
+            text = f.tail + text if f.tail else text
+            cut = len(text) - len(text) % 4
+            f.tail = text[cut:]
+            if cut:
+                self._write(f, base64.b64decode(text[:cut] if f.tail else text))
+
+    def _write(self, f: _IncomingFile, data: bytes) -> None:
+        if f.part is None:
+            f.part = open(f.out.with_name(f.out.name + PART_SUFFIX), "wb")
+            if self.previews and progressive.is_progressive(data):
+                f.preview = f.out.with_name(f"{f.out.stem}{progressive.PREVIEW_INFIX}{f.out.suffix}")
+        f.part.write(data)
+        f.written += len(data)
+
+    def _write_preview(self, f: _IncomingFile) -> None:
+        f.part.flush()
+        tmp = f.preview.with_name(f.preview.name + PART_SUFFIX)
+        try:
+            with open(f.part.name, "rb") as src:
+                tmp.write_bytes(progressive.preview(src.read()))
+            os.replace(tmp, f.preview)
+        except OSError as e:
+            print(f"[WARN] Could not write preview '{f.preview}': {e}")
+            return
+        f.previewed = f.written
+        print(f"[INFO] Preview {f.next}/{len(f.parts)} chunks ({f.written} bytes) -> '{f.preview.resolve()}'")
+
+    def _finish(self, fname: str, f: _IncomingFile) -> Optional[Path]:
+        try:
+            if f.buffered is not None:
+                self._write(f, textcodec.decode("".join(f.buffered)))
+            elif f.tail:
+                self._write(f, base64.b64decode(f.tail))
+            if f.part is None:
+                self._write(f, b"")
+            f.part.close()
+            os.replace(f.part.name, f.out)
+        except (ValueError, OSError) as e:
+            print(f"[ERROR] {self._encoding(f)} decode failed for '{fname}': {e}")
+            self._drop(fname)
+            self.failed += 1
+            return None
+        if f.previewed:
+            try:
+                os.remove(f.preview)  # superseded by the complete file
+            except OSError:
+                pass
+        self._forget(fname)
+        self.completed += 1
+        print(f"[OK] Reassembled and wrote {f.written} bytes to '{f.out.resolve()}'")
+        if self.on_file is not None:
+            self.on_file(fname, f.out)
+        return f.out
+
+    @staticmethod
+    def _encoding(f: _IncomingFile) -> str:
+        return textcodec.encoding_of(f.buffered[0]) if f.buffered else textcodec.DEFAULT
+
+    # ---- legacy FILE: ----
+
+    def write_blob(self, fname: str, text: str) -> Optional[Path]:
+        """Legacy one-shot FILE:<fname>:<data>; returns the output path."""
+        print(f"[INFO] Received FILE '{fname}' ({textcodec.encoding_of(text)} length {len(text)})")
+        if not Path(fname).name:
+            print("[WARN] FILE payload without a file name, dropped")
+            return None
+        try:
+            raw = textcodec.decode(text)
+        except ValueError as e:
+            print(f"[ERROR] {textcodec.encoding_of(text)} decode failed: {e}")
+            return None
+        out = self.out_path(fname)
+        out.write_bytes(raw)
+        print(f"[OK] Wrote {len(raw)} bytes to '{out.resolve()}'")
+        if self.on_file is not None:
+            self.on_file(fname, out)
+        return out
+
+    # ---- housekeeping ----
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Drop files idle for ``ttl_s`` (and their .part files); returns how many."""
+        now = self.clock() if now is None else now
+        self._next_sweep = now + self.ttl_s / 4
+        stale = [k for k, f in self.files.items() if now - f.t_last >= self.ttl_s]
+        for k in stale:
+            f = self.files[k]
+            print(f"[WARN] Dropping incomplete '{k}' ({f.have}/{len(f.parts)} chunks): "
+                  f"nothing for {self.ttl_s:.0f}s")
+            self._drop(k)
+        self.expired += len(stale)
+        return len(stale)
+
+    def close(self) -> None:
+        """Drop every incomplete file and remove its .part."""
+        for k in list(self.files):
+            self._drop(k)
+
+    def _forget(self, fname: str) -> _IncomingFile:
+        f = self.files.pop(fname)
+        self._chunks -= f.have
+        self._chars -= f.chars
+        return f
+
+    def _drop(self, fname: str) -> None:
+        f = self._forget(fname)
+        if f.part is not None:
+            f.part.close()
+            try:
+                os.remove(f.part.name)
+            except OSError:
+                pass
+        if f.previewed:
+            print(f"[INFO] Kept preview '{f.preview.resolve()}' of incomplete '{fname}'")
+
+
+def handle_full_payload(payload: str, file_asm: FileChunkAssembler, start: int = 0,
+                        preview: int = PREVIEW_CHARS) -> None:
+    """
+    Called with a fully reassembled payload (or a MSG line, from ``start``):
+      FILECHUNK:<fname>:<idx>:<tot>:<data>  -> file_asm.add_chunk
+      FILE:<fname>:<data>                   -> file_asm.write_blob
+    Anything else is logged.
+    """
+    ev = lineparse.parse_tunnel_payload(payload, start)
+    t = type(ev)
+
+    if t is lineparse.FileChunk:
+        file_asm.add_chunk(ev.fname, ev.idx, ev.tot, ev.b64)
+        return
+
+    if t is lineparse.FileBlob:
+        file_asm.write_blob(ev.fname, ev.b64)
+        return
+
+    if t is lineparse.BadLine:
+        print(f"[WARN] {ev.kind} payload format invalid, printing raw:")
+        print(payload[start:start + preview] + "...")
+        return
+
+    print("[FULL PAYLOAD]", payload[start:start + preview] + ("..." if len(payload) - start > preview else ""))
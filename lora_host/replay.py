@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Replay recorded MCU output into the host-side consumers, without radios.
+
+Input is either a lora_host.trace JSONL file (the "rx" line records, with
+their monotonic timestamps) or a plain text capture with one MCU line per
+line (no timing; replayed back to back or --line-interval apart).
+
+The lines are served by ``ReplaySerial``. It has the subset of the
+pyserial API that the consumers use:
+- readline
+- in_waiting
+- write and flush
+- close and is_open
+- context manager
+
+Each target runs its real read loop on it:
+
+  session   LoRaSerialSession._reader_loop   (11-Multimedia_Tunnel)
+  mesh_rx   MeshReceiver.listen              (14-Mesh_Network)
+  mseed6/7/8  rx_receive_mseed.main          (06/07/08 Seismic Stream)
+
+Lines are delivered at the recorded timing (``--speed 1``, or 10 for ten
+times faster) or as fast as the consumer reads them (``--asap``). The
+report gives:
+- time to completion, from the first line read to the end of the stream
+- CPU time per line
+- lines per second
+- how late lines were picked up (timed mode)
+- the files the consumer wrote
+
+The consumers' console output goes to /dev/null unless --show-output is
+given. Files are written into --out-dir, which is a temporary directory
+by default.
+
+``--synth tunnel|mesh --file F --out T.jsonl`` writes a trace of what an RX
+MCU would print while receiving F. FRAG lines come from the tunnel
+sketches and [RX] DATA/Payload pairs from MeshNode. Timing comes from the
+LoRa time-on-air model in arq_sim.
+
+Usage:
+    python -m lora_host.replay capture.jsonl --target session --asap
+    python -m lora_host.replay capture.jsonl --target mesh_rx --speed 10
+    python -m lora_host.replay rx_console.txt --target mseed8 --asap
+    python -m lora_host.replay --synth tunnel --file human_voice.wav --out voice.jsonl
+"""
+
+import argparse
+import base64
+import contextlib
+import importlib.util
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import types
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from lora_host import arq_sim, trace
+
+REPO = Path(__file__).resolve().parents[1]
+EXP = REPO / "03-FullStack_Experiments"
+
+MSEED_RX = {
+    "mseed6": "06-Seismic_Stream_v6/01-RX_MiniSEED/rx_receive_mseed.py",
+    "mseed7": "07-Seismic_Stream_v7/01-RX_MiniSEED/rx_receive_mseed.py",
+    "mseed8": "08-Seismic_Stream_v8/01-RX_MiniSEED/rx_receive_mseed.py",
+}
+
+# (seconds since start of capture, line)
+Record = Tuple[float, str]
+
+
+class ReplayDone(KeyboardInterrupt):
+    """Raised by ReplaySerial at end of input; the consumers' Ctrl+C path ends them cleanly."""
+
+
+# ----------------------------
+# Input
+# ----------------------------
+
+def load_capture(path: str, component: str = "", line_interval: float = 0.0) -> List[Record]:
+    """Read rx lines from a trace JSONL or a plain text capture."""
+    p = Path(path)
+    with open(p, "r", encoding="utf-8", errors="replace") as f:
+        first = f.readline()
+    out: List[Record] = []
+    if first.startswith("{"):
+        t0 = None
+        for rec in trace.read_trace(path):
+            if rec.get("ev") != "line" or rec.get("d") != "rx":
+                continue
+            if component and rec.get("c") != component:
+                continue
+            t = rec.get("t", 0) / 1e9
+            if t0 is None:
+                t0 = t
+            out.append((t - t0, rec.get("s", "")))
+        return out
+    with open(p, "r", encoding="utf-8", errors="replace") as f:
+        for i, line in enumerate(f):
+            line = line.rstrip("\r\n")
+            if line:
+                out.append((len(out) * line_interval, line))
+    return out
+
+
+# ----------------------------
+# Fake port
+# ----------------------------
+
+class ReplaySerial:
+    """
+    Serves recorded lines through the pyserial calls the consumers make.
+
+    ``speed=None`` delivers as fast as the consumer reads; otherwise line i
+    is held back until ``t_i / speed`` after the first read. At end of input
+    ``on_end`` is called and, if ``raise_at_end``, ReplayDone is raised;
+    otherwise readline() returns b"" like a port timeout.
+    """
+
+    def __init__(self, records: List[Record], speed: Optional[float] = None,
+                 raise_at_end: bool = True, on_end: Optional[Callable[[], None]] = None):
+        self.records = records
+        self.speed = speed
+        self.raise_at_end = raise_at_end
+        self.on_end = on_end
+        self.i = 0
+        self.is_open = True
+        self.bytes_written = 0
+        self.lines_written = 0
+        self.lateness: List[float] = []
+        self.t_first: Optional[float] = None
+        self.cpu_first: Optional[float] = None
+        self.t_end: Optional[float] = None
+        self.cpu_end: Optional[float] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _start(self) -> None:
+        if self.t_first is None:
+            self.t_first = time.perf_counter()
+            self.cpu_first = time.process_time()
+
+    def _finish(self):
+        if self.t_end is None:
+            self.t_end = time.perf_counter()
+            self.cpu_end = time.process_time()
+            if self.on_end:
+                self.on_end()
+        if self.raise_at_end:
+            raise ReplayDone()
+        return b""
+
+    def _due(self, i: int) -> float:
+        return self.t_first + self.records[i][0] / self.speed
+
+    @property
+    def in_waiting(self) -> int:
+        self._start()
+        if self.i >= len(self.records):
+            self._finish()
+            return 0
+        if self.speed is None:
+            return len(self.records) - self.i
+        return 1 if time.perf_counter() >= self._due(self.i) else 0
+
+    def readline(self) -> bytes:
+        self._start()
+        if self.i >= len(self.records):
+            return self._finish()
+        if self.speed is not None:
+            due = self._due(self.i)
+            now = time.perf_counter()
+            if now < due:
+                time.sleep(due - now)
+                now = time.perf_counter()
+            self.lateness.append(now - due)
+        line = self.records[self.i][1]
+        self.i += 1
+        return line.encode("utf-8", errors="replace") + b"\n"
+
+    def write(self, data: bytes) -> int:
+        self.bytes_written += len(data)
+        self.lines_written += data.count(b"\n")
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def reset_input_buffer(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.is_open = False
+
+
+# ----------------------------
+# Targets
+# ----------------------------
+
+def _load(rel: str, name: str):
+    spec = importlib.util.spec_from_file_location(name, EXP / rel)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def run_session(ser: ReplaySerial, out_dir: Path) -> None:
+    mod = _load("11-Multimedia_Tunnel/lora_transceiver.py", "_replay_lora_transceiver")
+    sess = mod.LoRaSerialSession("replay", 115200, out_dir=out_dir, quiet=True,
+                                 log_callback=lambda s: print(s))
+    ser.raise_at_end = False
+    ser.on_end = sess._stop.set
+    sess.ser = ser
+    try:
+        sess._reader_loop()
+    finally:
+        sess.close()
+
+
+def run_mesh_rx(ser: ReplaySerial, out_dir: Path) -> None:
+    mod = _load("14-Mesh_Network/mesh_receiver.py", "_replay_mesh_receiver")
+    rx = mod.MeshReceiver("replay", out_dir)
+    rx.ser = ser
+    rx.listen()
+
+
+def run_mseed(key: str) -> Callable[[ReplaySerial, Path], None]:
+    def run(ser: ReplaySerial, out_dir: Path) -> None:
+        mod = _load(MSEED_RX[key], f"_replay_{key}")
+        # main() opens serial.Serial(SERIAL_PORT, ...) itself and writes to cwd
+        mod.serial = types.SimpleNamespace(Serial=lambda *a, **k: ser)
+        prev = os.getcwd()
+        os.chdir(out_dir)
+        try:
+            mod.main()
+        finally:
+            os.chdir(prev)
+    return run
+
+
+TARGETS = {
+    "session": run_session,
+    "mesh_rx": run_mesh_rx,
+    **{k: run_mseed(k) for k in MSEED_RX},
+}
+
+
+def replay(records: List[Record], target: str, speed: Optional[float], out_dir: Path,
+           show_output: bool = False) -> dict:
+    ser = ReplaySerial(records, speed=speed)
+    with open(os.devnull, "w") as devnull:
+        sink = contextlib.nullcontext() if show_output else contextlib.redirect_stdout(devnull)
+        with sink:
+            try:
+                TARGETS[target](ser, out_dir)
+            except ReplayDone:
+                pass
+    if ser.t_end is None:  # consumer returned on its own before the end of input
+        ser.t_end, ser.cpu_end = time.perf_counter(), time.process_time()
+    n = ser.i
+    wall = ser.t_end - (ser.t_first or ser.t_end)
+    cpu = ser.cpu_end - (ser.cpu_first or ser.cpu_end)
+    res = {
+        "target": target,
+        "mode": "asap" if speed is None else f"x{speed:g}",
+        "lines": n,
+        "lines_total": len(records),
+        "recorded_s": records[-1][0] if records else 0.0,
+        "wall_s": wall,
+        "cpu_s": cpu,
+        "cpu_us_per_line": cpu / n * 1e6 if n else 0.0,
+        "lines_per_s": n / wall if wall > 0 else 0.0,
+        "host_lines_written": ser.lines_written,
+        "files": sorted((p.name, p.stat().st_size) for p in out_dir.iterdir() if p.is_file()),
+    }
+    if ser.lateness:
+        lat = sorted(ser.lateness)
+        res["late_p50_ms"] = statistics.median(lat) * 1e3
+        res["late_max_ms"] = lat[-1] * 1e3
+    return res
+
+
+def print_report(res: dict) -> None:
+    print(f"[REPLAY] target={res['target']} mode={res['mode']} "
+          f"lines={res['lines']}/{res['lines_total']} (recorded span {res['recorded_s']:.1f}s)")
+    print(f"  time to completion : {res['wall_s']:.3f} s")
+    print(f"  CPU                : {res['cpu_s']:.3f} s  ({res['cpu_us_per_line']:.1f} us/line)")
+    print(f"  throughput         : {res['lines_per_s']:.0f} lines/s")
+    if "late_p50_ms" in res:
+        print(f"  pickup lateness    : p50 {res['late_p50_ms']:.2f} ms, max {res['late_max_ms']:.2f} ms")
+    if res["host_lines_written"]:
+        print(f"  host -> MCU lines  : {res['host_lines_written']}")
+    for name, size in res["files"]:
+        print(f"  wrote {name} ({size} bytes)")
+
+
+# ----------------------------
+# Synthetic captures
+# ----------------------------
+
+def _emit(out, t_s: float, line: str) -> None:
+    out.write(json.dumps({"t": int(t_s * 1e9), "c": "synth", "ev": "line", "d": "rx", "s": line},
+                         separators=(",", ":")) + "\n")
+
+
+def synth_tunnel(data: bytes, fname: str, out_path: str, chunk_chars: int = 40000,
+                 frag_chars: int = 220, payload: str = "filechunk", p: Optional[arq_sim.Params] = None) -> int:
+    """FRAG/MSG lines an RX tunnel MCU prints while a file arrives (no loss)."""
+    p = p or arq_sim.Params()
+    b64 = base64.b64encode(data).decode("ascii")
+    if payload == "file":
+        lines = [f"FILE:{fname}:{b64}"]
+    else:
+        chunks = [b64[i:i + chunk_chars] for i in range(0, len(b64), chunk_chars)]
+        lines = [f"FILECHUNK:{fname}:{i}:{len(chunks)}:{c}" for i, c in enumerate(chunks)]
+    t = 0.0
+    n = 0
+    with open(out_path, "w", encoding="utf-8") as out:
+        _emit(out, t, "=== LoRa Chat (PC Reassembly Mode) ===")
+        for seq, line in enumerate(lines):
+            frags = [line[i:i + frag_chars] for i in range(0, len(line), frag_chars)]
+            for idx, frag in enumerate(frags):
+                t += (arq_sim.toa_ms(len(frag) + 30, p) + p.frag_spacing_ms) / 1000.0
+                if len(frags) == 1:
+                    _emit(out, t, f"MSG,A1B2C3D4E5F6,{seq},-61,3.20,{frag}")
+                else:
+                    _emit(out, t, f"FRAG,A1B2C3D4E5F6,{seq},{idx},{len(frags)},-61,3.20,{frag}")
+                n += 1
+    return n
+
+
+def synth_mesh(data: bytes, fname: str, out_path: str, chunk_chars: int = 150,
+               p: Optional[arq_sim.Params] = None) -> int:
+    """[RX] DATA/Payload pairs a MeshNode prints while mesh_network_interface sends a file."""
+    p = p or arq_sim.Params()
+    full = f"FILE:{fname}:{len(data)}:" + base64.b64encode(data).decode("ascii")
+    chunks = [full[i:i + chunk_chars] for i in range(0, len(full), chunk_chars)]
+    t = 0.0
+    n = 0
+    with open(out_path, "w", encoding="utf-8") as out:
+        for idx, chunk in enumerate(chunks):
+            t += (arq_sim.toa_ms(len(chunk) + 40, p) + p.frag_spacing_ms) / 1000.0
+            _emit(out, t, f"[RX] DATA from Node_1 (seq={idx + 1}, hops=1)")
+            _emit(out, t, f"[RX] Payload: FRAG:{idx}:{len(chunks)}:{chunk}")
+            n += 2
+    return n
+
+
+# ----------------------------
+# CLI
+# ----------------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay captured MCU output into the host consumers.")
+    ap.add_argument("capture", nargs="?", help="trace JSONL (lora_host.trace) or plain text capture")
+    ap.add_argument("--target", choices=sorted(TARGETS), default="session")
+    mode = ap.add_mutually_exclusive_group()
+    mode.add_argument("--asap", action="store_true", help="Deliver lines as fast as they are read")
+    mode.add_argument("--speed", type=float, default=1.0, help="Recorded timing divided by this factor")
+    ap.add_argument("--component", default="", help="Only rx lines of this trace component")
+    ap.add_argument("--line-interval", type=float, default=0.0, help="Seconds between lines of a text capture")
+    ap.add_argument("--out-dir", default="", help="Where the consumer writes files (default: temp dir)")
+    ap.add_argument("--show-output", action="store_true", help="Let the consumer print to the console")
+    ap.add_argument("--json", default="", help="Also write the report as JSON here")
+    ap.add_argument("--synth", choices=["tunnel", "mesh"], help="Write a synthetic capture instead of replaying")
+    ap.add_argument("--file", help="File carried by the synthetic capture")
+    ap.add_argument("--payload", choices=["filechunk", "file"], default="filechunk",
+                    help="Tunnel payload framing for --synth tunnel (file = legacy FILE:, for mseed6)")
+    ap.add_argument("--sf", type=int, default=7)
+    ap.add_argument("--out", default="", help="Output path for --synth")
+    args = ap.parse_args()
+
+    if args.synth:
+        if not args.file or not args.out:
+            ap.error("--synth needs --file and --out")
+        src = Path(args.file)
+        params = arq_sim.Params(sf=args.sf)
+        if args.synth == "tunnel":
+            n = synth_tunnel(src.read_bytes(), src.name, args.out, payload=args.payload, p=params)
+        else:
+            n = synth_mesh(src.read_bytes(), src.name, args.out, p=params)
+        print(f"[OK] Wrote {n} lines to {args.out}")
+        return
+
+    if not args.capture:
+        ap.error("capture file required")
+    records = load_capture(args.capture, args.component, args.line_interval)
+    if not records:
+        print("[ERROR] No rx lines in capture")
+        sys.exit(1)
+    speed = None if args.asap else args.speed
+
+    with tempfile.TemporaryDirectory(prefix="replay_") as tmp:
+        out_dir = Path(args.out_dir or tmp)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        res = replay(records, args.target, speed, out_dir, args.show_output)
+    print_report(res)
+    if args.json:
+        Path(args.json).write_text(json.dumps(res, indent=2))
+
+
+if __name__ == "__main__":
+    main()
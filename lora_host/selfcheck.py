@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Unit checks that live next to the code they test.
+
+Each module in MODULES defines ``SELF_CHECKS``, a dict of check name ->
+function returning None on success or a short description of what is
+wrong. Modules are imported one by one, so a missing optional dependency
+(pandas for timing_analysis) only skips that module's checks.
+
+Receiver reassembly has its own harness, lora_host.conformance (lora check).
+
+Prints one PASS/FAIL line per check; exit status 1 on any failure.
+
+Usage:
+    python -m lora_host.selfcheck [--only sr_arq,imgbudget]
+"""
+
+import argparse
+import contextlib
+import importlib
+import os
+import sys
+from typing import List, Optional, Tuple
+
+MODULES = ("sr_arq", "imgbudget", "timing_analysis")
+
+
+def run(only: List[str], verbose: bool = False) -> List[Tuple[str, Optional[str]]]:
+    results: List[Tuple[str, Optional[str]]] = []
+    for name in MODULES:
+        if only and name not in only:
+            continue
+        try:
+            mod = importlib.import_module(f"lora_host.{name}")
+        except ImportError as e:
+            print(f"[INFO] {name} skipped: {e}")
+            continue
+        for check, fn in mod.SELF_CHECKS.items():
+            with open(os.devnull, "w") as devnull:
+                sink = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(devnull)
+                with sink:
+                    problem = fn()
+            results.append((f"{name}/{check}", problem))
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run the lora_host modules' own unit checks.")
+    ap.add_argument("--only", default="", help=f"Comma-separated modules ({', '.join(MODULES)})")
+    ap.add_argument("-v", "--verbose", action="store_true", help="Show the checks' console output")
+    args = ap.parse_args()
+
+    results = run([m for m in args.only.split(",") if m], args.verbose)
+    for name, problem in results:
+        print(f"[{'FAIL' if problem else 'PASS'}] {name}" + (f": {problem}" if problem else ""))
+    failed = sum(1 for _, p in results if p)
+    if failed:
+        print(f"[ERROR] {failed} of {len(results)} checks failed")
+        sys.exit(1)
+    print(f"[OK] {len(results)} checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Host-side selective-repeat ARQ for the multimedia tunnel.
+
+The MCU ARQ modes (S&W/GBN/SR/TDD) retransmit per LoRa fragment with a
+fixed 5 s timeout and a 20-fragment window. With the sketch in ARQ_NONE
+mode the radios only forward, and the two PCs run selective repeat end to
+end instead:
+
+  sender   -> SRSEG:<sid>:<seq>:<tot>:<data>   one line per segment
+  receiver -> SRACK:<sid>:<cum>:<bitmap>       written back to its own MCU
+
+``cum`` is the number of segments received in order (so segment ``cum``
+is the first missing one); bit ``i`` of the hex ``bitmap`` means segment
+``cum + 1 + i`` also arrived. Segment 0 carries the file name, segments
+1..tot-1 the base64 body.
+
+The retransmission timeout follows RFC 6298: SRTT/RTTVAR from SACK round
+trips, RTO = SRTT + 4*RTTVAR, Karn's rule (no samples from retransmitted
+segments) and exponential backoff when a timeout fires.
+
+Nothing here touches the serial port; LoRaSerialSession drives these
+classes from its TX path and reader thread.
+"""
+
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+SACK_BITS = 512  # segments covered by one bitmap beyond ``cum``
+RX_TTL_S = 900.0       # no segment for this long -> drop the incomplete transfer
+RX_MAX_PENDING = 16    # incomplete transfers kept; the oldest is dropped beyond that
+
+
+def sack_line(sid: str, cum: int, bitmap: int) -> str:
+    return f"SRACK:{sid}:{cum}:{bitmap:x}"
+
+
+def parse_bitmap(hexstr: str) -> int:
+    try:
+        return int(hexstr, 16) if hexstr else 0
+    except ValueError:
+        return 0
+
+
+# ----------------------------
+# RTO estimation
+# ----------------------------
+
+class RttEstimator:
+    """RFC 6298 smoothed RTT / RTO with backoff, all in seconds."""
+
+    __slots__ = ("srtt", "rttvar", "rto", "min_rto", "max_rto", "samples", "last")
+
+    def __init__(self, initial_rto: float = 15.0, min_rto: float = 2.0, max_rto: float = 120.0):
+        self.srtt: Optional[float] = None
+        self.rttvar = 0.0
+        self.rto = initial_rto
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.samples = 0
+        self.last: Optional[float] = None
+
+    def sample(self, rtt: float) -> None:
+        self.last = rtt
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.samples += 1
+        self.rto = min(self.max_rto, max(self.min_rto, self.srtt + 4 * self.rttvar))
+
+    def backoff(self) -> None:
+        self.rto = min(self.max_rto, self.rto * 2)
+
+
+# ----------------------------
+# Sender
+# ----------------------------
+
+@dataclass(slots=True)
+class _SegState:
+    sent_at: float = -1.0
+    tries: int = 0
+    acked: bool = False
+
+
+class SrSender:
+    """
+    Window/retransmission bookkeeping for one transfer.
+
+    Call ``next_to_send(now)`` to get the segment that should go out next
+    (a timed-out one first, then new ones inside the window), ``on_sent``
+    once the MCU reports [TX DONE] for it, and ``on_sack`` for every SRACK.
+    """
+
+    def __init__(self, sid: str, segments: List[str], window: int = 256,
+                 max_tries: int = 8, rtt: Optional[RttEstimator] = None):
+        self.sid = sid
+        self.segments = segments
+        self.tot = len(segments)
+        self.window = max(1, window)
+        self.max_tries = max_tries
+        self.rtt = rtt or RttEstimator()
+        self.state = [_SegState() for _ in segments]
+        self.base = 0        # first unacknowledged segment
+        self.next_new = 0    # next never-sent segment
+        self.acked = 0
+        self.retransmits = 0
+        self.failed_seq: Optional[int] = None
+        self._retx: Deque[int] = deque()  # timed out, not yet handed out again
+
+    @property
+    def done(self) -> bool:
+        return self.acked == self.tot
+
+    @property
+    def failed(self) -> bool:
+        return self.failed_seq is not None
+
+    def line(self, seq: int) -> str:
+        return f"SRSEG:{self.sid}:{seq}:{self.tot}:{self.segments[seq]}\n"
+
+    def next_to_send(self, now: float) -> Optional[int]:
+        if not self._retx:
+            rto = self.rtt.rto
+            state = self.state
+            expired = [seq for seq in range(self.base, min(self.next_new, self.base + self.window))
+                       if not state[seq].acked and state[seq].sent_at >= 0
+                       and now - state[seq].sent_at >= rto]
+            if expired:
+                for seq in expired:
+                    if state[seq].tries >= self.max_tries:
+                        self.failed_seq = seq
+                        return None
+                self.rtt.backoff()
+                self._retx.extend(expired)
+        while self._retx:
+            seq = self._retx.popleft()
+            if not self.state[seq].acked:
+                self.retransmits += 1
+                return seq
+        if self.next_new < self.tot and self.next_new < self.base + self.window:
+            return self.next_new
+        return None
+
+    def on_sent(self, seq: int, now: float) -> None:
+        st = self.state[seq]
+        st.sent_at = now
+        st.tries += 1
+        if seq == self.next_new:
+            self.next_new += 1
+
+    def _ack(self, seq: int, now: float) -> bool:
+        st = self.state[seq]
+        if st.acked:
+            return False
+        st.acked = True
+        self.acked += 1
+        # Karn: only unambiguous (single transmission) samples
+        if st.tries == 1 and st.sent_at >= 0:
+            self.rtt.sample(now - st.sent_at)
+        return True
+
+    def on_sack(self, cum: int, bitmap: int, now: float) -> int:
+        """Apply one SACK; returns how many segments it newly acknowledged."""
+        cum = min(cum, self.tot)
+        newly = 0
+        for seq in range(self.base, cum):
+            newly += self._ack(seq, now)
+        seq = cum + 1
+        while bitmap and seq < self.tot:
+            if bitmap & 1:
+                newly += self._ack(seq, now)
+            bitmap >>= 1
+            seq += 1
+        while self.base < self.tot and self.state[self.base].acked:
+            self.base += 1
+        return newly
+
+    def next_deadline(self) -> Optional[float]:
+        """Earliest time an in-flight segment times out (None if nothing in flight)."""
+        t = math.inf
+        for seq in range(self.base, self.next_new):
+            st = self.state[seq]
+            if not st.acked and st.sent_at >= 0:
+                t = min(t, st.sent_at + self.rtt.rto)
+        return None if t == math.inf else t
+
+
+# ----------------------------
+# Receiver
+# ----------------------------
+
+@dataclass(slots=True)
+class _RxTransfer:
+    tot: int
+    t_last: float
+    chunks: Dict[int, str] = field(default_factory=dict)
+    cum: int = 0
+    unacked: int = 0       # new segments since the last SACK
+    completed: bool = False
+
+
+class SrReceiver:
+    """
+    Collects SRSEG segments per sid and builds SACKs.
+
+    Completed transfers are remembered (without their data) so duplicate
+    segments after completion still get a final SACK; otherwise a lost
+    last SACK would leave the sender retrying until max_tries.
+
+    Incomplete transfers are bounded like lora_host.reassembly: dropped
+    after ``ttl_s`` without a segment, and the oldest goes once more than
+    ``max_pending`` are open.
+    """
+
+    def __init__(self, sack_every: int = 8, keep_done: int = 64, ttl_s: float = RX_TTL_S,
+                 max_pending: int = RX_MAX_PENDING, clock: Callable[[], float] = time.monotonic):
+        self.sack_every = max(1, sack_every)
+        self.keep_done = keep_done
+        self.ttl_s = ttl_s
+        self.max_pending = max_pending
+        self.clock = clock
+        self.transfers: Dict[str, _RxTransfer] = {}  # oldest first
+        self._done_order: List[str] = []
+        self._open = 0         # incomplete transfers in ``transfers``
+        self._next_sweep = 0.0
+        self.expired = 0
+        self.evicted = 0
+
+    def add(self, sid: str, seq: int, tot: int, data: str) -> Tuple[bool, bool]:
+        """Store a segment. Returns (is_new, should_sack_now)."""
+        now = self.clock()
+        if now >= self._next_sweep:
+            self.expire(now)
+        tr = self.transfers.get(sid)
+        if tr is None:
+            tr = self.transfers[sid] = _RxTransfer(tot, now)
+            self._open += 1
+            if self._open > self.max_pending:
+                self._evict(sid)
+        if tr.completed or seq in tr.chunks or not 0 <= seq < tr.tot:
+            # Duplicate: our SACK was probably lost, answer right away
+            return False, True
+        tr.chunks[seq] = data
+        tr.t_last = now
+        while tr.cum in tr.chunks:
+            tr.cum += 1
+        tr.unacked += 1
+        if tr.cum == tr.tot:
+            tr.completed = True
+            self._open -= 1
+            return True, True
+        return True, tr.unacked >= self.sack_every
+
+    def _evict(self, keep: str) -> None:
+        """Drop the oldest incomplete transfers until back within ``max_pending``."""
+        for sid in [k for k, tr in self.transfers.items() if not tr.completed and k != keep]:
+            if self._open <= self.max_pending:
+                break
+            del self.transfers[sid]
+            self._open -= 1
+            self.evicted += 1
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Drop incomplete transfers idle for ``ttl_s``; returns how many."""
+        now = self.clock() if now is None else now
+        self._next_sweep = now + self.ttl_s / 4
+        stale = [k for k, tr in self.transfers.items()
+                 if not tr.completed and now - tr.t_last >= self.ttl_s]
+        for k in stale:
+            del self.transfers[k]
+        self._open -= len(stale)
+        self.expired += len(stale)
+        return len(stale)
+
+    def sack(self, sid: str) -> Optional[str]:
+        tr = self.transfers.get(sid)
+        if tr is None:
+            return None
+        tr.unacked = 0
+        if tr.completed:
+            return sack_line(sid, tr.tot, 0)
+        bitmap = 0
+        chunks = tr.chunks
+        for i in range(min(SACK_BITS, tr.tot - tr.cum - 1)):
+            if tr.cum + 1 + i in chunks:
+                bitmap |= 1 << i
+        return sack_line(sid, tr.cum, bitmap)
+
+    def pending_sack(self, sid: str) -> bool:
+        tr = self.transfers.get(sid)
+        return tr is not None and tr.unacked > 0
+
+    def take(self, sid: str) -> Optional[List[str]]:
+        """Return the ordered segments of a completed transfer once, freeing them."""
+        tr = self.transfers.get(sid)
+        if tr is None or not tr.completed or not tr.chunks:
+            return None
+        out = [tr.chunks[i] for i in range(tr.tot)]
+        tr.chunks = {}
+        self._done_order.append(sid)
+        while len(self._done_order) > self.keep_done:
+            self.transfers.pop(self._done_order.pop(0), None)
+        return out
+
+
+# ----------------------------
+# Self-check (python -m lora_host.selfcheck)
+# ----------------------------
+
+def _check_backoff() -> Optional[str]:
+    snd = SrSender("s", ["x"] * 6, window=4)
+    for _ in range(4):
+        snd.on_sent(snd.next_to_send(0.0), 0.0)
+    rto = snd.rtt.rto
+    now = rto + 1                           # all four time out at once
+    got = []
+    while (seq := snd.next_to_send(now)) is not None:
+        got.append(seq)
+        snd.on_sent(seq, now)
+    if got != [0, 1, 2, 3]:
+        return f"retransmitted {got}, want [0, 1, 2, 3]"
+    if snd.rtt.rto != 2 * rto or snd.retransmits != 4:
+        return f"rto {rto:g} -> {snd.rtt.rto:g} after one timeout, want {2 * rto:g}"
+    return None
+
+
+def _check_rx_bounds() -> Optional[str]:
+    now = [1000.0]
+    rx = SrReceiver(ttl_s=60, max_pending=4, clock=lambda: now[0])
+    rx.add("done", 0, 1, "f")
+    rx.take("done")
+    for i in range(10):
+        rx.add(f"s{i}", 0, 3, "x")
+    open_ = sorted(k for k, tr in rx.transfers.items() if not tr.completed)
+    if open_ != ["s6", "s7", "s8", "s9"] or rx.evicted != 6 or "done" not in rx.transfers:
+        return f"open={open_}, evicted={rx.evicted}"
+    now[0] += 61
+    rx.add("new", 0, 3, "x")
+    if rx.expired != 4 or sorted(rx.transfers) != ["done", "new"]:
+        return f"expired={rx.expired}, left {sorted(rx.transfers)}"
+    if rx.add("s9", 1, 3, "y") != (True, False) or rx.transfers["s9"].cum != 0:
+        return "expired transfer kept its segments"
+    return None
+
+
+SELF_CHECKS: Dict[str, Callable[[], Optional[str]]] = {
+    "backoff": _check_backoff,
+    "rx_bounds": _check_rx_bounds,
+}
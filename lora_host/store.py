@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Indexed SQLite store for the experiment CSVs.
+
+Loads every run into one database so plots and comparisons do not have to
+re-parse whole CSV files with pandas each time:
+
+  - rx_results.csv / tx_results.csv   (pathloss loggers)  -> table pathloss
+  - Tx_*.csv / Rx_*.csv               (csv_capture.py)    -> table packets
+  - tx_data_*.csv / rx_data_*.csv     (csv_download.py)   -> table packets
+  - timing_data_*.csv                 (csv_download.py)   -> table timing
+
+Each source file is one run. Ingestion is incremental: the byte offset of
+the last complete line is remembered per file, so re-running only reads rows
+appended since (a file that shrank is re-imported from scratch).
+
+For the TX side of the pathloss tests the ack_rssi_dbm / ack_snr_db /
+ack_pathloss_db columns are stored in rssi_dbm / snr_db / pathloss_db with
+side = 'TX'; a missing pathloss_db is filled in as txp_dbm - rssi_dbm, as the
+plot scripts do.
+
+Usage:
+    python -m lora_host.store ingest runs.sqlite 03-FullStack_Experiments/
+    python -m lora_host.store summary runs.sqlite --side RX
+"""
+
+import argparse
+import csv
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from lora_host import lineparse
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      INTEGER PRIMARY KEY,
+    path        TEXT UNIQUE NOT NULL,
+    kind        TEXT NOT NULL,          -- pathloss | packets | timing
+    side        TEXT NOT NULL,          -- TX | RX | '' (timing holds both)
+    header      TEXT NOT NULL,
+    offset      INTEGER NOT NULL DEFAULT 0,
+    rows        INTEGER NOT NULL DEFAULT 0,
+    ingested_at REAL
+);
+
+CREATE TABLE IF NOT EXISTS pathloss (
+    run_id      INTEGER NOT NULL REFERENCES runs(run_id),
+    side        TEXT NOT NULL,
+    t           REAL,                   -- PC time, unix seconds
+    type        TEXT,
+    event       TEXT,
+    testId      INTEGER,
+    slot        INTEGER,
+    sf          INTEGER,
+    bw          INTEGER,
+    seq         INTEGER,
+    len         INTEGER,
+    toa_ms      REAL,
+    txp_dbm     REAL,
+    ack         INTEGER,
+    rssi_dbm    REAL,
+    snr_db      REAL,
+    pathloss_db REAL,
+    raw_line    TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_pathloss_run ON pathloss(run_id);
+CREATE INDEX IF NOT EXISTS ix_pathloss_test ON pathloss(testId, slot);
+CREATE INDEX IF NOT EXISTS ix_pathloss_time ON pathloss(t);
+CREATE INDEX IF NOT EXISTS ix_pathloss_sfbw ON pathloss(sf, bw, slot);
+
+-- Rollup of received packets (RX rows; TX rows with ack = 1), one set of
+-- partial sums per ingest batch, so per-(sf, bw) summaries only read a
+-- handful of rows per run.
+CREATE TABLE IF NOT EXISTS pathloss_rollup (
+    run_id INTEGER NOT NULL, side TEXT NOT NULL, testId INTEGER,
+    sf INTEGER NOT NULL, bw INTEGER NOT NULL,
+    n_pathloss_db INTEGER, s_pathloss_db REAL, ss_pathloss_db REAL,
+    lo_pathloss_db REAL, hi_pathloss_db REAL,
+    n_rssi_dbm INTEGER, s_rssi_dbm REAL, ss_rssi_dbm REAL,
+    lo_rssi_dbm REAL, hi_rssi_dbm REAL,
+    n_snr_db INTEGER, s_snr_db REAL, ss_snr_db REAL,
+    lo_snr_db REAL, hi_snr_db REAL
+);
+CREATE INDEX IF NOT EXISTS ix_rollup ON pathloss_rollup(side, sf, bw, testId, run_id);
+
+CREATE TABLE IF NOT EXISTS packets (
+    run_id      INTEGER NOT NULL REFERENCES runs(run_id),
+    side        TEXT NOT NULL,
+    t_ms        INTEGER,
+    packet_type TEXT,
+    seq         INTEGER,
+    idx         INTEGER,
+    tot         INTEGER,
+    bytes       INTEGER
+);
+CREATE INDEX IF NOT EXISTS ix_packets_run ON packets(run_id, seq, idx);
+CREATE INDEX IF NOT EXISTS ix_packets_time ON packets(t_ms);
+
+CREATE TABLE IF NOT EXISTS timing (
+    run_id      INTEGER NOT NULL REFERENCES runs(run_id),
+    node_id     TEXT,
+    role        TEXT,
+    event       TEXT,
+    seq         INTEGER,
+    idx         INTEGER,
+    tot         INTEGER,
+    bytes       INTEGER,
+    rssi        REAL,
+    snr         REAL,
+    toa_ms      INTEGER,
+    t_ms        INTEGER,
+    dt_ms       INTEGER
+);
+CREATE INDEX IF NOT EXISTS ix_timing_run ON timing(run_id, seq, idx);
+CREATE INDEX IF NOT EXISTS ix_timing_event ON timing(event, role);
+CREATE INDEX IF NOT EXISTS ix_timing_time ON timing(t_ms);
+"""
+
+# Filename patterns -> (kind, side)
+PATTERNS: List[Tuple[str, str, str]] = [
+    ("rx_results*.csv", "pathloss", "RX"),
+    ("tx_results*.csv", "pathloss", "TX"),
+    ("Rx_*.csv", "packets", "RX"),
+    ("Tx_*.csv", "packets", "TX"),
+    ("rx_data_*.csv", "packets", "RX"),
+    ("tx_data_*.csv", "packets", "TX"),
+    ("timing_data_*.csv", "timing", ""),
+]
+
+METRICS = ("pathloss_db", "rssi_dbm", "snr_db")
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """Open (and create if needed) the store."""
+    con = sqlite3.connect(db_path)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    con.executescript(SCHEMA)
+    return con
+
+
+# ----------------------------
+# Row converters
+# ----------------------------
+
+def _num(v: Optional[str], conv=float):
+    if v is None or v == "" or v == "-":
+        return None
+    try:
+        return conv(v)
+    except ValueError:
+        try:
+            return conv(float(v))
+        except ValueError:
+            return None
+
+
+def _iso_to_unix(s: str) -> Optional[float]:
+    try:
+        return time.mktime(time.strptime(s, "%Y-%m-%dT%H:%M:%S"))
+    except ValueError:
+        return None
+
+
+def _pathloss_row(run_id: int, side: str, r: Dict[str, str]) -> tuple:
+    if side == "TX":
+        rssi, snr, pl = r.get("ack_rssi_dbm"), r.get("ack_snr_db"), r.get("ack_pathloss_db")
+    else:
+        rssi, snr, pl = r.get("rssi_dbm"), r.get("snr_db"), r.get("pathloss_db")
+    txp = _num(r.get("txp_dbm"))
+    rssi = _num(rssi)
+    pl = _num(pl)
+    if pl is None and txp is not None and rssi is not None:
+        pl = txp - rssi
+    return (
+        run_id, side, _iso_to_unix(r.get("pc_time_iso", "")),
+        r.get("type", ""), r.get("event", ""),
+        _num(r.get("testId"), int), _num(r.get("slot"), int),
+        _num(r.get("sf"), int), _num(r.get("bw"), int),
+        _num(r.get("seq"), int), _num(r.get("len"), int),
+        _num(r.get("toa_ms")), txp, _num(r.get("ack"), int),
+        rssi, _num(snr), pl, r.get("raw_line", ""),
+    )
+
+
+def _packet_row(run_id: int, side: str, r: List[str]) -> Optional[tuple]:
+    if len(r) != 6:
+        return None
+    t_ms, ptype, seq, idx, tot, nbytes = r
+    return (run_id, side, _num(t_ms, int), ptype, _num(seq, int),
+            _num(idx, int), _num(tot, int), _num(nbytes, int))
+
+
+def _timing_row(run_id: int, line: str) -> Optional[tuple]:
+    ev = lineparse.parse_line(line)
+    if type(ev) is not lineparse.Timing:
+        return None
+    return (run_id, ev.node_id, ev.role, ev.event, ev.seq, ev.idx, ev.tot, ev.nbytes,
+            ev.rssi, ev.snr, ev.toa_ms, ev.t_ms, ev.dt_ms)
+
+
+# ----------------------------
+# Ingestion
+# ----------------------------
+
+def classify(path: Path) -> Optional[Tuple[str, str]]:
+    """(kind, side) for a CSV file name, or None if it is not a run file."""
+    for pattern, kind, side in PATTERNS:
+        if path.match(pattern):
+            return kind, side
+    return None
+
+
+def find_runs(roots: Iterable[str]) -> List[Path]:
+    """All run CSVs under the given files/directories."""
+    out = []
+    for root in map(Path, roots):
+        files = [root] if root.is_file() else sorted(root.rglob("*.csv"))
+        out.extend(p for p in files if classify(p) is not None)
+    return out
+
+
+def ingest_file(con: sqlite3.Connection, path: Path) -> int:
+    """Import rows appended to ``path`` since the last call. Returns rows added."""
+    kind, side = classify(path)
+    key = str(path.resolve())
+    size = path.stat().st_size
+    row = con.execute("SELECT run_id, offset, header FROM runs WHERE path = ?", (key,)).fetchone()
+    if row is not None and size < row[1]:
+        # File was truncated or rewritten: start over.
+        run_id = row[0]
+        for table in ("pathloss", "pathloss_rollup", "packets", "timing"):
+            con.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+        con.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+        row = None
+    if row is not None and size == row[1]:
+        return 0
+
+    with open(path, "rb") as f:
+        if row is None:
+            header = f.readline().decode("utf-8", errors="replace").strip()
+            if not header:
+                return 0
+            cur = con.execute(
+                "INSERT INTO runs(path, kind, side, header) VALUES (?, ?, ?, ?)",
+                (key, kind, side, header),
+            )
+            run_id, offset = cur.lastrowid, f.tell()
+        else:
+            run_id, offset, header = row
+            f.seek(offset)
+        data = f.read()
+
+    # Only complete lines; a partial last line is picked up next time.
+    end = data.rfind(b"\n") + 1
+    lines = data[:end].decode("utf-8", errors="replace").splitlines()
+
+    if kind == "pathloss":
+        names = next(csv.reader([header]))
+        rows = [_pathloss_row(run_id, side, dict(zip(names, r)))
+                for r in csv.reader(lines) if r]
+        last = con.execute("SELECT COALESCE(MAX(rowid), 0) FROM pathloss").fetchone()[0]
+        con.executemany(f"INSERT INTO pathloss VALUES ({', '.join('?' * 18)})", rows)
+        if rows:
+            _append_rollup(con, run_id, last)
+    elif kind == "packets":
+        rows = [t for t in (_packet_row(run_id, side, r) for r in csv.reader(lines)) if t]
+        con.executemany("INSERT INTO packets VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    else:
+        rows = [t for t in (_timing_row(run_id, l.strip()) for l in lines) if t]
+        con.executemany(f"INSERT INTO timing VALUES ({', '.join('?' * 13)})", rows)
+
+    con.execute(
+        "UPDATE runs SET offset = ?, rows = rows + ?, ingested_at = ? WHERE run_id = ?",
+        (offset + end, len(rows), time.time(), run_id),
+    )
+    return len(rows)
+
+
+def _append_rollup(con: sqlite3.Connection, run_id: int, after_rowid: int) -> None:
+    # Partial aggregates of just the new rows; queries SUM across batches, so
+    # an incremental import never re-reads rows it has already rolled up.
+    aggs = ", ".join(
+        f"COUNT({m}), SUM({m}), SUM({m} * {m}), MIN({m}), MAX({m})" for m in METRICS
+    )
+    con.execute(
+        f"INSERT INTO pathloss_rollup SELECT run_id, side, testId, sf, bw, {aggs} "
+        "FROM pathloss WHERE rowid > ? AND run_id = ? AND type = side "
+        "AND sf IS NOT NULL AND bw IS NOT NULL AND (side = 'RX' OR ack = 1) "
+        "GROUP BY run_id, side, testId, sf, bw",
+        (after_rowid, run_id),
+    )
+
+
+def ingest(con: sqlite3.Connection, roots: Iterable[str]) -> Dict[str, int]:
+    """Incrementally import every run file under ``roots`` in one transaction."""
+    added = {}
+    with con:
+        for path in find_runs(roots):
+            added[str(path)] = ingest_file(con, path)
+    return added
+
+
+# ----------------------------
+# Queries
+# ----------------------------
+
+def aggregate_by_sf_bw(
+    con: sqlite3.Connection,
+    metric: str = "pathloss_db",
+    side: str = "RX",
+    test_id: Optional[int] = None,
+    run_id: Optional[int] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+) -> List[Dict[str, float]]:
+    """
+    Per-(sf, bw) count/mean/std/min/max of ``metric`` for received packets
+    (side RX: type RX rows; side TX: type TX rows with ack = 1).
+    Answered from the rollup table unless a time window is given, in which
+    case the raw rows are scanned through the time index.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of {METRICS}")
+    args: list = [side]
+    if since is None and until is None:
+        m = metric
+        sql = (f"SELECT sf, bw, SUM(n_{m}), SUM(s_{m}), SUM(ss_{m}), MIN(lo_{m}), MAX(hi_{m}) "
+               "FROM pathloss_rollup WHERE side = ?")
+        filters = (("testId = ?", test_id), ("run_id = ?", run_id))
+    else:
+        sql = (f"SELECT sf, bw, COUNT({metric}), SUM({metric}), SUM({metric} * {metric}), "
+               f"MIN({metric}), MAX({metric}) FROM pathloss WHERE side = ? AND type = side "
+               "AND sf IS NOT NULL AND bw IS NOT NULL AND (side = 'RX' OR ack = 1)")
+        filters = (("testId = ?", test_id), ("run_id = ?", run_id),
+                   ("t >= ?", since), ("t < ?", until))
+    for clause, value in filters:
+        if value is not None:
+            sql += f" AND {clause}"
+            args.append(value)
+    sql += " GROUP BY sf, bw ORDER BY bw, sf"
+
+    out = []
+    for sf, bw, n, total, total_sq, lo, hi in con.execute(sql, args):
+        if not n:
+            continue
+        mean = total / n
+        var = max(total_sq / n - mean * mean, 0.0) * n / (n - 1) if n > 1 else 0.0
+        out.append({"sf": sf, "bw": bw, "n": n, "mean": mean, "std": var ** 0.5,
+                    "min": lo, "max": hi})
+    return out
+
+
+def runs(con: sqlite3.Connection, kind: Optional[str] = None) -> List[Dict[str, object]]:
+    """List ingested runs (optionally of one kind)."""
+    sql = "SELECT run_id, path, kind, side, rows, ingested_at FROM runs"
+    args: tuple = ()
+    if kind:
+        sql += " WHERE kind = ?"
+        args = (kind,)
+    cols = ("run_id", "path", "kind", "side", "rows", "ingested_at")
+    return [dict(zip(cols, r)) for r in con.execute(sql + " ORDER BY run_id", args)]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Import experiment CSVs into SQLite and query them.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("ingest", help="Import new rows from run CSVs")
+    p.add_argument("db")
+    p.add_argument("paths", nargs="+", help="CSV files or directories to scan")
+    p = sub.add_parser("summary", help="Per-(sf, bw) aggregate of a metric")
+    p.add_argument("db")
+    p.add_argument("--side", choices=["RX", "TX"], default="RX")
+    p.add_argument("--metric", choices=METRICS, default="pathloss_db")
+    p.add_argument("--test-id", type=int)
+    p.add_argument("--run-id", type=int)
+    args = ap.parse_args()
+
+    con = connect(args.db)
+    if args.cmd == "ingest":
+        t0 = time.perf_counter()
+        added = ingest(con, args.paths)
+        for path, n in added.items():
+            print(f"[INFO] {path}: +{n} rows")
+        print(f"[OK] {len(added)} files, {sum(added.values())} new rows "
+              f"in {time.perf_counter() - t0:.2f} s")
+        return
+
+    t0 = time.perf_counter()
+    rows = aggregate_by_sf_bw(con, args.metric, args.side, args.test_id, args.run_id)
+    dt_ms = (time.perf_counter() - t0) * 1000
+    print(f"{'sf':>3} {'bw':>7} {'n':>6} {'mean':>8} {'std':>6} {'min':>8} {'max':>8}")
+    for r in rows:
+        print(f"{r['sf']:>3} {r['bw']:>7} {r['n']:>6} {r['mean']:>8.2f} {r['std']:>6.2f} "
+              f"{r['min']:>8.2f} {r['max']:>8.2f}")
+    print(f"[INFO] query took {dt_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
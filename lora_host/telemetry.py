@@ -0,0 +1,214 @@
+"""
+Batched, columnar sink for the ``LOG,...`` telemetry of the pathloss tests.
+
+Rows are parsed once into per-field column lists and written out in batches,
+either when ``flush_rows`` rows are pending or ``flush_secs`` have passed:
+
+  - CSV (always): same header/layout the loggers have always written.
+  - SQLite (optional): one ``telemetry`` table, numeric fields as REAL.
+  - NumPy .npz shards (optional): one file per batch, numeric fields as
+    float64 (NaN when missing), the rest as strings.
+
+Crash safety comes from a write-ahead journal instead of flushing the CSV on
+every line: each raw line is appended to ``<csv>.wal`` (one unbuffered write,
+no fsync) before it is buffered. A batch flush writes all outputs, fsyncs the
+CSV and then empties the journal. If the logger dies in between, the next
+start replays the journal, so rows are delivered at least once.
+"""
+
+import csv
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from lora_host import lineparse
+
+
+class TelemetrySink:
+    """Collect LOG lines into columns and flush them in batches."""
+
+    def __init__(
+        self,
+        csv_path: str,
+        fieldnames: Sequence[str],
+        numeric: Iterable[str] = (),
+        flush_rows: int = 256,
+        flush_secs: float = 2.0,
+        sqlite_path: Optional[str] = None,
+        npz_dir: Optional[str] = None,
+        journal: bool = True,
+    ):
+        self.csv_path = Path(csv_path)
+        self.fieldnames = list(fieldnames)
+        self.numeric = set(numeric)
+        self.flush_rows = flush_rows
+        self.flush_secs = flush_secs
+        self.sqlite_path = sqlite_path
+        self.npz_dir = Path(npz_dir) if npz_dir else None
+
+        self._cols: Dict[str, List[str]] = {k: [] for k in self.fieldnames}
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self.rows_written = 0
+        self.batches_written = 0
+
+        self._csv_file = self._open_csv()
+        self._csv = csv.writer(self._csv_file)
+        self._db = self._open_sqlite() if sqlite_path else None
+        self._shard = 0
+        if self.npz_dir:
+            self.npz_dir.mkdir(parents=True, exist_ok=True)
+            self._shard = len(list(self.npz_dir.glob(f"{self.csv_path.stem}_*.npz")))
+
+        self._wal_path = self.csv_path.with_name(self.csv_path.name + ".wal")
+        self._wal = None
+        if journal:
+            self._recover()
+            # Unbuffered binary append: one write() per line, survives a
+            # process crash without paying for an fsync.
+            self._wal = open(self._wal_path, "ab", buffering=0)
+
+    # ----------------------------
+    # Outputs
+    # ----------------------------
+
+    def _open_csv(self):
+        new = (not self.csv_path.exists()) or self.csv_path.stat().st_size == 0
+        f = open(self.csv_path, "a", newline="", encoding="utf-8")
+        if new:
+            csv.writer(f).writerow(self.fieldnames)
+            f.flush()
+        return f
+
+    def _open_sqlite(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.sqlite_path)
+        cols = ", ".join(
+            f'"{k}" {"REAL" if k in self.numeric else "TEXT"}' for k in self.fieldnames
+        )
+        db.execute(f"CREATE TABLE IF NOT EXISTS telemetry ({cols})")
+        db.commit()
+        return db
+
+    def _recover(self) -> None:
+        if not self._wal_path.exists() or self._wal_path.stat().st_size == 0:
+            return
+        n = 0
+        with open(self._wal_path, "r", encoding="utf-8", errors="replace") as f:
+            for rec in f:
+                ts, sep, line = rec.rstrip("\n").partition("\t")
+                if sep:
+                    self._add(ts, line)
+                    n += 1
+        print(f"[INFO] Recovered {n} rows from journal {self._wal_path}")
+        self.flush()
+        self._wal_path.unlink()
+
+    # ----------------------------
+    # Ingest
+    # ----------------------------
+
+    def _add(self, ts: str, line: str) -> None:
+        row = lineparse.parse_log(line).as_row()
+        row["pc_time_iso"] = ts
+        get = row.get
+        for k, col in self._cols.items():
+            col.append(get(k, ""))
+        self._pending += 1
+
+    def add_line(self, line: str, ts: Optional[str] = None) -> None:
+        """Journal and buffer one LOG line; flushes when a limit is reached."""
+        if ts is None:
+            ts = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime())
+        if self._wal is not None:
+            self._wal.write(f"{ts}\t{line}\n".encode("utf-8"))
+        self._add(ts, line)
+        if self._pending >= self.flush_rows:
+            self.flush()
+        else:
+            self.poll()
+
+    def poll(self) -> None:
+        """Flush if rows have been waiting longer than ``flush_secs``."""
+        if self._pending and time.monotonic() - self._last_flush >= self.flush_secs:
+            self.flush()
+
+    # ----------------------------
+    # Flush
+    # ----------------------------
+
+    def flush(self) -> None:
+        """Write all pending rows to every output and empty the journal."""
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        cols = [self._cols[k] for k in self.fieldnames]
+
+        self._csv.writerows(zip(*cols))
+        self._csv_file.flush()
+        os.fsync(self._csv_file.fileno())
+
+        if self._db is not None:
+            marks = ", ".join("?" * len(self.fieldnames))
+            self._db.executemany(
+                f"INSERT INTO telemetry VALUES ({marks})",
+                zip(*(self._sql_column(k) for k in self.fieldnames)),
+            )
+            self._db.commit()
+
+        if self.npz_dir is not None:
+            self._write_npz()
+
+        if self._wal is not None:
+            self._wal.truncate(0)
+
+        self.rows_written += self._pending
+        self.batches_written += 1
+        self._pending = 0
+        for col in cols:
+            col.clear()
+
+    def _sql_column(self, k: str) -> list:
+        col = self._cols[k]
+        if k not in self.numeric:
+            return col
+        return [_to_float(v) for v in col]
+
+    def _write_npz(self) -> None:
+        import numpy as np
+
+        arrays = {}
+        for k in self.fieldnames:
+            col = self._cols[k]
+            if k in self.numeric:
+                # Blanks and junk become NaN, like pd.to_numeric(errors="coerce")
+                arrays[k] = np.array([_to_float(v) for v in col], dtype=np.float64)
+            else:
+                arrays[k] = np.array(col, dtype=str)
+        path = self.npz_dir / f"{self.csv_path.stem}_{self._shard:06d}.npz"
+        np.savez(path, **arrays)
+        self._shard += 1
+
+    def close(self) -> None:
+        """Flush remaining rows and release files; the journal is removed."""
+        self.flush()
+        self._csv_file.close()
+        if self._db is not None:
+            self._db.close()
+        if self._wal is not None:
+            self._wal.close()
+            self._wal_path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _to_float(v: str) -> Optional[float]:
+    try:
+        return float(v)
+    except ValueError:
+        return None
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Text-safe binary encodings for the MCU line protocols.
+
+``FILE:``/``FRAG:`` payloads on the mesh and ``FILECHUNK:``/``SRSEG:`` in the
+tunnel carry binary data as text, so the expansion is paid on the UART and
+again on air. Available encodings:
+
+  b64   base64 (RFC 4648)            4 chars / 3 bytes   +33.3%   default
+  a85   Ascii85 (base64.a85encode)   5 chars / 4 bytes   +25.0%
+  z85   Z85 (ZeroMQ alphabet)        5 chars / 4 bytes   +25.0%
+  b91   basE91                       ~16 chars / 13 bytes ~+23%
+
+All encoded text avoids ``:`` and ``,`` (the parsers split headers on them),
+blanks (the firmware ``trim()``s lines) and newlines. Where an alphabet uses
+``:`` or ``,``, they are mapped to characters the alphabet does not use:
+
+  a85   "," -> "v"   ":" -> "w"
+  z85   ":" -> "_"
+  b91   "," -> "-"   ":" -> "'"
+
+The encoding is chosen per transfer by the sender and carried in band: the
+encoded stream starts with ``~<name>~`` unless it is base64. That keeps b64
+transfers byte-identical to what older receivers expect, and ``decode``
+accepts both. The tag goes at the start of the whole stream, before it is
+split into chunks, so only the first chunk carries it.
+
+``python -m lora_host.bench.encodings`` compares size, LoRa airtime and CPU.
+"""
+
+import base64
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+TAG = "~"
+DEFAULT = "b64"
+
+
+@dataclass(frozen=True)
+class Codec:
+    name: str
+    encode: Callable[[bytes], str]
+    decode: Callable[[str], bytes]
+    description: str
+
+
+# ----------------------------
+# Ascii85
+# ----------------------------
+
+_A85_OUT = str.maketrans({",": "v", ":": "w"})
+_A85_IN = str.maketrans({"v": ",", "w": ":"})
+
+
+def _a85_encode(data: bytes) -> str:
+    return base64.a85encode(data).decode("ascii").translate(_A85_OUT)
+
+
+def _a85_decode(text: str) -> bytes:
+    return base64.a85decode(text.translate(_A85_IN))
+
+
+# ----------------------------
+# Z85 (same radix-85 arithmetic as base64.b85encode, ZeroMQ alphabet)
+# ----------------------------
+
+_B85_ALPHABET = ("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+                 "abcdefghijklmnopqrstuvwxyz!#$%&()*+-;<=>?@^_`{|}~")
+_Z85_ALPHABET = ("0123456789abcdefghijklmnopqrstuvwxyz"
+                 "ABCDEFGHIJKLMNOPQRSTUVWXYZ.-_+=^!/*?&<>()[]{}@%$#")  # ":" -> "_"
+_Z85_OUT = str.maketrans(_B85_ALPHABET, _Z85_ALPHABET)
+_Z85_IN = str.maketrans(_Z85_ALPHABET, _B85_ALPHABET)
+
+
+def _z85_encode(data: bytes) -> str:
+    # b85encode handles a short last group like Z85 implementations that
+    # allow unpadded input: n bytes -> n + 1 chars
+    return base64.b85encode(data).decode("ascii").translate(_Z85_OUT)
+
+
+def _z85_decode(text: str) -> bytes:
+    return base64.b85decode(text.translate(_Z85_IN))
+
+
+# ----------------------------
+# basE91 (Joachim Henke), table-driven
+# ----------------------------
+
+# Standard basE91 table with "," -> "-" and ":" -> "'" (neither is in the original)
+_B91_ALPHABET = ("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+                 "0123456789!#$%&()*+,./:;<=>?@[]^_`{|}~\"").replace(",", "-").replace(":", "'")
+assert len(_B91_ALPHABET) == 91 and len(set(_B91_ALPHABET)) == 91
+
+# One 13/14-bit value -> its two output characters
+_B91_PAIRS: List[str] = [_B91_ALPHABET[v % 91] + _B91_ALPHABET[v // 91] for v in range(91 * 91)]
+_B91_VALUE: Dict[str, int] = {c: i for i, c in enumerate(_B91_ALPHABET)}
+_B91_PAIR_VALUE: Dict[str, int] = {p: v for v, p in enumerate(_B91_PAIRS)}
+
+
+def _b91_encode(data: bytes) -> str:
+    out: List[str] = []
+    append = out.append
+    pairs = _B91_PAIRS
+    b = n = 0
+    for byte in data:
+        b |= byte << n
+        n += 8
+        if n > 13:
+            v = b & 8191
+            if v > 88:
+                b >>= 13
+                n -= 13
+            else:
+                v = b & 16383
+                b >>= 14
+                n -= 14
+            append(pairs[v])
+    if n:
+        append(_B91_ALPHABET[b % 91])
+        if n > 7 or b > 90:
+            append(_B91_ALPHABET[b // 91])
+    return "".join(out)
+
+
+def _b91_decode(text: str) -> bytes:
+    out = bytearray()
+    append = out.append
+    pair_value = _B91_PAIR_VALUE
+    b = n = 0
+    end = len(text) - (len(text) & 1)
+    try:
+        for i in range(0, end, 2):
+            v = pair_value[text[i:i + 2]]
+            b |= v << n
+            n += 13 if (v & 8191) > 88 else 14
+            while n > 7:
+                append(b & 255)
+                b >>= 8
+                n -= 8
+        if end < len(text):
+            b |= _B91_VALUE[text[end]] << n
+            append(b & 255)
+    except KeyError as e:
+        raise ValueError(f"invalid basE91 character in {e}") from None
+    return bytes(out)
+
+
+# ----------------------------
+# Registry and in-band tag
+# ----------------------------
+
+CODECS: Dict[str, Codec] = {
+    "b64": Codec("b64", lambda d: base64.b64encode(d).decode("ascii"),
+                 lambda s: base64.b64decode(s), "base64, 4 chars per 3 bytes"),
+    "a85": Codec("a85", _a85_encode, _a85_decode, "Ascii85, 5 chars per 4 bytes"),
+    "z85": Codec("z85", _z85_encode, _z85_decode, "Z85, 5 chars per 4 bytes"),
+    "b91": Codec("b91", _b91_encode, _b91_decode, "basE91, ~16 chars per 13 bytes"),
+}
+
+
+def encode(data: bytes, name: str = DEFAULT) -> str:
+    """``data`` as text in encoding ``name``, tagged unless it is base64."""
+    codec = CODECS.get(name)
+    if codec is None:
+        raise ValueError(f"unknown encoding {name!r} (choose from {', '.join(CODECS)})")
+    text = codec.encode(data)
+    return text if name == DEFAULT else f"{TAG}{name}{TAG}{text}"
+
+
+def encoding_of(text: str) -> str:
+    """Name of the encoding a stream from ``encode`` uses."""
+    if text.startswith(TAG):
+        end = text.find(TAG, 1)
+        if 0 < end <= 8:
+            return text[1:end]
+    return DEFAULT
+
+
+def decode(text: str) -> bytes:
+    """Inverse of ``encode``; raises ValueError on an unknown tag or bad data."""
+    name = encoding_of(text)
+    if name != DEFAULT:
+        text = text[len(name) + 2:]
+    codec = CODECS.get(name)
+    if codec is None:
+        raise ValueError(f"unknown encoding tag {name!r}")
+    try:
+        return codec.decode(text)
+    except ValueError:
+        raise
+    except Exception as e:  # binascii.Error is a ValueError; be safe with the rest
+        raise ValueError(str(e)) from None
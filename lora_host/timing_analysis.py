@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+End-to-end latency / ACK RTT / retransmission / goodput analysis for the
+13-Timing_Analysis firmware.
+
+Each node writes three streams: timing_data_*.csv (every TIM event),
+tx_data_*.csv and rx_data_*.csv (one row per packet sent / received; the
+live capture equivalents are Tx_*.csv / Rx_*.csv). All are normalised into
+one event table per node and aligned by (seq, fragment_idx); everything below
+is done with vectorized pandas joins (merge_asof / groupby), no Python loops
+over rows.
+
+  - ACK RTT (sender clock only): MSG(F)_TX -> matching ACK(F)_RX.
+  - Retransmissions: TX attempts per (seq, idx) minus one; duplicates on RX.
+  - Measured vs theoretical airtime: sendLoRa() blocks until the packet is
+    out, so for a TX that directly follows its trigger (MSGF_RX -> ACKF_TX,
+    WAIT_ACKF_OK -> MSGF_TX, ...) the gap between the two events is the
+    measured airtime; it is compared with the firmware's toa_ms.
+  - One-way latency: needs both nodes. The receiver clock offset is estimated
+    NTP-style from the data/ACK exchanges, then latency is measured from the
+    start of the successful transmission to its reception.
+  - Goodput over time: first-copy bytes delivered per time bin.
+
+Usage:
+    python -m lora_host.timing_analysis timing_data_A.csv tx_data_A.csv rx_data_A.csv \\
+        timing_data_B.csv ... [--bin 10] [--out report_dir]
+"""
+
+import argparse
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Radio defaults of 13-Timing_Analysis/src/main.cpp
+LORA_SF = 8
+LORA_BW_HZ = 125000
+LORA_CR_DEN = 5
+LORA_HAS_CRC = True
+
+EVENT_COLUMNS = ["node", "role", "event", "seq", "idx", "tot", "bytes",
+                 "rssi", "snr", "toa_ms", "t_ms"]
+
+TX_DATA = ("MSG_TX", "MSGF_TX")
+RX_DATA = ("MSG_RX", "MSGF_RX")
+TX_ACK = ("ACK_TX", "ACKF_TX")
+RX_ACK = ("ACK_RX", "ACKF_RX")
+
+# (previous event, TX event) pairs where the TX starts right after the
+# previous event, so the gap between them is the measured airtime.
+AIRTIME_PAIRS = [
+    "MSG_RX>ACK_TX", "MSGF_RX>ACKF_TX",
+    "ACKF_TX>ACK_TX", "WAIT_ACKF_OK>MSGF_TX",
+]
+
+
+def lora_toa_ms(payload_len, sf: int = LORA_SF, bw: int = LORA_BW_HZ,
+                cr_den: int = LORA_CR_DEN, crc: bool = LORA_HAS_CRC):
+    """Semtech time-on-air (explicit header), same formula as loraToaMs()."""
+    n = np.asarray(payload_len, dtype=np.float64)
+    de = 1 if (sf >= 11 and bw == 125000) else 0
+    ts = (1 << sf) / bw
+    t_pre = (8.0 + 4.25) * ts
+    sym = np.ceil((8.0 * n - 4.0 * sf + 28.0 + 16.0 * int(crc)) / (4.0 * (sf - 2.0 * de)))
+    n_payload = 8.0 + np.maximum(sym * cr_den, 0)
+    return (t_pre + n_payload * ts) * 1000.0
+
+
+# ----------------------------
+# Loading
+# ----------------------------
+
+_TIMING_NAMES = ["tag", "node", "role", "event", "seq", "idx", "tot", "bytes",
+                 "rssi", "snr", "toa_ms", "t_ms", "dt_ms"]
+_PACKET_NAMES = ["t_ms", "packet_type", "seq", "idx", "tot", "bytes"]
+
+
+def read_timing(path: str) -> pd.DataFrame:
+    """timing_data_*.csv (header has 12 names, rows carry a TIM prefix)."""
+    df = pd.read_csv(
+        path, header=None, skiprows=1, names=_TIMING_NAMES,
+        usecols=EVENT_COLUMNS, na_values=["-"], engine="c",
+        dtype={"node": str, "role": str, "event": str, "seq": np.int64, "idx": np.int64,
+               "tot": np.int64, "bytes": np.int64, "rssi": np.float64, "snr": np.float64,
+               "toa_ms": np.float64, "t_ms": np.int64},
+    )
+    return df[EVENT_COLUMNS]
+
+
+def read_packets(path: str, direction: str, node: str = "") -> pd.DataFrame:
+    """tx_data_*/rx_data_*/Tx_*/Rx_* packet CSVs as events (direction TX or RX)."""
+    df = pd.read_csv(path, header=None, skiprows=1, names=_PACKET_NAMES, engine="c",
+                     dtype={"packet_type": str, "t_ms": np.int64, "seq": np.int64,
+                            "idx": np.int64, "tot": np.int64, "bytes": np.int64})
+    return pd.DataFrame({
+        "node": node,
+        "role": direction,
+        "event": df["packet_type"] + "_" + direction,
+        "seq": df["seq"], "idx": df["idx"], "tot": df["tot"], "bytes": df["bytes"],
+        "rssi": np.nan, "snr": np.nan,
+        "toa_ms": np.round(lora_toa_ms(df["bytes"].to_numpy())),
+        "t_ms": df["t_ms"],
+    })
+
+
+# csv_capture.py rotates Tx_<ts>.csv into Tx_<ts>_001.csv, ... (.csv.gz with --gzip)
+_RUN_RE = re.compile(r"^(timing_data|tx_data|rx_data|Tx|Rx)_(.+?)(?:_(\d{3}))?\.csv(?:\.gz)?$")
+
+
+def load_nodes(paths: Iterable[str]) -> Dict[str, pd.DataFrame]:
+    """
+    Group files by their download/capture suffix (one group per node) and
+    build one event table per node. timing_data is the complete stream; the
+    packet CSVs repeat its TX/RX rows and are only used when it is missing.
+    Rotated capture segments are read in segment order as one stream.
+    """
+    groups: Dict[str, Dict[str, List[Tuple[int, str]]]] = {}
+    for p in map(Path, paths):
+        m = _RUN_RE.match(p.name)
+        if not m:
+            raise ValueError(f"Unrecognised file name: {p}")
+        segment = int(m.group(3) or 0)
+        groups.setdefault(m.group(2), {}).setdefault(m.group(1).lower(), []).append((segment, str(p)))
+
+    def read_all(reader, segments, *args) -> pd.DataFrame:
+        return pd.concat([reader(path, *args) for _, path in sorted(segments)], ignore_index=True)
+
+    nodes = {}
+    for key, files in groups.items():
+        if "timing_data" in files:
+            ev = read_all(read_timing, files["timing_data"])
+            name = ev["node"].iloc[0] if len(ev) else key
+        else:
+            parts = []
+            for kind, direction in (("tx_data", "TX"), ("tx", "TX"), ("rx_data", "RX"), ("rx", "RX")):
+                if kind in files:
+                    parts.append(read_all(read_packets, files[kind], direction, key))
+            ev = pd.concat(parts, ignore_index=True)
+            name = key
+        nodes[name] = _prepare(ev)
+    return nodes
+
+
+def _prepare(ev: pd.DataFrame) -> pd.DataFrame:
+    # Categorical event/role columns make every isin()/comparison an integer
+    # operation; string columns dominate the run time on large logs.
+    if not ev["t_ms"].is_monotonic_increasing:
+        ev = ev.sort_values("t_ms", kind="stable", ignore_index=True)
+    for col in ("node", "role", "event"):
+        if not isinstance(ev[col].dtype, pd.CategoricalDtype):
+            ev[col] = ev[col].astype("category")
+    # One int64 join key instead of the (seq, idx) pair: single-column
+    # groupby/merge_asof skip the multi-key factorisation.
+    ev["key"] = _key(ev["seq"].to_numpy(), ev["idx"].to_numpy())
+    return ev
+
+
+def _key(seq, idx):
+    return (np.asarray(seq, dtype=np.int64) << 16) | (np.asarray(idx, dtype=np.int64) & 0xFFFF)
+
+
+def _unkey(key):
+    key = np.asarray(key, dtype=np.int64)
+    idx = key & 0xFFFF
+    return key >> 16, np.where(idx == 0xFFFF, -1, idx)
+
+
+# ----------------------------
+# Analysis
+# ----------------------------
+
+@dataclass
+class Report:
+    summary: Dict[str, float] = field(default_factory=dict)
+    fragments: pd.DataFrame = None    # per (seq, idx)
+    rtt: pd.DataFrame = None          # per acknowledged TX attempt
+    airtime: pd.DataFrame = None      # measured vs theoretical, per TX event
+    goodput: pd.DataFrame = None      # per time bin
+
+
+def _split_roles(nodes: Dict[str, pd.DataFrame]):
+    """
+    Pick the data sender (most MSG/MSGF TX events) and the receiver. With a
+    single node's files, that node plays both roles (its own sends and the
+    messages it received) and no clock alignment is possible.
+    """
+    counts = {n: int(ev["event"].isin(TX_DATA).sum()) for n, ev in nodes.items()}
+    ordered = sorted(nodes, key=counts.get, reverse=True)
+    if len(ordered) == 1:
+        ev = nodes[ordered[0]]
+        return ev, ev
+    return nodes[ordered[0]], nodes[ordered[1]]
+
+
+def _pick(ev: pd.DataFrame, events, cols: List[str]) -> pd.DataFrame:
+    """Rows of the given events, only the needed columns (avoids copying the rest)."""
+    return ev.loc[ev["event"].isin(events).to_numpy(), cols]
+
+
+def _asof(left: pd.DataFrame, right: pd.DataFrame, on: str, direction: str) -> pd.DataFrame:
+    # merge_asof needs both sides sorted on the time key
+    return pd.merge_asof(left.sort_values(on), right.sort_values(on), on=on,
+                         by="key", direction=direction, suffixes=("", "_r"))
+
+
+def airtime_table(ev: pd.DataFrame) -> pd.DataFrame:
+    """Measured airtime of TX events that start right after their trigger."""
+    cats = list(ev["event"].cat.categories)
+    k = len(cats) + 1
+    wanted = [cats.index(a) * k + cats.index(b)
+              for a, b in (p.split(">") for p in AIRTIME_PAIRS) if a in cats and b in cats]
+    codes = ev["event"].cat.codes.to_numpy().astype(np.int64)
+    prev = np.empty_like(codes)
+    prev[0], prev[1:] = k - 1, codes[:-1]
+    t = ev["t_ms"].to_numpy()
+    gap = np.empty(len(t), dtype=np.float64)
+    gap[0], gap[1:] = np.nan, np.diff(t)
+    mask = np.isin(prev * k + codes, wanted) & (ev["toa_ms"].to_numpy() > 0)
+    out = ev.loc[mask, ["node", "event", "seq", "idx", "bytes", "toa_ms"]].copy()
+    out["measured_ms"] = gap[mask]
+    out["excess_ms"] = out["measured_ms"] - out["toa_ms"]
+    return out
+
+
+def estimate_offset(sender: pd.DataFrame, receiver: pd.DataFrame) -> float:
+    """
+    Receiver clock minus sender clock (ms). Uses the last attempt of each
+    (seq, idx) in both directions, like NTP: the forward and reverse delays
+    cancel when they are similar.
+    """
+    def last(ev, events):
+        sub = _pick(ev, events, ["key", "t_ms"])
+        return sub.groupby("key")["t_ms"].max()
+
+    fwd = (last(receiver, RX_DATA) - last(sender, TX_DATA)).dropna()
+    rev = (last(sender, RX_ACK) - last(receiver, TX_ACK)).dropna()
+    if fwd.empty or rev.empty:
+        return float("nan")
+    return float((fwd.median() - rev.median()) / 2.0)
+
+
+def analyze(nodes: Dict[str, pd.DataFrame], bin_s: float = 10.0) -> Report:
+    nodes = {n: _prepare(ev) for n, ev in nodes.items()}
+    sender, receiver = _split_roles(nodes)
+    rep = Report()
+    s = rep.summary
+
+    frames = []
+    tx = _pick(sender, TX_DATA, ["event", "key", "tot", "bytes", "toa_ms", "t_ms"])
+    g = tx.groupby("key")
+    frames.append(pd.DataFrame({
+        "tot": g["tot"].max(),
+        "tx_attempts": g.size(),
+        "first_tx_ms": g["t_ms"].min(),
+        "last_tx_ms": g["t_ms"].max(),
+        "toa_ms": g["toa_ms"].max(),
+    }))
+
+    # ACK RTT: each ACK(F)_RX back to the latest TX attempt of its (seq, idx)
+    ack = _pick(sender, RX_ACK, ["key", "seq", "idx", "t_ms", "event"])
+    ack = ack.rename(columns={"event": "ack_event"})
+    ack["ack_ms"] = ack["t_ms"]
+    att = tx[["key", "t_ms", "event", "bytes", "toa_ms"]].copy()
+    att["tx_ms"] = att["t_ms"]
+    rtt = _asof(ack, att, "t_ms", "backward").dropna(subset=["tx_ms"])
+    rtt["rtt_ms"] = rtt["ack_ms"] - rtt["tx_ms"]
+    rep.rtt = rtt[["seq", "idx", "event", "ack_event", "bytes", "toa_ms", "tx_ms", "ack_ms", "rtt_ms"]]
+    s["tx_packets"] = int(len(tx))
+    s["retransmissions"] = int(len(tx) - g.ngroups)
+    s["retry_frag_events"] = int((sender["event"] == "RETRY_FRAG").sum())
+    s["retry_msg_events"] = int((sender["event"] == "RETRY_MSG").sum())
+    s["aborts"] = int((sender["event"] == "ABORT").sum())
+    if len(rtt):
+        s["ack_rtt_ms_p50"] = float(rtt["rtt_ms"].median())
+        s["ack_rtt_ms_p95"] = float(rtt["rtt_ms"].quantile(0.95))
+
+    rx = _pick(receiver, RX_DATA, ["key", "bytes", "rssi", "snr", "t_ms"])
+    g = rx.groupby("key")
+    frames.append(pd.DataFrame({
+        "rx_copies": g.size(),
+        "first_rx_ms": g["t_ms"].min(),
+        "rssi_mean": g["rssi"].mean(),
+        "snr_mean": g["snr"].mean(),
+        "rx_bytes": g["bytes"].max(),
+    }))
+    s["rx_packets"] = int(len(rx))
+    s["rx_duplicates"] = int(len(rx) - g.ngroups)
+
+    frag = pd.concat(frames, axis=1)
+    if "tx_attempts" in frag:
+        frag["retransmissions"] = frag["tx_attempts"].fillna(0).astype(int) - 1
+    if "rx_copies" in frag:
+        frag["rx_copies"] = frag["rx_copies"].fillna(0).astype(int)
+
+    # One-way latency with both clocks
+    if sender is not receiver:
+        offset = estimate_offset(sender, receiver)
+        s["clock_offset_ms"] = offset
+        if not np.isnan(offset):
+            rx_al = _pick(receiver, RX_DATA, ["key", "t_ms"])
+            rx_al["t_ms"] = rx_al["t_ms"] - offset
+            txa = tx[["key", "t_ms", "toa_ms"]]
+            txa = txa.rename(columns={"t_ms": "tx_end_ms"})
+            txa["t_ms"] = txa["tx_end_ms"].astype(np.float64)
+            rx_al["t_ms"] = rx_al["t_ms"].astype(np.float64)
+            m = _asof(rx_al, txa, "t_ms", "backward").dropna(subset=["tx_end_ms"])
+            # From the start of the transmission that was received
+            m["latency_ms"] = m["t_ms"] - (m["tx_end_ms"] - m["toa_ms"])
+            lat = m.groupby("key")["latency_ms"].min()
+            frag["one_way_ms"] = lat
+            frag["delivery_ms"] = frag["first_rx_ms"] - offset - (frag["first_tx_ms"] - frag["toa_ms"])
+            if len(lat):
+                s["one_way_ms_p50"] = float(lat.median())
+                s["one_way_ms_p95"] = float(lat.quantile(0.95))
+
+    seq, idx = _unkey(frag.index.to_numpy())
+    frag.insert(0, "seq", seq)
+    frag.insert(1, "idx", idx)
+    rep.fragments = frag.reset_index(drop=True)
+
+    # Airtime on every node
+    air = [airtime_table(ev) for ev in nodes.values()]
+    rep.airtime = pd.concat(air, ignore_index=True) if air else pd.DataFrame()
+    if len(rep.airtime):
+        by = rep.airtime.groupby("event")
+        for ev_name, grp in by:
+            s[f"airtime_{ev_name}_measured_ms_p50"] = float(grp["measured_ms"].median())
+            s[f"airtime_{ev_name}_toa_ms"] = float(grp["toa_ms"].median())
+
+    # Goodput: first copy of each (seq, idx) at the receiver, else ACKed at the sender
+    if len(rx):
+        first = rx.drop_duplicates("key")
+        t, nbytes = first["t_ms"].to_numpy(), first["bytes"].to_numpy()
+    else:
+        first = ack[ack["idx"] >= 0].drop_duplicates("key")
+        sizes = tx.drop_duplicates("key").set_index("key")["bytes"]
+        t = first["t_ms"].to_numpy()
+        nbytes = sizes.reindex(first["key"]).fillna(0).to_numpy()
+    if len(t):
+        t0 = t.min()
+        bins = ((t - t0) // (bin_s * 1000)).astype(np.int64)
+        per_bin = np.bincount(bins, weights=nbytes)
+        rep.goodput = pd.DataFrame({
+            "t_s": t0 / 1000.0 + np.arange(len(per_bin)) * bin_s,
+            "bytes": per_bin,
+            "goodput_bps": per_bin * 8 / bin_s,
+        })
+        span_s = max((t.max() - t0) / 1000.0, 1e-9)
+        s["delivered_bytes"] = float(nbytes.sum())
+        s["goodput_bps_overall"] = float(nbytes.sum() * 8 / span_s) if len(t) > 1 else float("nan")
+    else:
+        rep.goodput = pd.DataFrame(columns=["t_s", "bytes", "goodput_bps"])
+    return rep
+
+
+
+# ----------------------------
+# Self-check (python -m lora_host.selfcheck)
+# ----------------------------
+
+def _check_rotated_capture() -> Optional[str]:
+    """The sample CSVs written through csv_capture's RotatingCSV, rotated and not, load the same."""
+    import importlib.util
+    import tempfile
+
+    from lora_host import replay
+    spec = importlib.util.spec_from_file_location(
+        "_selfcheck_csv_capture", replay.EXP / "13-Timing_Analysis" / "csv_capture.py")
+    capture = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(capture)
+    src = replay.EXP / "13-Timing_Analysis"
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = {}
+        for sub, max_bytes in (("one", 0), ("rotated", 200)):
+            out_dir = Path(tmp) / sub
+            out_dir.mkdir()
+            for prefix, name, compress in (("Tx", "tx_data_20250929_210202.csv", False),
+                                           ("Rx", "rx_data_20250929_210202.csv", True)):
+                lines = (src / name).read_text().splitlines()
+                out = capture.RotatingCSV(str(out_dir / prefix), "20250929_210202", max_bytes=max_bytes,
+                                          compress=compress and max_bytes > 0)
+                for i in range(0, len(lines), 4):
+                    out.write_batch([(l, i + j == 0) for j, l in enumerate(lines[i:i + 4])])
+                out.close()
+            runs[sub] = sorted(map(str, out_dir.iterdir()), reverse=True)
+        if len(runs["rotated"]) <= 2:
+            return f"capture did not rotate: {runs['rotated']}"
+        want = load_nodes(runs["one"])
+        got = load_nodes(runs["rotated"])
+        if list(got) != list(want):
+            return f"{len(runs['rotated'])} segments loaded as nodes {list(got)}, want {list(want)}"
+        for node, ev in want.items():
+            if not got[node].equals(ev):
+                return f"{node}: {len(got[node])} events from the segments, {len(ev)} from one file"
+        analyze(got)
+    return None
+
+
+SELF_CHECKS: Dict[str, Callable[[], Optional[str]]] = {
+    "rotated_capture": _check_rotated_capture,
+}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Join tx/rx/timing CSVs of a run and report latency, RTT, retries, airtime and goodput.")
+    ap.add_argument("files", nargs="+", help="timing_data_*/tx_data_*/rx_data_* (or Tx_*/Rx_*) CSVs of one or two nodes")
+    ap.add_argument("--bin", type=float, default=10.0, help="Goodput bin width in seconds")
+    ap.add_argument("--out", help="Directory to write fragments/rtt/airtime/goodput CSVs")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    nodes = load_nodes(args.files)
+    t1 = time.perf_counter()
+    rep = analyze(nodes, args.bin)
+    t2 = time.perf_counter()
+
+    print(f"[INFO] nodes: {', '.join(f'{n} ({len(ev)} events)' for n, ev in nodes.items())}")
+    for k, v in rep.summary.items():
+        print(f"  {k:<40} {v:.1f}" if isinstance(v, float) else f"  {k:<40} {v}")
+    print(f"[INFO] load {1000 * (t1 - t0):.0f} ms, analysis {1000 * (t2 - t1):.0f} ms")
+
+    if args.out:
+        out = Path(args.out)
+        out.mkdir(parents=True, exist_ok=True)
+        for name in ("fragments", "rtt", "airtime", "goodput"):
+            df = getattr(rep, name)
+            if df is not None and len(df):
+                df.to_csv(out / f"{name}.csv", index=False)
+        print(f"[OK] Tables written to {out.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Thread-safe, frame-rate-limited log view for the Tkinter GUIs.
+
+Worker and serial-reader threads call ``LogView.put(text, tag)``, which
+only appends to a ``queue.SimpleQueue``. The Tk main loop drains the
+queue every ``interval_ms`` (33 ms ~ 30 Hz) and renders the whole batch
+with a single ``Text.insert`` call, consecutive entries with the same tag
+joined into one string. Per frame that is one insert, at most one delete
+and at most one ``see("end")``, however many lines arrived.
+
+Trimming is O(1): the view keeps its own line count (newlines inserted)
+instead of asking Tk for ``index("end")``, and when it passes
+``max_lines`` deletes everything but the newest ``keep_lines`` in one call.
+If a single frame brings more than ``keep_lines`` lines, only the newest
+ones are rendered and the rest are counted in ``dropped``.
+
+Optional level filtering: every entry gets a level from its tag
+(``TAG_LEVELS``) or its ``[ERROR]``/``[WARN]``/... prefix, and entries below
+``min_level`` are discarded in ``put`` before they reach the queue.
+Changing the level affects new entries only.
+
+Tk is not imported here; the widget is whatever ``tk.Text`` the GUI built.
+"""
+
+import queue
+from typing import Dict, List, Optional, Tuple
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+
+LEVEL_NAMES: Dict[str, int] = {"all": 0, "debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR}
+
+# mesh_gui colour tags
+TAG_LEVELS: Dict[str, int] = {
+    "error": ERROR,
+    "warning": WARNING,
+    "success": INFO,
+    "info": INFO,
+    "tx": INFO,
+    "rx": INFO,
+    "debug": DEBUG,
+}
+
+# Message prefixes used across the host scripts ([INFO], [WARN], ...)
+_PREFIX_LEVELS: Tuple[Tuple[str, int], ...] = (
+    ("[ERROR]", ERROR),
+    ("[ERR]", ERROR),
+    ("[WARN]", WARNING),
+    ("[MCU", DEBUG),
+    ("[SR]", DEBUG),
+)
+
+
+def level_of(text: str, tag: str = "") -> int:
+    lv = TAG_LEVELS.get(tag)
+    if lv is not None:
+        return lv
+    s = text.lstrip()
+    for prefix, lv in _PREFIX_LEVELS:
+        if s.startswith(prefix):
+            return lv
+    return INFO
+
+
+class LogView:
+    """
+    Batches log text from any thread into a ``tk.Text`` widget.
+
+    ``start()`` must be called from the Tk thread once the widget exists;
+    everything else except ``put`` must also run on the Tk thread.
+    """
+
+    def __init__(self, widget, max_lines: int = 5000, keep_lines: int = 4000,
+                 interval_ms: int = 33, min_level: int = 0):
+        self.widget = widget
+        self.max_lines = max_lines
+        self.keep_lines = min(keep_lines, max_lines)
+        self.interval_ms = interval_ms
+        self.min_level = min_level
+        self.q: "queue.SimpleQueue[Tuple[str, str]]" = queue.SimpleQueue()
+        self.lines = int(widget.index("end-1c").split(".")[0]) - 1
+        self.dropped = 0
+        self.filtered = 0
+        self._after_id: Optional[str] = None
+
+    # ---- any thread ----
+
+    def put(self, text: str, tag: str = "") -> None:
+        if self.min_level and level_of(text, tag) < self.min_level:
+            self.filtered += 1
+            return
+        self.q.put((text, tag))
+
+    def set_level(self, level) -> None:
+        """Minimum level to show, as a number or a LEVEL_NAMES key."""
+        if isinstance(level, str):
+            level = LEVEL_NAMES.get(level.lower(), 0)
+        self.min_level = int(level)
+
+    # ---- Tk thread ----
+
+    def start(self) -> None:
+        if self._after_id is None:
+            self._after_id = self.widget.after(self.interval_ms, self._tick)
+
+    def stop(self) -> None:
+        if self._after_id is not None:
+            try:
+                self.widget.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+        self.flush()
+
+    def _tick(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self._after_id = self.widget.after(self.interval_ms, self._tick)
+
+    def _take(self) -> List[Tuple[str, str]]:
+        items = []
+        get = self.q.get_nowait
+        try:
+            while True:
+                items.append(get())
+        except queue.Empty:
+            pass
+        return items
+
+    def flush(self) -> None:
+        """Render everything queued so far in one insert."""
+        items = self._take()
+        if not items:
+            return
+
+        # Keep only the newest lines of an oversized batch (one slot for the notice)
+        n_new = 0
+        start = len(items)
+        budget = max(1, self.keep_lines - 1)
+        while start > 0:
+            n = items[start - 1][0].count("\n")
+            if n_new + n > budget and n_new:
+                break
+            n_new += n
+            start -= 1
+        if start:
+            self.dropped += start
+            items = items[start:]
+            items.insert(0, (f"[WARN] log: {start} entries skipped to keep up\n", "warning"))
+            n_new += 1
+
+        # Coalesce runs with the same tag: insert(index, s1, tag1, s2, tag2, ...)
+        args: List[str] = []
+        run: List[str] = []
+        run_tag = items[0][1]
+        for text, tag in items:
+            if tag != run_tag:
+                args.append("".join(run))
+                args.append(run_tag)
+                run = []
+                run_tag = tag
+            run.append(text)
+        args.append("".join(run))
+        args.append(run_tag)
+
+        w = self.widget
+        follow = w.yview()[1] >= 0.999
+        w.insert("end", *args)
+        self.lines += n_new
+        if self.lines > self.max_lines:
+            cut = self.lines - self.keep_lines
+            w.delete("1.0", f"{cut + 1}.0")
+            self.lines = self.keep_lines
+        if follow:
+            w.see("end")
+
+    def clear(self) -> None:
+        self._take()
+        self.widget.delete("1.0", "end")
+        self.lines = 0
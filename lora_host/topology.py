@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Incremental model of the mesh as seen from one node's serial port.
+
+Fed one line at a time (usually from MeshNetworkInterface's reader thread),
+it keeps:
+
+  links    direct neighbours from   [HELLO] Neighbor X (RSSI=.., SNR=..)
+  routes   dest -> next hop from    [ROUTE] X via Y (N hops)
+                                    [ROUTE] Expired/Invalidated route to X
+                                    [RREP] Received from X (N hops total)
+                                    the ROUTES table (Dest NextHop Hops RSSI Age)
+
+Route ages follow MeshNode.ino: an entry's timestamp only moves when the
+firmware prints a [ROUTE] line for it (addOrUpdateRoute), and it is gone
+once older than ROUTE_TIMEOUT_MS. A ROUTES dump is authoritative: its Age
+column resets the timestamps and routes it does not list are dropped.
+
+A STATS dump fills ``stats`` and ``local`` (the node's own name).
+
+``feed`` returns the names whose link or route changed (``LOCAL`` for the
+stats) and also adds them to ``dirty``. A view redraws only those after
+``take_changes()``.
+
+Timestamps are time.monotonic() seconds.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from lora_host import lineparse
+
+ROUTE_TIMEOUT_S = 300.0   # MeshNode.ino ROUTE_TIMEOUT_MS
+HELLO_INTERVAL_S = 30.0   # MeshNode.ino HELLO_INTERVAL_MS
+
+_TABLE_START = "========== ROUTING TABLE"
+_STATS_START = "========== STATISTICS"
+_TABLE_END = "====="
+
+LOCAL = ""  # change key / edge endpoint meaning the local node
+
+
+@dataclass
+class Link:
+    """A neighbour heard directly (HELLO)."""
+    node: str
+    rssi: int
+    snr: float
+    last_seen: float
+    heard: int = 1
+
+
+@dataclass
+class Route:
+    dest: str
+    next_hop: str          # "" when only an [RREP] has been seen
+    hops: int
+    updated: float         # firmware timestamp, as host monotonic time
+    rssi: Optional[int] = None
+
+
+class Topology:
+    """Neighbour links and routing table of the local node; thread-safe."""
+
+    def __init__(self, route_timeout_s: float = ROUTE_TIMEOUT_S, clock=time.monotonic):
+        self.route_timeout_s = route_timeout_s
+        self.clock = clock
+        self.local = ""                    # from "Node: <name>" in STATS output
+        self.stats: Dict[str, str] = {}    # last STATS dump, "TX Packets" -> "12", ...
+        self.links: Dict[str, Link] = {}
+        self.routes: Dict[str, Route] = {}
+        self.dirty: Set[str] = set()
+        self._lock = threading.Lock()
+        self._table: Optional[Set[str]] = None   # dests seen in a ROUTES dump in progress
+        self._stats: Optional[Dict[str, str]] = None
+
+    # ---------- input ----------
+
+    def feed(self, line: str, ev=None, now: Optional[float] = None) -> Set[str]:
+        """Apply one stripped node line (``ev`` = its parse_line result, if known)."""
+        if now is None:
+            now = self.clock()
+        if ev is None:
+            ev = lineparse.parse_line(line)
+        with self._lock:
+            changed = self._apply(line, ev, now)
+            if changed:
+                self.dirty |= changed
+            return changed
+
+    def _apply(self, line: str, ev, now: float) -> Set[str]:
+        if isinstance(ev, lineparse.Neighbor):
+            link = self.links.get(ev.node)
+            if link is None:
+                self.links[ev.node] = Link(ev.node, ev.rssi, ev.snr, now)
+            else:
+                link.rssi, link.snr, link.last_seen = ev.rssi, ev.snr, now
+                link.heard += 1
+            return {ev.node}
+        if isinstance(ev, lineparse.RouteUpdate):
+            self._set_route(ev.dest, ev.next_hop, ev.hops, now)
+            return {ev.dest}
+        if isinstance(ev, lineparse.RouteLost):
+            return {ev.dest} if self.routes.pop(ev.dest, None) else set()
+        if isinstance(ev, lineparse.RouteReply):
+            # The [ROUTE] line (if the firmware took the route) carries the
+            # next hop and timestamp; only fill in a route we know nothing of.
+            if ev.src not in self.routes:
+                self.routes[ev.src] = Route(ev.src, "", ev.hops, now)
+                return {ev.src}
+            return set()
+        if ev is not None:
+            return set()
+
+        # Untagged lines: ROUTES table and STATS dumps
+        if line.startswith(_TABLE_START):
+            self._table = set()
+            self._stats = None
+            return set()
+        if line.startswith(_STATS_START):
+            self._stats = {}
+            self._table = None
+            return set()
+        if self._table is not None:
+            if line.startswith(_TABLE_END):
+                gone = set(self.routes) - self._table
+                for dest in gone:
+                    del self.routes[dest]
+                self._table = None
+                return gone
+            return self._table_row(line, now)
+        if self._stats is not None:
+            if line.startswith(_TABLE_END):
+                self.stats, self._stats = self._stats, None
+                self.local = self.stats.get("Node", self.local)
+                return {LOCAL}
+            key, sep, value = line.partition(": ")
+            if sep:
+                self._stats[key] = value.strip()
+        return set()
+
+    def _table_row(self, line: str, now: float) -> Set[str]:
+        parts = line.split()
+        if len(parts) != 5 or parts[0] == "Dest":
+            return set()
+        dest, hop, hops, rssi, age = parts
+        try:
+            r = self._set_route(dest, hop, int(hops), now - int(age))
+            r.rssi = int(rssi)
+        except ValueError:
+            return set()
+        self._table.add(dest)
+        return {dest}
+
+    def _set_route(self, dest: str, next_hop: str, hops: int, updated: float) -> Route:
+        r = self.routes.get(dest)
+        if r is None:
+            r = self.routes[dest] = Route(dest, next_hop, hops, updated)
+        else:
+            r.next_hop, r.hops, r.updated = next_hop, hops, updated
+        return r
+
+    def invalidate(self, dest: str) -> None:
+        """Forget a route the host has reason to distrust (e.g. a failed send)."""
+        with self._lock:
+            if self.routes.pop(dest, None):
+                self.dirty.add(dest)
+
+    # ---------- queries ----------
+
+    def route(self, dest: str, now: Optional[float] = None) -> Optional[Route]:
+        """The route to ``dest`` if the node should still have it, else None."""
+        if now is None:
+            now = self.clock()
+        with self._lock:
+            r = self.routes.get(dest)
+            if r is None or now - r.updated > self.route_timeout_s:
+                return None
+            return r
+
+    def expire(self, now: Optional[float] = None) -> Set[str]:
+        """Drop routes older than the firmware timeout; returns their names."""
+        if now is None:
+            now = self.clock()
+        with self._lock:
+            gone = {d for d, r in self.routes.items() if now - r.updated > self.route_timeout_s}
+            for d in gone:
+                del self.routes[d]
+            self.dirty |= gone
+            return gone
+
+    def take_changes(self) -> Set[str]:
+        with self._lock:
+            out, self.dirty = self.dirty, set()
+            return out
+
+    def edges(self, names=None) -> Iterator[Tuple[str, str, str, Optional[int], float]]:
+        """
+        (a, b, kind, rssi, updated) for the given names (all when None):
+        "link" local->neighbour heard by HELLO, "route" next_hop->dest for
+        other routes (a == "" is the local node).
+        """
+        with self._lock:
+            keys = set(self.links) | set(self.routes) if names is None else names
+            out: List[Tuple[str, str, str, Optional[int], float]] = []
+            for n in keys:
+                link = self.links.get(n)
+                if link is not None:
+                    out.append(("", n, "link", link.rssi, link.last_seen))
+                r = self.routes.get(n)
+                if r is not None and (r.hops > 1 or link is None):
+                    a = r.next_hop if r.hops > 1 and r.next_hop != n else ""
+                    out.append((a, n, "route", r.rssi, r.updated))
+        return iter(out)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Structured JSONL event trace for the serial session classes.
+
+One JSON object per line, keys kept short:
+
+  t     time.monotonic_ns() when the record was made
+  c     component ("lora_session", "mesh_iface", "mesh_rx", ...)
+  ev    record type:
+          open    first record; "wall" = time.time() at the same instant
+          line    raw serial line, "d" = "rx"/"tx", "s" = text
+                  (tx lines longer than TX_HEAD chars keep only the head; "n" = full length)
+          parse   parsed MCU event, "k" = event class plus its small fields
+          send    start of an operation (file, chunk, command)
+          done    completion of the operation with the same "cid"
+          state   anything else worth a timestamp (payload complete, file saved, SACK, ...)
+  cid   correlation id tying send/done/state records together ("f1", "f1.3", ...)
+
+Disabled tracing is the ``NULL`` tracer. Call sites guard with
+``if tr.enabled:``, so a disabled trace costs one attribute check and no
+dict or string is built.
+
+Enabled, records go through one buffered file under a lock and are
+flushed at least every ``flush_s`` seconds (so ``tail -f`` works).
+
+The "rx" line records are what lora_host.replay feeds back into the
+consumers.
+"""
+
+import atexit
+import itertools
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+TX_HEAD = 120
+
+# Small scalar fields copied from lineparse events into "parse" records
+_EV_FIELDS = ("src", "seq", "idx", "tot", "rssi", "fname", "sid", "cum", "ok", "reason", "kind", "hops", "dst")
+
+_dumps = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+
+class _Writer:
+    def __init__(self, path: Path, flush_s: float):
+        self.f = open(path, "a", encoding="utf-8", buffering=1 << 16)
+        self.lock = threading.Lock()
+        self.flush_s = flush_s
+        self.last_flush = time.monotonic()
+        self.refs = 0
+        atexit.register(self.flush)
+
+    def write(self, s: str) -> None:
+        with self.lock:
+            self.f.write(s)
+            now = time.monotonic()
+            if now - self.last_flush >= self.flush_s:
+                self.f.flush()
+                self.last_flush = now
+
+    def flush(self) -> None:
+        with self.lock:
+            if not self.f.closed:
+                self.f.flush()
+
+    def close(self) -> None:
+        with self.lock:
+            self.refs -= 1
+            if self.f.closed:
+                return
+            if self.refs <= 0:
+                self.f.close()
+            else:
+                self.f.flush()
+
+
+class Tracer:
+    """JSONL event recorder; ``Tracer()`` with no path is disabled."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, path: Optional[str] = None, component: str = "", flush_s: float = 1.0,
+                 _writer: Optional[_Writer] = None):
+        self.component = component
+        self._w = _writer
+        if self._w is None and path:
+            self._w = _Writer(Path(path), flush_s)
+        self.enabled = self._w is not None
+        if self.enabled:
+            self._w.refs += 1
+            if _writer is None:
+                self.emit("open", wall=time.time(), pid=os.getpid())
+
+    def child(self, component: str) -> "Tracer":
+        """Another component writing into the same file."""
+        if not self.enabled:
+            return NULL
+        return Tracer(component=component, _writer=self._w)
+
+    def new_id(self, prefix: str = "") -> str:
+        return f"{prefix}{next(self._ids)}"
+
+    def emit(self, ev: str, **fields) -> None:
+        if not self.enabled:
+            return
+        rec = {"t": time.monotonic_ns(), "c": self.component, "ev": ev}
+        rec.update(fields)
+        self._w.write(_dumps(rec) + "\n")
+
+    def rx(self, line: str) -> None:
+        self.emit("line", d="rx", s=line)
+
+    def tx(self, data) -> None:
+        s = data.decode("utf-8", errors="replace") if isinstance(data, (bytes, bytearray)) else data
+        s = s.rstrip("\r\n")
+        if len(s) > TX_HEAD:
+            self.emit("line", d="tx", s=s[:TX_HEAD], n=len(s))
+        else:
+            self.emit("line", d="tx", s=s)
+
+    def parsed(self, ev_obj) -> None:
+        rec = {"k": type(ev_obj).__name__}
+        for name in _EV_FIELDS:
+            v = getattr(ev_obj, name, None)
+            if v is not None and not callable(v):
+                rec[name] = v
+        self.emit("parse", **rec)
+
+    def close(self) -> None:
+        if self.enabled:
+            self._w.close()
+            self.enabled = False
+
+
+NULL = Tracer()
+
+
+def open_tracer(path: str, component: str) -> Tracer:
+    """CLI helper: a tracer writing to ``path``, or NULL when path is empty."""
+    if not path:
+        return NULL
+    print(f"[INFO] Tracing to {path}")
+    return Tracer(path, component)
+
+
+def read_trace(path: str) -> Iterator[dict]:
+    """Yield records from a trace file, skipping torn/partial lines."""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
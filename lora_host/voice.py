@@ -0,0 +1,619 @@
+#!/usr/bin/env python3
+"""
+Low-bitrate voice for the tunnel, NumPy only.
+
+``convert_audio_to_mp3`` needs pydub plus an ffmpeg binary, and 64 kbps
+MP3 is a lot of airtime for a few seconds of speech. This module reads
+the audio itself (RIFF WAV or FLAC), mixes it to mono, resamples it to
+8 kHz and encodes it with one of:
+
+  ulaw    G.711 µ-law, 8 bits per sample: 64 kbps. A µ-law WAV file.
+  adpcm   IMA ADPCM, 4 bits per sample in 256-byte blocks: ~32 kbps.
+          An IMA ADPCM WAV file.
+  lpc     LPC-10 style vocoder: 10 reflection coefficients, pitch or
+          noise excitation and a gain per 22.5 ms frame, 54 bits each:
+          2.4 kbps. Intelligible, but synthetic sounding. A small
+          ``.lpc`` file; ``decode`` turns it back into a WAV.
+
+The two WAV codecs are standard formats, so the received file plays
+anywhere as it is. The senders use this module for ``--voice CODEC``
+(tx_send_file.py, lora_transceiver.py) and for the GUI's Voice Codec
+choice. lora_host.bench.voice measures size, airtime, speed and SNR.
+
+Usage:
+    python -m lora_host.voice encode human_voice.wav voice.wav --codec adpcm
+    python -m lora_host.voice decode received_files/voice_rx.lpc voice.wav
+"""
+
+import argparse
+import io
+import math
+import operator
+import struct
+import wave
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+
+RATE = 8000
+CODECS = ("ulaw", "adpcm", "lpc")
+
+# IMA ADPCM (WAV format 0x11), mono
+ADPCM_BLOCK = 256                           # bytes per block
+ADPCM_SAMPLES = (ADPCM_BLOCK - 4) * 2 + 1   # 505: header sample + 504 nibbles
+_STEP = (
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45, 50, 55, 60, 66,
+    73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230, 253, 279, 307, 337, 371, 408,
+    449, 494, 544, 598, 658, 724, 796, 876, 963, 1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066,
+    2272, 2499, 2749, 3024, 3327, 3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630,
+    9493, 10442, 11487, 12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794, 32767,
+)
+_INDEX = (-1, -1, -1, -1, 2, 4, 6, 8) * 2
+
+# LPC vocoder
+LPC_MAGIC = b"LPCV"
+LPC_ORDER = 10
+FRAME = 180                  # samples: 22.5 ms at 8 kHz
+WINDOW = 240                 # analysis window centred on the frame
+PITCH_WINDOW = 320
+PREEMPH = 0.9375
+K_BITS = (5, 5, 5, 5, 4, 4, 4, 4, 3, 3)
+PITCH_BITS = 7               # 0 = unvoiced, else lag MIN_LAG + code - 1
+GAIN_BITS = 5                # frame RMS in GAIN_STEP_DB steps, 0 = silence
+MIN_LAG = 20                 # 400 Hz
+MAX_LAG = MIN_LAG + (1 << PITCH_BITS) - 2   # 146: 55 Hz
+GAIN_STEP_DB = 3.0
+VOICED = 0.5                 # normalised autocorrelation peak
+FIELDS = K_BITS + (PITCH_BITS, GAIN_BITS)
+FRAME_BITS = sum(FIELDS)     # 54: 2400 bps
+_LPC_HEADER = struct.Struct("<4sHHI")   # magic, rate, frame, samples
+_FFT = 1024
+
+
+# ----------------------------
+# Reading
+# ----------------------------
+
+def _riff(chunks: List[Tuple[bytes, bytes]]) -> bytes:
+    body = b"WAVE" + b"".join(tag + struct.pack("<I", len(c)) + c + b"\0" * (len(c) & 1) for tag, c in chunks)
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def _read_riff(data: bytes) -> Tuple[np.ndarray, int]:
+    fmt = body = None
+    frames = None  # fact chunk: sample count of compressed data
+    pos = 12
+    while pos + 8 <= len(data):
+        tag = data[pos:pos + 4]
+        size = struct.unpack_from("<I", data, pos + 4)[0]
+        if tag == b"fmt ":
+            fmt = data[pos + 8:pos + 8 + size]
+        elif tag == b"fact":
+            frames = struct.unpack_from("<I", data, pos + 8)[0]
+        elif tag == b"data":
+            body = data[pos + 8:pos + 8 + size]
+        pos += 8 + size + (size & 1)
+    if fmt is None or body is None:
+        raise ValueError("WAV file without fmt/data chunks")
+    tag, ch, rate, _, align, bits = struct.unpack_from("<HHIIHH", fmt)
+    if tag == 0xFFFE and len(fmt) >= 26:  # WAVE_FORMAT_EXTENSIBLE: sub-format GUID
+        tag = struct.unpack_from("<H", fmt, 24)[0]
+
+    if tag == 0x11:
+        if ch != 1:
+            raise ValueError("IMA ADPCM: only mono is supported")
+        x = adpcm_decode(body, align).astype(np.float64)
+        return (x if frames is None else x[:frames]), rate
+    if tag == 7:
+        x = ulaw_decode(body).astype(np.float64)
+    elif tag == 3:
+        x = np.frombuffer(body, "<f4" if bits == 32 else "<f8").astype(np.float64) * 32768.0
+    elif tag == 1 and bits == 8:
+        x = (np.frombuffer(body, np.uint8).astype(np.float64) - 128.0) * 256.0
+    elif tag == 1 and bits == 16:
+        x = np.frombuffer(body, "<i2").astype(np.float64)
+    elif tag == 1 and bits == 24:
+        b = np.frombuffer(body[:len(body) // 3 * 3], np.uint8).reshape(-1, 3).astype(np.int32)
+        x = ((b[:, 0] << 8 | b[:, 1] << 16 | b[:, 2] << 24) >> 8).astype(np.float64) / 256.0
+    elif tag == 1 and bits == 32:
+        x = np.frombuffer(body, "<i4").astype(np.float64) / 65536.0
+    else:
+        raise ValueError(f"unsupported WAV format {tag:#x} ({bits} bit)")
+    x = x[:len(x) // ch * ch].reshape(-1, ch).mean(axis=1)
+    return x, rate
+
+
+def _read_flac(data: bytes) -> Tuple[np.ndarray, int]:
+    """Decode a FLAC stream (all subframe types) and mix it to mono."""
+    bits = bin(int.from_bytes(b"\x01" + data, "big"))[3:]   # the leading 1 keeps the zeros
+    find = bits.find
+    pos = 32
+    rate = bps = total = 0
+    while True:
+        last = bits[pos] == "1"
+        btype = int(bits[pos + 1:pos + 8], 2)
+        length = int(bits[pos + 8:pos + 32], 2)
+        pos += 32
+        if btype == 0:  # STREAMINFO
+            p = pos + 80
+            rate = int(bits[p:p + 20], 2)
+            bps = int(bits[p + 23:p + 28], 2) + 1
+            total = int(bits[p + 28:p + 64], 2)
+        pos += 8 * length
+        if last:
+            break
+
+    def signed(n: int) -> int:
+        nonlocal pos
+        if n == 0:
+            return 0
+        v = int(bits[pos:pos + n], 2)
+        pos += n
+        return v - (1 << n) if v >> (n - 1) else v
+
+    def residual(n: int, order: int) -> List[int]:
+        nonlocal pos
+        pbits = 4 if bits[pos:pos + 2] == "00" else 5
+        escape = (1 << pbits) - 1
+        porder = int(bits[pos + 2:pos + 6], 2)
+        pos += 6
+        out = []
+        append = out.append
+        for part in range(1 << porder):
+            cnt = (n >> porder) - (order if part == 0 else 0)
+            k = int(bits[pos:pos + pbits], 2)
+            pos += pbits
+            if k == escape:
+                nb = int(bits[pos:pos + 5], 2)
+                pos += 5
+                out += [signed(nb) for _ in range(cnt)]
+                continue
+            p = pos
+            for _ in range(cnt):
+                j = find("1", p)
+                u = (j - p) << k | (int(bits[j + 1:j + 1 + k], 2) if k else 0)
+                p = j + 1 + k
+                append(u >> 1 ^ -(u & 1))
+            pos = p
+        return out
+
+    def subframe(n: int, sbps: int) -> List[int]:
+        nonlocal pos
+        t = int(bits[pos + 1:pos + 7], 2)
+        pos += 7
+        wasted = 0
+        if bits[pos] == "1":
+            j = find("1", pos + 1)
+            wasted = j - pos
+            pos = j + 1
+        else:
+            pos += 1
+        sbps -= wasted
+        if t == 0:
+            out = [signed(sbps)] * n
+        elif t == 1:
+            out = [signed(sbps) for _ in range(n)]
+        else:
+            if 8 <= t <= 12:
+                order = t - 8
+                warm = [signed(sbps) for _ in range(order)]
+                coefs, shift = ((), (1,), (2, -1), (3, -3, 1), (4, -6, 4, -1))[order], 0
+            elif t >= 32:
+                order = t - 31
+                warm = [signed(sbps) for _ in range(order)]
+                prec = int(bits[pos:pos + 4], 2) + 1
+                pos += 4
+                shift = signed(5)
+                coefs = [signed(prec) for _ in range(order)]
+            else:
+                raise ValueError(f"FLAC: reserved subframe type {t}")
+            res = residual(n, order)
+            out = warm + [0] * (n - order)
+            rc = coefs[::-1]
+            mul = operator.mul
+            for i in range(order, n):
+                out[i] = res[i - order] + (sum(map(mul, rc, out[i - order:i])) >> shift)
+        if wasted:
+            out = [v << wasted for v in out]
+        return out
+
+    blocks = []
+    got = 0
+    while pos + 16 <= len(bits) and (not total or got < total):
+        if bits[pos:pos + 14] != "11111111111110":
+            raise ValueError(f"FLAC: lost frame sync at byte {pos // 8}")
+        bs_code = int(bits[pos + 16:pos + 20], 2)
+        sr_code = int(bits[pos + 20:pos + 24], 2)
+        ch_code = int(bits[pos + 24:pos + 28], 2)
+        ss_code = int(bits[pos + 28:pos + 31], 2)
+        pos += 32
+        lead = find("0", pos) - pos   # UTF-8 coded frame/sample number
+        pos += 8 * max(1, lead)
+        if bs_code == 1:
+            n = 192
+        elif bs_code <= 5:
+            n = 576 << (bs_code - 2)
+        elif bs_code <= 7:
+            w = 8 if bs_code == 6 else 16
+            n = int(bits[pos:pos + w], 2) + 1
+            pos += w
+        else:
+            n = 256 << (bs_code - 8)
+        pos += {12: 8, 13: 16, 14: 16}.get(sr_code, 0) + 8   # + CRC-8
+        fbps = {1: 8, 2: 12, 4: 16, 5: 20, 6: 24, 7: 32}.get(ss_code, bps)
+        nch = ch_code + 1 if ch_code < 8 else 2
+        side = {8: 1, 9: 0, 10: 1}.get(ch_code, -1)
+        chans = [np.array(subframe(n, fbps + (c == side)), dtype=np.int64) for c in range(nch)]
+        if ch_code == 8:
+            chans[1] = chans[0] - chans[1]
+        elif ch_code == 9:
+            chans[0] = chans[0] + chans[1]
+        elif ch_code == 10:
+            mid = chans[0] << 1 | (chans[1] & 1)
+            chans = [(mid + chans[1]) >> 1, (mid - chans[1]) >> 1]
+        blocks.append(np.mean(chans, axis=0))
+        got += n
+        pos = (pos + 7) // 8 * 8 + 16   # byte align + CRC-16
+    x = np.concatenate(blocks) if blocks else np.zeros(0)
+    if total:
+        x = x[:total]
+    return x * 2.0 ** (16 - bps), rate
+
+
+def read_audio(data: bytes) -> Tuple[np.ndarray, int]:
+    """(mono samples on the int16 scale, sample rate) of a WAV, FLAC or .lpc file."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return _read_riff(data)
+    if data[:4] == b"fLaC":
+        return _read_flac(data)
+    if data[:4] == LPC_MAGIC:
+        return lpc_decode(data).astype(np.float64), RATE
+    raise ValueError("not a WAV, FLAC or .lpc file")
+
+
+def load(path: Path) -> Tuple[np.ndarray, int]:
+    """read_audio for a file, falling back to pydub (if installed) for other formats."""
+    data = Path(path).read_bytes()
+    try:
+        return read_audio(data)
+    except ValueError:
+        try:
+            from pydub import AudioSegment  # pip install pydub
+        except ImportError:
+            raise ValueError(f"{Path(path).name}: not WAV or FLAC; install pydub and ffmpeg "
+                             "to read other formats") from None
+    seg = AudioSegment.from_file(path)
+    x = np.array(seg.get_array_of_samples(), dtype=np.float64).reshape(-1, seg.channels).mean(axis=1)
+    return x * 2.0 ** (16 - 8 * seg.sample_width), seg.frame_rate
+
+
+def resample(x: np.ndarray, rate: int, to: int = RATE) -> np.ndarray:
+    """Windowed-sinc low-pass below the new Nyquist, then decimate (or interpolate)."""
+    if rate == to or len(x) == 0:
+        return x
+    if rate > to:
+        ratio = rate / to
+        taps = 32 * math.ceil(ratio) + 1
+        t = np.arange(taps) - taps // 2
+        fc = 0.45 / ratio   # cycles per input sample, just under the new Nyquist
+        h = 2 * fc * np.sinc(2 * fc * t) * np.hamming(taps)
+        x = np.convolve(x, h / h.sum(), mode="same")
+        if rate % to == 0:
+            return x[::rate // to]
+    n = int(len(x) * to / rate)
+    return np.interp(np.arange(n) * (rate / to), np.arange(len(x)), x)
+
+
+def _pcm16(x: np.ndarray) -> np.ndarray:
+    return np.clip(np.round(x), -32768, 32767).astype(np.int16)
+
+
+def pcm_wav(x: np.ndarray, rate: int) -> bytes:
+    """16-bit mono PCM WAV bytes."""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(_pcm16(x).astype("<i2").tobytes())
+    return buf.getvalue()
+
+
+# ----------------------------
+# µ-law
+# ----------------------------
+
+def ulaw_encode(pcm: np.ndarray) -> bytes:
+    """G.711 µ-law bytes of int16 samples (the reference's 14-bit arithmetic)."""
+    x = pcm.astype(np.int32) >> 2
+    mask = np.where(x < 0, 0x7F, 0xFF)
+    mag = np.minimum(np.abs(x), 8159) + 33
+    seg = np.floor(np.log2(mag)).astype(np.int32) - 5
+    code = np.where(seg > 7, 0x7F, seg << 4 | (mag >> (seg + 1)) & 0x0F)   # clipped: top code
+    return (code ^ mask).astype(np.uint8).tobytes()
+
+
+def ulaw_decode(data: bytes) -> np.ndarray:
+    u = ~np.frombuffer(data, np.uint8).astype(np.int32) & 0xFF
+    mag = (((u & 0x0F) << 3) + 0x84 << ((u >> 4) & 0x07)) - 0x84
+    return np.where(u & 0x80, -mag, mag).astype(np.int16)
+
+
+# ----------------------------
+# IMA ADPCM
+# ----------------------------
+
+def adpcm_encode(pcm: np.ndarray) -> bytes:
+    """IMA ADPCM blocks (WAV layout, mono); the last block is padded with silence."""
+    samples = pcm.tolist()
+    nblocks = max(1, -(-len(samples) // ADPCM_SAMPLES))
+    samples += [0] * (nblocks * ADPCM_SAMPLES - len(samples))
+    out = bytearray()
+    index = 0
+    for b in range(0, len(samples), ADPCM_SAMPLES):
+        pred = samples[b]
+        out += struct.pack("<hBB", pred, index, 0)
+        codes = []
+        for s in samples[b + 1:b + ADPCM_SAMPLES]:
+            step = _STEP[index]
+            diff = s - pred
+            code = 0
+            if diff < 0:
+                code = 8
+                diff = -diff
+            vpdiff = step >> 3
+            if diff >= step:
+                code |= 4
+                diff -= step
+                vpdiff += step
+            if diff >= step >> 1:
+                code |= 2
+                diff -= step >> 1
+                vpdiff += step >> 1
+            if diff >= step >> 2:
+                code |= 1
+                vpdiff += step >> 2
+            pred = pred - vpdiff if code & 8 else pred + vpdiff
+            pred = -32768 if pred < -32768 else 32767 if pred > 32767 else pred
+            index += _INDEX[code]
+            index = 0 if index < 0 else 88 if index > 88 else index
+            codes.append(code)
+        out += bytes(lo | hi << 4 for lo, hi in zip(codes[0::2], codes[1::2]))
+    return bytes(out)
+
+
+def adpcm_decode(data: bytes, block: int = ADPCM_BLOCK) -> np.ndarray:
+    out = []
+    append = out.append
+    for b in range(0, len(data) - 3, block):
+        pred, index = struct.unpack_from("<hB", data, b)
+        index = min(index, 88)
+        append(pred)
+        for byte in data[b + 4:b + block]:
+            for code in (byte & 0x0F, byte >> 4):
+                step = _STEP[index]
+                vpdiff = step >> 3
+                if code & 4:
+                    vpdiff += step
+                if code & 2:
+                    vpdiff += step >> 1
+                if code & 1:
+                    vpdiff += step >> 2
+                pred = pred - vpdiff if code & 8 else pred + vpdiff
+                pred = -32768 if pred < -32768 else 32767 if pred > 32767 else pred
+                index += _INDEX[code]
+                index = 0 if index < 0 else 88 if index > 88 else index
+                append(pred)
+    return np.array(out, dtype=np.int16)
+
+
+# ----------------------------
+# LPC vocoder
+# ----------------------------
+
+def _frames(x: np.ndarray, nf: int, width: int) -> np.ndarray:
+    """(nf, width) windows of ``x`` centred on each FRAME, zero padded at the edges."""
+    pad = width
+    xp = np.concatenate([np.zeros(pad), x, np.zeros(pad + nf * FRAME - len(x))])
+    starts = pad + np.arange(nf) * FRAME + FRAME // 2 - width // 2
+    return np.lib.stride_tricks.sliding_window_view(xp, width)[starts]
+
+
+def _levinson(r: np.ndarray) -> np.ndarray:
+    """Reflection coefficients (nf, LPC_ORDER) from autocorrelations (nf, LPC_ORDER + 1)."""
+    nf = len(r)
+    a = np.zeros((nf, LPC_ORDER + 1))
+    a[:, 0] = 1.0
+    err = r[:, 0].copy()
+    k = np.zeros((nf, LPC_ORDER))
+    for i in range(1, LPC_ORDER + 1):
+        acc = r[:, i] + (a[:, 1:i] * r[:, i - 1:0:-1]).sum(axis=1)
+        ki = np.clip(-acc / err, -0.999, 0.999)
+        a[:, 1:i] = a[:, 1:i] + ki[:, None] * a[:, i - 1:0:-1]
+        a[:, i] = ki
+        err = err * (1.0 - ki * ki)
+        k[:, i - 1] = ki
+    return k
+
+
+def _step_up(k: np.ndarray) -> np.ndarray:
+    """Direct-form A(z) coefficients (nf, LPC_ORDER + 1) from reflection coefficients."""
+    a = np.zeros((len(k), LPC_ORDER + 1))
+    a[:, 0] = 1.0
+    for i in range(1, LPC_ORDER + 1):
+        ki = k[:, i - 1]
+        a[:, 1:i] = a[:, 1:i] + ki[:, None] * a[:, i - 1:0:-1]
+        a[:, i] = ki
+    return a
+
+
+def _pitch(x: np.ndarray, nf: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(lag, normalised autocorrelation peak) per frame on 900 Hz low-passed speech."""
+    t = np.arange(31) - 15
+    h = 2 * 900 / RATE * np.sinc(2 * 900 / RATE * t) * np.hamming(31)
+    seg = _frames(np.convolve(x, h, mode="same"), nf, PITCH_WINDOW)
+    seg = seg - seg.mean(axis=1, keepdims=True)
+    ac = np.fft.irfft(np.abs(np.fft.rfft(seg, _FFT)) ** 2, _FFT)[:, :MAX_LAG + 1]
+    sq = np.cumsum(seg * seg, axis=1)
+    lags = np.arange(MAX_LAG + 1)
+    head = sq[:, PITCH_WINDOW - 1 - lags]                      # energy of seg[:-lag]
+    tail = sq[:, -1:] - np.concatenate([np.zeros((nf, 1)), sq[:, :MAX_LAG]], axis=1)  # seg[lag:]
+    c = ac / np.sqrt(head * tail + 1e-9)
+    c[:, :MIN_LAG] = -1.0
+    lag = c.argmax(axis=1)
+    peak = c[np.arange(nf), lag]
+    for div in (2, 3):   # prefer a sub-multiple that is nearly as good (octave errors)
+        sub = np.maximum(np.round(lag / div).astype(int), MIN_LAG)
+        better = c[np.arange(nf), sub] >= 0.85 * peak
+        lag = np.where(better & (lag / div >= MIN_LAG), sub, lag)
+    return lag, peak
+
+
+def lpc_encode(pcm: np.ndarray) -> bytes:
+    """2.4 kbps vocoder bitstream (with header) of 8 kHz int16 samples."""
+    if len(pcm) < FRAME:
+        raise ValueError(f"need at least one {FRAME * 1000 / RATE:g} ms frame of {RATE // 1000} kHz audio "
+                         f"for the LPC vocoder, got {len(pcm)} samples")
+    x = pcm.astype(np.float64)
+    nf = max(1, -(-len(x) // FRAME))
+    pre = np.concatenate([x[:1], x[1:] - PREEMPH * x[:-1]])
+
+    w = _frames(pre, nf, WINDOW) * np.hamming(WINDOW)
+    r = np.stack([(w[:, j:] * w[:, :WINDOW - j]).sum(axis=1) for j in range(LPC_ORDER + 1)], axis=1)
+    r[:, 0] = r[:, 0] * 1.0001 + 1e-6   # white-noise correction keeps silent frames stable
+    k = _levinson(r)
+    theta = np.arcsin(np.clip(k, -0.98, 0.98))
+    kq = np.stack([np.clip(np.floor((theta[:, i] / math.pi + 0.5) * (1 << b)), 0, (1 << b) - 1)
+                   for i, b in enumerate(K_BITS)], axis=1).astype(np.int64)
+
+    body = np.concatenate([pre, np.zeros(nf * FRAME - len(pre))]).reshape(nf, FRAME)
+    rms = np.sqrt((body * body).mean(axis=1))
+    gain = np.clip(np.round(20 * np.log10(rms + 1e-9) / GAIN_STEP_DB), 0, (1 << GAIN_BITS) - 1).astype(np.int64)
+
+    lag, peak = _pitch(x, nf)
+    voiced = (peak > VOICED) & (gain > 0)
+    # A single voiced (or unvoiced) frame between two of the other kind is a detector glitch
+    if nf > 2:
+        v = voiced.copy()
+        v[1:-1] = (voiced[:-2].astype(int) + voiced[1:-1] + voiced[2:]) >= 2
+        voiced = v
+    pitch = np.where(voiced, np.clip(lag, MIN_LAG, MAX_LAG) - MIN_LAG + 1, 0)
+
+    cols = np.concatenate([kq, pitch[:, None], gain[:, None]], axis=1)
+    bits = np.concatenate([(cols[:, [i]] >> np.arange(b - 1, -1, -1)) & 1
+                           for i, b in enumerate(FIELDS)], axis=1)
+    return _LPC_HEADER.pack(LPC_MAGIC, RATE, FRAME, len(pcm)) + np.packbits(bits.astype(np.uint8)).tobytes()
+
+
+def lpc_decode(data: bytes) -> np.ndarray:
+    """int16 samples at RATE from an ``lpc_encode`` bitstream."""
+    magic, _, frame, nsamples = _LPC_HEADER.unpack_from(data)
+    if magic != LPC_MAGIC or frame != FRAME:
+        raise ValueError("not an LPC vocoder stream")
+    nf = max(1, -(-nsamples // FRAME))
+    bits = np.unpackbits(np.frombuffer(data, np.uint8, offset=_LPC_HEADER.size))[:nf * FRAME_BITS]
+    bits = bits.reshape(nf, FRAME_BITS).astype(np.int64)
+    cols = []
+    at = 0
+    for b in FIELDS:
+        cols.append((bits[:, at:at + b] << np.arange(b - 1, -1, -1)).sum(axis=1))
+        at += b
+    kq = np.stack(cols[:LPC_ORDER], axis=1)
+    pitch, gain = cols[LPC_ORDER], cols[LPC_ORDER + 1]
+
+    k = np.sin(((kq + 0.5) / (1 << np.array(K_BITS)) - 0.5) * math.pi)
+    a = _step_up(k)
+    # Excitation at unit power, scaled so the synthesis filter output has the frame's RMS
+    g = np.where(gain > 0, 10 ** (gain * GAIN_STEP_DB / 20), 0.0) * np.sqrt(np.prod(1 - k * k, axis=1))
+    exc = np.zeros((nf, FRAME))
+    noise = np.random.default_rng(0).standard_normal((nf, FRAME))
+    nxt = 0
+    for i in range(nf):
+        start = i * FRAME
+        if pitch[i]:
+            lag = MIN_LAG + pitch[i] - 1
+            nxt = max(nxt, start)
+            while nxt < start + FRAME:
+                exc[i, nxt - start] = math.sqrt(lag)
+                nxt += lag
+        else:
+            exc[i] = noise[i]
+    exc *= g[:, None]
+
+    # Each frame through its own 1/A(z) and the de-emphasis, tails overlap-added
+    den = np.fft.rfft(a, _FFT) * np.fft.rfft(np.array([1.0, -PREEMPH]), _FFT)
+    y = np.fft.irfft(np.fft.rfft(exc, _FFT) / den, _FFT)
+    out = np.zeros(nf * FRAME + _FFT)
+    for i in range(nf):
+        out[i * FRAME:i * FRAME + _FFT] += y[i]
+    return _pcm16(out[:nsamples])
+
+
+# ----------------------------
+# Files
+# ----------------------------
+
+def encode(x: np.ndarray, rate: int, codec: str) -> bytes:
+    """File bytes of ``x`` (int16 scale, any rate) at RATE with ``codec``."""
+    pcm = _pcm16(resample(x, rate, RATE))
+    if not len(pcm):
+        raise ValueError("no audio samples to encode")
+    if codec == "ulaw":
+        fmt = struct.pack("<HHIIHHH", 7, 1, RATE, RATE, 1, 8, 0)
+        return _riff([(b"fmt ", fmt), (b"fact", struct.pack("<I", len(pcm))), (b"data", ulaw_encode(pcm))])
+    if codec == "adpcm":
+        fmt = struct.pack("<HHIIHHHH", 0x11, 1, RATE, RATE * ADPCM_BLOCK // ADPCM_SAMPLES,
+                          ADPCM_BLOCK, 4, 2, ADPCM_SAMPLES)
+        return _riff([(b"fmt ", fmt), (b"fact", struct.pack("<I", len(pcm))), (b"data", adpcm_encode(pcm))])
+    if codec == "lpc":
+        return lpc_encode(pcm)
+    raise ValueError(f"unknown voice codec {codec!r} (choose from {', '.join(CODECS)})")
+
+
+def decode(data: bytes) -> Tuple[np.ndarray, int]:
+    """(int16 samples, rate) of any file ``encode`` writes (or a WAV / FLAC)."""
+    x, rate = read_audio(data)
+    return _pcm16(x), rate
+
+
+def suffix(codec: str) -> str:
+    return ".lpc" if codec == "lpc" else ".wav"
+
+
+def encode_file(path: Path, codec: str) -> Tuple[bytes, str]:
+    """(file bytes, transmit name) of an audio file encoded with ``codec``."""
+    x, rate = load(path)
+    return encode(x, rate, codec), Path(path).with_suffix(suffix(codec)).name
+
+
+def main():
+    ap = argparse.ArgumentParser(description="NumPy-only voice codecs: 8 kHz µ-law, IMA ADPCM, 2.4 kbps LPC.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    enc = sub.add_parser("encode", help="WAV/FLAC -> µ-law WAV, IMA ADPCM WAV or .lpc")
+    enc.add_argument("src")
+    enc.add_argument("dst")
+    enc.add_argument("--codec", choices=CODECS, default="adpcm")
+    dec = sub.add_parser("decode", help="Any of those (or a WAV/FLAC) -> 16-bit PCM WAV")
+    dec.add_argument("src")
+    dec.add_argument("dst")
+    args = ap.parse_args()
+
+    try:
+        if args.cmd == "encode":
+            x, rate = load(Path(args.src))
+            out = encode(x, rate, args.codec)
+            secs = len(x) / rate
+            print(f"[OK] {args.codec}: {len(out)} bytes for {secs:.1f} s ({len(out) * 8 / secs / 1000:.1f} kbps)")
+        else:
+            pcm, rate = decode(Path(args.src).read_bytes())
+            out = pcm_wav(pcm, rate)
+            print(f"[OK] {len(pcm) / rate:.1f} s at {rate} Hz")
+    except ValueError as e:
+        raise SystemExit(f"[ERROR] {e}") from None
+    Path(args.dst).write_bytes(out)
+    print(f"[OK] Wrote {args.dst}")
+
+
+if __name__ == "__main__":
+    main()